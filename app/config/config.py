@@ -1,13 +1,34 @@
 from dotenv import load_dotenv
 import os
 
+# Configurazione letta una sola volta per processo: ogni modulo chiama load_config() a
+# livello di modulo e load_dotenv() (ricerca e parsing del file .env) pesava su ogni import
+_config = None
+
 def load_config():
     """
     Carica e restituisce tutte le variabili di configurazione dal file .env.
+    Il file viene letto alla prima chiamata; le successive restituiscono una copia dello
+    stesso dizionario (reload_config() forza una nuova lettura).
     """
-    load_dotenv()
+    global _config
+    if _config is None:
+        load_dotenv()
+        _config = _read_config()
+    return dict(_config)
+
+def reload_config():
+    """Rilegge .env e variabili d'ambiente (per gli script che le modificano a runtime)."""
+    global _config
+    _config = None
+    return load_config()
+
+def _read_config():
     return {
         "DB_PATH": os.getenv("DB_PATH", "nft_data.sqlite3"),
+        # Replica in sola lettura per il bot (vuoto = disattivata)
+        "DB_READ_REPLICA_PATH": os.getenv("DB_READ_REPLICA_PATH", ""),
+        "DB_READ_REPLICA_REFRESH_SECONDS": os.getenv("DB_READ_REPLICA_REFRESH_SECONDS", "300"),
         "API_ENDPOINT": os.getenv("API_ENDPOINT"),
         "QAPIKEY": os.getenv("QAPIKEY"),
         "TELEGRAM_BOT_TOKEN": os.getenv("TELEGRAM_BOT_TOKEN"),
@@ -30,6 +51,7 @@ def load_config():
         "SMA_100_MISSING_THRESH": os.getenv("SMA_100_MISSING_THRESH"),
         "SMA_200_MISSING_THRESH": os.getenv("SMA_200_MISSING_THRESH"),
         "ALLOWED_TELEGRAM_IDS": os.getenv("ALLOWED_TELEGRAM_IDS"),
+        "ADMIN_TELEGRAM_IDS": os.getenv("ADMIN_TELEGRAM_IDS"),
         "MNEMONIC": os.getenv("MNEMONIC"),  # Farcaster mnemonic
         "GROK_API_KEY": os.getenv("GROK_API_KEY"),
         "GROK_API_ENDPOINT": os.getenv("GROK_API_ENDPOINT", "https://api.x.ai/v1"),
@@ -41,4 +63,65 @@ def load_config():
         "ML_LABEL":          os.getenv("ML_LABEL",          "binary"),
         "ML_MIN_DAYS":       os.getenv("ML_MIN_DAYS",       "60"),
         "ML_MODEL_PATH":     os.getenv("ML_MODEL_PATH",     "data/ml_model.pkl"),
+        # Peak RSS allowed to the ML jobs in MB (0 = no limit, see app/ml/memory.py)
+        "ML_MEMORY_BUDGET_MB": os.getenv("ML_MEMORY_BUDGET_MB", "0"),
+        # Incremental ML feature store (separate SQLite file, see app/ml/feature_store.py)
+        "ML_FEATURE_STORE_PATH":          os.getenv("ML_FEATURE_STORE_PATH",          "data/ml_feature_store.sqlite3"),
+        "ML_FEATURE_STORE_TRAILING_DAYS": os.getenv("ML_FEATURE_STORE_TRAILING_DAYS", "400"),
+        # Total threads shared by the parallel walk-forward CV folds (0 = all cores)
+        "ML_CV_THREADS": os.getenv("ML_CV_THREADS", "0"),
+        # Warm-start model updates (daily_ml_run.py --incremental, see app/ml/model.py)
+        "ML_UPDATE_MODE":        os.getenv("ML_UPDATE_MODE",        "trees"),
+        "ML_UPDATE_TREES":       os.getenv("ML_UPDATE_TREES",       "20"),
+        "ML_UPDATE_WINDOW_DAYS": os.getenv("ML_UPDATE_WINDOW_DAYS", "90"),
+        "ML_FULL_RETRAIN_DAYS":  os.getenv("ML_FULL_RETRAIN_DAYS",  "7"),
+        "ML_DRIFT_TOLERANCE":    os.getenv("ML_DRIFT_TOLERANCE",    "0.10"),
+        # Out-of-core training (--external-memory, see app/ml/external_training.py)
+        "ML_TRAIN_PARTITION_COLLECTIONS": os.getenv("ML_TRAIN_PARTITION_COLLECTIONS", "200"),
+        "ML_TRAIN_WORK_DIR":              os.getenv("ML_TRAIN_WORK_DIR",              "data"),
+        # Chart rendering worker pool (bot)
+        "CHART_WORKERS":         os.getenv("CHART_WORKERS",         "2"),
+        "CHART_QUEUE_MAX":       os.getenv("CHART_QUEUE_MAX",       "8"),
+        "CHART_TIMEOUT_SECONDS": os.getenv("CHART_TIMEOUT_SECONDS", "30"),
+        # Rendered chart cache (bot)
+        "CHART_CACHE_DIR":            os.getenv("CHART_CACHE_DIR",            "data/chart_cache"),
+        "CHART_CACHE_MEMORY_ITEMS":   os.getenv("CHART_CACHE_MEMORY_ITEMS",   "64"),
+        "CHART_CACHE_DISK_MAX_MB":    os.getenv("CHART_CACHE_DISK_MAX_MB",    "200"),
+        "CHART_CACHE_PREWARM_TOP_N":  os.getenv("CHART_CACHE_PREWARM_TOP_N",  "20"),
+        "CHART_CACHE_PREWARM_DAYS":   os.getenv("CHART_CACHE_PREWARM_DAYS",   "30,90,365"),
+        # Bot run mode: "polling" (default) or "webhook"
+        "TELEGRAM_BOT_MODE":          os.getenv("TELEGRAM_BOT_MODE",          "polling"),
+        "TELEGRAM_WEBHOOK_LISTEN":    os.getenv("TELEGRAM_WEBHOOK_LISTEN",    "127.0.0.1"),
+        "TELEGRAM_WEBHOOK_PORT":      os.getenv("TELEGRAM_WEBHOOK_PORT",      "8443"),
+        "TELEGRAM_WEBHOOK_PATH":      os.getenv("TELEGRAM_WEBHOOK_PATH",      "telegram"),
+        "TELEGRAM_WEBHOOK_URL":       os.getenv("TELEGRAM_WEBHOOK_URL",       ""),
+        "TELEGRAM_WEBHOOK_SECRET":    os.getenv("TELEGRAM_WEBHOOK_SECRET",    ""),
+        "BOT_MAX_CONCURRENT_UPDATES": os.getenv("BOT_MAX_CONCURRENT_UPDATES", "16"),
+        "BOT_SHUTDOWN_GRACE_SECONDS": os.getenv("BOT_SHUTDOWN_GRACE_SECONDS", "20"),
+        # Per-command latency metrics (bot, /perf); dump every N seconds (0 = only at shutdown)
+        "BOT_METRICS_WINDOW":         os.getenv("BOT_METRICS_WINDOW",         "1000"),
+        "BOT_METRICS_DUMP_SECONDS":   os.getenv("BOT_METRICS_DUMP_SECONDS",   "300"),
+        "BOT_METRICS_DUMP_PATH":      os.getenv("BOT_METRICS_DUMP_PATH",      "data/bot_metrics.json"),
+        # Async database access for bot handlers
+        "DB_POOL_WORKERS":           os.getenv("DB_POOL_WORKERS",           "4"),
+        "DB_MAX_CONCURRENT_QUERIES": os.getenv("DB_MAX_CONCURRENT_QUERIES", "4"),
+        "DB_QUERY_TIMEOUT_SECONDS":  os.getenv("DB_QUERY_TIMEOUT_SECONDS",  "10"),
+        # Slug list pagination cache (bot)
+        "PAGINATION_CACHE_TTL_SECONDS": os.getenv("PAGINATION_CACHE_TTL_SECONDS", "300"),
+        # In-memory slug index (bot)
+        "SLUG_INDEX_REFRESH_SECONDS": os.getenv("SLUG_INDEX_REFRESH_SECONDS", "300"),
+        # Daily market dashboard snapshot (/dashboard)
+        "DASHBOARD_TOP_N":          os.getenv("DASHBOARD_TOP_N",          "5"),
+        "DASHBOARD_MAX_RANKING":    os.getenv("DASHBOARD_MAX_RANKING",    "500"),
+        "DASHBOARD_RETENTION_DAYS": os.getenv("DASHBOARD_RETENTION_DAYS", "30"),
+        # Outgoing Telegram notifications (send queue and rate limits)
+        "TELEGRAM_GLOBAL_RATE_PER_SEC":  os.getenv("TELEGRAM_GLOBAL_RATE_PER_SEC",  "25"),
+        "TELEGRAM_PRIVATE_RATE_PER_SEC": os.getenv("TELEGRAM_PRIVATE_RATE_PER_SEC", "1"),
+        "TELEGRAM_GROUP_RATE_PER_MIN":   os.getenv("TELEGRAM_GROUP_RATE_PER_MIN",   "20"),
+        "TELEGRAM_SEND_MAX_RETRIES":     os.getenv("TELEGRAM_SEND_MAX_RETRIES",     "5"),
+        "TELEGRAM_SEND_TIMEOUT_SECONDS": os.getenv("TELEGRAM_SEND_TIMEOUT_SECONDS", "120"),
+        # SQL tracing (opt-in)
+        "SQL_TRACE":          os.getenv("SQL_TRACE",          "0"),
+        "SQL_SLOW_QUERY_MS":  os.getenv("SQL_SLOW_QUERY_MS",  "200"),
+        "SQL_TRACE_DUMP_DIR": os.getenv("SQL_TRACE_DUMP_DIR", "sql_traces"),
     }
\ No newline at end of file
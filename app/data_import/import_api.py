@@ -1,6 +1,5 @@
 # app/data_import/import_api.py
 
-import asyncio
 import os
 import json
 import requests
@@ -8,8 +7,13 @@ import logging
 from datetime import datetime, date
 from app.config.config import load_config
 from app.database.database import get_db_connection
+from app.database.canonical_collections import register_collection_row
+from app.database.compact_schema import CompactHistoryWriter
+from app.database.ingest_stats import IngestStatsRecorder
+from app.database.read_replica import refresh_read_replica
+from app.telegram.utils.chart_cache import invalidate_chart_cache
 from app.utils.helpers import unix_to_yyyy_mm_dd, unix_to_hh_mm, extract_or_none
-from app.telegram.utils.telegram_notifier import send_telegram_message, get_monitoring_chat_id
+from app.telegram.utils.telegram_notifier import send_telegram_message_sync, get_monitoring_chat_id
 from app.telegram.utils import telegram_msg_templates # Import del modulo per i template
 
 def import_nft_collections_via_api():
@@ -55,17 +59,17 @@ def import_nft_collections_via_api():
         except FileNotFoundError:
              msg = f"Errore: File mock locale non trovato al percorso specificato: {fixed_mock_file_path}"
              logging.error(msg)
-             asyncio.run(send_telegram_message(msg, telegram_chat_id))
+             send_telegram_message_sync(msg, telegram_chat_id)
              return # Esce se il file mock richiesto non esiste
         except json.JSONDecodeError as e:
              msg = f"Errore parsing JSON nel file mock {fixed_mock_file_path}: {e}"
              logging.error(msg)
-             asyncio.run(send_telegram_message(msg, telegram_chat_id))
+             send_telegram_message_sync(msg, telegram_chat_id)
              return # Esce se il file mock non è un JSON valido
         except Exception as e:
             msg = f"Errore generico caricamento file mock {fixed_mock_file_path}: {e}"
             logging.error(msg)
-            asyncio.run(send_telegram_message(msg, telegram_chat_id))
+            send_telegram_message_sync(msg, telegram_chat_id)
             return # Esce per altri errori di caricamento file
 
     else:
@@ -78,7 +82,7 @@ def import_nft_collections_via_api():
                 # Gestisce errori HTTP
                 msg = f"Errore API! Status: {response.status_code}, Body: {response.text}"
                 logging.error(msg)
-                asyncio.run(send_telegram_message(msg, telegram_chat_id))
+                send_telegram_message_sync(msg, telegram_chat_id)
                 return # Esce in caso di errore API
             # Se tutto ok:
             try:
@@ -88,7 +92,7 @@ def import_nft_collections_via_api():
                 # Gestisce errori di parsing JSON della risposta API
                 msg = f"Errore parsing JSON di risposta API: {e}. Risposta testuale: {response.text[:500]}..." # Logga anche parte della risposta per contesto
                 logging.error(msg)
-                asyncio.run(send_telegram_message(msg, telegram_chat_id))
+                send_telegram_message_sync(msg, telegram_chat_id)
                 return # Esce se il parsing JSON fallisce
 
             # --- Salva la risposta API su file dinamico ---
@@ -114,19 +118,19 @@ def import_nft_collections_via_api():
             # Gestisce timeout della richiesta
             msg = "Errore Eccezione chiamata API: Timeout della richiesta dopo 60 secondi."
             logging.error(msg)
-            asyncio.run(send_telegram_message(msg, telegram_chat_id))
+            send_telegram_message_sync(msg, telegram_chat_id)
             return # Esce per timeout
         except requests.exceptions.RequestException as e:
             # Gestisce altri errori di richiesta
             msg = f"Errore Eccezione chiamata API: {e}"
             logging.error(msg)
-            asyncio.run(send_telegram_message(msg, telegram_chat_id))
+            send_telegram_message_sync(msg, telegram_chat_id)
             return # Esce per altri errori di richiesta
         except Exception as e:
             # Gestisce altre eccezioni impreviste durante la chiamata API
             msg = f"Eccezione imprevista durante chiamata API: {e}"
             logging.error(msg)
-            asyncio.run(send_telegram_message(msg, telegram_chat_id))
+            send_telegram_message_sync(msg, telegram_chat_id)
             return # Esce per eccezione imprevista
 
 
@@ -139,7 +143,7 @@ def import_nft_collections_via_api():
     if not isinstance(data, list):
         msg = "Il payload ricevuto (da mock o API) NON è un array di elementi processabili."
         logging.error(msg)
-        asyncio.run(send_telegram_message(msg, telegram_chat_id))
+        send_telegram_message_sync(msg, telegram_chat_id)
         # Se eravamo in modalità API e il salvataggio è avvenuto, includi questa info
         final_save_status = api_response_dump_status if not mock_mode else "skipped"
         # Invia un riepilogo di errore parziale se possibile, ma senza contatori di insert/skip/error
@@ -149,17 +153,10 @@ def import_nft_collections_via_api():
     conn = get_db_connection()
     cur = conn.cursor()
 
-    # Query di inserimento per historical_nft_data
-    # Usiamo INSERT OR IGNORE per gestire eventuali duplicati (basato su Primary Key) senza errori che bloccano tutto
-    insert_sql = """
-        INSERT OR IGNORE INTO historical_nft_data (
-            collection_identifier, contract_address, slug, latest_floor_date, latest_floor_timestamp,
-            floor_native, floor_usd, chain, chain_currency_symbol, marketplace_source,
-            ranking, unique_owners, total_supply, listed_count, best_price_url,
-            sale_count_24h, sale_volume_native_24h, highest_sale_native_24h, lowest_sale_native_24h
-        )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """
+    # Scrittura su historical_nft_data con semantica INSERT OR IGNORE (duplicati di Primary Key ignorati).
+    # Se lo storico è già migrato allo schema compatto, scrive direttamente su dim_* / nft_daily_facts.
+    writer = CompactHistoryWriter(conn)
+    ingest_stats = IngestStatsRecorder(conn)
 
     # Inizializzazione contatori per il riepilogo
     inserted = 0 # Record inseriti correttamente (o ignorati con successo da OR IGNORE, se vogliamo contarli così)
@@ -220,10 +217,11 @@ def import_nft_collections_via_api():
             )
 
             # Esegue l'inserimento nel database
-            cur.execute(insert_sql, values)
-
-            # sqlite3.cur.rowcount è 1 per INSERT, 0 per INSERT IGNORE se ignorato
-            if cur.rowcount == 1:
+            # True se la riga è stata inserita, False se ignorata perché duplicata
+            if writer.insert(cur, values):
+                # Aggiorna la mappatura canonica nella stessa transazione dell'insert
+                register_collection_row(cur, slug, collection_identifier, chain, latest_floor_date)
+                ingest_stats.record(cur, latest_floor_date, slug, floor_native, floor_usd)
                 inserted += 1
                 conn.commit() # Committa l'inserimento riuscito
                 # 4. Logging per elemento: Inserito correttamente
@@ -248,6 +246,11 @@ def import_nft_collections_via_api():
     # --- Fine del loop di elaborazione elementi ---
     conn.close() # Chiude la connessione al database al termine
 
+    # Aggiorna la replica di lettura del bot con i dati appena importati (se configurata)
+    refresh_read_replica()
+    # I grafici in cache sono basati sui dati precedenti all'import
+    invalidate_chart_cache()
+
     # --- 5. Messaggio Telegram finale ---
     logging.info("Importazione via API completata. Invio messaggio di riepilogo.")
 
@@ -263,7 +266,7 @@ def import_nft_collections_via_api():
 
     # Invia il messaggio Telegram
     if telegram_chat_id:
-        send_telegram_message(summary_msg, telegram_chat_id)
+        send_telegram_message_sync(summary_msg, telegram_chat_id, wait=False)
     else:
         logging.warning("ID chat Telegram non configurato. Impossibile inviare messaggio riepilogativo finale.")
 
@@ -1,11 +1,10 @@
-import asyncio
 import os
 import json
 import logging
 from datetime import date
 from app.database.database import get_db_connection
 from app.utils.helpers import extract_or_none
-from app.telegram.utils.telegram_notifier import send_telegram_message, get_monitoring_chat_id
+from app.telegram.utils.telegram_notifier import send_telegram_message_sync, get_monitoring_chat_id
 from app.telegram.utils import telegram_msg_templates  # Import del modulo per i template
 
 
@@ -30,17 +29,17 @@ def import_collections():
     except FileNotFoundError:
         msg = f"Errore: File non trovato - {json_path}. Assicurati che il file esista."
         logging.error(msg)
-        asyncio.run(send_telegram_message(msg, telegram_chat_id))
+        send_telegram_message_sync(msg, telegram_chat_id)
         return
     except json.JSONDecodeError as e:
         msg = f"Errore parsing JSON nel file {json_path}: {e}"
         logging.error(msg)
-        asyncio.run(send_telegram_message(msg, telegram_chat_id))
+        send_telegram_message_sync(msg, telegram_chat_id)
         return
     except Exception as e:
         msg = f"Errore generico caricamento file {json_path}: {e}"
         logging.error(msg)
-        asyncio.run(send_telegram_message(msg, telegram_chat_id))
+        send_telegram_message_sync(msg, telegram_chat_id)
         return
 
     if isinstance(data, dict) and "data" in data:
@@ -49,7 +48,7 @@ def import_collections():
     if not isinstance(data, list):
         msg = "Il payload del file non è un array di oggetti come previsto."
         logging.error(msg)
-        asyncio.run(send_telegram_message(msg, telegram_chat_id))
+        send_telegram_message_sync(msg, telegram_chat_id)
         return
 
     conn = get_db_connection()
@@ -143,7 +142,7 @@ def import_collections():
     )
 
     if telegram_chat_id:
-        asyncio.run(send_telegram_message(summary_msg, telegram_chat_id))
+        send_telegram_message_sync(summary_msg, telegram_chat_id)
     else:
         logging.warning("ID chat Telegram non configurato. Impossibile inviare messaggio riepilogativo finale.")
 
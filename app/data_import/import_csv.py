@@ -3,7 +3,10 @@ import csv
 import logging
 from datetime import datetime
 from app.database.database import get_db_connection
-from app.telegram.utils.telegram_notifier import send_telegram_message, get_monitoring_chat_id
+from app.database.compact_schema import CompactHistoryWriter
+from app.database.ingest_stats import IngestStatsRecorder
+from app.telegram.utils.chart_cache import invalidate_chart_cache
+from app.telegram.utils.telegram_notifier import send_telegram_message_sync, get_monitoring_chat_id
 from app.config.config import load_config
 
 # Configura logging
@@ -78,6 +81,8 @@ def import_csv_folder():
 
             conn = get_db_connection()
             cur = conn.cursor()
+            writer = CompactHistoryWriter(conn)
+            ingest_stats = IngestStatsRecorder(conn)
             for row in reader:
                 row_num += 1
                 try:
@@ -97,15 +102,7 @@ def import_csv_folder():
                         logging.error(f"[{filename}] Riga {row_num}: ERRORE data non valida — {row} — {e}")
                         continue
 
-                    # ---- PROVA DIRETTAMENTE LA INSERT ----
-                    insert_sql = """
-                        INSERT OR IGNORE INTO historical_nft_data (
-                            collection_identifier, contract_address, slug, latest_floor_date, latest_floor_timestamp,
-                            floor_native, floor_usd, chain, chain_currency_symbol, marketplace_source,
-                            ranking, unique_owners, total_supply, listed_count, best_price_url,
-                            sale_count_24h, sale_volume_native_24h, highest_sale_native_24h, lowest_sale_native_24h
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """
+                    # ---- PROVA DIRETTAMENTE LA INSERT (INSERT OR IGNORE) ----
                     values = (
                         collection_identifier,     # 1: collection_identifier (non presente nel CSV storico)
                         contract_address,          # 2: contract_address (estratto dal nome file)
@@ -129,10 +126,15 @@ def import_csv_folder():
                     )
 
                     try:
-                        cur.execute(insert_sql, values)
-                        conn.commit()
-                        inserted_rows += 1
-                        logging.info(f"[{filename}] Riga {row_num}: INSERITA [collection_id={collection_identifier}, date={norm_date}]")
+                        if writer.insert(cur, values):
+                            # Rollup giornaliero nella stessa transazione dell'insert
+                            ingest_stats.record(cur, norm_date, None, floor_native, None)
+                            conn.commit()
+                            inserted_rows += 1
+                            logging.info(f"[{filename}] Riga {row_num}: INSERITA [collection_id={collection_identifier}, date={norm_date}]")
+                        else:
+                            skipped_rows += 1
+                            logging.info(f"[{filename}] Riga {row_num}: SKIPPED (record già esistente) [collection_id={collection_identifier}, date={norm_date}]")
                     except Exception as insert_exc:
                         # ---- GESTIONE ERRORE DI CHIAVE UNICA/PRIMARIA ----
                         if "UNIQUE constraint failed" in str(insert_exc) or "duplicate key" in str(insert_exc).lower():
@@ -160,6 +162,11 @@ def import_csv_folder():
         total_rows_skipped += skipped_rows
         total_rows_errors += row_errors
 
+    # ---- INVALIDAZIONE GRAFICI IN CACHE ----
+    # Le righe storiche importate possono cambiare grafici già generati
+    if total_rows_inserted:
+        invalidate_chart_cache()
+
     # ---- MESSAGGIO TELEGRAM FINALE ----
     summary_msg = (
         f"Importazione CSV completata.\n"
@@ -169,7 +176,7 @@ def import_csv_folder():
         f"Errori: {total_rows_errors}"
     )
     if get_monitoring_chat_id():
-        send_telegram_message(summary_msg, get_monitoring_chat_id())
+        send_telegram_message_sync(summary_msg, get_monitoring_chat_id(), wait=False)
     else:
         logging.warning("ID chat Telegram non configurato. Impossibile inviare messaggio riepilogativo.")
 
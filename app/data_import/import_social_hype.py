@@ -10,8 +10,7 @@ import logging
 from datetime import datetime
 from app.config.config import load_config
 from app.database.db_connection import get_db_connection
-from app.telegram.utils.telegram_notifier import send_telegram_message, get_monitoring_chat_id
-import asyncio
+from app.telegram.utils.telegram_notifier import send_telegram_message_sync, get_monitoring_chat_id
 
 logger = logging.getLogger(__name__)
 
@@ -183,19 +182,19 @@ def import_nft_social_hype():
                 f"✅ Social hype aggiornato con successo!"
             )
             logger.info("Social hype importato correttamente!")
-            asyncio.run(send_telegram_message(message, monitoring_chat_id))
+            send_telegram_message_sync(message, monitoring_chat_id)
         else:
             logger.error("Errore nel salvataggio dei dati di hype nel database")
-            asyncio.run(send_telegram_message(
+            send_telegram_message_sync(
                 "❌ Errore nel salvataggio dei dati di social hype nel database",
                 monitoring_chat_id
-            ))
+            )
     else:
         logger.error("Errore nel recupero dei dati di sentiment da Grok")
-        asyncio.run(send_telegram_message(
+        send_telegram_message_sync(
             "❌ Errore nel recupero dei dati di sentiment da Grok",
             monitoring_chat_id
-        ))
+        )
 
 
 if __name__ == "__main__":
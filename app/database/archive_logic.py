@@ -4,7 +4,10 @@ Logica di archiviazione e notifica dei record storici NFT.
 
 import sqlite3
 from datetime import datetime, timedelta
-from app.telegram.utils.telegram_notifier import send_telegram_message, get_monitoring_chat_id
+from app.telegram.utils.telegram_notifier import send_telegram_message_sync, get_monitoring_chat_id
+from app.database.canonical_collections import unregister_rows_before
+from app.database.compact_schema import delete_history_before
+from app.database.ingest_stats import record_archive_move
 
 ARCHIVE_DAYS = 365  # Valore costante per il cutoff di archiviazione
 
@@ -32,11 +35,13 @@ def archive_and_notify_old_historical_data(conn):
             INSERT OR IGNORE INTO historical_nft_data_archive
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, records)
-        # Cancellazione dalla tabella principale
-        cur.execute("""
-            DELETE FROM historical_nft_data
-            WHERE latest_floor_date < ?
-        """, (cutoff_date,))
+        archived_inserted = cur.rowcount
+        # Sposta i contatori del rollup giornaliero verso l'archivio
+        record_archive_move(cur, records, archived_inserted)
+        # Aggiorna i contatori della mappatura canonica prima della cancellazione
+        unregister_rows_before(cur, cutoff_date)
+        # Cancellazione dalla tabella principale (sullo schema compatto via indice su 'day')
+        delete_history_before(cur, cutoff_date)
         conn.commit()
 
     # Generazione messaggio Telegram
@@ -48,7 +53,7 @@ def archive_and_notify_old_historical_data(conn):
 
     # Invio notifica Telegram tramite funzione legacy preesistente
     chat_id = get_monitoring_chat_id()
-    send_telegram_message(message, chat_id)
+    send_telegram_message_sync(message, chat_id, wait=False)
 
     # Restituisce i dati per log eventuale e testing
     return {
@@ -0,0 +1,452 @@
+"""
+Accesso asincrono al database per gli handler del bot.
+
+Gli handler aprivano una connessione sqlite3 ed eseguivano le query direttamente nel
+thread dell'event loop: una join lenta di /meta o un GROUP BY di /check_missing_days
+bloccavano tutti gli altri update. BotRepository esegue ogni lettura in un
+ThreadPoolExecutor dedicato (DB_POOL_WORKERS thread) con:
+  - pool di connessioni di sola lettura (replica se configurata, vedi read_replica.py),
+    riaperte quando la replica viene sostituita da un refresh
+  - limite di query contemporanee (DB_MAX_CONCURRENT_QUERIES, le altre attendono)
+  - timeout per query (DB_QUERY_TIMEOUT_SECONDS): allo scadere la query viene interrotta
+    con Connection.interrupt() e il chiamante riceve QueryTimeout
+
+Le query SQL del bot sono funzioni sincrone che ricevono la connessione (riusabili anche
+dagli script); i metodi async di BotRepository le eseguono nel pool.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from app.config.config import load_config
+from app.database.read_replica import get_read_connection, read_replica_version
+from app.database.canonical_collections import canonical_collections_available
+from app.database.ingest_stats import count_rows_on_date, daily_counts_since, table_summary
+from app.database.dashboard import load_daily_dashboard
+
+logger = logging.getLogger(__name__)
+
+config = load_config()
+DB_POOL_WORKERS = int(config.get("DB_POOL_WORKERS") or 4)
+DB_MAX_CONCURRENT_QUERIES = int(config.get("DB_MAX_CONCURRENT_QUERIES") or DB_POOL_WORKERS)
+DB_QUERY_TIMEOUT_SECONDS = float(config.get("DB_QUERY_TIMEOUT_SECONDS") or 10)
+
+
+class QueryTimeout(Exception):
+    """La query non è terminata entro DB_QUERY_TIMEOUT_SECONDS ed è stata interrotta."""
+
+
+# Filtro SQL per i comandi di lista slug per prefisso e chain. La categoria non ha un
+# filtro SQL: come nell'indice in memoria (slug_index.py) è confrontata in Python con
+# i token di 'categories' separati da virgole, senza spazi ai lati e in minuscolo,
+# quindi "art" trova "Art, PFP" ma non "pixel-art", e "pixelart" non trova "Pixel Art".
+SLUG_LIST_FILTERS = {
+    "slug_list_by_prefix": "slug LIKE ? || '%' COLLATE NOCASE",
+    "slug_list_by_chain": "chain LIKE ? COLLATE NOCASE",
+}
+
+
+# ─────────────────────────────────────────────
+# Query (sincrone, ricevono la connessione)
+# ─────────────────────────────────────────────
+
+def query_slug_list(conn, command: str, query_value: str) -> list:
+    cur = conn.cursor()
+    if command == "slug_list_by_category":
+        category = query_value.strip().lower()
+        cur.execute(
+            "SELECT slug, categories FROM nft_collections WHERE categories IS NOT NULL "
+            "ORDER BY slug COLLATE NOCASE"
+        )
+        return [
+            slug for slug, categories in cur.fetchall()
+            if category in {token.strip().lower() for token in str(categories).split(",")}
+        ]
+    cur.execute(
+        f"SELECT slug FROM nft_collections WHERE {SLUG_LIST_FILTERS[command]} "
+        "ORDER BY slug COLLATE NOCASE",
+        (query_value,)
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def query_chart_source(conn, slug: str) -> Optional[dict]:
+    """
+    Collezione da graficare per lo slug (la più recente tra quelle con lo stesso slug)
+    e sua ultima data disponibile, che fa da versione dei dati per la cache dei grafici.
+    None se lo slug non esiste.
+    """
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT c.collection_identifier, c.chain, c.chain_currency_symbol, MAX(h.latest_floor_date) "
+        "FROM nft_collections c "
+        "LEFT JOIN historical_nft_data h ON h.collection_identifier = c.collection_identifier "
+        "WHERE c.slug = ? "
+        "GROUP BY c.collection_identifier, c.chain, c.chain_currency_symbol "
+        "ORDER BY MAX(h.latest_floor_date) DESC "
+        "LIMIT 1",
+        (slug,)
+    )
+    row = cur.fetchone()
+    if not row:
+        return None
+    collection_identifier, chain, chain_currency_symbol, latest_floor_date = row
+    return {
+        "collection_identifier": collection_identifier,
+        "chain": chain,
+        "chain_currency_symbol": chain_currency_symbol,
+        "latest_floor_date": latest_floor_date,
+    }
+
+
+def query_collection_meta(conn, slug: str) -> Optional[tuple]:
+    """
+    (slug, name, chain, categories, best_price_url, latest_floor_date) della riga storica
+    più recente della collezione, o None.
+    """
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT nc.slug, nc.name, nc.chain, nc.categories, hnd.best_price_url, hnd.latest_floor_date
+        FROM nft_collections nc
+        INNER JOIN historical_nft_data hnd
+        ON nc.collection_identifier = hnd.collection_identifier
+        WHERE nc.slug = ? COLLATE NOCASE
+        """,
+        (slug,)
+    )
+    rows = cur.fetchall()
+    if not rows:
+        return None
+    return max(rows, key=lambda row: row[5] if row[5] is not None else "")
+
+
+def _placeholders(values) -> str:
+    return ",".join("?" * len(values))
+
+
+def _resolve_ma_collections(conn, slugs) -> dict:
+    """
+    slug → (collection_identifier, chain) della collezione più recente con quello slug.
+    Prima dalla tabella canonical_collections (chiave primaria su slug, con l'ultima data
+    di ogni identificativo); gli slug che non vi compaiono con la join sullo storico.
+    """
+    cur = conn.cursor()
+    resolved = {}
+    if canonical_collections_available(conn):
+        cur.execute(
+            f"""
+            SELECT slug, collection_identifier, chain FROM (
+                SELECT slug, collection_identifier, chain,
+                       ROW_NUMBER() OVER (PARTITION BY slug ORDER BY last_floor_date DESC) AS rn
+                FROM canonical_collections
+                WHERE slug IN ({_placeholders(slugs)})
+            ) WHERE rn = 1
+            """,
+            list(slugs)
+        )
+        resolved = {slug: (cid, chain) for slug, cid, chain in cur.fetchall()}
+
+    remaining = [slug for slug in slugs if slug not in resolved]
+    if remaining:
+        cur.execute(
+            f"""
+            SELECT slug, collection_identifier, chain FROM (
+                SELECT c.slug, c.collection_identifier, c.chain,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY c.slug ORDER BY MAX(h.latest_floor_date) DESC
+                       ) AS rn
+                FROM nft_collections c
+                LEFT JOIN historical_nft_data h ON h.collection_identifier = c.collection_identifier
+                WHERE c.slug IN ({_placeholders(remaining)})
+                GROUP BY c.slug, c.collection_identifier, c.chain
+            ) WHERE rn = 1
+            """,
+            remaining
+        )
+        resolved.update({slug: (cid, chain) for slug, cid, chain in cur.fetchall()})
+    return resolved
+
+
+def query_ma_windows(conn, slugs, floor_field: str, since_date: str) -> dict:
+    """
+    Dati per le medie mobili di più slug in un'unica lettura.
+    Per ogni slug trovato: collection_identifier, chain, numero totale di righe storiche,
+    prima data disponibile e le righe (data, valore) dal since_date in poi (range sulla
+    chiave (collection_identifier, latest_floor_date)). Gli slug inesistenti mancano dal risultato.
+    """
+    if floor_field not in ("floor_native", "floor_usd"):
+        raise ValueError(f"Campo non supportato: {floor_field}")
+    resolved = _resolve_ma_collections(conn, slugs)
+    if not resolved:
+        return {}
+
+    identifiers = sorted({cid for cid, _ in resolved.values()})
+    cur = conn.cursor()
+    # Conteggio e prima data: solo indice (collection_identifier, latest_floor_date)
+    cur.execute(
+        f"""
+        SELECT collection_identifier, COUNT(*), MIN(latest_floor_date)
+        FROM historical_nft_data
+        WHERE collection_identifier IN ({_placeholders(identifiers)})
+        GROUP BY collection_identifier
+        """,
+        identifiers
+    )
+    summary = {cid: (count, first_date) for cid, count, first_date in cur.fetchall()}
+
+    cur.execute(
+        f"""
+        SELECT collection_identifier, latest_floor_date, {floor_field}
+        FROM historical_nft_data
+        WHERE collection_identifier IN ({_placeholders(identifiers)})
+          AND latest_floor_date >= ?
+        ORDER BY collection_identifier, latest_floor_date ASC
+        """,
+        identifiers + [since_date]
+    )
+    windows = {}
+    for cid, floor_date, value in cur.fetchall():
+        windows.setdefault(cid, []).append((floor_date, value))
+
+    result = {}
+    for slug, (cid, chain) in resolved.items():
+        count, first_date = summary.get(cid, (0, None))
+        result[slug] = {
+            "collection_identifier": cid,
+            "chain": chain,
+            "count": count,
+            "first_date": first_date,
+            "rows": windows.get(cid, []),
+        }
+    return result
+
+
+def query_latest_social_hype(conn) -> Optional[tuple]:
+    """(date, hype_score, sentiment, trend, keywords, summary, created_at) più recente."""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT date, hype_score, sentiment, trend, keywords, summary, created_at
+        FROM nft_social_hype
+        ORDER BY date DESC
+        LIMIT 1
+    """)
+    return cur.fetchone()
+
+
+def query_x_sentiment(conn, slug: str, chain: str) -> Optional[tuple]:
+    """Ultima analisi del sentiment X per (slug, chain)."""
+    cur = conn.cursor()
+    cur.execute("""
+    SELECT
+        sentiment_score,
+        sentiment_category,
+        bullish_indicators,
+        bearish_indicators,
+        key_topics,
+        community_engagement,
+        volume_activity,
+        summary,
+        date
+    FROM nft_x_sentiment
+    WHERE slug = ? AND chain = ?
+    ORDER BY date DESC
+    LIMIT 1
+    """, (slug, chain))
+    return cur.fetchone()
+
+
+def query_x_sentiment_rankings(conn, limit: int = 5) -> tuple:
+    """(più bullish, più bearish) dell'ultima data di analisi: liste di (slug, chain, score, category, date)."""
+    cur = conn.cursor()
+    rankings = []
+    for order in ("DESC", "ASC"):
+        cur.execute(f"""
+        SELECT
+            slug,
+            chain,
+            sentiment_score,
+            sentiment_category,
+            date
+        FROM nft_x_sentiment
+        WHERE date = (SELECT MAX(date) FROM nft_x_sentiment)
+        ORDER BY sentiment_score {order}
+        LIMIT ?
+        """, (limit,))
+        rankings.append(cur.fetchall())
+    return tuple(rankings)
+
+
+# ─────────────────────────────────────────────
+# Repository asincrono
+# ─────────────────────────────────────────────
+
+class BotRepository:
+    """Esegue le query del bot in un pool di thread con connessioni di sola lettura riusate."""
+
+    def __init__(self, workers=DB_POOL_WORKERS, max_concurrent=DB_MAX_CONCURRENT_QUERIES,
+                 timeout=DB_QUERY_TIMEOUT_SECONDS):
+        self.workers = workers
+        self.timeout = timeout
+        self._executor = None
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self.metrics = {
+            "queries": 0,
+            "completed": 0,
+            "failed": 0,
+            "timeouts": 0,
+            "waiting": 0,
+            "connections_opened": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+        }
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bot-db")
+        return self._executor
+
+    # ── pool di connessioni ────────────────────────────────────────
+
+    def _checkout(self):
+        version = read_replica_version()
+        while True:
+            try:
+                conn_version, conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if conn_version == version:
+                return version, conn
+            conn.close()  # replica sostituita dopo l'apertura
+        with self._lock:
+            self.metrics["connections_opened"] += 1
+        return version, get_read_connection()
+
+    def _checkin(self, version, conn, healthy=True):
+        if healthy and version == read_replica_version() and self._idle.qsize() < self.workers:
+            self._idle.put((version, conn))
+        else:
+            conn.close()
+
+    def _close_idle(self):
+        while True:
+            try:
+                _, conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
+
+    # ── esecuzione ─────────────────────────────────────────────────
+
+    async def run(self, fn, *args):
+        """Esegue fn(conn, *args) nel pool e ne restituisce il risultato."""
+        in_use = {}
+
+        def job():
+            version, conn = self._checkout()
+            in_use["conn"] = conn
+            healthy = False
+            try:
+                result = fn(conn, *args)
+                healthy = True
+                return result
+            finally:
+                in_use.pop("conn", None)
+                self._checkin(version, conn, healthy)
+
+        name = getattr(fn, "__name__", str(fn))
+        self.metrics["queries"] += 1
+        self.metrics["waiting"] += 1
+        t0 = time.perf_counter()
+        try:
+            # Anche l'attesa di uno slot libero rientra nel timeout
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.metrics["timeouts"] += 1
+            logger.warning(f"Query {name}: nessuno slot libero entro {self.timeout:.1f}s.")
+            raise QueryTimeout(name)
+        finally:
+            self.metrics["waiting"] -= 1
+
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self._get_executor(), job)
+            remaining = max(self.timeout - (time.perf_counter() - t0), 0.1)
+            result = await asyncio.wait_for(future, timeout=remaining)
+        except asyncio.TimeoutError:
+            self.metrics["timeouts"] += 1
+            conn = in_use.get("conn")
+            if conn is not None:
+                conn.interrupt()  # la query in corso fallisce con "interrupted"
+            logger.warning(f"Query {name} interrotta dopo {self.timeout:.1f}s.")
+            raise QueryTimeout(name)
+        except Exception:
+            self.metrics["failed"] += 1
+            raise
+        finally:
+            self._semaphore.release()
+
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        self.metrics["completed"] += 1
+        self.metrics["total_ms"] += elapsed_ms
+        self.metrics["max_ms"] = max(self.metrics["max_ms"], elapsed_ms)
+        return result
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._close_idle()
+
+    def stats(self) -> dict:
+        completed = self.metrics["completed"]
+        return {
+            **self.metrics,
+            "workers": self.workers,
+            "idle_connections": self._idle.qsize(),
+            "avg_ms": self.metrics["total_ms"] / completed if completed else 0.0,
+        }
+
+    # ── query del bot ──────────────────────────────────────────────
+
+    async def count_rows_on_date(self, query_date: str) -> int:
+        return await self.run(count_rows_on_date, query_date)
+
+    async def daily_counts_since(self, since_date: str, min_rows: int) -> list:
+        return await self.run(daily_counts_since, since_date, min_rows)
+
+    async def table_summary(self, table: str) -> dict:
+        return await self.run(table_summary, table)
+
+    async def slug_list(self, command: str, query_value: str) -> list:
+        return await self.run(query_slug_list, command, query_value)
+
+    async def collection_meta(self, slug: str) -> Optional[tuple]:
+        return await self.run(query_collection_meta, slug)
+
+    async def ma_windows(self, slugs: list, floor_field: str, since_date: str) -> dict:
+        return await self.run(query_ma_windows, slugs, floor_field, since_date)
+
+    async def chart_source(self, slug: str) -> Optional[dict]:
+        return await self.run(query_chart_source, slug)
+
+    async def latest_social_hype(self) -> Optional[tuple]:
+        return await self.run(query_latest_social_hype)
+
+    async def x_sentiment(self, slug: str, chain: str) -> Optional[tuple]:
+        return await self.run(query_x_sentiment, slug, chain)
+
+    async def x_sentiment_rankings(self, limit: int = 5) -> tuple:
+        return await self.run(query_x_sentiment_rankings, limit)
+
+    async def daily_dashboard(self, scope: Optional[str] = None) -> Optional[tuple]:
+        return await self.run(load_daily_dashboard, scope)
+
+
+bot_repository = BotRepository()
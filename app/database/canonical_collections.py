@@ -0,0 +1,214 @@
+"""
+Mappatura canonica slug → (collection_identifier, chain).
+
+La stessa collezione NFT può essere stata importata con più collection_identifier
+(stesso slug). La regola storica, usata dal feature pipeline ML, sceglie per ogni
+slug la coppia (collection_identifier, chain) con più righe in historical_nft_data,
+a parità di righe la collection_identifier alfabeticamente minore.
+
+Invece di ricalcolare la regola con un GROUP BY sull'intera tabella storica a ogni
+lettura, la tabella 'canonical_collections' mantiene i contatori per ogni
+(slug, collection_identifier, chain) e il flag is_canonical, aggiornati in modo
+incrementale dagli import. L'elezione del canonico per uno slug viene rifatta solo
+quando compare un nuovo identificativo o quando cresce un identificativo non
+canonico (l'unico caso in cui il vincitore può cambiare).
+"""
+
+import logging
+from datetime import datetime
+
+CREATE_CANONICAL_COLLECTIONS_SQL = """
+CREATE TABLE IF NOT EXISTS canonical_collections (
+    slug TEXT NOT NULL,
+    collection_identifier TEXT NOT NULL,
+    chain TEXT NOT NULL,
+    row_count INTEGER NOT NULL DEFAULT 0,
+    last_floor_date TEXT,
+    is_canonical INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT,
+    PRIMARY KEY (slug, collection_identifier, chain)
+);
+"""
+
+CREATE_CANONICAL_COLLECTIONS_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS idx_canonical_collections_id_chain
+ON canonical_collections (collection_identifier, chain, is_canonical);
+"""
+
+
+def create_canonical_collections_table(cur):
+    """
+    Crea la tabella canonical_collections e il relativo indice (idempotente).
+    """
+    cur.execute(CREATE_CANONICAL_COLLECTIONS_SQL)
+    cur.execute(CREATE_CANONICAL_COLLECTIONS_INDEX_SQL)
+
+
+def canonical_collections_available(conn) -> bool:
+    """
+    Restituisce True se la tabella canonical_collections esiste ed è popolata.
+    I lettori la usano per decidere se ricadere sulla deduplica via CTE.
+    """
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'canonical_collections'"
+    )
+    if not cur.fetchone():
+        return False
+    cur.execute("SELECT 1 FROM canonical_collections WHERE is_canonical = 1 LIMIT 1")
+    return cur.fetchone() is not None
+
+
+def _elect_canonical(cur, slug):
+    """
+    Rielegge il canonico per un singolo slug (poche righe, lookup per chiave primaria).
+    """
+    cur.execute(
+        """
+        UPDATE canonical_collections
+        SET is_canonical = CASE WHEN rowid = (
+                SELECT rowid FROM canonical_collections
+                WHERE slug = ?
+                ORDER BY row_count DESC, collection_identifier ASC
+                LIMIT 1
+            ) THEN 1 ELSE 0 END,
+            updated_at = ?
+        WHERE slug = ?
+        """,
+        (slug, datetime.utcnow().isoformat(), slug),
+    )
+
+
+def register_collection_row(cur, slug, collection_identifier, chain, floor_date):
+    """
+    Registra una nuova riga inserita in historical_nft_data.
+    Va chiamata nella stessa transazione dell'INSERT, solo se la riga è stata
+    effettivamente inserita (rowcount == 1).
+    Le righe senza slug (es. import CSV storici) non partecipano alla deduplica,
+    come nella regola originale basata su GROUP BY slug.
+    """
+    if not slug or not collection_identifier or not chain:
+        return
+
+    cur.execute(
+        """
+        SELECT is_canonical FROM canonical_collections
+        WHERE slug = ? AND collection_identifier = ? AND chain = ?
+        """,
+        (slug, collection_identifier, chain),
+    )
+    row = cur.fetchone()
+
+    if row is None:
+        # Nuovo identificativo per lo slug: inserisce e rielegge
+        cur.execute(
+            """
+            INSERT INTO canonical_collections
+                (slug, collection_identifier, chain, row_count, last_floor_date, is_canonical, updated_at)
+            VALUES (?, ?, ?, 1, ?, 0, ?)
+            """,
+            (slug, collection_identifier, chain, floor_date, datetime.utcnow().isoformat()),
+        )
+        _elect_canonical(cur, slug)
+        return
+
+    cur.execute(
+        """
+        UPDATE canonical_collections
+        SET row_count = row_count + 1,
+            last_floor_date = MAX(COALESCE(last_floor_date, ''), ?)
+        WHERE slug = ? AND collection_identifier = ? AND chain = ?
+        """,
+        (floor_date, slug, collection_identifier, chain),
+    )
+    if not row[0]:
+        # Solo un identificativo non canonico può superare il canonico attuale
+        _elect_canonical(cur, slug)
+
+
+def unregister_rows_before(cur, cutoff_date):
+    """
+    Aggiorna i contatori prima che le righe con latest_floor_date < cutoff_date
+    vengano spostate in archivio (la regola canonica conta solo historical_nft_data).
+    Va chiamata prima della DELETE, nella stessa transazione.
+    """
+    cur.execute(
+        """
+        SELECT slug, collection_identifier, chain, COUNT(*)
+        FROM historical_nft_data
+        WHERE latest_floor_date < ?
+          AND slug IS NOT NULL AND collection_identifier IS NOT NULL AND chain IS NOT NULL
+        GROUP BY slug, collection_identifier, chain
+        """,
+        (cutoff_date,),
+    )
+    removed = cur.fetchall()
+    if not removed:
+        return 0
+
+    cur.executemany(
+        """
+        UPDATE canonical_collections
+        SET row_count = row_count - ?
+        WHERE slug = ? AND collection_identifier = ? AND chain = ?
+        """,
+        [(cnt, slug, cid, chain) for slug, cid, chain, cnt in removed],
+    )
+    cur.execute("DELETE FROM canonical_collections WHERE row_count <= 0")
+
+    for slug in sorted({r[0] for r in removed}):
+        _elect_canonical(cur, slug)
+    return len(removed)
+
+
+def rebuild_canonical_collections(conn, logger=None):
+    """
+    Ricostruisce da zero canonical_collections con una scansione completa di
+    historical_nft_data. Da usare per la migrazione iniziale o come riallineamento.
+    """
+    logger = logger or logging.getLogger(__name__)
+    cur = conn.cursor()
+    create_canonical_collections_table(cur)
+    cur.execute("DELETE FROM canonical_collections")
+    now = datetime.utcnow().isoformat()
+    cur.execute(
+        """
+        INSERT INTO canonical_collections
+            (slug, collection_identifier, chain, row_count, last_floor_date, is_canonical, updated_at)
+        SELECT
+            slug,
+            collection_identifier,
+            chain,
+            cnt,
+            max_date,
+            CASE WHEN rn = 1 THEN 1 ELSE 0 END,
+            ?
+        FROM (
+            SELECT
+                slug,
+                collection_identifier,
+                chain,
+                cnt,
+                max_date,
+                ROW_NUMBER() OVER (
+                    PARTITION BY slug
+                    ORDER BY cnt DESC, collection_identifier ASC
+                ) AS rn
+            FROM (
+                SELECT slug, collection_identifier, chain,
+                       COUNT(*) AS cnt, MAX(latest_floor_date) AS max_date
+                FROM historical_nft_data
+                WHERE slug IS NOT NULL AND collection_identifier IS NOT NULL AND chain IS NOT NULL
+                GROUP BY slug, collection_identifier, chain
+            )
+        )
+        """,
+        (now,),
+    )
+    conn.commit()
+    cur.execute("SELECT COUNT(*), SUM(is_canonical) FROM canonical_collections")
+    total, canonical = cur.fetchone()
+    logger.info(
+        f"canonical_collections ricostruita: {total} identificativi, {canonical or 0} canonici."
+    )
+    return total, canonical or 0
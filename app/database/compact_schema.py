@@ -0,0 +1,361 @@
+"""
+Schema compatto per lo storico giornaliero NFT (chiavi surrogate intere).
+
+La tabella legacy 'historical_nft_data' ripete in ogni riga giornaliera le stringhe
+collection_identifier, slug, chain e chain_currency_symbol, e la sua chiave primaria
+(oltre all'indice idx_collection_date) è costruita su queste stringhe.
+
+Lo schema compatto normalizza i dati in:
+  - dim_chain       → una riga per chain (id intero, simbolo della valuta)
+  - dim_collection  → una riga per (collection_identifier, chain) con slug e contratto
+  - nft_daily_facts → una riga per (collection_id, day), WITHOUT ROWID, dove 'day'
+                      è il numero di giorni dal 1970-01-01 (intero)
+
+Dopo la migrazione (scripts/migrate_to_compact_historical_schema.py) la tabella legacy
+viene rinominata e 'historical_nft_data' diventa una vista di compatibilità con le stesse
+colonne nello stesso ordine, più trigger INSTEAD OF per INSERT e DELETE: le query
+esistenti continuano a funzionare, mentre i percorsi caldi (import API, archiviazione,
+feature pipeline ML) usano direttamente le colonne compatte.
+
+Il flag has_metadata nella tabella dei fatti conserva la distinzione tra righe importate
+via API (slug e simbolo valuta presenti) e righe storiche da CSV (slug e simbolo NULL),
+così la vista restituisce esattamente gli stessi valori della tabella legacy.
+"""
+
+from datetime import date, timedelta
+
+# Offset giuliano del 1970-01-01: day = julianday(data) - EPOCH_JULIAN_DAY
+EPOCH_JULIAN_DAY = 2440587.5
+
+# Ordine delle colonne della tabella legacy (e della vista di compatibilità)
+HISTORICAL_COLUMNS = (
+    "collection_identifier", "contract_address", "slug", "latest_floor_date",
+    "latest_floor_timestamp", "floor_native", "floor_usd", "chain",
+    "chain_currency_symbol", "marketplace_source", "ranking", "unique_owners",
+    "total_supply", "listed_count", "best_price_url", "sale_count_24h",
+    "sale_volume_native_24h", "highest_sale_native_24h", "lowest_sale_native_24h",
+)
+
+# Colonne per riga che restano nella tabella dei fatti
+FACT_VALUE_COLUMNS = (
+    "latest_floor_timestamp", "floor_native", "floor_usd", "marketplace_source",
+    "ranking", "unique_owners", "total_supply", "listed_count", "best_price_url",
+    "sale_count_24h", "sale_volume_native_24h", "highest_sale_native_24h",
+    "lowest_sale_native_24h",
+)
+
+CREATE_COMPACT_TABLES_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS dim_chain (
+        chain_id INTEGER PRIMARY KEY,
+        chain TEXT NOT NULL UNIQUE,
+        chain_currency_symbol TEXT
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS dim_collection (
+        collection_id INTEGER PRIMARY KEY,
+        collection_identifier TEXT NOT NULL,
+        chain_id INTEGER NOT NULL REFERENCES dim_chain(chain_id),
+        slug TEXT,
+        contract_address TEXT,
+        UNIQUE (collection_identifier, chain_id)
+    );
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_dim_collection_slug ON dim_collection (slug);
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS nft_daily_facts (
+        collection_id INTEGER NOT NULL REFERENCES dim_collection(collection_id),
+        day INTEGER NOT NULL,
+        has_metadata INTEGER NOT NULL DEFAULT 1,
+        latest_floor_timestamp TEXT,
+        floor_native REAL,
+        floor_usd REAL,
+        marketplace_source TEXT,
+        ranking INTEGER,
+        unique_owners INTEGER,
+        total_supply INTEGER,
+        listed_count INTEGER,
+        best_price_url TEXT,
+        sale_count_24h INTEGER,
+        sale_volume_native_24h REAL,
+        highest_sale_native_24h REAL,
+        lowest_sale_native_24h REAL,
+        PRIMARY KEY (collection_id, day)
+    ) WITHOUT ROWID;
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_nft_daily_facts_day ON nft_daily_facts (day);
+    """,
+)
+
+CREATE_COMPAT_VIEW_SQL = """
+CREATE VIEW IF NOT EXISTS historical_nft_data AS
+SELECT
+    c.collection_identifier,
+    c.contract_address,
+    CASE WHEN f.has_metadata THEN c.slug END AS slug,
+    date(f.day + 2440587.5) AS latest_floor_date,
+    f.latest_floor_timestamp,
+    f.floor_native,
+    f.floor_usd,
+    ch.chain,
+    CASE WHEN f.has_metadata THEN ch.chain_currency_symbol END AS chain_currency_symbol,
+    f.marketplace_source,
+    f.ranking,
+    f.unique_owners,
+    f.total_supply,
+    f.listed_count,
+    f.best_price_url,
+    f.sale_count_24h,
+    f.sale_volume_native_24h,
+    f.highest_sale_native_24h,
+    f.lowest_sale_native_24h
+FROM nft_daily_facts f
+JOIN dim_collection c ON c.collection_id = f.collection_id
+JOIN dim_chain ch ON ch.chain_id = c.chain_id;
+"""
+
+# Nota: se l'INSERT esterno è 'INSERT OR IGNORE', SQLite applica la stessa politica
+# di conflitto a tutte le istruzioni del trigger (duplicati ignorati come prima).
+# slug e contract_address di dim_collection valgono per tutte le righe della vista:
+# si aggiornano solo se la riga dei fatti è stata davvero inserita (changes() > 0)
+# ed è la più recente della collezione, così reimportare un giorno vecchio non
+# riporta indietro i metadati.
+CREATE_COMPAT_TRIGGERS_SQL = (
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_historical_nft_data_insert
+    INSTEAD OF INSERT ON historical_nft_data
+    BEGIN
+        SELECT RAISE(ABORT, 'historical_nft_data: collection_identifier, chain e latest_floor_date sono obbligatori')
+        WHERE NEW.collection_identifier IS NULL OR NEW.chain IS NULL
+           OR julianday(NEW.latest_floor_date) IS NULL;
+        INSERT OR IGNORE INTO dim_chain (chain, chain_currency_symbol)
+        VALUES (NEW.chain, NEW.chain_currency_symbol);
+        UPDATE dim_chain SET chain_currency_symbol = NEW.chain_currency_symbol
+        WHERE chain = NEW.chain AND chain_currency_symbol IS NULL
+          AND NEW.chain_currency_symbol IS NOT NULL;
+        INSERT OR IGNORE INTO dim_collection (collection_identifier, chain_id, slug, contract_address)
+        VALUES (NEW.collection_identifier,
+                (SELECT chain_id FROM dim_chain WHERE chain = NEW.chain),
+                NEW.slug, NEW.contract_address);
+        INSERT INTO nft_daily_facts (
+            collection_id, day, has_metadata,
+            latest_floor_timestamp, floor_native, floor_usd, marketplace_source,
+            ranking, unique_owners, total_supply, listed_count, best_price_url,
+            sale_count_24h, sale_volume_native_24h, highest_sale_native_24h, lowest_sale_native_24h
+        ) VALUES (
+            (SELECT c.collection_id FROM dim_collection c JOIN dim_chain ch ON ch.chain_id = c.chain_id
+             WHERE c.collection_identifier = NEW.collection_identifier AND ch.chain = NEW.chain),
+            CAST(julianday(NEW.latest_floor_date) - 2440587.5 AS INTEGER),
+            NEW.slug IS NOT NULL,
+            NEW.latest_floor_timestamp, NEW.floor_native, NEW.floor_usd, NEW.marketplace_source,
+            NEW.ranking, NEW.unique_owners, NEW.total_supply, NEW.listed_count, NEW.best_price_url,
+            NEW.sale_count_24h, NEW.sale_volume_native_24h, NEW.highest_sale_native_24h,
+            NEW.lowest_sale_native_24h
+        );
+        UPDATE dim_collection
+        SET slug = COALESCE(NEW.slug, slug),
+            contract_address = COALESCE(NEW.contract_address, contract_address)
+        WHERE changes() > 0
+          AND collection_identifier = NEW.collection_identifier
+          AND chain_id = (SELECT chain_id FROM dim_chain WHERE chain = NEW.chain)
+          AND CAST(julianday(NEW.latest_floor_date) - 2440587.5 AS INTEGER) >= (
+                SELECT MAX(f.day) FROM nft_daily_facts f WHERE f.collection_id = dim_collection.collection_id)
+          AND (slug IS NOT COALESCE(NEW.slug, slug)
+               OR contract_address IS NOT COALESCE(NEW.contract_address, contract_address));
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_historical_nft_data_delete
+    INSTEAD OF DELETE ON historical_nft_data
+    BEGIN
+        DELETE FROM nft_daily_facts
+        WHERE collection_id = (
+                SELECT c.collection_id FROM dim_collection c JOIN dim_chain ch ON ch.chain_id = c.chain_id
+                WHERE c.collection_identifier = OLD.collection_identifier AND ch.chain = OLD.chain)
+          AND day = CAST(julianday(OLD.latest_floor_date) - 2440587.5 AS INTEGER);
+    END;
+    """,
+)
+
+
+def create_compact_tables(cur):
+    """
+    Crea le tabelle dimensionali e la tabella dei fatti compatta (idempotente).
+    Non tocca 'historical_nft_data': la sostituzione con la vista avviene solo
+    nello script di migrazione.
+    """
+    for sql in CREATE_COMPACT_TABLES_SQL:
+        cur.execute(sql)
+
+
+def create_compat_view(cur):
+    """
+    Crea la vista 'historical_nft_data' e i trigger INSTEAD OF.
+    Da chiamare solo dopo aver rinominato/rimosso la tabella legacy.
+    """
+    cur.execute(CREATE_COMPAT_VIEW_SQL)
+    for sql in CREATE_COMPAT_TRIGGERS_SQL:
+        cur.execute(sql)
+
+
+def is_compact_schema(conn) -> bool:
+    """
+    Restituisce True se 'historical_nft_data' è la vista di compatibilità,
+    cioè se lo storico risiede nelle tabelle compatte.
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT type FROM sqlite_master WHERE name = 'historical_nft_data'")
+    row = cur.fetchone()
+    return row is not None and row[0] == "view"
+
+
+def date_to_day(date_str):
+    """Converte 'YYYY-MM-DD' nel numero di giorni dal 1970-01-01."""
+    return (date.fromisoformat(date_str[:10]) - date(1970, 1, 1)).days
+
+
+def day_to_date(day):
+    """Converte il numero di giorni dal 1970-01-01 in 'YYYY-MM-DD'."""
+    return (date(1970, 1, 1) + timedelta(days=int(day))).isoformat()
+
+
+class CompactHistoryWriter:
+    """
+    Scrittura diretta sulle tabelle compatte per i percorsi caldi di import.
+
+    Mantiene in memoria le chiavi surrogate già risolte, così ogni riga costa una
+    sola INSERT sulla tabella dei fatti. Su schema legacy esegue la stessa
+    'INSERT OR IGNORE INTO historical_nft_data' di sempre.
+    """
+
+    LEGACY_INSERT_SQL = f"""
+        INSERT OR IGNORE INTO historical_nft_data ({", ".join(HISTORICAL_COLUMNS)})
+        VALUES ({", ".join("?" for _ in HISTORICAL_COLUMNS)})
+    """
+
+    FACT_INSERT_SQL = f"""
+        INSERT OR IGNORE INTO nft_daily_facts (collection_id, day, has_metadata, {", ".join(FACT_VALUE_COLUMNS)})
+        VALUES (?, ?, ?, {", ".join("?" for _ in FACT_VALUE_COLUMNS)})
+    """
+
+    def __init__(self, conn):
+        self.compact = is_compact_schema(conn)
+        self._chain_ids = {}
+        self._collection_ids = {}
+
+    def _chain_id(self, cur, chain, currency_symbol):
+        chain_id = self._chain_ids.get(chain)
+        if chain_id is None:
+            cur.execute(
+                "INSERT OR IGNORE INTO dim_chain (chain, chain_currency_symbol) VALUES (?, ?)",
+                (chain, currency_symbol),
+            )
+            cur.execute("SELECT chain_id FROM dim_chain WHERE chain = ?", (chain,))
+            chain_id = cur.fetchone()[0]
+            self._chain_ids[chain] = chain_id
+        if currency_symbol is not None:
+            cur.execute(
+                "UPDATE dim_chain SET chain_currency_symbol = ? "
+                "WHERE chain_id = ? AND chain_currency_symbol IS NULL",
+                (currency_symbol, chain_id),
+            )
+        return chain_id
+
+    def _collection_id(self, cur, collection_identifier, chain_id, slug, contract_address):
+        key = (collection_identifier, chain_id)
+        collection_id = self._collection_ids.get(key)
+        if collection_id is None:
+            cur.execute(
+                "INSERT OR IGNORE INTO dim_collection (collection_identifier, chain_id, slug, contract_address) "
+                "VALUES (?, ?, ?, ?)",
+                (collection_identifier, chain_id, slug, contract_address),
+            )
+            cur.execute(
+                "SELECT collection_id FROM dim_collection WHERE collection_identifier = ? AND chain_id = ?",
+                key,
+            )
+            collection_id = cur.fetchone()[0]
+            self._collection_ids[key] = collection_id
+        return collection_id
+
+    def _update_collection_metadata(self, cur, collection_id, day, slug, contract_address):
+        """
+        Aggiorna slug/contract_address della collezione con quelli di una riga appena
+        inserita, solo se è la più recente e se i valori cambiano (come il trigger).
+        """
+        if slug is None and contract_address is None:
+            return
+        cur.execute(
+            "UPDATE dim_collection SET slug = COALESCE(?, slug), "
+            "contract_address = COALESCE(?, contract_address) "
+            "WHERE collection_id = ? "
+            "AND ? >= (SELECT MAX(day) FROM nft_daily_facts WHERE collection_id = ?) "
+            "AND (slug IS NOT COALESCE(?, slug) "
+            "OR contract_address IS NOT COALESCE(?, contract_address))",
+            (slug, contract_address, collection_id, day, collection_id, slug, contract_address),
+        )
+
+    def insert(self, cur, values) -> bool:
+        """
+        Inserisce una riga (tupla nell'ordine di HISTORICAL_COLUMNS) con semantica
+        INSERT OR IGNORE. Restituisce True se la riga è stata inserita, False se
+        era un duplicato della chiave primaria.
+        """
+        if not self.compact:
+            cur.execute(self.LEGACY_INSERT_SQL, values)
+            return cur.rowcount == 1
+
+        row = dict(zip(HISTORICAL_COLUMNS, values))
+        if not row["collection_identifier"] or not row["chain"] or not row["latest_floor_date"]:
+            raise ValueError("collection_identifier, chain e latest_floor_date sono obbligatori")
+
+        chain_id = self._chain_id(cur, row["chain"], row["chain_currency_symbol"])
+        collection_id = self._collection_id(
+            cur, row["collection_identifier"], chain_id, row["slug"], row["contract_address"]
+        )
+        day = date_to_day(row["latest_floor_date"])
+        cur.execute(
+            self.FACT_INSERT_SQL,
+            (
+                collection_id,
+                day,
+                int(row["slug"] is not None),
+                *(row[col] for col in FACT_VALUE_COLUMNS),
+            ),
+        )
+        if cur.rowcount != 1:
+            return False
+        self._update_collection_metadata(cur, collection_id, day, row["slug"], row["contract_address"])
+        return True
+
+
+def delete_history_before(cur, cutoff_date) -> int:
+    """
+    Cancella dallo storico attivo le righe con data < cutoff_date.
+    Su schema compatto usa l'indice intero su 'day' invece del trigger riga per riga.
+    """
+    cur.execute("SELECT type FROM sqlite_master WHERE name = 'historical_nft_data'")
+    row = cur.fetchone()
+    if row is not None and row[0] == "view":
+        cur.execute("DELETE FROM nft_daily_facts WHERE day < ?", (date_to_day(cutoff_date),))
+    else:
+        cur.execute("DELETE FROM historical_nft_data WHERE latest_floor_date < ?", (cutoff_date,))
+    return cur.rowcount
+
+
+def latest_history_date(conn):
+    """
+    Restituisce la data più recente presente nello storico ('YYYY-MM-DD' o None),
+    leggendo il MAX dall'indice intero quando lo schema è compatto.
+    """
+    cur = conn.cursor()
+    if is_compact_schema(conn):
+        cur.execute("SELECT MAX(day) FROM nft_daily_facts")
+        day = cur.fetchone()[0]
+        return day_to_date(day) if day is not None else None
+    cur.execute("SELECT MAX(latest_floor_date) FROM historical_nft_data")
+    return cur.fetchone()[0]
@@ -0,0 +1,284 @@
+"""
+Snapshot giornaliero della dashboard di mercato.
+
+La tabella 'daily_dashboard' contiene, per ogni data, poche decine di righe già pronte
+per il comando /dashboard del bot:
+  - gainers_1d / gainers_7d / gainers_30d → top DASHBOARD_TOP_N per variazione % del floor
+                                             (native) per chain
+  - volume                                → top per volume di vendita 24h (native) per chain
+  - crosses                               → golden cross rilevate nel giorno, per chain
+  - ml_signals                            → segnali BUY più forti dell'ultima esecuzione ML
+  - hype                                  → ultimo punteggio di social hype
+
+Le righe per chain hanno scope = chain, quelle globali scope = ''. Sono considerate solo
+le collezioni con ranking entro DASHBOARD_MAX_RANKING, per non riempire la dashboard di
+collezioni illiquide.
+
+La snapshot viene ricostruita da scripts/build_daily_dashboard.py dopo gli import (e di
+nuovo dopo golden cross e ML): la ricostruzione di una data sostituisce le sue righe, quindi
+il job si può rilanciare. Le snapshot più vecchie di DASHBOARD_RETENTION_DAYS vengono
+eliminate.
+"""
+
+from datetime import date, datetime, timedelta
+
+from app.config.config import load_config
+from app.database.compact_schema import date_to_day, is_compact_schema, latest_history_date
+
+config = load_config()
+DASHBOARD_TOP_N = int(config.get("DASHBOARD_TOP_N") or 5)
+DASHBOARD_MAX_RANKING = int(config.get("DASHBOARD_MAX_RANKING") or 500)
+DASHBOARD_RETENTION_DAYS = int(config.get("DASHBOARD_RETENTION_DAYS") or 30)
+
+GAINER_WINDOWS = (("gainers_1d", 1), ("gainers_7d", 7), ("gainers_30d", 30))
+GLOBAL_SCOPE = ""
+
+CREATE_DAILY_DASHBOARD_SQL = """
+CREATE TABLE IF NOT EXISTS daily_dashboard (
+    snapshot_date TEXT NOT NULL,
+    section TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    slug TEXT,
+    chain TEXT,
+    value REAL,
+    detail TEXT,
+    generated_at TEXT,
+    PRIMARY KEY (snapshot_date, section, scope, rank)
+) WITHOUT ROWID;
+"""
+
+# Righe di un giorno dello storico: chiave (collection_identifier, chain)
+_DAY_ROWS_COMPACT_SQL = """
+SELECT c.collection_identifier, ch.chain,
+       CASE WHEN f.has_metadata THEN c.slug END,
+       f.floor_native, f.ranking, f.sale_volume_native_24h, f.sale_count_24h,
+       ch.chain_currency_symbol
+FROM nft_daily_facts f
+JOIN dim_collection c ON c.collection_id = f.collection_id
+JOIN dim_chain ch ON ch.chain_id = c.chain_id
+WHERE f.day = ?
+"""
+
+_DAY_ROWS_LEGACY_SQL = """
+SELECT collection_identifier, chain, slug, floor_native, ranking,
+       sale_volume_native_24h, sale_count_24h, chain_currency_symbol
+FROM historical_nft_data
+WHERE latest_floor_date = ?
+"""
+
+
+def _table_exists(cur, name):
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+    return cur.fetchone() is not None
+
+
+def create_daily_dashboard_table(cur):
+    cur.execute(CREATE_DAILY_DASHBOARD_SQL)
+
+
+def daily_dashboard_available(conn) -> bool:
+    return _table_exists(conn.cursor(), "daily_dashboard")
+
+
+def _day_rows(conn, compact, day_date):
+    """{(collection_identifier, chain): riga} per le collezioni presenti nel giorno."""
+    cur = conn.cursor()
+    if compact:
+        cur.execute(_DAY_ROWS_COMPACT_SQL, (date_to_day(day_date),))
+    else:
+        cur.execute(_DAY_ROWS_LEGACY_SQL, (day_date,))
+    rows = {}
+    for identifier, chain, slug, floor, ranking, volume, sales, symbol in cur.fetchall():
+        rows[(identifier, chain)] = {
+            "slug": slug, "chain": chain, "floor": floor, "ranking": ranking,
+            "volume": volume, "sales": sales, "symbol": symbol or "",
+        }
+    return rows
+
+
+def _top_per_chain(items, top_n):
+    """items: (chain, sort_value, riga dashboard) → righe con rank per chain."""
+    by_chain = {}
+    for chain, sort_value, row in items:
+        by_chain.setdefault(chain or "", []).append((sort_value, row))
+    result = []
+    for chain, entries in by_chain.items():
+        entries.sort(key=lambda e: e[0], reverse=True)
+        for rank, (_, row) in enumerate(entries[:top_n], 1):
+            result.append({**row, "scope": chain, "rank": rank})
+    return result
+
+
+def _gainers(today, past, top_n):
+    items = []
+    for key, row in today.items():
+        before = past.get(key)
+        if not row["slug"] or not row["floor"] or not before or not before["floor"]:
+            continue
+        change = (row["floor"] / before["floor"] - 1) * 100
+        items.append((row["chain"], change, {
+            "slug": row["slug"], "chain": row["chain"], "value": change,
+            "detail": f"{row['floor']:.4g} {row['symbol']}".strip(),
+        }))
+    return _top_per_chain(items, top_n)
+
+
+def _volume_leaders(today, top_n):
+    items = [
+        (row["chain"], row["volume"], {
+            "slug": row["slug"], "chain": row["chain"], "value": row["volume"],
+            "detail": f"{row['symbol']} · {row['sales'] or 0} sales".strip(" ·"),
+        })
+        for row in today.values()
+        if row["slug"] and row["volume"]
+    ]
+    return _top_per_chain(items, top_n)
+
+
+def _crosses(conn, snapshot_date, today, top_n):
+    cur = conn.cursor()
+    if not _table_exists(cur, "historical_golden_crosses"):
+        return []
+    cur.execute(
+        """
+        SELECT collection_identifier, chain, ma_short_period, ma_long_period, is_native, ranking
+        FROM historical_golden_crosses
+        WHERE date = ?
+        """,
+        (snapshot_date,),
+    )
+    items = []
+    for identifier, chain, short_period, long_period, is_native, ranking in cur.fetchall():
+        row = today.get((identifier, chain))
+        slug = row["slug"] if row and row["slug"] else identifier
+        items.append((chain, -(ranking or 10 ** 9), {
+            "slug": slug, "chain": chain, "value": ranking,
+            "detail": f"SMA{short_period}/{long_period} {'native' if is_native else 'USD'}",
+        }))
+    return _top_per_chain(items, top_n)
+
+
+def _ml_signals(conn, snapshot_date, top_n):
+    cur = conn.cursor()
+    if not _table_exists(cur, "ml_signals"):
+        return []
+    cur.execute(
+        """
+        SELECT slug, chain, confidence, as_of_date
+        FROM ml_signals
+        WHERE as_of_date = (SELECT MAX(as_of_date) FROM ml_signals WHERE as_of_date <= ?)
+          AND signal = 'BUY'
+        ORDER BY confidence DESC
+        LIMIT ?
+        """,
+        (snapshot_date, top_n),
+    )
+    return [
+        {"scope": GLOBAL_SCOPE, "rank": rank, "slug": slug, "chain": chain,
+         "value": confidence, "detail": f"as of {as_of}"}
+        for rank, (slug, chain, confidence, as_of) in enumerate(cur.fetchall(), 1)
+    ]
+
+
+def _hype(conn, snapshot_date):
+    cur = conn.cursor()
+    if not _table_exists(cur, "nft_social_hype"):
+        return []
+    cur.execute(
+        """
+        SELECT date, hype_score, sentiment, trend
+        FROM nft_social_hype
+        WHERE date <= ?
+        ORDER BY date DESC
+        LIMIT 1
+        """,
+        (snapshot_date,),
+    )
+    row = cur.fetchone()
+    if row is None:
+        return []
+    hype_date, score, sentiment, trend = row
+    return [{
+        "scope": GLOBAL_SCOPE, "rank": 1, "slug": None, "chain": None, "value": score,
+        "detail": " · ".join(str(x) for x in (sentiment, trend, hype_date) if x),
+    }]
+
+
+def build_daily_dashboard(conn, snapshot_date=None, top_n=DASHBOARD_TOP_N):
+    """
+    Calcola la snapshot della data indicata (default: ultimo giorno dello storico) e
+    sostituisce le sue righe in daily_dashboard. Restituisce (data, righe per sezione).
+    Il commit è a carico del chiamante.
+    """
+    snapshot_date = snapshot_date or latest_history_date(conn)
+    if snapshot_date is None:
+        return None, {}
+    compact = is_compact_schema(conn)
+    day = date.fromisoformat(snapshot_date)
+
+    def ranked(rows):
+        return {
+            key: row for key, row in rows.items()
+            if row["ranking"] is not None and row["ranking"] <= DASHBOARD_MAX_RANKING
+        }
+
+    today = _day_rows(conn, compact, snapshot_date)
+    today_ranked = ranked(today)
+    sections = {}
+    for section, days_back in GAINER_WINDOWS:
+        past = _day_rows(conn, compact, (day - timedelta(days=days_back)).isoformat())
+        sections[section] = _gainers(today_ranked, past, top_n)
+    sections["volume"] = _volume_leaders(today_ranked, top_n)
+    sections["crosses"] = _crosses(conn, snapshot_date, today, top_n)
+    sections["ml_signals"] = _ml_signals(conn, snapshot_date, top_n)
+    sections["hype"] = _hype(conn, snapshot_date)
+
+    cur = conn.cursor()
+    create_daily_dashboard_table(cur)
+    generated_at = datetime.utcnow().isoformat()
+    cur.execute("DELETE FROM daily_dashboard WHERE snapshot_date = ?", (snapshot_date,))
+    cur.executemany(
+        """
+        INSERT INTO daily_dashboard
+            (snapshot_date, section, scope, rank, slug, chain, value, detail, generated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (snapshot_date, section, r["scope"], r["rank"], r["slug"], r["chain"],
+             r["value"], r["detail"], generated_at)
+            for section, rows in sections.items()
+            for r in rows
+        ],
+    )
+    cutoff = (day - timedelta(days=DASHBOARD_RETENTION_DAYS)).isoformat()
+    cur.execute("DELETE FROM daily_dashboard WHERE snapshot_date < ?", (cutoff,))
+    return snapshot_date, sections
+
+
+def load_daily_dashboard(conn, scope=None):
+    """
+    Ultima snapshot disponibile: (data, generated_at, [righe]) oppure None se la tabella
+    non esiste o è vuota. Con scope indicato restituisce solo quella chain e le sezioni globali.
+    """
+    if not daily_dashboard_available(conn):
+        return None
+    cur = conn.cursor()
+    cur.execute("SELECT MAX(snapshot_date) FROM daily_dashboard")
+    snapshot_date = cur.fetchone()[0]
+    if snapshot_date is None:
+        return None
+    sql = """
+        SELECT section, scope, rank, slug, chain, value, detail, generated_at
+        FROM daily_dashboard
+        WHERE snapshot_date = ?
+    """
+    params = [snapshot_date]
+    if scope:
+        sql += " AND scope IN (?, ?)"
+        params += [scope, GLOBAL_SCOPE]
+    cur.execute(sql + " ORDER BY section, scope, rank", params)
+    columns = ("section", "scope", "rank", "slug", "chain", "value", "detail", "generated_at")
+    rows = [dict(zip(columns, r)) for r in cur.fetchall()]
+    generated_at = max((r["generated_at"] or "" for r in rows), default="")
+    return snapshot_date, generated_at, rows
@@ -2,6 +2,11 @@
 import os
 import sqlite3
 from app.config.config import load_config
+from app.database.canonical_collections import create_canonical_collections_table
+from app.database.compact_schema import create_compact_tables, is_compact_schema
+from app.database.ingest_stats import ensure_daily_ingest_stats
+from app.database.dashboard import create_daily_dashboard_table
+from app.database import query_tracing
 
 def create_tables_if_not_exist(logger=None):
     """
@@ -46,11 +51,19 @@ def create_tables_if_not_exist(logger=None):
     # Nota: l'indice usa le colonne collection_identifier e date.
     # Basandosi sullo schema fornito, useremo latest_floor_date al posto di date
     # per l'indicizzazione basata sulla data della quotazione.
-    cursor.execute("""
-    CREATE INDEX IF NOT EXISTS idx_collection_date ON historical_nft_data (collection_identifier, latest_floor_date);
-    """)
+    # Dopo la migrazione allo schema compatto historical_nft_data è una vista (non indicizzabile).
+    if not is_compact_schema(conn):
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_collection_date ON historical_nft_data (collection_identifier, latest_floor_date);
+        """)
+        if logger:
+            logger.info("Indice idx_collection_date creato sulla tabella historical_nft_data.")
+
+    # Tabelle: dim_chain, dim_collection, nft_daily_facts
+    # Schema compatto a chiavi intere (vedi app/database/compact_schema.py).
+    create_compact_tables(cursor)
     if logger:
-        logger.info("Indice idx_collection_date creato sulla tabella historical_nft_data.")
+        logger.info("Tabelle dello schema compatto (dim_chain, dim_collection, nft_daily_facts) create.")
 
 
     # Tabella: nft_collections
@@ -198,6 +211,23 @@ def create_tables_if_not_exist(logger=None):
     if logger:
         logger.info("Indice idx_ml_signals_date creato.")
 
+    # Tabella: canonical_collections
+    # Mappatura slug -> (collection_identifier, chain) canonica, mantenuta dagli import.
+    create_canonical_collections_table(cursor)
+    if logger:
+        logger.info("Tabella canonical_collections creata.")
+
+    # Tabella: daily_ingest_stats
+    # Rollup giornaliero degli inserimenti; alla prima creazione viene popolata dallo storico.
+    if ensure_daily_ingest_stats(cursor) and logger:
+        logger.info("Tabella daily_ingest_stats creata e popolata dallo storico.")
+
+    # Tabella: daily_dashboard
+    # Snapshot giornaliera per /dashboard, ricostruita da scripts/build_daily_dashboard.py.
+    create_daily_dashboard_table(cursor)
+    if logger:
+        logger.info("Tabella daily_dashboard creata.")
+
     conn.commit()
     conn.close()
 
@@ -208,6 +238,7 @@ def get_db_connection():
     """
     config = load_config()
     db_path = config.get("DB_PATH", "nft_data.sqlite3")
-    conn = sqlite3.connect(db_path)
+    # Con SQL_TRACE attivo la connessione è tracciata (vedi query_tracing.py)
+    conn = query_tracing.connect(db_path)
     return conn
 
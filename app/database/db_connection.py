@@ -2,6 +2,7 @@
 
 import sqlite3
 from app.config.config import load_config
+from app.database import query_tracing
 
 config = load_config()
 DB_PATH = config.get("DB_PATH", "nft_data.sqlite3")
@@ -12,7 +13,8 @@ def get_db_connection():
     Usa il percorso del DB definito in config.py (.env).
     Configura timeout e WAL mode per migliorare l'accesso concorrente.
     """
-    conn = sqlite3.connect(DB_PATH, timeout=10.0, check_same_thread=False)
+    # Con SQL_TRACE attivo la connessione è tracciata (vedi query_tracing.py)
+    conn = query_tracing.connect(DB_PATH, timeout=10.0, check_same_thread=False)
     # Enable WAL mode for better concurrent access
     conn.execute("PRAGMA journal_mode=WAL")
     # Increase busy timeout
@@ -0,0 +1,260 @@
+"""
+Rollup giornaliero degli inserimenti nello storico NFT.
+
+La tabella 'daily_ingest_stats' contiene una riga per (data, tabella, sorgente) con:
+  - row_count               → righe presenti per quella data
+  - collection_count        → collezioni distinte (collection_identifier, chain); la chiave
+                              primaria dello storico garantisce una riga per collezione al
+                              giorno, quindi cresce insieme a row_count
+  - null_floor_native_count → righe senza floor_native
+  - null_floor_usd_count    → righe senza floor_usd
+
+La sorgente è 'api' per le righe con slug valorizzato e 'csv' per quelle storiche
+importate da CSV (slug NULL): la stessa regola vale per import, archiviazione e
+ricostruzione, così i contatori restano coerenti.
+
+La tabella è aggiornata nella stessa transazione di ogni import e di ogni spostamento
+in archivio; i comandi Telegram di controllo (/check_daily_insert, /check_missing_days,
+/historical_data_stats) leggono da qui poche centinaia di righe invece di scansionare
+lo storico completo. Se la tabella non esiste ancora i comandi ricadono sulle query
+originali sulle tabelle storiche.
+"""
+
+from datetime import datetime
+
+MAIN_TABLE = "historical_nft_data"
+ARCHIVE_TABLE = "historical_nft_data_archive"
+
+CREATE_DAILY_INGEST_STATS_SQL = """
+CREATE TABLE IF NOT EXISTS daily_ingest_stats (
+    stat_date TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    source TEXT NOT NULL,
+    row_count INTEGER NOT NULL DEFAULT 0,
+    collection_count INTEGER NOT NULL DEFAULT 0,
+    null_floor_native_count INTEGER NOT NULL DEFAULT 0,
+    null_floor_usd_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT,
+    PRIMARY KEY (stat_date, table_name, source)
+);
+"""
+
+UPSERT_STATS_SQL = """
+INSERT INTO daily_ingest_stats (
+    stat_date, table_name, source, row_count, collection_count,
+    null_floor_native_count, null_floor_usd_count, updated_at
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (stat_date, table_name, source) DO UPDATE SET
+    row_count = row_count + excluded.row_count,
+    collection_count = collection_count + excluded.collection_count,
+    null_floor_native_count = null_floor_native_count + excluded.null_floor_native_count,
+    null_floor_usd_count = null_floor_usd_count + excluded.null_floor_usd_count,
+    updated_at = excluded.updated_at
+"""
+
+
+def _source(slug):
+    """Sorgente della riga: 'api' se ha lo slug, 'csv' per gli storici da file."""
+    return "api" if slug is not None else "csv"
+
+
+def _table_exists(cur, name):
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+    return cur.fetchone() is not None
+
+
+def daily_ingest_stats_available(conn) -> bool:
+    """True se la tabella di rollup esiste (viene creata già popolata)."""
+    return _table_exists(conn.cursor(), "daily_ingest_stats")
+
+
+def rebuild_daily_ingest_stats(cur, table_name=None):
+    """
+    Ricalcola da zero i contatori con una scansione completa delle tabelle storiche.
+    Se table_name è indicato ricalcola solo quella tabella.
+    """
+    tables = [table_name] if table_name else [MAIN_TABLE, ARCHIVE_TABLE]
+    now = datetime.utcnow().isoformat()
+    for table in tables:
+        cur.execute("DELETE FROM daily_ingest_stats WHERE table_name = ?", (table,))
+        cur.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (table,))
+        if cur.fetchone() is None:
+            continue
+        cur.execute(
+            f"""
+            INSERT INTO daily_ingest_stats (
+                stat_date, table_name, source, row_count, collection_count,
+                null_floor_native_count, null_floor_usd_count, updated_at
+            )
+            SELECT
+                latest_floor_date,
+                ?,
+                CASE WHEN slug IS NOT NULL THEN 'api' ELSE 'csv' END,
+                COUNT(*),
+                COUNT(DISTINCT collection_identifier || '|' || COALESCE(chain, '')),
+                SUM(floor_native IS NULL),
+                SUM(floor_usd IS NULL),
+                ?
+            FROM {table}
+            WHERE latest_floor_date IS NOT NULL
+            GROUP BY 1, 3
+            """,
+            (table, now),
+        )
+
+
+def ensure_daily_ingest_stats(cur) -> bool:
+    """
+    Crea la tabella di rollup se non esiste e, in quel caso, la popola subito dallo
+    storico. Restituisce True se la tabella è stata appena creata.
+    """
+    if _table_exists(cur, "daily_ingest_stats"):
+        return False
+    cur.execute(CREATE_DAILY_INGEST_STATS_SQL)
+    rebuild_daily_ingest_stats(cur)
+    return True
+
+
+class IngestStatsRecorder:
+    """
+    Aggiorna daily_ingest_stats durante un import, riga per riga, nella stessa
+    transazione dell'INSERT. Se la tabella non esiste ancora non fa nulla.
+    """
+
+    def __init__(self, conn, table_name=MAIN_TABLE):
+        self.enabled = daily_ingest_stats_available(conn)
+        self.table_name = table_name
+
+    def record(self, cur, stat_date, slug, floor_native, floor_usd):
+        """Registra una riga effettivamente inserita (da chiamare solo se rowcount == 1)."""
+        if not self.enabled or not stat_date:
+            return
+        cur.execute(
+            UPSERT_STATS_SQL,
+            (
+                stat_date, self.table_name, _source(slug), 1, 1,
+                int(floor_native is None), int(floor_usd is None),
+                datetime.utcnow().isoformat(),
+            ),
+        )
+
+
+def record_archive_move(cur, records, archived_inserted):
+    """
+    Sposta i contatori delle righe archiviate da historical_nft_data all'archivio.
+
+    records: righe lette con 'SELECT * FROM historical_nft_data' (tutte cancellate).
+    archived_inserted: righe effettivamente inserite nell'archivio (INSERT OR IGNORE);
+    se alcune erano già presenti i contatori dell'archivio vengono ricalcolati.
+    """
+    if not _table_exists(cur, "daily_ingest_stats") or not records:
+        return
+
+    buckets = {}
+    for row in records:
+        slug, stat_date, floor_native, floor_usd = row[2], row[3], row[5], row[6]
+        key = (stat_date, _source(slug))
+        b = buckets.setdefault(key, [0, 0, 0])
+        b[0] += 1
+        b[1] += int(floor_native is None)
+        b[2] += int(floor_usd is None)
+
+    now = datetime.utcnow().isoformat()
+    cur.executemany(
+        UPSERT_STATS_SQL,
+        [
+            (stat_date, MAIN_TABLE, source, -n, -n, -nn, -nu, now)
+            for (stat_date, source), (n, nn, nu) in buckets.items()
+        ],
+    )
+    cur.execute("DELETE FROM daily_ingest_stats WHERE table_name = ? AND row_count <= 0", (MAIN_TABLE,))
+
+    if archived_inserted == len(records):
+        cur.executemany(
+            UPSERT_STATS_SQL,
+            [
+                (stat_date, ARCHIVE_TABLE, source, n, n, nn, nu, now)
+                for (stat_date, source), (n, nn, nu) in buckets.items()
+            ],
+        )
+    else:
+        rebuild_daily_ingest_stats(cur, ARCHIVE_TABLE)
+
+
+# ─────────────────────────────────────────────
+# Letture per i comandi Telegram
+# ─────────────────────────────────────────────
+
+def count_rows_on_date(conn, query_date):
+    """Numero di righe in historical_nft_data per la data (accetta anche 'now')."""
+    cur = conn.cursor()
+    if daily_ingest_stats_available(conn):
+        cur.execute(
+            """
+            SELECT COALESCE(SUM(row_count), 0) FROM daily_ingest_stats
+            WHERE stat_date = DATE(?) AND table_name = ?
+            """,
+            (query_date, MAIN_TABLE),
+        )
+    else:
+        cur.execute(
+            "SELECT COUNT(*) FROM historical_nft_data WHERE latest_floor_date = DATE(?)",
+            (query_date,),
+        )
+    result = cur.fetchone()
+    return result[0] if result else 0
+
+
+def daily_counts_since(conn, since_date, min_rows):
+    """
+    Elenco (data, righe) di historical_nft_data a partire da since_date,
+    solo per i giorni con più di min_rows righe, in ordine cronologico.
+    """
+    cur = conn.cursor()
+    if daily_ingest_stats_available(conn):
+        cur.execute(
+            """
+            SELECT stat_date, SUM(row_count)
+            FROM daily_ingest_stats
+            WHERE table_name = ? AND stat_date >= DATE(?)
+            GROUP BY stat_date
+            HAVING SUM(row_count) > ?
+            ORDER BY stat_date ASC
+            """,
+            (MAIN_TABLE, since_date, min_rows),
+        )
+    else:
+        cur.execute(
+            """
+            SELECT latest_floor_date, COUNT(*)
+            FROM historical_nft_data
+            WHERE latest_floor_date >= DATE(?)
+            GROUP BY latest_floor_date
+            HAVING COUNT(*) > ?
+            ORDER BY latest_floor_date ASC
+            """,
+            (since_date, min_rows),
+        )
+    return cur.fetchall()
+
+
+def table_summary(conn, table):
+    """Conteggio righe e intervallo di date coperto da una tabella storica."""
+    cur = conn.cursor()
+    if daily_ingest_stats_available(conn):
+        cur.execute(
+            """
+            SELECT SUM(row_count), MIN(stat_date), MAX(stat_date)
+            FROM daily_ingest_stats
+            WHERE table_name = ? AND row_count > 0
+            """,
+            (table,),
+        )
+    else:
+        cur.execute(f"SELECT COUNT(*), MIN(latest_floor_date), MAX(latest_floor_date) FROM {table}")
+    count, min_date, max_date = cur.fetchone()
+    return {
+        "count": count or 0,
+        "from": min_date or "-",
+        "to": max_date or "-",
+    }
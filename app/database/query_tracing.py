@@ -0,0 +1,317 @@
+"""
+Tracciamento opzionale della latenza delle query SQLite.
+
+Attivabile con SQL_TRACE=1 nel .env: le connessioni restituite da get_db_connection
+vengono create con TracedConnection, che cronometra ogni istruzione (execute,
+executemany e le successive fetch) e accumula, per ogni SQL normalizzato:
+  - numero di esecuzioni, tempo totale/massimo, righe totali/massime
+  - istogramma della latenza (ms) e istogramma delle righe restituite/modificate
+
+Le istruzioni più lente di SQL_SLOW_QUERY_MS finiscono nello slow-query log
+(logger 'sql.slow' + buffer in memoria) insieme al loro EXPLAIN QUERY PLAN.
+Le statistiche sono consultabili con il comando admin /sql_stats e vengono scritte
+in JSON all'uscita del processo (cartella SQL_TRACE_DUMP_DIR).
+
+Con SQL_TRACE disattivato non cambia nulla: sqlite3.connect viene chiamato come prima.
+"""
+
+import atexit
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime
+
+from app.config.config import load_config
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger("sql.slow")
+
+config = load_config()
+SQL_TRACE_ENABLED = str(config.get("SQL_TRACE") or "").lower() in ("1", "true", "yes", "on")
+SQL_SLOW_QUERY_MS = float(config.get("SQL_SLOW_QUERY_MS") or 200)
+SQL_TRACE_DUMP_DIR = config.get("SQL_TRACE_DUMP_DIR") or "sql_traces"
+
+# Limiti superiori (inclusi) dei bucket degli istogrammi; l'ultimo bucket è "oltre"
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+SLOW_LOG_SIZE = 100
+
+# Istruzioni per cui EXPLAIN QUERY PLAN ha senso
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+_RE_COMMENT_LINE = re.compile(r"--[^\n]*")
+_RE_COMMENT_BLOCK = re.compile(r"/\*.*?\*/", re.S)
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_RE_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+_RE_VALUES_LIST = re.compile(r"\bVALUES\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+_RE_SPACES = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Normalizza il testo SQL per raggruppare le esecuzioni della stessa istruzione:
+    rimuove commenti, sostituisce letterali con '?', compatta le liste IN/VALUES
+    e gli spazi.
+    """
+    text = _RE_COMMENT_BLOCK.sub(" ", sql)
+    text = _RE_COMMENT_LINE.sub(" ", text)
+    text = _RE_STRING.sub("?", text)
+    text = _RE_NUMBER.sub("?", text)
+    text = _RE_IN_LIST.sub("IN (?+)", text)
+    text = _RE_VALUES_LIST.sub("VALUES (?+)", text)
+    return _RE_SPACES.sub(" ", text).strip()
+
+
+def _bucket(value, bounds):
+    return bisect_left(bounds, value)
+
+
+class QueryStats:
+    """Registro thread-safe delle statistiche per SQL normalizzato."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._slow = deque(maxlen=SLOW_LOG_SIZE)
+        self.started_at = datetime.utcnow().isoformat()
+
+    def record(self, sql, elapsed_ms, rows):
+        key = normalize_sql(sql)
+        rows = max(rows, 0)
+        with self._lock:
+            entry = self._stats.get(key)
+            if entry is None:
+                entry = self._stats[key] = {
+                    "sql": key,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "total_rows": 0,
+                    "max_rows": 0,
+                    "slow_count": 0,
+                    "latency_hist": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+                    "rows_hist": [0] * (len(ROW_BUCKETS) + 1),
+                }
+            entry["count"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["total_rows"] += rows
+            entry["max_rows"] = max(entry["max_rows"], rows)
+            entry["latency_hist"][_bucket(elapsed_ms, LATENCY_BUCKETS_MS)] += 1
+            entry["rows_hist"][_bucket(rows, ROW_BUCKETS)] += 1
+            if elapsed_ms >= SQL_SLOW_QUERY_MS:
+                entry["slow_count"] += 1
+        return key
+
+    def record_slow(self, item):
+        with self._lock:
+            self._slow.append(item)
+
+    def top(self, n=10, order_by="total_ms"):
+        """Le n istruzioni peggiori per total_ms, max_ms, count o slow_count."""
+        with self._lock:
+            entries = [dict(e) for e in self._stats.values()]
+        for e in entries:
+            e["avg_ms"] = e["total_ms"] / e["count"] if e["count"] else 0.0
+        entries.sort(key=lambda e: e.get(order_by, 0), reverse=True)
+        return entries[:n]
+
+    def slow_queries(self):
+        with self._lock:
+            return list(self._slow)
+
+    def snapshot(self):
+        """Dizionario serializzabile in JSON con tutte le statistiche raccolte."""
+        return {
+            "pid": os.getpid(),
+            "process": os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else "python",
+            "started_at": self.started_at,
+            "dumped_at": datetime.utcnow().isoformat(),
+            "slow_query_ms": SQL_SLOW_QUERY_MS,
+            "latency_buckets_ms": list(LATENCY_BUCKETS_MS),
+            "row_buckets": list(ROW_BUCKETS),
+            "statements": self.top(n=len(self._stats)),
+            "slow_queries": self.slow_queries(),
+        }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._slow.clear()
+            self.started_at = datetime.utcnow().isoformat()
+
+
+query_stats = QueryStats()
+
+
+def _explain(conn, sql, params):
+    """EXPLAIN QUERY PLAN dell'istruzione lenta, con un cursore non tracciato."""
+    if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return None
+    try:
+        cur = sqlite3.Cursor(conn)
+        cur.execute(f"EXPLAIN QUERY PLAN {sql}", params if params is not None else ())
+        plan = [row[-1] for row in cur.fetchall()]
+        cur.close()
+        return plan
+    except sqlite3.Error as e:
+        return [f"EXPLAIN non disponibile: {e}"]
+
+
+def _finish(conn, sql, params, elapsed_ms, rows):
+    key = query_stats.record(sql, elapsed_ms, rows)
+    if elapsed_ms >= SQL_SLOW_QUERY_MS:
+        plan = _explain(conn, sql, params)
+        query_stats.record_slow({
+            "at": datetime.utcnow().isoformat(),
+            "sql": key,
+            "elapsed_ms": round(elapsed_ms, 2),
+            "rows": rows,
+            "plan": plan,
+        })
+        slow_logger.warning(
+            f"Slow query ({elapsed_ms:.1f} ms, {rows} righe): {key} | plan: {plan}"
+        )
+
+
+class TracedCursor(sqlite3.Cursor):
+    """
+    Cursore che cronometra execute/executemany e le fetch successive.
+    L'istruzione viene registrata quando il risultato è esaurito, al successivo
+    execute o alla chiusura del cursore.
+    """
+
+    _pending = None
+
+    def _flush(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            sql, params, elapsed_ms, rows = pending
+            _finish(self.connection, sql, params, elapsed_ms, rows)
+
+    def _start(self, sql, params, method, *args):
+        self._flush()
+        t0 = time.perf_counter()
+        try:
+            method(*args)
+        finally:
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            # Per le SELECT rowcount è -1: le righe si contano durante le fetch
+            self._pending = [sql, params, elapsed_ms, max(super().rowcount, 0)]
+            if self.description is None:
+                self._flush()
+        return self
+
+    def execute(self, sql, parameters=()):
+        return self._start(sql, parameters, super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        # Per l'EXPLAIN basta il primo set di parametri (se la sequenza è indicizzabile)
+        first = seq_of_parameters[0] if isinstance(seq_of_parameters, (list, tuple)) and seq_of_parameters else None
+        return self._start(sql, first, super().executemany, sql, seq_of_parameters)
+
+    def _timed_fetch(self, method, *args):
+        t0 = time.perf_counter()
+        result = method(*args)
+        if self._pending is not None:
+            self._pending[2] += (time.perf_counter() - t0) * 1000
+        return result
+
+    def fetchone(self):
+        row = self._timed_fetch(super().fetchone)
+        if self._pending is not None:
+            if row is None:
+                self._flush()
+            else:
+                self._pending[3] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed_fetch(super().fetchmany, size if size is not None else self.arraysize)
+        if self._pending is not None:
+            self._pending[3] += len(rows)
+            if not rows:
+                self._flush()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed_fetch(super().fetchall)
+        if self._pending is not None:
+            self._pending[3] += len(rows)
+            self._flush()
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        self._flush()
+        super().close()
+
+
+class TracedConnection(sqlite3.Connection):
+    """Connessione i cui cursori (anche quelli impliciti di conn.execute) sono tracciati."""
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connect(database, **kwargs):
+    """
+    Sostituto di sqlite3.connect: con SQL_TRACE attivo usa TracedConnection.
+    """
+    if SQL_TRACE_ENABLED:
+        kwargs.setdefault("factory", TracedConnection)
+        _register_dump_at_exit()
+    return sqlite3.connect(database, **kwargs)
+
+
+def dump_stats_json(path=None):
+    """
+    Scrive le statistiche raccolte in JSON e restituisce il percorso del file.
+    Default: SQL_TRACE_DUMP_DIR/<processo>_<pid>.json
+    """
+    snapshot = query_stats.snapshot()
+    if path is None:
+        os.makedirs(SQL_TRACE_DUMP_DIR, exist_ok=True)
+        name = os.path.splitext(snapshot["process"])[0] or "python"
+        path = os.path.join(SQL_TRACE_DUMP_DIR, f"{name}_{snapshot['pid']}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, indent=2, ensure_ascii=False)
+    return path
+
+
+_dump_registered = False
+
+
+def _register_dump_at_exit():
+    global _dump_registered
+    if _dump_registered:
+        return
+    _dump_registered = True
+
+    def _dump():
+        if not query_stats.top(n=1):
+            return
+        try:
+            path = dump_stats_json()
+            logger.info(f"Statistiche SQL salvate in {path}")
+        except OSError as e:
+            logger.error(f"Impossibile salvare le statistiche SQL: {e}")
+
+    atexit.register(_dump)
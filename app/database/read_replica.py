@@ -0,0 +1,127 @@
+"""
+Replica in sola lettura del database per le letture interattive del bot.
+
+I job batch (daily_ml_run.py, backfill dei golden cross, import) tengono transazioni di
+lettura lunghe o raffiche di scritture sullo stesso file SQLite interrogato dal bot, e i
+comandi finiscono ad attendere il busy_timeout. Con DB_READ_REPLICA_PATH impostato:
+
+  - refresh_read_replica() copia il database con la backup API di sqlite3 in un file
+    temporaneo (snapshot consistente, in WAL non blocca gli scrittori), lo porta in
+    journal_mode=DELETE e lo sostituisce atomicamente alla replica (os.replace).
+    Le connessioni già aperte sulla replica precedente continuano a leggere il vecchio file.
+  - get_read_connection() apre la replica in sola lettura (URI mode=ro); se la replica
+    non è configurata o non esiste ancora, ricade sulla connessione principale.
+
+Il refresh avviene periodicamente dal bot (DB_READ_REPLICA_REFRESH_SECONDS), dopo ogni
+import via API e a richiesta con scripts/refresh_read_replica.py.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from app.config.config import load_config
+from app.database import query_tracing
+from app.database.db_connection import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+config = load_config()
+DB_READ_REPLICA_PATH = config.get("DB_READ_REPLICA_PATH") or ""
+DB_READ_REPLICA_REFRESH_SECONDS = int(config.get("DB_READ_REPLICA_REFRESH_SECONDS") or 300)
+
+_refresh_lock = threading.Lock()
+
+
+def read_replica_enabled() -> bool:
+    """True se è configurato un percorso per la replica."""
+    return bool(DB_READ_REPLICA_PATH)
+
+
+def replica_age_seconds():
+    """Età della replica in secondi (None se non esiste)."""
+    if not read_replica_enabled() or not os.path.exists(DB_READ_REPLICA_PATH):
+        return None
+    return time.time() - os.path.getmtime(DB_READ_REPLICA_PATH)
+
+
+def read_replica_version():
+    """
+    Identifica il file di replica in uso (mtime in ns, cambia a ogni refresh); None se le
+    letture usano il database principale. Serve ai pool di connessioni per riaprirle.
+    """
+    if not read_replica_enabled():
+        return None
+    try:
+        return os.stat(DB_READ_REPLICA_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def refresh_read_replica() -> bool:
+    """
+    Aggiorna la replica con uno snapshot del database principale.
+    Restituisce True se la replica è stata aggiornata, False se disattivata o in errore.
+    Non solleva eccezioni: un refresh fallito lascia in uso la replica precedente.
+    """
+    if not read_replica_enabled():
+        return False
+
+    # Un solo refresh per volta nello stesso processo; tra processi diversi il file
+    # temporaneo è distinto per pid e os.replace è atomico.
+    with _refresh_lock:
+        tmp_path = f"{DB_READ_REPLICA_PATH}.tmp-{os.getpid()}"
+        t0 = time.perf_counter()
+        src = dst = None
+        try:
+            directory = os.path.dirname(os.path.abspath(DB_READ_REPLICA_PATH))
+            os.makedirs(directory, exist_ok=True)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+            src = get_db_connection()
+            dst = sqlite3.connect(tmp_path)
+            src.backup(dst)
+            # La replica è un file autonomo: niente -wal/-shm accanto
+            dst.execute("PRAGMA journal_mode=DELETE")
+            dst.close()
+            dst = None
+            os.replace(tmp_path, DB_READ_REPLICA_PATH)
+
+            elapsed = time.perf_counter() - t0
+            logger.info(f"Replica di lettura aggiornata in {elapsed:.2f}s ({DB_READ_REPLICA_PATH}).")
+            return True
+        except Exception as e:
+            logger.error(f"Refresh della replica di lettura fallito: {type(e).__name__} - {e}")
+            return False
+        finally:
+            if dst is not None:
+                dst.close()
+            if src is not None:
+                src.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def get_read_connection():
+    """
+    Connessione per le sole letture del bot: replica in sola lettura se disponibile,
+    altrimenti la connessione principale.
+    """
+    if read_replica_enabled() and os.path.exists(DB_READ_REPLICA_PATH):
+        uri = f"file:{os.path.abspath(DB_READ_REPLICA_PATH)}?mode=ro"
+        return query_tracing.connect(uri, uri=True, timeout=10.0, check_same_thread=False)
+    return get_db_connection()
+
+
+async def read_replica_refresh_loop(interval_seconds: int = DB_READ_REPLICA_REFRESH_SECONDS):
+    """
+    Task asyncio del bot: aggiorna la replica subito e poi ogni interval_seconds.
+    Il backup gira in un thread per non bloccare l'event loop.
+    """
+    while True:
+        await asyncio.to_thread(refresh_read_replica)
+        await asyncio.sleep(interval_seconds)
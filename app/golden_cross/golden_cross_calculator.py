@@ -1,8 +1,7 @@
-import asyncio
 import sqlite3
 from datetime import datetime
 from app.golden_cross.moving_average import calculate_sma, is_golden_cross
-from app.telegram.utils.telegram_notifier import send_telegram_message, get_monitoring_chat_id
+from app.telegram.utils.telegram_notifier import send_telegram_message_sync, get_monitoring_chat_id
 from app.telegram.utils.telegram_msg_templates import get_golden_cross_summary_msg
 
 def get_collections(conn):
@@ -161,7 +160,7 @@ def detect_all_historical_golden_crosses(
         inserted_records=golden_cross_inserted,
         start_date=start_date
     )
-    send_telegram_message(msg, chat_id)
+    send_telegram_message_sync(msg, chat_id, wait=False)
     return golden_cross_detected, golden_cross_inserted
 
 def detect_current_golden_crosses(conn, short_period, long_period,
@@ -217,6 +216,6 @@ def detect_current_golden_crosses(conn, short_period, long_period,
         start_date=date_today
     )
     
-    asyncio.run(send_telegram_message(msg, chat_id))
+    send_telegram_message_sync(msg, chat_id)
 
     return golden_cross_detected, golden_cross_inserted
\ No newline at end of file
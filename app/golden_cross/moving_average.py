@@ -1,6 +1,11 @@
-from typing import List, Tuple
+import math
+from typing import TYPE_CHECKING, List, Tuple
 from datetime import datetime, timedelta
-import numpy as np
+
+# numpy serve solo a sma_series (grafici): importato alla prima chiamata, così gli
+# script delle golden cross e il bot partono senza caricarlo
+if TYPE_CHECKING:
+    import numpy as np
 
 def count_days_present(
     date_value_list: List[Tuple[str, float]],
@@ -31,7 +36,7 @@ def calculate_sma(
     - Non esiste una riga per quella data nell'elenco;
     - Oppure, esiste una riga ma il valore è NULL.
 
-    Se i giorni mancanti superano missing_threshold, ritorna np.nan.
+    Se i giorni mancanti superano missing_threshold, ritorna NaN.
     Se mancano pochi giorni, esegue interpolazione lineare tra i valori noti più vicini.
 
     Args:
@@ -41,7 +46,7 @@ def calculate_sma(
         missing_threshold: massimo numero di giorni interpolabili
 
     Returns:
-        float: valore SMA, oppure np.nan se non calcolabile
+        float: valore SMA, oppure NaN se non calcolabile
     """
     end = datetime.strptime(end_date, "%Y-%m-%d")
     days_window = [(end - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(period)][::-1]
@@ -57,7 +62,7 @@ def calculate_sma(
             missing_indices.append(i)
 
     if len(missing_indices) > missing_threshold:
-        return np.nan
+        return math.nan
 
     # Interpolazione lineare dei buchi interni/estremi
     for idx in missing_indices:
@@ -70,10 +75,57 @@ def calculate_sma(
         elif nextv is not None:
             available[idx] = nextv
         else:
-            return np.nan  # Nessun dato interpolabile
+            return math.nan  # Nessun dato interpolabile
 
     # Calcola la media sui valori (ora tutti not None)
-    return sum(available) / period if available else np.nan
+    return sum(available) / period if available else math.nan
+
+def sma_series(
+    values: "np.ndarray",
+    period: int,
+    missing_threshold: int
+) -> "np.ndarray":
+    """
+    SMA di {period} giorni per ogni giorno di una serie giornaliera densa, in un solo passaggio.
+
+    A differenza di calculate_sma (una finestra per chiamata), calcola tutte le finestre con
+    somme cumulative: costo lineare nella lunghezza della serie.
+
+    Args:
+        values: array float di un valore per giorno consecutivo, np.nan dove il dato manca
+        period: numero di giorni della SMA
+        missing_threshold: massimo numero di giorni mancanti nella finestra
+
+    Returns:
+        np.ndarray: SMA per ogni giorno (np.nan dove i giorni mancanti superano la soglia).
+        I giorni prima dell'inizio della serie contano come mancanti, come in calculate_sma;
+        i buchi sono riempiti con interpolazione lineare tra i valori noti (costanti agli estremi).
+    """
+    import numpy as np
+
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    result = np.full(n, np.nan)
+    known = ~np.isnan(values)
+    if n == 0 or not known.any():
+        return result
+
+    idx = np.arange(n)
+    filled = np.interp(idx, idx[known], values[known])
+
+    csum = np.concatenate(([0.0], np.cumsum(filled)))
+    missing_csum = np.concatenate(([0], np.cumsum(~known)))
+    start = idx + 1 - period
+    clipped = np.maximum(start, 0)
+    # Giorni della finestra che cadono prima dell'inizio della serie
+    before_start = clipped - start
+
+    window_sum = csum[idx + 1] - csum[clipped] + before_start * filled[0]
+    missing = missing_csum[idx + 1] - missing_csum[clipped] + before_start
+
+    valid = missing <= missing_threshold
+    result[valid] = window_sum[valid] / period
+    return result
 
 def is_golden_cross(
     ma_short_today: float, ma_long_today: float,
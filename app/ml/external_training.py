@@ -0,0 +1,255 @@
+"""
+external_training.py
+
+Out-of-core training of the final model, for servers where the full labeled
+frame (plus the copies made by prepare_dataset / XGBClassifier.fit) does not
+fit in RAM.
+
+The feature store is read in partitions of ML_TRAIN_PARTITION_COLLECTIONS
+collections. Each partition gets its market features and forward-return labels
+(labels only look at the collection's own future prices, so they are exact per
+partition) and is written as .npy files (X float32, y, day) to a temporary
+directory under ML_TRAIN_WORK_DIR. XGBoost then streams the partition files
+through a DataIter into a QuantileDMatrix: apart from one memory-mapped
+partition, only the quantised matrix (about 1 byte per value) is held in RAM.
+
+    model, feature_names = train_final_model_external(conn, store_conn, label_col="label_binary")
+
+The result is an XGBClassifier with the same parameters, class-balanced sample
+weights and early-stopping split as train_final_model(): the last 10% of labeled
+rows by date are held out. The split is made on whole dates (rows of the
+boundary date all go to validation), where the in-memory version cuts the
+sorted frame at an arbitrary row of that date.
+"""
+
+import logging
+import os
+import sqlite3
+import tempfile
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from app.config.config import load_config
+from app.ml.feature_pipeline import load_market_data
+from app.ml.feature_store import load_feature_dataframe, store_collections
+from app.ml.label_generator import add_labels
+from app.ml.memory import ensure_memory, log_memory
+from app.ml.model import _booster_params, _to_classifier, prepare_dataset
+
+logger = logging.getLogger(__name__)
+
+config = load_config()
+ML_TRAIN_PARTITION_COLLECTIONS = int(config.get("ML_TRAIN_PARTITION_COLLECTIONS") or 200)
+ML_TRAIN_WORK_DIR = config.get("ML_TRAIN_WORK_DIR") or "data"
+
+# Share of labeled rows (by date) held out for early stopping, as in train_final_model
+_VALIDATION_SHARE = 0.10
+
+
+# ─────────────────────────────────────────────
+# Partition files
+# ─────────────────────────────────────────────
+
+def write_training_partitions(
+    conn: sqlite3.Connection,
+    store_conn: sqlite3.Connection,
+    work_dir: str,
+    label_col: str = "label_binary",
+    horizon_days: int = 14,
+    buy_threshold: float = 0.10,
+    sell_threshold: float = 0.10,
+    min_days: int = 60,
+    train_cutoff_date: Optional[str] = None,
+    partition_collections: int = ML_TRAIN_PARTITION_COLLECTIONS,
+) -> dict:
+    """
+    Write the labeled training rows to `work_dir`, one set of .npy files per
+    partition of collections.
+
+    Returns a manifest: {"parts": [path prefix, ...], "feature_names": [...],
+    "n_rows": total labeled rows}. y is stored 0-based (label_3class shifted +1,
+    as in train_model).
+    """
+    keys = store_collections(store_conn, min_days=min_days)
+    market_data = load_market_data(conn)
+    cutoff = pd.to_datetime(train_cutoff_date) if train_cutoff_date else None
+    manifest = {"parts": [], "feature_names": None, "n_rows": 0}
+
+    for start in range(0, len(keys), partition_collections):
+        df = load_feature_dataframe(
+            conn, store_conn, min_days=min_days,
+            collections=keys[start:start + partition_collections], market_data=market_data,
+        )
+        if df.empty:
+            continue
+        df = add_labels(df, horizon_days=horizon_days, buy_threshold=buy_threshold, sell_threshold=sell_threshold)
+        if cutoff is not None:
+            df = df[df["date"] <= cutoff]
+        X, y = prepare_dataset(df, label_col=label_col)
+        if X.empty:
+            continue
+        if manifest["feature_names"] is None:
+            manifest["feature_names"] = X.columns.tolist()
+        elif X.columns.tolist() != manifest["feature_names"]:
+            raise ValueError(f"Partition {len(manifest['parts'])} has different feature columns.")
+
+        prefix = os.path.join(work_dir, f"part{len(manifest['parts']):05d}")
+        if label_col == "label_3class":
+            y = y + 1  # -1→0, 0→1, 1→2
+        np.save(prefix + "_X.npy", X.to_numpy(dtype=np.float32))
+        np.save(prefix + "_y.npy", y.to_numpy(dtype=np.float32))
+        np.save(prefix + "_day.npy", df.loc[X.index, "date"].to_numpy(dtype="datetime64[D]").astype(np.int32))
+        manifest["parts"].append(prefix)
+        manifest["n_rows"] += len(X)
+        del df, X, y
+
+    logger.info(
+        "Wrote %d training partitions (%d labeled rows, %d collections) to %s",
+        len(manifest["parts"]), manifest["n_rows"], len(keys), work_dir,
+    )
+    log_memory("training partitions written")
+    return manifest
+
+
+def _validation_cutoff_day(manifest: dict) -> int:
+    """First day of the validation period: the date of the row at the 90% position by date."""
+    days = np.concatenate([np.load(p + "_day.npy") for p in manifest["parts"]])
+    days.sort()
+    return int(days[int(len(days) * (1 - _VALIDATION_SHARE))])
+
+
+def _class_weights(manifest: dict, day_hi: int) -> np.ndarray:
+    """Class-balanced sample weights of train_model, indexed by the 0-based label."""
+    counts = np.zeros(3, dtype=np.int64)
+    for p in manifest["parts"]:
+        y = np.load(p + "_y.npy")[np.load(p + "_day.npy") < day_hi]
+        counts += np.bincount(y.astype(np.int64), minlength=3)[:3]
+    present = counts > 0
+    weights = np.ones(3)
+    weights[present] = counts.sum() / (present.sum() * counts[present])
+    return weights
+
+
+def sample_partitions(manifest: dict, n: int, seed: int = 42) -> pd.DataFrame:
+    """Random sample of about `n` feature rows across the partitions (e.g. for SHAP)."""
+    rng = np.random.default_rng(seed)
+    share = min(1.0, n / max(manifest["n_rows"], 1))
+    chunks = []
+    for p in manifest["parts"]:
+        X = np.load(p + "_X.npy", mmap_mode="r")
+        take = np.flatnonzero(rng.random(len(X)) < share)
+        chunks.append(np.asarray(X[take]))
+    return pd.DataFrame(np.concatenate(chunks), columns=manifest["feature_names"])
+
+
+class _PartitionIter(xgb.DataIter):
+    """
+    Feeds the rows of the partition files with day_lo <= day < day_hi to XGBoost,
+    weighted by class_weights (unweighted when None, like train_model's eval_set).
+    """
+
+    def __init__(self, manifest: dict, day_lo: int, day_hi: int, class_weights: np.ndarray = None):
+        self._manifest = manifest
+        self._day_lo = day_lo
+        self._day_hi = day_hi
+        self._class_weights = class_weights
+        self._pos = 0
+        super().__init__()
+
+    def next(self, input_data) -> bool:
+        parts = self._manifest["parts"]
+        while self._pos < len(parts):
+            prefix = parts[self._pos]
+            self._pos += 1
+            day = np.load(prefix + "_day.npy")
+            mask = (day >= self._day_lo) & (day < self._day_hi)
+            if not mask.any():
+                continue
+            y = np.load(prefix + "_y.npy")[mask]
+            weight = None if self._class_weights is None else self._class_weights[y.astype(np.int64)]
+            input_data(
+                data=np.load(prefix + "_X.npy", mmap_mode="r")[mask],
+                label=y,
+                weight=weight,
+                feature_names=self._manifest["feature_names"],
+            )
+            return True
+        return False
+
+    def reset(self):
+        self._pos = 0
+
+
+# ─────────────────────────────────────────────
+# Training
+# ─────────────────────────────────────────────
+
+def train_from_partitions(manifest: dict, label_col: str = "label_binary") -> xgb.XGBClassifier:
+    """Train on the partition files written by write_training_partitions()."""
+    if not manifest["parts"]:
+        raise ValueError("No labeled training rows.")
+    params, num_boost_round, early_stopping_rounds = _booster_params(label_col)
+
+    val_start = _validation_cutoff_day(manifest)
+    weights = _class_weights(manifest, val_start)
+    n_features = len(manifest["feature_names"])
+    # Quantised train + validation matrices: ~1 byte per value, plus one partition
+    ensure_memory("external-memory training", manifest["n_rows"] * n_features * 2 / 2**20)
+
+    logger.info("Building QuantileDMatrix from %d partitions ...", len(manifest["parts"]))
+    dtrain = xgb.QuantileDMatrix(_PartitionIter(manifest, np.iinfo(np.int32).min, val_start, weights))
+    dval = xgb.QuantileDMatrix(_PartitionIter(manifest, val_start, np.iinfo(np.int32).max), ref=dtrain)
+    log_memory("training matrices built")
+
+    logger.info(
+        "Training final model on %d rows (validation from %s: %d rows) ...",
+        dtrain.num_row(), pd.Timestamp(val_start, unit="D").date(), dval.num_row(),
+    )
+    booster = xgb.train(
+        params,
+        dtrain,
+        num_boost_round=num_boost_round,
+        evals=[(dval, "validation_0")],
+        early_stopping_rounds=early_stopping_rounds,
+        verbose_eval=False,
+    )
+
+    # Same estimator type as train_model, so save_model / predict_signals are unchanged
+    model = _to_classifier(booster, label_col)
+    logger.info("Final model trained. Best iteration: %d", model.best_iteration)
+    return model
+
+
+def train_final_model_external(
+    conn: sqlite3.Connection,
+    store_conn: sqlite3.Connection,
+    label_col: str = "label_binary",
+    horizon_days: int = 14,
+    buy_threshold: float = 0.10,
+    sell_threshold: float = 0.10,
+    min_days: int = 60,
+    train_cutoff_date: Optional[str] = None,
+    work_dir: str = ML_TRAIN_WORK_DIR,
+) -> tuple[xgb.XGBClassifier, list[str]]:
+    """
+    Out-of-core equivalent of add_labels() + train_final_model() on the feature
+    store. Partition files are written to a temporary directory under `work_dir`
+    and removed afterwards.
+
+    Returns
+    -------
+    (model, feature_names)
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="ml_train_", dir=work_dir) as tmp:
+        manifest = write_training_partitions(
+            conn, store_conn, tmp,
+            label_col=label_col, horizon_days=horizon_days,
+            buy_threshold=buy_threshold, sell_threshold=sell_threshold,
+            min_days=min_days, train_cutoff_date=train_cutoff_date,
+        )
+        model = train_from_partitions(manifest, label_col=label_col)
+    return model, manifest["feature_names"]
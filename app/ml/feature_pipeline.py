@@ -18,6 +18,10 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 
+from app.database.canonical_collections import canonical_collections_available
+from app.database.compact_schema import date_to_day, is_compact_schema, latest_history_date
+from app.ml.memory import ensure_memory, frame_mb, log_memory
+
 logger = logging.getLogger(__name__)
 
 # ─────────────────────────────────────────────
@@ -60,51 +64,170 @@ def _encode_chain(chain: str) -> int:
 # Loaders
 # ─────────────────────────────────────────────
 
-def _load_price_data(conn: sqlite3.Connection, since_date: str = None) -> pd.DataFrame:
+# For each unique slug, keep only the (collection_identifier, chain) pair with
+# the most historical rows.  This deduplicates collections that were re-ingested
+# under a different collection_identifier (same slug = same NFT project),
+# halving the apparent collection count from ~2800 to ~1400.
+# Fallback only: the import keeps the same mapping in `canonical_collections`.
+_CANONICAL_CTE = """
+    WITH counts AS (
+        SELECT
+            slug,
+            collection_identifier,
+            chain,
+            COUNT(*) AS cnt
+        FROM historical_nft_data
+        GROUP BY slug, collection_identifier, chain
+    ),
+    canonical AS (
+        SELECT
+            slug,
+            collection_identifier,
+            chain
+        FROM (
+            SELECT
+                slug,
+                collection_identifier,
+                chain,
+                ROW_NUMBER() OVER (
+                    PARTITION BY slug
+                    ORDER BY cnt DESC, collection_identifier ASC
+                ) AS rn
+            FROM counts
+        )
+        WHERE rn = 1
+    )
+"""
+
+_CANONICAL_TABLE_CTE = """
+    WITH canonical AS (
+        SELECT collection_identifier, chain
+        FROM canonical_collections
+        WHERE is_canonical = 1
+    )
+"""
+
+_COMPACT_PRICE_QUERY = """
+    SELECT
+        dc.collection_identifier,
+        CASE WHEN f.has_metadata THEN dc.slug END AS slug,
+        ch.chain,
+        date(f.day + 2440587.5)        AS date,
+        f.floor_native,
+        f.floor_usd,
+        f.sale_count_24h,
+        f.sale_volume_native_24h,
+        f.highest_sale_native_24h,
+        f.lowest_sale_native_24h,
+        f.listed_count,
+        f.unique_owners,
+        f.total_supply,
+        f.ranking
+    FROM canonical_collections cc
+    JOIN dim_chain ch
+        ON  ch.chain = cc.chain
+    JOIN dim_collection dc
+        ON  dc.collection_identifier = cc.collection_identifier
+        AND dc.chain_id              = ch.chain_id
+    JOIN nft_daily_facts f
+        ON  f.collection_id = dc.collection_id
+    WHERE cc.is_canonical = 1 {filters}
+    ORDER BY dc.collection_identifier, ch.chain, f.day ASC
+"""
+
+# Collections per query when loading selected ones (2 parameters each, within
+# SQLite's default limit of 999 bound parameters)
+_KEYS_PER_QUERY = 400
+
+_PRICE_VALUE_COLUMNS = [
+    "floor_native", "floor_usd", "sale_count_24h", "sale_volume_native_24h",
+    "highest_sale_native_24h", "lowest_sale_native_24h",
+    "listed_count", "unique_owners", "total_supply", "ranking",
+]
+
+
+def _key_filter(columns: str, keys: list) -> tuple[str, list]:
+    """SQL condition (and parameters) restricting `columns` to (collection_identifier, chain) keys."""
+    if not keys:
+        return "AND 0", []
+    values = ", ".join(["(?, ?)"] * len(keys))
+    return f"AND ({columns}) IN (VALUES {values})", [v for key in keys for v in key]
+
+
+def _load_price_data(conn: sqlite3.Connection, since_date: str = None, collections: list = None) -> pd.DataFrame:
     """
     Load raw price rows, sorted by collection + date.
 
+    The canonical (collection_identifier, chain) per slug is read from the
+    incrementally maintained `canonical_collections` table (indexed join).
+    If the table has not been built yet (see
+    scripts/migrate_add_canonical_collections_table.py), falls back to the
+    full-table deduplication CTE.
+
+    Once the history has been migrated to the compact schema (see
+    app/database/compact_schema.py), rows are read straight from
+    `nft_daily_facts` by integer collection_id / day instead of through the
+    text-keyed compatibility view.
+
     Parameters
     ----------
     since_date : str or None
         If provided (format 'YYYY-MM-DD'), only loads rows on or after this date.
         Used in prediction-only (low-RAM) mode to avoid loading full history.
         Minimum recommended window: 280 calendar days (covers MA200 + buffer).
+    collections : list of (collection_identifier, chain) or None
+        Only load these collections (filtered in SQL, _KEYS_PER_QUERY per query).
     """
+    if collections is None:
+        df = _query_price_data(conn, since_date)
+    else:
+        keys = sorted(set(map(tuple, collections)))
+        chunks = [keys[i:i + _KEYS_PER_QUERY] for i in range(0, len(keys), _KEYS_PER_QUERY)] or [[]]
+        df = pd.concat([_query_price_data(conn, since_date, chunk) for chunk in chunks], ignore_index=True)
+        # A chunk whose column is all NULL reads back as object
+        for col in _PRICE_VALUE_COLUMNS:
+            if df[col].dtype == object:
+                df[col] = pd.to_numeric(df[col], errors="coerce")
+    df["date"] = pd.to_datetime(df["date"])
+    df["floor_native"] = pd.to_numeric(df["floor_native"], errors="coerce")
+    df["floor_usd"] = pd.to_numeric(df["floor_usd"], errors="coerce")
+    return df
+
+
+def _query_price_data(conn: sqlite3.Connection, since_date: str = None, keys: list = None) -> pd.DataFrame:
+    """Raw price rows from the compact schema or the legacy table; keys as in _key_filter."""
+    if not (canonical_collections_available(conn) and is_compact_schema(conn)):
+        return _load_price_data_legacy(conn, since_date, keys)
+    filters, params = [], []
+    if since_date:
+        filters.append("AND f.day >= ?")
+        params.append(date_to_day(since_date))
+    if keys is not None:
+        key_sql, key_params = _key_filter("dc.collection_identifier, ch.chain", keys)
+        filters.append(key_sql)
+        params += key_params
+    return pd.read_sql_query(
+        _COMPACT_PRICE_QUERY.format(filters=" ".join(filters)),
+        conn,
+        params=params or None,
+    )
+
+
+def _load_price_data_legacy(conn: sqlite3.Connection, since_date: str = None, keys: list = None) -> pd.DataFrame:
+    """Price rows read through the text-keyed historical_nft_data table (or view)."""
+    if canonical_collections_available(conn):
+        canonical_cte = _CANONICAL_TABLE_CTE
+    else:
+        logger.warning(
+            "canonical_collections not populated — falling back to full-table dedup CTE."
+        )
+        canonical_cte = _CANONICAL_CTE
+
     date_filter = f"AND h.latest_floor_date >= '{since_date}'" if since_date else ""
+    key_sql, params = _key_filter("h.collection_identifier, h.chain", keys) if keys is not None else ("", [])
     df = pd.read_sql_query(
         f"""
-        -- For each unique slug, keep only the (collection_identifier, chain) pair
-        -- with the most historical rows.  This deduplicates collections that were
-        -- re-ingested under a different collection_identifier (same slug = same NFT
-        -- project), halving the apparent collection count from ~2800 to ~1400.
-        WITH counts AS (
-            SELECT
-                slug,
-                collection_identifier,
-                chain,
-                COUNT(*) AS cnt
-            FROM historical_nft_data
-            GROUP BY slug, collection_identifier, chain
-        ),
-        canonical AS (
-            SELECT
-                slug,
-                collection_identifier,
-                chain
-            FROM (
-                SELECT
-                    slug,
-                    collection_identifier,
-                    chain,
-                    ROW_NUMBER() OVER (
-                        PARTITION BY slug
-                        ORDER BY cnt DESC, collection_identifier ASC
-                    ) AS rn
-                FROM counts
-            )
-            WHERE rn = 1
-        )
+        {canonical_cte}
         SELECT
             h.collection_identifier,
             h.slug,
@@ -124,14 +247,12 @@ def _load_price_data(conn: sqlite3.Connection, since_date: str = None) -> pd.Dat
         INNER JOIN canonical c
             ON  c.collection_identifier = h.collection_identifier
             AND c.chain                 = h.chain
-        WHERE 1=1 {date_filter}
+        WHERE 1=1 {date_filter} {key_sql}
         ORDER BY h.collection_identifier, h.chain, h.latest_floor_date ASC
         """,
         conn,
+        params=params or None,
     )
-    df["date"] = pd.to_datetime(df["date"])
-    df["floor_native"] = pd.to_numeric(df["floor_native"], errors="coerce")
-    df["floor_usd"] = pd.to_numeric(df["floor_usd"], errors="coerce")
     return df
 
 
@@ -267,6 +388,14 @@ def _load_crypto_metrics(conn: sqlite3.Connection) -> pd.DataFrame:
 # Per-collection feature engineering
 # ─────────────────────────────────────────────
 
+# Peak working memory of the feature engineering per loaded price row, used to fail
+# fast against ML_MEMORY_BUDGET_MB before starting it. Measured with tracemalloc on
+# _compute_features_vectorized over synthetic_price_data(1500, 730) (650k price rows,
+# 38 output columns): ~640 B/row, i.e. the float64 output frame (~380 B/row before
+# _downcast_features) plus the daily reindex and grouped-rolling temporaries.
+_FEATURE_BYTES_PER_PRICE_ROW = 650
+
+
 def _compute_collection_features(grp: pd.DataFrame, max_fill_gap: int = 7) -> pd.DataFrame:
     """
     Takes a single-collection group (sorted by date) and computes all features.
@@ -275,8 +404,9 @@ def _compute_collection_features(grp: pd.DataFrame, max_fill_gap: int = 7) -> pd
     # Deduplicate: if same (collection, chain, date) appears more than once in the DB
     # (can happen due to SQLite NULL primary key edge cases), keep the row with the
     # highest floor_native. Using groupby→first after sorting guarantees a unique date index.
+    # The sort is stable so ties resolve in load order, as in the vectorized path.
     grp = (
-        grp.sort_values("floor_native", ascending=False)
+        grp.sort_values("floor_native", ascending=False, kind="stable")
            .groupby("date", sort=True)
            .first()
            .reset_index()
@@ -370,6 +500,166 @@ def _compute_collection_features(grp: pd.DataFrame, max_fill_gap: int = 7) -> pd
     return grp
 
 
+def _compute_features_per_group(
+    price_df: pd.DataFrame, max_fill_gap: int = 7, last_row_only: bool = False
+) -> tuple:
+    """
+    Reference implementation: _compute_collection_features on every
+    (collection_identifier, chain) group, then concatenate.
+
+    Returns (feature dataframe, number of groups skipped for lack of price data).
+    """
+    groups = price_df.groupby(["collection_identifier", "chain"], sort=False)
+    results = []
+    skipped = 0
+    for (cid, chain), grp in groups:
+        feat = _compute_collection_features(grp.copy(), max_fill_gap=max_fill_gap)
+        if feat.empty:
+            skipped += 1
+            continue
+        # ── Predict-only RAM optimisation (inner loop) ───────────
+        # Keep only the last date row immediately so the `results` list
+        # accumulates O(N_collections) rows instead of O(280 × N_collections).
+        # Rolling features have already been computed over the full window;
+        # subsequent market-feature merges only need the final row.
+        if last_row_only:
+            feat = feat.iloc[[-1]]
+        results.append(feat)
+    if not results:
+        return pd.DataFrame(), skipped
+    return pd.concat(results, ignore_index=True), skipped
+
+
+def _grouped_rolling(s: pd.Series, gid: np.ndarray, window: int, min_periods: int, how: str) -> np.ndarray:
+    """Rolling aggregate restarted at every group boundary (rows sorted by gid, then date)."""
+    rolled = s.groupby(gid, sort=True).rolling(window, min_periods=min_periods)
+    return getattr(rolled, how)().to_numpy()
+
+
+def _compute_features_vectorized(
+    price_df: pd.DataFrame, max_fill_gap: int = 7, last_row_only: bool = False
+) -> tuple:
+    """
+    Same output as _compute_features_per_group, computed for all collections at once.
+
+    Every (collection_identifier, chain) gets an integer group id in order of first
+    appearance; rows are deduplicated with one groupby, densified to a daily calendar
+    with a single reindex over a (group, date) MultiIndex, and all forward-fills, shifts
+    and rolling windows run as grouped operations. Rows stay sorted by (group, date), so
+    the grouped results align positionally and the final frame has the same rows, column
+    order and dtypes as the per-group concatenation.
+
+    Returns (feature dataframe, number of groups skipped for lack of price data).
+    """
+    keys = ["collection_identifier", "chain"]
+    df = price_df.dropna(subset=keys + ["date"])
+    if df.empty:
+        return pd.DataFrame(), 0
+    value_cols = [c for c in df.columns if c != "date"]
+    gid = df.groupby(keys, sort=False).ngroup().to_numpy()
+    n_groups = int(gid.max()) + 1
+
+    # ── Deduplicate (collection, chain, date): highest floor_native first ──
+    dedup = (
+        df.assign(_gid=gid)
+          .sort_values("floor_native", ascending=False, kind="stable")
+          .groupby(["_gid", "date"], sort=True)[value_cols]
+          .first()
+    )
+
+    # ── Densify: one daily calendar per group, single reindex ──────────
+    dates = dedup.index.get_level_values("date")
+    group_ids = dedup.index.get_level_values("_gid").to_numpy()
+    bounds = pd.DataFrame({"_gid": group_ids, "date": dates}).groupby("_gid")["date"].agg(["min", "max"])
+    lengths = ((bounds["max"] - bounds["min"]).dt.days + 1).to_numpy()
+    starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    offsets = (np.arange(lengths.sum()) - starts).astype("timedelta64[D]")
+    full_dates = np.repeat(bounds["min"].to_numpy(), lengths) + offsets
+    full_idx = pd.MultiIndex.from_arrays(
+        [np.repeat(bounds.index.to_numpy(), lengths), full_dates.astype(dates.dtype)],
+        names=["_gid", "date"],
+    )
+    grp = dedup.reindex(full_idx).reset_index()
+    by_group = grp.groupby("_gid", sort=True)
+
+    # Carry forward metadata (non-price)
+    meta_cols = ["collection_identifier", "slug", "chain"]
+    grp[meta_cols] = by_group[meta_cols].ffill()
+
+    # Forward-fill price with gap limit
+    grp[["floor_native", "floor_usd"]] = by_group[["floor_native", "floor_usd"]].ffill(limit=max_fill_gap)
+
+    # Drop rows still missing floor_native (gaps > max_fill_gap or start of series)
+    grp = grp.dropna(subset=["floor_native"]).reset_index(drop=True)
+    skipped = n_groups - grp["_gid"].nunique()
+    if grp.empty:
+        return pd.DataFrame(), skipped
+
+    g = grp["_gid"].to_numpy()
+    by_group = grp.groupby(g, sort=True)
+    p = grp["floor_native"]
+
+    # ── Returns ──────────────────────────────────────────────────
+    for n in [3, 7, 14, 30]:
+        grp[f"ret_{n}d"] = p / by_group["floor_native"].shift(n) - 1
+
+    # ── Log returns (for volatility) ────────────────────────────
+    log_ret = np.log(p / by_group["floor_native"].shift(1))
+
+    # ── Volatility: rolling std of log returns ──────────────────
+    for n in [7, 14, 30]:
+        grp[f"vol_{n}d"] = _grouped_rolling(log_ret, g, n, max(3, n // 3), "std")
+
+    # ── Moving averages ──────────────────────────────────────────
+    for ma in [20, 50, 200]:
+        grp[f"ma{ma}"] = _grouped_rolling(p, g, ma, ma // 2, "mean")
+
+    # ── MA ratios: floor / MA (>1 means price above MA) ─────────
+    for ma in [20, 50, 200]:
+        grp[f"floor_vs_ma{ma}"] = p / grp[f"ma{ma}"]
+
+    # ── MA spreads ───────────────────────────────────────────────
+    grp["spread_20_50"] = (grp["ma20"] - grp["ma50"]) / grp["ma50"]
+    grp["spread_50_200"] = (grp["ma50"] - grp["ma200"]) / grp["ma200"]
+
+    # ── MA slope (momentum of MA itself) ────────────────────────
+    for ma in [20, 50]:
+        col = f"ma{ma}"
+        grp[f"{col}_slope"] = grp[col] / grp.groupby(g, sort=True)[col].shift(5) - 1
+
+    # ── Listing pressure / unique owner ratio ───────────────────
+    by_group = grp.groupby(g, sort=True)
+    grp["listed_count"] = by_group["listed_count"].ffill(limit=7)
+    grp[["total_supply", "unique_owners"]] = by_group[["total_supply", "unique_owners"]].ffill(limit=30)
+    grp["listing_ratio"] = grp["listed_count"] / grp["total_supply"].replace(0, np.nan)
+    grp["owner_ratio"] = grp["unique_owners"] / grp["total_supply"].replace(0, np.nan)
+
+    # ── Sales features ───────────────────────────────────────────
+    grp["sale_count_24h"] = grp["sale_count_24h"].fillna(0)
+    grp["sale_volume_native_24h"] = grp["sale_volume_native_24h"].fillna(0)
+    grp["sale_count_ma7"] = _grouped_rolling(grp["sale_count_24h"], g, 7, 1, "mean")
+    grp["sale_vol_ma7"] = _grouped_rolling(grp["sale_volume_native_24h"], g, 7, 1, "mean")
+    sale_count_ma30 = pd.Series(_grouped_rolling(grp["sale_count_24h"], g, 30, 3, "mean"), index=grp.index)
+    grp["sale_count_momentum"] = grp["sale_count_ma7"] / sale_count_ma30.replace(0, np.nan)
+
+    # ── Intraday range (when available) ─────────────────────────
+    high = grp["highest_sale_native_24h"].where(grp["highest_sale_native_24h"] > 0)
+    low = grp["lowest_sale_native_24h"].where(grp["lowest_sale_native_24h"] > 0)
+    grp["intraday_range"] = (high - low) / p.replace(0, np.nan)
+
+    # ── Ranking (lower is better) ────────────────────────────────
+    grp["ranking"] = grp.groupby(g, sort=True)["ranking"].ffill(limit=7)
+
+    # ── Chain encoding ───────────────────────────────────────────
+    chain_codes = {c: _encode_chain(c) for c in grp["chain"].unique()}
+    grp["chain_enc"] = grp["chain"].map(chain_codes).astype("int64")
+
+    if last_row_only:
+        grp = grp[grp["_gid"] != grp["_gid"].shift(-1)]
+    feature_cols = [c for c in grp.columns if c not in value_cols and c not in ("_gid", "date")]
+    return grp[["date"] + value_cols + feature_cols].reset_index(drop=True), skipped
+
+
 def _merge_market_features(df: pd.DataFrame, hype_df: pd.DataFrame) -> pd.DataFrame:
     """Left-join market-wide hype signals onto the feature dataframe."""
     if hype_df.empty:
@@ -410,10 +700,9 @@ def _merge_x_sentiment(df: pd.DataFrame, xsent_df: pd.DataFrame) -> pd.DataFrame
     )
 
     merged = merged.sort_values(["collection_identifier", "chain", "date"])
-    for col in ["xsent_score", "xsent_engagement", "xsent_volume"]:
-        merged[col] = merged.groupby(["collection_identifier", "chain"])[col].transform(
-            lambda s: s.ffill(limit=45)  # forward-fill up to ~45 days (monthly cadence)
-        )
+    xcols = ["xsent_score", "xsent_engagement", "xsent_volume"]
+    # forward-fill up to ~45 days (monthly cadence)
+    merged[xcols] = merged.groupby(["collection_identifier", "chain"], observed=True)[xcols].ffill(limit=45)
 
     return merged
 
@@ -473,14 +762,15 @@ def _merge_fear_greed(df: pd.DataFrame, fg_df: pd.DataFrame) -> pd.DataFrame:
 
 def _merge_crypto_features(df: pd.DataFrame, crypto_df: pd.DataFrame) -> pd.DataFrame:
     """
-    Left-join crypto market features onto the feature dataframe.
+    Add crypto market features to the feature dataframe (in place, by date lookup).
 
     Chain-native symbol columns (e.g. eth_ret_7d for 'ethereum' chains) are
     copied to neutral 'native_*' columns so the model sees one consistent
     feature name regardless of which chain a collection lives on.
 
     BTC columns are kept as-is (universal macro indicator).
-    All symbol-specific wide columns are dropped afterwards.
+    Only these target columns are materialised: the per-symbol wide columns
+    (noise for the model) are never joined onto the feature rows.
     """
     native_suffixes = ["ret_1d", "ret_7d", "ret_30d", "vol_7d", "ath_pct", "volume_rel"]
     native_targets  = [f"native_{s}" for s in native_suffixes]
@@ -493,41 +783,60 @@ def _merge_crypto_features(df: pd.DataFrame, crypto_df: pd.DataFrame) -> pd.Data
             df[col] = np.nan
         return df
 
-    df = df.merge(crypto_df, on="date", how="left")
+    # Row of crypto_df (one per date) for every feature row, -1 when the date is missing
+    wide = crypto_df.set_index("date")
+    pos = wide.index.get_indexer(df["date"])
+    found = pos >= 0
 
-    # Initialise native_* columns
-    for col in native_targets:
-        df[col] = np.nan
+    def lookup(col: str, rows=None) -> np.ndarray:
+        out = np.full(len(df), np.nan)
+        take = found if rows is None else found & rows
+        out[take] = wide[col].to_numpy(dtype=float)[pos[take]]
+        return out
 
     # Map each (chain → native symbol) → fill generic native_* columns
-    chain_col = df["chain"].str.lower()
-    for chain, sym in CHAIN_TO_NATIVE.items():
-        prefix = sym.lower()
-        mask = chain_col == chain
-        if not mask.any():
-            continue
-        for suffix, native_col in zip(native_suffixes, native_targets):
-            src = f"{prefix}_{suffix}"
-            if src in df.columns:
-                df.loc[mask, native_col] = df.loc[mask, src]
+    chain_col = df["chain"].astype(str).str.lower().to_numpy()
+    for suffix, native_col in zip(native_suffixes, native_targets):
+        values = np.full(len(df), np.nan)
+        for chain, sym in CHAIN_TO_NATIVE.items():
+            src = f"{sym.lower()}_{suffix}"
+            if src not in wide.columns:
+                continue
+            mask = chain_col == chain
+            if mask.any():
+                values[mask] = lookup(src, mask)[mask]
+        df[native_col] = values
 
     # BTC macro — same value for every chain
     for src, dst in btc_features.items():
-        df[dst] = df[src] if src in df.columns else np.nan
-
-    # Drop the per-symbol wide columns (noise for the model)
-    all_native_syms = set(CHAIN_TO_NATIVE.values()) | set(MACRO_SYMBOLS)
-    keep = set(native_targets) | set(btc_features.values())
-    drop_cols = [
-        c for c in df.columns
-        if any(c.startswith(s.lower() + "_") for s in all_native_syms)
-        and c not in keep
-    ]
-    df = df.drop(columns=drop_cols, errors="ignore")
+        df[dst] = lookup(src) if src in wide.columns else np.nan
 
     return df
 
 
+# Kept in float64: forward-return labels and reported prices are computed from them
+_FLOAT64_COLUMNS = ("floor_native", "floor_usd")
+
+
+def _downcast_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Store float feature columns as float32 (in place). XGBoost converts its input
+    to float32 anyway, so model inputs are unchanged; _FLOAT64_COLUMNS stay float64.
+    """
+    for col in df.columns:
+        if col not in _FLOAT64_COLUMNS and df[col].dtype == np.float64:
+            df[col] = df[col].astype(np.float32)
+    return df
+
+
+def _categorize_identifiers(df: pd.DataFrame) -> pd.DataFrame:
+    """Repeated identifier strings as categoricals (in place): one code per row."""
+    for col in ("collection_identifier", "slug", "chain"):
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    return df
+
+
 # ─────────────────────────────────────────────
 # Public entry point
 # ─────────────────────────────────────────────
@@ -570,6 +879,7 @@ def build_feature_dataframe(
     min_days: int = 60,
     max_fill_gap: int = 7,
     lookback_days: int = None,
+    vectorized: bool = True,
 ) -> pd.DataFrame:
     """
     Build the complete ML feature dataframe.
@@ -591,6 +901,11 @@ def build_feature_dataframe(
         cuts peak RAM from ~1.8 GB to ~250 MB — safe for servers with <1 GB RAM.
         Minimum safe value: 280 (covers the 200-day MA + gap-fill buffer).
         Leave as None for full historical load (required for training).
+    vectorized : bool
+        Compute the per-collection features for all collections at once
+        (_compute_features_vectorized). False runs the original per-group loop,
+        which produces identical output; kept as reference for
+        scripts/benchmark_feature_pipeline.py.
 
     Returns
     -------
@@ -598,12 +913,13 @@ def build_feature_dataframe(
         Columns: collection_identifier, slug, chain, date, floor_native, floor_usd,
                  + all FEATURE_COLUMNS.
         Sorted by collection_identifier, chain, date.
+        Float features are float32 and identifiers categorical (see
+        _downcast_features / _categorize_identifiers); memory per stage is
+        logged and checked against ML_MEMORY_BUDGET_MB (app/ml/memory.py).
     """
     since_date = None
     if lookback_days is not None:
-        cur = conn.cursor()
-        cur.execute("SELECT MAX(latest_floor_date) FROM historical_nft_data")
-        max_db_date = pd.to_datetime(cur.fetchone()[0])
+        max_db_date = pd.to_datetime(latest_history_date(conn))
         since_date = (max_db_date - pd.Timedelta(days=lookback_days)).strftime("%Y-%m-%d")
         logger.info(
             "Prediction-only mode: loading price data from %s onwards (%d-day window)",
@@ -612,6 +928,7 @@ def build_feature_dataframe(
 
     logger.info("Loading price data from DB ...")
     price_df = _load_price_data(conn, since_date=since_date)
+    log_memory("price data loaded", price_df)
 
     # Filter to collections with enough data
     counts = price_df.groupby(["collection_identifier", "chain"]).size()
@@ -624,42 +941,77 @@ def build_feature_dataframe(
         len(valid), min_days, len(price_df),
     )
 
+    # Dense daily rows x ~40 float64 columns plus grouped-rolling temporaries
+    ensure_memory("feature engineering", len(price_df) * _FEATURE_BYTES_PER_PRICE_ROW / 2**20)
+    if vectorized:
+        logger.info("Engineering features for all collections (vectorized) ...")
+        df, skipped = _compute_features_vectorized(
+            price_df, max_fill_gap=max_fill_gap, last_row_only=lookback_days is not None
+        )
+    else:
+        logger.info("Engineering features per collection ...")
+        df, skipped = _compute_features_per_group(
+            price_df, max_fill_gap=max_fill_gap, last_row_only=lookback_days is not None
+        )
+
+    del price_df
+    if df.empty:
+        logger.warning("No feature data produced.")
+        return pd.DataFrame()
+    logger.info(
+        "Engineered %d collections (skipped: %d)",
+        df["collection_identifier"].nunique(), skipped,
+    )
+    _downcast_features(df)
+    log_memory("features engineered", df)
+
+    return add_market_features(conn, df, predict_only=lookback_days is not None)
+
+
+def load_market_data(conn: sqlite3.Connection) -> dict:
+    """
+    Load the auxiliary sources merged by add_market_features (hype, X sentiment,
+    Fear & Greed, crypto market). Callers merging many partitions load them once.
+    """
     logger.info("Loading hype, sentiment, fear/greed and crypto market data ...")
-    hype_df    = _load_social_hype(conn)
-    xsent_df   = _load_x_sentiment(conn)
-    fg_df      = _load_fear_greed(conn)
-    crypto_df  = _load_crypto_metrics(conn)
+    market_data = {
+        "hype":   _load_social_hype(conn),
+        "xsent":  _load_x_sentiment(conn),
+        "fg":     _load_fear_greed(conn),
+        "crypto": _load_crypto_metrics(conn),
+    }
     logger.info(
         "Auxiliary data: hype=%d rows | x_sentiment=%d rows | fear_greed=%d rows | crypto_wide=%d rows",
-        len(hype_df), len(xsent_df), len(fg_df), len(crypto_df),
+        *(len(market_data[k]) for k in ("hype", "xsent", "fg", "crypto")),
     )
+    return market_data
 
-    logger.info("Engineering features per collection ...")
-    groups = price_df.groupby(["collection_identifier", "chain"], sort=False)
-    results = []
-    skipped = 0
-    for (cid, chain), grp in groups:
-        feat = _compute_collection_features(grp.copy(), max_fill_gap=max_fill_gap)
-        if feat.empty:
-            skipped += 1
-            continue
-        # ── Predict-only RAM optimisation (inner loop) ───────────
-        # Keep only the last date row immediately so the `results` list
-        # accumulates O(N_collections) rows instead of O(280 × N_collections).
-        # Rolling features have already been computed over the full window;
-        # subsequent market-feature merges only need the final row.
-        if lookback_days is not None:
-            feat = feat.iloc[[-1]]
-        results.append(feat)
-
-    if not results:
-        logger.warning("No feature data produced.")
-        return pd.DataFrame()
 
-    logger.info("Concatenating %d collections (skipped: %d) ...", len(results), skipped)
-    df = pd.concat(results, ignore_index=True)
+def add_market_features(
+    conn: sqlite3.Connection,
+    df: pd.DataFrame,
+    predict_only: bool = False,
+    market_data: dict = None,
+) -> pd.DataFrame:
+    """
+    Merge the market-wide and auxiliary features (hype, X sentiment, Fear & Greed,
+    crypto market) onto per-collection features and sort the result.
 
-    if lookback_days is not None:
+    Shared by build_feature_dataframe and the feature store reader
+    (app/ml/feature_store.py), so both return the same frame layout.
+    predict_only: df holds one row per collection (X sentiment merged as-of).
+    market_data: output of load_market_data(); loaded from conn when None.
+    """
+    # Each date-keyed merge below copies the frame once
+    ensure_memory("market features", 3 * frame_mb(df))
+    if market_data is None:
+        market_data = load_market_data(conn)
+    hype_df    = market_data["hype"]
+    xsent_df   = market_data["xsent"]
+    fg_df      = market_data["fg"]
+    crypto_df  = market_data["crypto"]
+
+    if predict_only:
         logger.info(
             "Predict-only mode: %d rows (1 per collection) — merging market features ...",
             len(df),
@@ -669,7 +1021,7 @@ def build_feature_dataframe(
     df = _merge_market_features(df, hype_df)
 
     logger.info("Merging X sentiment features ...")
-    if lookback_days is not None:
+    if predict_only:
         # In predict-only mode df has 1 row per collection.
         # The normal _merge_x_sentiment relies on groupby-transform ffill across
         # many rows per collection — a no-op on single-row groups (all NaN).
@@ -687,9 +1039,12 @@ def build_feature_dataframe(
 
     # Final sort
     df = df.sort_values(["collection_identifier", "chain", "date"]).reset_index(drop=True)
+    _downcast_features(df)
+    _categorize_identifiers(df)
 
     logger.info(
         "Feature dataframe built: %d rows, %d collections",
         len(df), df["collection_identifier"].nunique(),
     )
+    log_memory("market features merged", df)
     return df
@@ -0,0 +1,542 @@
+"""
+feature_store.py
+
+Persistent, incrementally maintained store of per-collection ML features.
+
+build_feature_dataframe() recomputes every feature for the full price history on
+each run, although a daily import only adds one date per collection. The store
+keeps the per-collection part of its output (price columns + engineered features,
+one row per (collection_identifier, chain, date)) in a separate SQLite file
+(ML_FEATURE_STORE_PATH, kept out of the main DB so the bot read replica does not
+copy it), and the daily job only appends what is new:
+
+  - every collection's raw history is summarised by a fingerprint (row counts and
+    per-column totals, one aggregate query over the history);
+  - collections whose history up to the previous run is unchanged get only their
+    new dates appended, computed from a trailing window of
+    ML_FEATURE_STORE_TRAILING_DAYS of prices;
+  - collections whose past rows changed (CSV backfills, corrections, new canonical
+    mapping) or whose trailing window is too sparse to reproduce the rolling
+    features exactly are recomputed from their full history;
+  - collections no longer canonical are removed.
+
+Market-wide and auxiliary features (hype, X sentiment, Fear & Greed, crypto) are
+not stored: they are cheap and their sources are backfilled independently, so
+load_feature_dataframe() merges them at read time with the same code as
+build_feature_dataframe(). In training mode the result matches
+build_feature_dataframe(conn, min_days) up to floating-point rounding of the
+rolling windows (pandas' running sums depend on where the window starts).
+"""
+
+import json
+import logging
+import math
+import os
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+from app.config.config import load_config
+from app.database.canonical_collections import canonical_collections_available
+from app.database.compact_schema import day_to_date, is_compact_schema
+from app.ml.feature_pipeline import (
+    _CANONICAL_CTE,
+    _CANONICAL_TABLE_CTE,
+    _compute_features_vectorized,
+    _downcast_features,
+    _load_price_data,
+    add_market_features,
+)
+from app.ml.memory import log_memory
+
+logger = logging.getLogger(__name__)
+
+config = load_config()
+FEATURE_STORE_PATH = config.get("ML_FEATURE_STORE_PATH") or "data/ml_feature_store.sqlite3"
+FEATURE_STORE_TRAILING_DAYS = int(config.get("ML_FEATURE_STORE_TRAILING_DAYS") or 400)
+
+# Bump when the per-collection feature engineering changes: the next update rebuilds the store.
+FEATURE_STORE_VERSION = 1
+
+KEYS = ["collection_identifier", "chain"]
+
+# Per-collection columns of build_feature_dataframe, in output order (after 'date')
+STORE_COLUMNS = [
+    "collection_identifier", "chain", "slug",
+    "floor_native", "floor_usd", "sale_count_24h", "sale_volume_native_24h",
+    "highest_sale_native_24h", "lowest_sale_native_24h",
+    "listed_count", "unique_owners", "total_supply", "ranking",
+    "ret_3d", "ret_7d", "ret_14d", "ret_30d",
+    "vol_7d", "vol_14d", "vol_30d",
+    "ma20", "ma50", "ma200",
+    "floor_vs_ma20", "floor_vs_ma50", "floor_vs_ma200",
+    "spread_20_50", "spread_50_200", "ma20_slope", "ma50_slope",
+    "listing_ratio", "owner_ratio",
+    "sale_count_ma7", "sale_vol_ma7", "sale_count_momentum",
+    "intraday_range",
+    "chain_enc",
+]
+_TEXT_COLUMNS = ("collection_identifier", "slug", "chain")
+_INTEGER_COLUMNS = ("chain_enc",)
+
+# Longest rolling window of the feature engineering (ma200): a new row is exact when
+# the rows it depends on are all inside the trailing window.
+_WARMUP_ROWS = 200
+
+# Raw price columns summarised in the history fingerprint
+_FINGERPRINT_COLUMNS = (
+    "floor_native", "floor_usd", "sale_count_24h", "sale_volume_native_24h",
+    "highest_sale_native_24h", "lowest_sale_native_24h",
+    "listed_count", "unique_owners", "total_supply", "ranking",
+)
+
+
+def _column_sql(col):
+    if col in _TEXT_COLUMNS:
+        return f"{col} TEXT"
+    if col in _INTEGER_COLUMNS:
+        return f"{col} INTEGER"
+    return f"{col} REAL"
+
+
+CREATE_FEATURE_STORE_SQL = (
+    f"""
+    CREATE TABLE IF NOT EXISTS collection_features (
+        day INTEGER NOT NULL,
+        {", ".join(_column_sql(c) for c in STORE_COLUMNS)},
+        PRIMARY KEY (collection_identifier, chain, day)
+    ) WITHOUT ROWID;
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS collection_features_state (
+        collection_identifier TEXT NOT NULL,
+        chain TEXT NOT NULL,
+        first_day INTEGER,
+        last_day INTEGER,
+        slug TEXT,
+        n_rows INTEGER NOT NULL,
+        fingerprint TEXT NOT NULL,
+        updated_at TEXT,
+        PRIMARY KEY (collection_identifier, chain)
+    ) WITHOUT ROWID;
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS feature_store_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+    """,
+)
+
+
+def get_feature_store_connection(path: str = FEATURE_STORE_PATH) -> sqlite3.Connection:
+    """Open (and create if needed) the feature store database."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    store_conn = sqlite3.connect(path, timeout=10.0)
+    store_conn.execute("PRAGMA journal_mode=WAL")
+    for sql in CREATE_FEATURE_STORE_SQL:
+        store_conn.execute(sql)
+    store_conn.commit()
+    return store_conn
+
+
+def feature_store_available(path: str = FEATURE_STORE_PATH) -> bool:
+    """True if the store file exists and has been populated at least once."""
+    if not os.path.exists(path):
+        return False
+    store_conn = sqlite3.connect(path)
+    try:
+        row = store_conn.execute(
+            "SELECT value FROM feature_store_meta WHERE key = 'as_of_day'"
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        store_conn.close()
+    return row is not None
+
+
+# ─────────────────────────────────────────────
+# History fingerprints
+# ─────────────────────────────────────────────
+
+def _fingerprint_query(conn: sqlite3.Connection) -> str:
+    """
+    Per canonical collection: first/last raw day, and row count + per-column totals
+    both over the whole history and over the rows up to :as_of (the previous run).
+    Same canonical selection and schema branching as _load_price_data.
+    """
+    compact = canonical_collections_available(conn) and is_compact_schema(conn)
+    if compact:
+        alias, day, meta = "f", "f.day", "TOTAL(f.has_metadata)"
+    else:
+        alias, day, meta = "h", "CAST(julianday(h.latest_floor_date) - 2440587.5 AS INTEGER)", "COUNT(h.slug)"
+    as_of_meta = (
+        f"TOTAL(CASE WHEN {day} <= :as_of THEN f.has_metadata END)" if compact
+        else f"COUNT(CASE WHEN {day} <= :as_of THEN h.slug END)"
+    )
+    aggregates = [
+        f"MIN({day}) AS first_day",
+        f"MAX({day}) AS last_raw_day",
+        "COUNT(*) AS n_rows",
+        f"{meta} AS meta_rows",
+        *(f"TOTAL({alias}.{c}) AS {c}" for c in _FINGERPRINT_COLUMNS),
+        f"COUNT(CASE WHEN {day} <= :as_of THEN 1 END) AS n_rows_as_of",
+        f"{as_of_meta} AS meta_rows_as_of",
+        *(f"TOTAL(CASE WHEN {day} <= :as_of THEN {alias}.{c} END) AS {c}_as_of"
+          for c in _FINGERPRINT_COLUMNS),
+    ]
+    select = ",\n            ".join(aggregates)
+
+    if compact:
+        return f"""
+        SELECT
+            dc.collection_identifier,
+            ch.chain,
+            {select}
+        FROM canonical_collections cc
+        JOIN dim_chain ch
+            ON  ch.chain = cc.chain
+        JOIN dim_collection dc
+            ON  dc.collection_identifier = cc.collection_identifier
+            AND dc.chain_id              = ch.chain_id
+        JOIN nft_daily_facts f
+            ON  f.collection_id = dc.collection_id
+        WHERE cc.is_canonical = 1
+        GROUP BY dc.collection_id
+        """
+    canonical_cte = _CANONICAL_TABLE_CTE if canonical_collections_available(conn) else _CANONICAL_CTE
+    return f"""
+        {canonical_cte}
+        SELECT
+            h.collection_identifier,
+            h.chain,
+            {select}
+        FROM historical_nft_data h
+        INNER JOIN canonical c
+            ON  c.collection_identifier = h.collection_identifier
+            AND c.chain                 = h.chain
+        GROUP BY h.collection_identifier, h.chain
+        """
+
+
+def _history_fingerprints(conn: sqlite3.Connection, as_of_day) -> pd.DataFrame:
+    """Fingerprints indexed by (collection_identifier, chain); see _fingerprint_query."""
+    df = pd.read_sql_query(
+        _fingerprint_query(conn), conn,
+        params={"as_of": as_of_day if as_of_day is not None else -1},
+    )
+    return df.set_index(KEYS)
+
+
+def _fingerprint(row, suffix: str = "") -> list:
+    return [int(row[f"n_rows{suffix}"]), float(row[f"meta_rows{suffix}"])] + [
+        float(row[f"{c}{suffix}"]) for c in _FINGERPRINT_COLUMNS
+    ]
+
+
+def _same_fingerprint(a, b) -> bool:
+    return len(a) == len(b) and all(
+        math.isclose(x, y, rel_tol=1e-9, abs_tol=1e-9) for x, y in zip(a, b)
+    )
+
+
+# ─────────────────────────────────────────────
+# Update
+# ─────────────────────────────────────────────
+
+def _feature_days(feat: pd.DataFrame) -> pd.Series:
+    return (feat["date"] - pd.Timestamp("1970-01-01")).dt.days
+
+
+def _append_rows(feat: pd.DataFrame, state: pd.DataFrame, first_day: pd.Series, window_start: int, max_fill_gap: int):
+    """
+    New rows (date after the stored last day) of collections updated from the trailing
+    window. Returns (rows to write, keys whose window is too short to be exact).
+
+    Unless the whole history is inside the window, a window row can differ from the
+    full-history computation only within max_fill_gap days of the window start (price
+    forward-fill reaching outside the window); a new row is exact when its
+    _WARMUP_ROWS predecessors are all later.
+    """
+    days = _feature_days(feat)
+    key_index = pd.MultiIndex.from_frame(feat[KEYS])
+    last_day = state["last_day"].reindex(key_index).to_numpy()
+    complete = first_day.reindex(key_index).to_numpy() >= window_start
+    by_key = [feat["collection_identifier"], feat["chain"]]
+
+    position = feat.groupby(by_key, sort=False).cumcount()
+    edge = (days < window_start + max_fill_gap).groupby(by_key, sort=False).transform("sum")
+    is_new = days.to_numpy() > last_day
+    first_new = position.where(is_new).groupby(by_key, sort=False).transform("min")
+    too_short = (first_new < edge + _WARMUP_ROWS) & ~complete
+
+    short_keys = set(map(tuple, feat.loc[too_short, KEYS].drop_duplicates().itertuples(index=False)))
+    rows = feat[is_new & ~too_short.to_numpy()].copy()
+    # Slug is forward-filled without limit: a NULL slug in the window inherits the
+    # last stored one, as it would in the full-history computation.
+    stored_slug = state["slug"].reindex(pd.MultiIndex.from_frame(rows[KEYS])).to_numpy()
+    rows["slug"] = rows["slug"].fillna(pd.Series(stored_slug, index=rows.index))
+    return rows, short_keys
+
+
+def _write_rows(store_conn: sqlite3.Connection, feat: pd.DataFrame) -> int:
+    if feat.empty:
+        return 0
+    columns = ["day"] + STORE_COLUMNS
+    values = [_feature_days(feat).tolist()] + [feat[c].tolist() for c in STORE_COLUMNS]
+    store_conn.executemany(
+        f"INSERT OR REPLACE INTO collection_features ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})",
+        zip(*values),
+    )
+    return len(feat)
+
+
+def update_feature_store(
+    conn: sqlite3.Connection,
+    store_conn: sqlite3.Connection,
+    trailing_days: int = FEATURE_STORE_TRAILING_DAYS,
+    max_fill_gap: int = 7,
+    rebuild: bool = False,
+) -> dict:
+    """
+    Bring the feature store up to date with the price history.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Main database (price history).
+    store_conn : sqlite3.Connection
+        Feature store (get_feature_store_connection()).
+    trailing_days : int
+        Calendar days of prices loaded to compute the new rows of unchanged
+        collections. Must comfortably cover the 200-row moving average.
+    max_fill_gap : int
+        Same as build_feature_dataframe.
+    rebuild : bool
+        Drop the store and recompute everything from full history.
+
+    Returns
+    -------
+    dict
+        Collections per outcome (unchanged / appended / window / rebuilt / removed),
+        rows_written and as_of (last price date covered).
+    """
+    meta = dict(store_conn.execute("SELECT key, value FROM feature_store_meta").fetchall())
+    if rebuild or meta.get("version") != str(FEATURE_STORE_VERSION):
+        if meta:
+            logger.info("Feature store: full rebuild (version %s → %d).", meta.get("version"), FEATURE_STORE_VERSION)
+        store_conn.execute("DELETE FROM collection_features")
+        store_conn.execute("DELETE FROM collection_features_state")
+        prev_as_of = None
+    else:
+        prev_as_of = int(meta["as_of_day"]) if meta.get("as_of_day") else None
+
+    stats = {"unchanged": 0, "appended": 0, "window": 0, "rebuilt": 0, "removed": 0, "rows_written": 0}
+    fingerprints = _history_fingerprints(conn, prev_as_of)
+    if fingerprints.empty:
+        logger.warning("Feature store: price history is empty.")
+        stats["as_of"] = None
+        return stats
+
+    state = pd.read_sql_query(
+        "SELECT collection_identifier, chain, last_day, slug, fingerprint FROM collection_features_state",
+        store_conn,
+    ).set_index(KEYS)
+    as_of = int(fingerprints["last_raw_day"].max())
+    window_start = as_of - trailing_days
+
+    # ── Classify collections ────────────────────────────────────
+    unchanged, append, window, full = [], [], [], []
+    for key, row in fingerprints.iterrows():
+        stored = json.loads(state.at[key, "fingerprint"]) if key in state.index else None
+        if stored is not None and _same_fingerprint(stored, _fingerprint(row, "_as_of")):
+            if row["n_rows"] == row["n_rows_as_of"] and _same_fingerprint(stored, _fingerprint(row)):
+                unchanged.append(key)
+                continue
+            if not pd.isna(state.at[key, "last_day"]):
+                append.append(key)
+                continue
+        (window if row["first_day"] >= window_start else full).append(key)
+    removed = [key for key in state.index if key not in fingerprints.index]
+
+    # ── Trailing window: appends + collections entirely inside it ──
+    frames = []
+    if append or window:
+        price_df = _load_price_data(conn, since_date=day_to_date(window_start), collections=append + window)
+        feat, _ = _compute_features_vectorized(price_df, max_fill_gap=max_fill_gap)
+        del price_df
+        if not feat.empty:
+            is_append = pd.MultiIndex.from_frame(feat[KEYS]).isin(
+                pd.MultiIndex.from_tuples(append, names=KEYS) if append else []
+            )
+            new_rows, short_keys = _append_rows(
+                feat[is_append].reset_index(drop=True), state, fingerprints["first_day"], window_start, max_fill_gap
+            )
+            frames += [new_rows, feat[~is_append]]
+            if short_keys:
+                append = [k for k in append if k not in short_keys]
+                full += sorted(short_keys)
+
+    # ── Full history: changed, new or sparse collections ───────
+    if full:
+        logger.info("Feature store: recomputing %d collections from full history ...", len(full))
+        price_df = _load_price_data(conn, collections=full)
+        feat, _ = _compute_features_vectorized(price_df, max_fill_gap=max_fill_gap)
+        del price_df
+        frames.append(feat)
+
+    # ── Write ───────────────────────────────────────────────────
+    now = datetime.utcnow().isoformat()
+    replaced = window + full + removed
+    store_conn.executemany(
+        "DELETE FROM collection_features WHERE collection_identifier = ? AND chain = ?", replaced
+    )
+    store_conn.executemany(
+        "DELETE FROM collection_features_state WHERE collection_identifier = ? AND chain = ?", removed
+    )
+    written = pd.concat([f for f in frames if not f.empty]) if any(not f.empty for f in frames) else pd.DataFrame()
+    stats["rows_written"] = _write_rows(store_conn, written)
+
+    last_rows = {}
+    if not written.empty:
+        days = _feature_days(written)
+        last = written.assign(_day=days).sort_values("_day").groupby(KEYS, sort=False).last()
+        last_rows = {key: (int(r["_day"]), r["slug"]) for key, r in last.iterrows()}
+    state_rows = []
+    for key in append + window + full:
+        row = fingerprints.loc[key]
+        if key in last_rows:
+            last_day, slug = last_rows[key]
+        elif key in append:
+            last_day, slug = state.at[key, "last_day"], state.at[key, "slug"]
+        else:
+            last_day, slug = None, None
+        state_rows.append((
+            key[0], key[1], int(row["first_day"]),
+            int(last_day) if last_day is not None and not pd.isna(last_day) else None,
+            None if pd.isna(slug) else slug,
+            int(row["n_rows"]), json.dumps(_fingerprint(row)), now,
+        ))
+    store_conn.executemany(
+        """
+        INSERT OR REPLACE INTO collection_features_state
+            (collection_identifier, chain, first_day, last_day, slug, n_rows, fingerprint, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        state_rows,
+    )
+    store_conn.executemany(
+        "INSERT OR REPLACE INTO feature_store_meta (key, value) VALUES (?, ?)",
+        [("version", str(FEATURE_STORE_VERSION)), ("as_of_day", str(as_of)), ("updated_at", now)],
+    )
+    store_conn.commit()
+
+    stats.update(
+        unchanged=len(unchanged), appended=len(append), window=len(window),
+        rebuilt=len(full), removed=len(removed), as_of=day_to_date(as_of),
+    )
+    logger.info(
+        "Feature store updated to %s: %d unchanged | %d appended | %d from window | "
+        "%d rebuilt | %d removed | %d rows written",
+        stats["as_of"], stats["unchanged"], stats["appended"], stats["window"],
+        stats["rebuilt"], stats["removed"], stats["rows_written"],
+    )
+    return stats
+
+
+# ─────────────────────────────────────────────
+# Read
+# ─────────────────────────────────────────────
+
+def store_collections(store_conn: sqlite3.Connection, min_days: int = 60) -> list[tuple[str, str]]:
+    """(collection_identifier, chain) of the stored collections with >= min_days price rows."""
+    rows = store_conn.execute(
+        """
+        SELECT collection_identifier, chain FROM collection_features_state
+        WHERE n_rows >= ? ORDER BY collection_identifier, chain
+        """,
+        (min_days,),
+    ).fetchall()
+    return [tuple(r) for r in rows]
+
+
+def load_feature_dataframe(
+    conn: sqlite3.Connection,
+    store_conn: sqlite3.Connection,
+    min_days: int = 60,
+    lookback_days: int = None,
+    collections: list = None,
+    market_data: dict = None,
+    recent_days: int = None,
+) -> pd.DataFrame:
+    """
+    Feature dataframe read from the store, in the layout of build_feature_dataframe.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Main database (auxiliary market data).
+    store_conn : sqlite3.Connection
+        Feature store, brought up to date with update_feature_store().
+    min_days : int
+        Minimum number of observed price rows (whole history) per collection.
+    lookback_days : int or None
+        Prediction-only mode: only the latest row of each collection, for
+        collections with prices in the last `lookback_days` days. Unlike
+        build_feature_dataframe(lookback_days=...) the rolling features of that
+        row are computed over the full history.
+    collections : list of (collection_identifier, chain) or None
+        Read only these collections (one partition of store_collections()).
+    market_data : dict or None
+        Preloaded load_market_data() output, passed to add_market_features.
+    recent_days : int or None
+        Only the rows of the last `recent_days` days (all dates of the window,
+        e.g. for a warm-start update); rolling features still cover the full history.
+    """
+    select = ", ".join(f"f.{c}" for c in STORE_COLUMNS)
+    sql = f"""
+        SELECT date(f.day + 2440587.5) AS date, {select}
+        FROM collection_features f
+        JOIN collection_features_state s
+            ON  s.collection_identifier = f.collection_identifier
+            AND s.chain                 = f.chain
+        WHERE s.n_rows >= ?
+    """
+    params = [min_days]
+    as_of = store_conn.execute(
+        "SELECT value FROM feature_store_meta WHERE key = 'as_of_day'"
+    ).fetchone()
+    as_of_day = int(as_of[0]) if as_of else 0
+    if lookback_days is not None:
+        sql += " AND f.day = s.last_day AND s.last_day >= ?"
+        params.append(as_of_day - lookback_days)
+    if recent_days is not None:
+        sql += " AND f.day >= ?"
+        params.append(as_of_day - recent_days)
+    if collections is not None:
+        if not collections:
+            return pd.DataFrame()
+        sql += " AND (s.collection_identifier, s.chain) IN (VALUES {})".format(
+            ", ".join(["(?, ?)"] * len(collections))
+        )
+        params.extend(v for key in collections for v in key)
+    sql += " ORDER BY f.collection_identifier, f.chain, f.day"
+
+    logger.info("Loading features from the feature store ...")
+    df = pd.read_sql_query(sql, store_conn, params=params)
+    if df.empty:
+        logger.warning("Feature store returned no rows.")
+        return pd.DataFrame()
+    df["date"] = pd.to_datetime(df["date"])
+    df["chain_enc"] = df["chain_enc"].astype("int64")
+    _downcast_features(df)
+    logger.info(
+        "Feature store: %d rows, %d collections",
+        len(df), df["collection_identifier"].nunique(),
+    )
+    log_memory("feature store loaded", df)
+    return add_market_features(conn, df, predict_only=lookback_days is not None, market_data=market_data)
@@ -18,14 +18,81 @@ import logging
 import numpy as np
 import pandas as pd
 
+from app.ml.memory import ensure_memory, frame_mb
+
 logger = logging.getLogger(__name__)
 
 
+# Offsets (days) tried around the target date, in order of preference
+_TOLERANCE_OFFSETS = (0, 1, -1, 2, -2)
+
+# Per-group key stride: key = group_id * stride + day (days since 1970 stay far below it)
+_GROUP_STRIDE = 1_000_000
+
+# Per-row temporaries of _forward_returns (int64 group id / day / key, lookup positions
+# and masks) and the three float64 label columns added per horizon. tracemalloc peak
+# for one horizon on 700k rows: ~72 B/row = 48 + 24.
+_LABEL_TEMP_BYTES_PER_ROW = 48
+_LABEL_BYTES_PER_ROW_PER_HORIZON = 24
+
+
+def _forward_returns(df: pd.DataFrame, horizons) -> dict:
+    """
+    Forward returns for several horizons, all collections at once.
+
+    df must be sorted by collection_identifier, chain, date. For each row the
+    floor_native `h` calendar days later is looked up on the closest available
+    date within ±2 days (exact date first, then +1, -1, +2, -2), skipping dates
+    without a floor — the same rule the per-row loop used. Rows are encoded as
+    sorted int64 keys (group id, day), so every lookup is one np.searchsorted
+    over the whole frame.
+
+    Returns {horizon: np.ndarray of forward returns aligned to df's rows}.
+    """
+    # Group id = running count of (collection, chain) changes: increasing along the sorted
+    # rows, for object and categorical identifiers alike
+    cid, chain = df["collection_identifier"], df["chain"]
+    gid = (cid.ne(cid.shift()) | chain.ne(chain.shift())).cumsum().to_numpy(dtype=np.int64)
+    day = df["date"].to_numpy().astype("datetime64[D]").astype(np.int64)
+    key = gid * _GROUP_STRIDE + day
+    floor = df["floor_native"].to_numpy(dtype=float)
+    if not len(key):
+        return {h: np.empty(0) for h in horizons}
+    has_floor = ~np.isnan(floor)
+    last = len(key) - 1
+
+    result = {}
+    for h in horizons:
+        fwd_floor = np.full(len(key), np.nan)
+        pending = floor > 0
+        for offset in _TOLERANCE_OFFSETS:
+            target = key + (h + offset)
+            pos = np.minimum(np.searchsorted(key, target), last)
+            hit = pending & (key[pos] == target) & has_floor[pos]
+            fwd_floor[hit] = floor[pos[hit]]
+            pending &= ~hit
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result[h] = (fwd_floor - floor) / floor
+    return result
+
+
+def _label_columns(fwd: np.ndarray, buy_threshold: float, sell_threshold: float):
+    """(label_3class, label_binary) as float arrays, NaN where the forward return is unknown."""
+    missing = np.isnan(fwd)
+    with np.errstate(invalid="ignore"):
+        label_3class = np.select([fwd >= buy_threshold, fwd <= -sell_threshold], [1.0, -1.0], 0.0)
+        label_binary = (fwd >= buy_threshold).astype(float)
+    label_3class[missing] = np.nan
+    label_binary[missing] = np.nan
+    return label_3class, label_binary
+
+
 def add_labels(
     df: pd.DataFrame,
     horizon_days: int = 14,
     buy_threshold: float = 0.10,
     sell_threshold: float = 0.10,
+    extra_horizons=(),
 ) -> pd.DataFrame:
     """
     Add label columns to the feature dataframe.
@@ -42,6 +109,9 @@ def add_labels(
         Minimum forward return to be labelled BUY. Default=0.10 (10%).
     sell_threshold : float
         Minimum forward loss to be labelled SELL. Default=0.10 (10%).
+    extra_horizons : sequence of int
+        Additional horizons computed in the same pass. Each adds
+        forward_ret_{h}d, label_3class_{h}d and label_binary_{h}d.
 
     Returns
     -------
@@ -50,62 +120,30 @@ def add_labels(
           - forward_ret  : raw forward return (float, NaN at end of series)
           - label_3class : -1 SELL, 0 HOLD, 1 BUY
           - label_binary : 1 BUY, 0 NOT-BUY (for simpler binary classification)
+        plus the suffixed columns of extra_horizons.
     """
-    df = df.sort_values(["collection_identifier", "chain", "date"]).copy()
-
-    def _calc_forward_return(grp: pd.DataFrame) -> pd.Series:
-        """
-        For each row in a single-collection group, look up the floor_native
-        exactly `horizon_days` calendar days later using the date index.
-        Uses date-based lookup (not integer shift) so gaps in the series
-        are handled correctly — we look for the closest available date
-        within horizon ± 2 days.
-        """
-        grp = grp.set_index("date")["floor_native"]
-        fwd_ret = pd.Series(np.nan, index=grp.index, name="forward_ret")
-
-        for dt in grp.index:
-            target_dt = dt + pd.Timedelta(days=horizon_days)
-            # Allow ±2 day tolerance for missing trading days
-            for offset in [0, 1, -1, 2, -2]:
-                candidate = target_dt + pd.Timedelta(days=offset)
-                if candidate in grp.index and pd.notna(grp[candidate]) and grp[dt] > 0:
-                    fwd_ret[dt] = (grp[candidate] - grp[dt]) / grp[dt]
-                    break
-
-        return fwd_ret.values  # return as array, aligned to grp's order
-
-    logger.info(
-        "Computing forward returns (horizon=%dd, buy>=%.0f%%, sell<=-%.0f%%) ...",
-        horizon_days, buy_threshold * 100, sell_threshold * 100,
+    horizons = [horizon_days] + [h for h in extra_horizons if h != horizon_days]
+    # Sorted copy of the frame + lookup temporaries + new columns
+    ensure_memory(
+        "labels",
+        frame_mb(df)
+        + len(df) * (_LABEL_TEMP_BYTES_PER_ROW + _LABEL_BYTES_PER_ROW_PER_HORIZON * len(horizons)) / 2**20,
     )
+    df = df.sort_values(["collection_identifier", "chain", "date"])
 
-    fwd_rets = (
-        df.groupby(["collection_identifier", "chain"], sort=False)
-        .apply(_calc_forward_return)
+    logger.info(
+        "Computing forward returns (horizons=%s, buy>=%.0f%%, sell<=-%.0f%%) ...",
+        ",".join(f"{h}d" for h in horizons), buy_threshold * 100, sell_threshold * 100,
     )
-
-    # Flatten multi-index result back onto df
-    flat_fwd = []
-    for (cid, chain), arr in fwd_rets.items():
-        mask = (df["collection_identifier"] == cid) & (df["chain"] == chain)
-        flat_fwd.append(pd.Series(arr, index=df[mask].index))
-
-    df["forward_ret"] = pd.concat(flat_fwd).sort_index()
+    fwd_rets = _forward_returns(df, horizons)
 
     # ── Build labels ─────────────────────────────────────────────
-    def _classify(r):
-        if pd.isna(r):
-            return np.nan
-        if r >= buy_threshold:
-            return 1
-        if r <= -sell_threshold:
-            return -1
-        return 0
-
-    df["label_3class"] = df["forward_ret"].map(_classify)
-    df["label_binary"] = (df["forward_ret"] >= buy_threshold).astype(float)
-    df.loc[df["forward_ret"].isna(), "label_binary"] = np.nan
+    for h in horizons:
+        suffix = "" if h == horizon_days else f"_{h}d"
+        label_3class, label_binary = _label_columns(fwd_rets[h], buy_threshold, sell_threshold)
+        df[f"forward_ret{suffix}"] = fwd_rets[h]
+        df[f"label_3class{suffix}"] = label_3class
+        df[f"label_binary{suffix}"] = label_binary
 
     # Stats
     valid = df["label_3class"].dropna()
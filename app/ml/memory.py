@@ -0,0 +1,113 @@
+"""
+memory.py
+
+Stage-by-stage memory reporting and a fail-fast memory budget for the ML jobs.
+
+The training pipeline runs on small servers: a job that would exceed the
+available RAM is better stopped with a clear error at the stage that caused it
+than killed by the OOM killer halfway through. Memory is measured as process
+RSS from /proc/self/status (Linux; resource.getrusage elsewhere), so numpy and
+pandas buffers are included without the overhead of tracemalloc.
+
+    log_memory("features engineered", df)    # logs RSS, stage peak, frame size
+    ensure_memory("feature engineering", 450)  # raises if +450 MB would not fit
+
+ML_MEMORY_BUDGET_MB (0 = no budget) is checked at every log_memory() call
+against the peak RSS, and by ensure_memory() against current RSS + estimate.
+"""
+
+import logging
+import resource
+import sys
+
+import pandas as pd
+
+from app.config.config import load_config
+
+logger = logging.getLogger(__name__)
+
+config = load_config()
+ML_MEMORY_BUDGET_MB = float(config.get("ML_MEMORY_BUDGET_MB") or 0)
+
+_last_rss_mb = None
+
+
+class MemoryBudgetExceeded(RuntimeError):
+    """Raised when a stage exceeds (or would exceed) ML_MEMORY_BUDGET_MB."""
+
+
+def _proc_status_mb(field: str):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _maxrss_mb() -> float:
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB (peak RSS where the current one is unavailable)."""
+    current = _proc_status_mb("VmRSS")
+    return current if current is not None else _maxrss_mb()
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size in MB since the last reset_peak() (or process start)."""
+    peak = _proc_status_mb("VmHWM")
+    return peak if peak is not None else _maxrss_mb()
+
+
+def reset_peak():
+    """Start a new peak measurement window (Linux only; elsewhere the peak is process-wide)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def frame_mb(df: pd.DataFrame) -> float:
+    """Memory used by a dataframe in MB, including object/string payloads."""
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
+
+
+def log_memory(stage: str, df: pd.DataFrame = None, budget_mb: float = None) -> float:
+    """
+    Log RSS, the peak since the previous call and (optionally) the size of `df`,
+    then start a new peak window. Raises MemoryBudgetExceeded if the stage peak
+    went over the budget. Returns the stage peak in MB.
+    """
+    global _last_rss_mb
+    budget_mb = ML_MEMORY_BUDGET_MB if budget_mb is None else budget_mb
+    current, peak = rss_mb(), peak_rss_mb()
+    delta = f" ({current - _last_rss_mb:+.0f} MB)" if _last_rss_mb is not None else ""
+    size = f" | frame {frame_mb(df):.0f} MB ({len(df)} rows)" if df is not None else ""
+    logger.info("[mem] %s: rss %.0f MB%s | stage peak %.0f MB%s", stage, current, delta, peak, size)
+    _last_rss_mb = current
+    reset_peak()
+    if budget_mb and peak > budget_mb:
+        raise MemoryBudgetExceeded(
+            f"{stage}: peak RSS {peak:.0f} MB exceeded ML_MEMORY_BUDGET_MB={budget_mb:.0f}"
+        )
+    return peak
+
+
+def ensure_memory(stage: str, needed_mb: float, budget_mb: float = None):
+    """Fail before a stage that is estimated to need `needed_mb` more than current RSS."""
+    budget_mb = ML_MEMORY_BUDGET_MB if budget_mb is None else budget_mb
+    if not budget_mb:
+        return
+    current = rss_mb()
+    if current + needed_mb > budget_mb:
+        raise MemoryBudgetExceeded(
+            f"{stage}: needs ~{needed_mb:.0f} MB on top of {current:.0f} MB RSS, "
+            f"over ML_MEMORY_BUDGET_MB={budget_mb:.0f}"
+        )
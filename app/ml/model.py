@@ -2,7 +2,7 @@
 model.py
 
 XGBoost-based buy/sell signal classifier with:
-  - Walk-forward (time-series respecting) cross-validation
+  - Walk-forward (time-series respecting) cross-validation, folds trained in parallel
   - SHAP feature importance
   - Model persistence (save / load)
   - Per-collection prediction with confidence scores
@@ -11,6 +11,7 @@ XGBoost-based buy/sell signal classifier with:
 import logging
 import os
 import pickle
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Optional
 
@@ -20,15 +21,28 @@ import shap
 import xgboost as xgb
 from sklearn.metrics import (
     classification_report,
+    log_loss,
     precision_score,
     recall_score,
     roc_auc_score,
 )
 
+from app.config.config import load_config
 from app.ml.feature_pipeline import FEATURE_COLUMNS
+from app.ml.memory import ensure_memory, frame_mb
 
 logger = logging.getLogger(__name__)
 
+config = load_config()
+# Total threads shared by the parallel walk-forward CV folds (0 = all cores)
+ML_CV_THREADS = int(config.get("ML_CV_THREADS") or 0)
+# Warm-start updates (update_model / warm_start_update)
+ML_UPDATE_MODE = config.get("ML_UPDATE_MODE") or "trees"
+ML_UPDATE_TREES = int(config.get("ML_UPDATE_TREES") or 20)
+ML_UPDATE_WINDOW_DAYS = int(config.get("ML_UPDATE_WINDOW_DAYS") or 90)
+ML_FULL_RETRAIN_DAYS = int(config.get("ML_FULL_RETRAIN_DAYS") or 7)
+ML_DRIFT_TOLERANCE = float(config.get("ML_DRIFT_TOLERANCE") or 0.10)
+
 # Default model save path (relative to project root)
 DEFAULT_MODEL_PATH = os.path.join(
     os.path.dirname(__file__), "..", "..", "data", "ml_model.pkl"
@@ -61,24 +75,24 @@ def walk_forward_splits(
 
     Yields
     ------
-    (train_indices, test_indices)
+    (train_indices, test_indices) as contiguous ranges of row positions
     """
-    df = df.reset_index(drop=True)
-    dates = df["date"]
+    dates = df["date"].reset_index(drop=True)
     min_date = dates.min()
     max_date = dates.max()
     total_days = (max_date - min_date).days
 
+    def end_of(date) -> int:
+        # Position after the last row on or before `date`
+        return int(dates.searchsorted(date, side="right"))
+
     train_start_days = train_min_months * 30
     test_size_days = test_months * 30
 
     if total_days < train_start_days + test_size_days:
         logger.warning("Not enough data for walk-forward CV. Using single split.")
-        cutoff = min_date + pd.Timedelta(days=int(total_days * 0.75))
-        yield (
-            df[dates <= cutoff].index.tolist(),
-            df[dates > cutoff].index.tolist(),
-        )
+        cutoff = end_of(min_date + pd.Timedelta(days=int(total_days * 0.75)))
+        yield range(0, cutoff), range(cutoff, len(dates))
         return
 
     # Calculate fold boundaries
@@ -92,8 +106,8 @@ def walk_forward_splits(
         if test_end > max_date:
             break
 
-        train_idx = df[dates <= train_end].index.tolist()
-        test_idx = df[(dates > train_end) & (dates <= test_end)].index.tolist()
+        train_idx = range(0, end_of(train_end))
+        test_idx = range(train_idx.stop, end_of(test_end))
 
         if len(train_idx) < 100 or len(test_idx) < 10:
             continue
@@ -132,8 +146,12 @@ def prepare_dataset(
     if missing_feats:
         logger.warning("Missing features (will be skipped): %s", missing_feats)
 
-    X = df[available_features].copy()
-    y = df[label_col].copy()
+    # Column selection, NaN-label mask and inf replacement each copy X
+    # (tracemalloc peak ~2.8x the size of X)
+    x_mb = len(df) * sum(df[c].dtype.itemsize for c in available_features) / 2**20
+    ensure_memory("dataset preparation", 3 * x_mb)
+    X = df[available_features]
+    y = df[label_col]
 
     if drop_na_label:
         mask = y.notna()
@@ -178,6 +196,36 @@ def build_xgb_params(label_col: str = "label_binary") -> dict:
     return base
 
 
+def _booster_params(label_col: str = "label_binary", nthread: int = None) -> tuple[dict, int, int]:
+    """
+    build_xgb_params() for xgb.train(): (params, num_boost_round, early_stopping_rounds).
+    The sklearn names (learning_rate, random_state, n_jobs, ...) are accepted as aliases.
+    """
+    params = build_xgb_params(label_col)
+    num_boost_round = params.pop("n_estimators")
+    early_stopping_rounds = params.pop("early_stopping_rounds")
+    params["tree_method"] = "hist"
+    if nthread is not None:
+        params["n_jobs"] = nthread
+    return params, num_boost_round, early_stopping_rounds
+
+
+def _to_classifier(booster: xgb.Booster, label_col: str = "label_binary") -> xgb.XGBClassifier:
+    """Wrap a booster trained with xgb.train() in the XGBClassifier used by save_model / predict_signals."""
+    model = xgb.XGBClassifier(**build_xgb_params(label_col))
+    model.load_model(booster.save_raw(raw_format="json"))
+    return model
+
+
+def _class_weights(y: pd.Series) -> pd.Series:
+    """Sample weights balancing the classes of y (total / (n_classes * count))."""
+    class_counts = y.value_counts()
+    total = len(y)
+    return y.map(
+        {cls: total / (len(class_counts) * cnt) for cls, cnt in class_counts.items()}
+    ).fillna(1.0)
+
+
 def train_model(
     X_train: pd.DataFrame,
     y_train: pd.Series,
@@ -211,11 +259,7 @@ def train_model(
             y_v = y_v + 1
 
     # Compute sample weights for class imbalance
-    class_counts = y_tr.value_counts()
-    total = len(y_tr)
-    sample_weights = y_tr.map(
-        {cls: total / (len(class_counts) * cnt) for cls, cnt in class_counts.items()}
-    ).fillna(1.0)
+    sample_weights = _class_weights(y_tr)
 
     model = xgb.XGBClassifier(**params)
 
@@ -238,10 +282,17 @@ def walk_forward_cv(
     df: pd.DataFrame,
     label_col: str = "label_binary",
     n_splits: int = 5,
+    n_jobs: Optional[int] = None,
 ) -> dict:
     """
     Run walk-forward cross-validation and report performance per fold.
 
+    Every fold trains on a contiguous slice of the date-sorted labeled rows.
+    The feature matrix is converted and its quantile bins computed once
+    (QuantileDMatrix), and each fold's matrices are binned against them. Folds
+    train in parallel threads (XGBoost releases the GIL) sharing `n_jobs`
+    threads in total (default: ML_CV_THREADS, 0 = all cores).
+
     Returns
     -------
     dict with keys: 'fold_results', 'mean_precision', 'mean_recall', 'mean_auc'
@@ -249,39 +300,63 @@ def walk_forward_cv(
     df_sorted = df.sort_values("date").reset_index(drop=True)
     X_all, y_all = prepare_dataset(df_sorted, label_col=label_col)
 
-    fold_results = []
-    splits = list(walk_forward_splits(df_sorted, n_splits=n_splits))
-
-    logger.info("Running %d-fold walk-forward CV ...", len(splits))
-
-    for i, (train_idx, test_idx) in enumerate(splits):
-        # Intersect with valid (non-NaN label) indices
-        valid_idx = set(X_all.index)
-        tr = [ix for ix in train_idx if ix in valid_idx]
-        te = [ix for ix in test_idx if ix in valid_idx]
+    # Fold boundaries as positions among the labeled rows: training is rows
+    # [0, train_end), test is [train_end, test_end)
+    labeled_pos = X_all.index.to_numpy()
+    bounds = [
+        (int(np.searchsorted(labeled_pos, tr.stop)), int(np.searchsorted(labeled_pos, te.stop)))
+        for tr, te in walk_forward_splits(df_sorted, n_splits=n_splits)
+    ]
+    dates = df_sorted["date"].iloc[labeled_pos].reset_index(drop=True)
+    y_all = y_all.reset_index(drop=True)
+    del df_sorted
+    if not bounds:
+        logger.error("No valid folds produced.")
+        return {}
 
-        if len(tr) < 50 or len(te) < 10:
+    X = X_all.to_numpy(dtype=np.float32)
+    del X_all
+    # For 3-class, shift labels -1→0, 0→1, 1→2 (XGBoost needs 0-based)
+    y = (y_all + 1 if label_col == "label_3class" else y_all).to_numpy()
+
+    n_jobs = n_jobs or ML_CV_THREADS or os.cpu_count() or 1
+    workers = min(len(bounds), n_jobs)
+    nthread = max(1, n_jobs // workers)
+    params, num_boost_round, early_stopping_rounds = _booster_params(label_col, nthread=nthread)
+    # Quantised reference + one train/val matrix per parallel fold, ~1 byte per value each
+    ensure_memory("walk-forward CV", (1 + workers) * X.size / 2**20)
+    ref = xgb.QuantileDMatrix(X, nthread=n_jobs)
+
+    def run_fold(i: int, train_end: int, test_end: int) -> Optional[dict]:
+        if train_end < 50 or test_end - train_end < 10:
             logger.warning("Fold %d: insufficient data, skipping.", i + 1)
-            continue
-
-        X_tr, y_tr = X_all.loc[tr], y_all.loc[tr]
-        X_te, y_te = X_all.loc[te], y_all.loc[te]
+            return None
 
         # Use last 20% of training as val for early stopping
-        val_cut = int(len(tr) * 0.8)
-        X_v, y_v = X_tr.iloc[val_cut:], y_tr.iloc[val_cut:]
-        X_tr2, y_tr2 = X_tr.iloc[:val_cut], y_tr.iloc[:val_cut]
-
-        model = train_model(X_tr2, y_tr2, X_val=X_v, y_val=y_v, label_col=label_col)
+        val_cut = int(train_end * 0.8)
+        dtrain = xgb.QuantileDMatrix(
+            X[:val_cut], label=y[:val_cut], weight=_class_weights(pd.Series(y[:val_cut])).to_numpy(),
+            ref=ref, nthread=nthread,
+        )
+        dval = xgb.QuantileDMatrix(X[val_cut:train_end], label=y[val_cut:train_end], ref=dtrain, nthread=nthread)
+        booster = xgb.train(
+            params, dtrain,
+            num_boost_round=num_boost_round,
+            evals=[(dval, "validation_0")],
+            early_stopping_rounds=early_stopping_rounds,
+            verbose_eval=False,
+        )
 
-        # Adjust back for 3-class
-        y_pred_raw = model.predict(X_te)
+        # Same predictions as XGBClassifier.predict / predict_proba (best iteration)
+        y_prob = booster.inplace_predict(
+            X[train_end:test_end], iteration_range=(0, booster.best_iteration + 1)
+        )
+        y_te = y_all.iloc[train_end:test_end]
         if label_col == "label_3class":
-            y_pred = pd.Series(y_pred_raw - 1, index=y_te.index)
+            y_pred = pd.Series(y_prob.argmax(axis=1) - 1, index=y_te.index)
         else:
-            y_pred = pd.Series(y_pred_raw, index=y_te.index)
-
-        y_prob = model.predict_proba(X_te)
+            y_pred = pd.Series((y_prob > 0.5).astype(int), index=y_te.index)
+            y_prob = np.column_stack([1 - y_prob, y_prob])
 
         prec = precision_score(y_te, y_pred, average="weighted", zero_division=0)
         rec = recall_score(y_te, y_pred, average="weighted", zero_division=0)
@@ -294,25 +369,33 @@ def walk_forward_cv(
         except Exception:
             auc = np.nan
 
-        train_start = df_sorted["date"].iloc[min(tr)]
-        train_end = df_sorted["date"].iloc[max(tr)]
-        test_start = df_sorted["date"].iloc[min(te)]
-        test_end = df_sorted["date"].iloc[max(te)]
+        train_start = dates.iloc[0]
+        train_last = dates.iloc[train_end - 1]
+        test_start = dates.iloc[train_end]
+        test_last = dates.iloc[test_end - 1]
 
         logger.info(
             "Fold %d | Train %s→%s | Test %s→%s | Prec=%.3f Rec=%.3f AUC=%.3f",
             i + 1,
-            train_start.date(), train_end.date(),
-            test_start.date(), test_end.date(),
+            train_start.date(), train_last.date(),
+            test_start.date(), test_last.date(),
             prec, rec, auc,
         )
-        fold_results.append({
+        return {
             "fold": i + 1,
-            "train_start": train_start, "train_end": train_end,
-            "test_start": test_start, "test_end": test_end,
+            "train_start": train_start, "train_end": train_last,
+            "test_start": test_start, "test_end": test_last,
             "precision": prec, "recall": rec, "auc": auc,
-            "n_train": len(tr), "n_test": len(te),
-        })
+            "n_train": train_end, "n_test": test_end - train_end,
+        }
+
+    logger.info(
+        "Running %d-fold walk-forward CV (%d folds in parallel, %d threads each) ...",
+        len(bounds), workers, nthread,
+    )
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(run_fold, range(len(bounds)), *zip(*bounds)))
+    fold_results = [r for r in results if r is not None]
 
     if not fold_results:
         logger.error("No valid folds produced.")
@@ -362,6 +445,9 @@ def train_final_model(
     X_tr, y_tr = X.iloc[:val_cut], y.iloc[:val_cut]
     X_v, y_v = X.iloc[val_cut:], y.iloc[val_cut:]
 
+    # XGBClassifier.fit peak RSS ~1.9x the size of X (float32 copy + quantised matrices),
+    # measured on 1.35M rows x 22 features
+    ensure_memory("final model training", 2 * frame_mb(X))
     logger.info("Training final model on %d rows ...", len(X_tr))
     model = train_model(X_tr, y_tr, X_val=X_v, y_val=y_v, label_col=label_col)
     logger.info("Final model trained. Best iteration: %d", model.best_iteration)
@@ -397,6 +483,182 @@ def compute_shap_importance(
     return importance
 
 
+# ─────────────────────────────────────────────
+# Incremental (warm-start) update
+# ─────────────────────────────────────────────
+
+def full_train_info(
+    model: xgb.XGBClassifier,
+    df: Optional[pd.DataFrame] = None,
+    label_col: str = "label_binary",
+    window_days: int = ML_UPDATE_WINDOW_DAYS,
+) -> dict:
+    """
+    Training record saved with a fully retrained model: the time of the full
+    retrain and its baseline_loss for drift checks.
+
+    The baseline is the loss on the acceptance slice of _recent_splits(df), the
+    same holdout warm_start_update() measures drift on. Those rows are the latest
+    labeled ones, inside the full retrain's early-stopping holdout (never its
+    training rows). Without df (out-of-core training) baseline_loss is None and the
+    first warm-start update records it.
+    """
+    baseline_loss = None
+    if df is not None:
+        *_, X_acc, y_acc = _recent_splits(df, label_col, window_days)
+        if y_acc.nunique() >= 2:
+            baseline_loss = _holdout_loss(model, X_acc, y_acc)
+    return {
+        "full_trained_at": datetime.utcnow().isoformat(),
+        "baseline_loss": baseline_loss,
+        "updates": 0,
+    }
+
+
+def _holdout_loss(model: xgb.XGBClassifier, X: pd.DataFrame, y: pd.Series) -> float:
+    """Unweighted (m)logloss of model on a holdout, y 0-based as in training."""
+    return float(log_loss(y, model.predict_proba(X), labels=np.arange(model.n_classes_)))
+
+
+def _recent_splits(df: pd.DataFrame, label_col: str, window_days: int):
+    """
+    Labeled rows of the last `window_days` days, date-sorted and split 80/10/10:
+    training, early stopping, and a final acceptance slice that neither training
+    nor early stopping sees. Returns (X_tr, y_tr, X_es, y_es, X_acc, y_acc), y 0-based.
+    """
+    labeled = df[df[label_col].notna()]
+    start = labeled["date"].max() - pd.Timedelta(days=window_days)
+    recent = labeled[labeled["date"] > start].sort_values("date").reset_index(drop=True)
+    X, y = prepare_dataset(recent, label_col=label_col)
+    if label_col == "label_3class":
+        y = y + 1  # -1→0, 0→1, 1→2
+    es_cut, acc_cut = int(len(X) * 0.80), int(len(X) * 0.90)
+    return (
+        X.iloc[:es_cut], y.iloc[:es_cut],
+        X.iloc[es_cut:acc_cut], y.iloc[es_cut:acc_cut],
+        X.iloc[acc_cut:], y.iloc[acc_cut:],
+    )
+
+
+def update_model(
+    model: xgb.XGBClassifier,
+    X_tr: pd.DataFrame,
+    y_tr: pd.Series,
+    X_v: pd.DataFrame,
+    y_v: pd.Series,
+    label_col: str = "label_binary",
+    mode: str = ML_UPDATE_MODE,
+    n_trees: int = ML_UPDATE_TREES,
+) -> xgb.XGBClassifier:
+    """
+    Warm-start update of a trained model on recent rows (y 0-based).
+
+    mode 'trees'   : add up to n_trees trees fitted on the recent rows
+                     (class-balanced, early stopping on X_v / y_v)
+    mode 'refresh' : keep the tree structure, refit the leaf values on the
+                     recent rows (process_type=update, updater=refresh)
+
+    The trees grown after the previous best iteration are dropped first, so the
+    update starts from the model predict_signals actually used.
+    """
+    booster = model.get_booster()
+    best = booster.attr("best_iteration")
+    if best is not None:
+        booster = booster[: int(best) + 1]
+
+    params, _, early_stopping_rounds = _booster_params(label_col)
+    dtrain = xgb.DMatrix(X_tr, label=y_tr, weight=_class_weights(y_tr))
+    if mode == "refresh":
+        params.pop("tree_method")
+        params.update(process_type="update", updater="refresh", refresh_leaf=True)
+        booster = xgb.train(params, dtrain, num_boost_round=booster.num_boosted_rounds(), xgb_model=booster)
+    elif mode == "trees":
+        booster = xgb.train(
+            params,
+            dtrain,
+            num_boost_round=n_trees,
+            evals=[(xgb.DMatrix(X_v, label=y_v), "validation_0")],
+            early_stopping_rounds=min(early_stopping_rounds, n_trees),
+            xgb_model=booster,
+            verbose_eval=False,
+        )
+    else:
+        raise ValueError(f"Unknown update mode: {mode!r} (expected 'trees' or 'refresh')")
+    return _to_classifier(booster, label_col)
+
+
+def warm_start_update(
+    model: xgb.XGBClassifier,
+    feature_names: list[str],
+    train_info: dict,
+    df: pd.DataFrame,
+    label_col: str = "label_binary",
+    mode: str = ML_UPDATE_MODE,
+    n_trees: int = ML_UPDATE_TREES,
+    window_days: int = ML_UPDATE_WINDOW_DAYS,
+    full_retrain_days: int = ML_FULL_RETRAIN_DAYS,
+    drift_tolerance: float = ML_DRIFT_TOLERANCE,
+) -> tuple[Optional[xgb.XGBClassifier], dict, str]:
+    """
+    Update the previous model on the last `window_days` of labeled rows in df
+    (output of add_labels), with guardrails that ask for a full retrain instead:
+
+      - no full-retrain record (model saved before updates existed);
+      - the last full retrain is `full_retrain_days` or more old (weekly schedule);
+      - the feature set changed;
+      - drift: on the acceptance slice the previous model's loss exceeds the
+        baseline_loss of its full retrain by more than `drift_tolerance`;
+      - the updated model does worse than the previous one on the acceptance slice.
+
+    The window is split by _recent_splits(): the update trains on the first 80%,
+    early-stops on the next 10%, and is accepted or rejected on the last 10%,
+    which neither has seen. A missing baseline_loss is set to the previous
+    model's loss on this run's acceptance slice.
+
+    Returns
+    -------
+    (updated model, updated train_info, reason) or (None, train_info, reason)
+    when a full retrain is needed.
+    """
+    full_trained_at = train_info.get("full_trained_at")
+    if not full_trained_at:
+        return None, train_info, "no full-retrain record"
+    age_days = (datetime.utcnow() - datetime.fromisoformat(full_trained_at)).total_seconds() / 86400
+    if age_days >= full_retrain_days:
+        return None, train_info, f"last full retrain {age_days:.1f} days ago (every {full_retrain_days})"
+
+    X_tr, y_tr, X_es, y_es, X_acc, y_acc = _recent_splits(df, label_col, window_days)
+    if X_tr.columns.tolist() != feature_names:
+        return None, train_info, "feature set changed"
+    if len(X_tr) < 200 or y_acc.nunique() < 2:
+        return None, train_info, f"too few recent labeled rows ({len(X_tr)})"
+
+    prev_loss = _holdout_loss(model, X_acc, y_acc)
+    baseline = train_info.get("baseline_loss")
+    if baseline is None:
+        baseline = prev_loss
+    elif prev_loss > baseline * (1 + drift_tolerance):
+        return None, train_info, f"drift: holdout loss {prev_loss:.4f} vs baseline {baseline:.4f}"
+
+    updated = update_model(model, X_tr, y_tr, X_es, y_es, label_col=label_col, mode=mode, n_trees=n_trees)
+    new_loss = _holdout_loss(updated, X_acc, y_acc)
+    logger.info(
+        "Warm-start update (%s) on %d rows: holdout loss %.4f -> %.4f",
+        mode, len(X_tr), prev_loss, new_loss,
+    )
+    if new_loss > prev_loss:
+        return None, train_info, f"update worse than previous model ({new_loss:.4f} > {prev_loss:.4f})"
+
+    info = dict(
+        train_info,
+        baseline_loss=baseline,
+        updates=train_info.get("updates", 0) + 1,
+        updated_at=datetime.utcnow().isoformat(),
+        last_update_loss=new_loss,
+    )
+    return updated, info, f"updated ({mode}), holdout loss {prev_loss:.4f} -> {new_loss:.4f}"
+
+
 # ─────────────────────────────────────────────
 # Prediction
 # ─────────────────────────────────────────────
@@ -435,7 +697,7 @@ def predict_signals(
     df_pred = (
         df[df["date"] <= target_date]
         .sort_values("date")
-        .groupby(["collection_identifier", "chain"])
+        .groupby(["collection_identifier", "chain"], observed=True)
         .last()
         .reset_index()
     )
@@ -493,13 +755,19 @@ def predict_signals(
 # Persistence
 # ─────────────────────────────────────────────
 
-def save_model(model: xgb.XGBClassifier, feature_names: list[str], path: str = DEFAULT_MODEL_PATH):
-    """Serialize model + feature names to disk."""
+def save_model(
+    model: xgb.XGBClassifier,
+    feature_names: list[str],
+    path: str = DEFAULT_MODEL_PATH,
+    train_info: Optional[dict] = None,
+):
+    """Serialize model + feature names (+ training record, see full_train_info) to disk."""
     os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
     payload = {
         "model": model,
         "feature_names": feature_names,
         "trained_at": datetime.utcnow().isoformat(),
+        "train_info": train_info or {},
     }
     with open(path, "wb") as f:
         pickle.dump(payload, f)
@@ -517,3 +785,12 @@ def load_model(path: str = DEFAULT_MODEL_PATH) -> tuple[xgb.XGBClassifier, list[
         path, payload.get("trained_at", "unknown"),
     )
     return payload["model"], payload["feature_names"]
+
+
+def load_train_info(path: str = DEFAULT_MODEL_PATH) -> dict:
+    """Training record saved with the model ({} for models saved without one)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "rb") as f:
+        payload = pickle.load(f)
+    return payload.get("train_info") or {}
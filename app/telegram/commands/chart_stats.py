@@ -0,0 +1,33 @@
+from telegram import Update
+from telegram.ext import ContextTypes, CommandHandler
+from app.telegram.utils.auth import is_admin, access_denied
+from app.telegram.utils.chart_service import chart_service
+
+async def chart_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /chart_stats → metriche del pool di rendering dei grafici (coda, latenza, errori).
+    """
+    user_id = update.effective_user.id
+    if not is_admin(user_id):
+        await access_denied(update)
+        return
+
+    s = chart_service.stats()
+    msg = (
+        f"🖼️ Chart service\n\n"
+        f"Worker: {s['workers']}\n"
+        f"Coda: {s['queue_depth']}/{s['queue_max']} (max raggiunto: {s['max_queue_depth']})\n"
+        f"Richieste: {s['requests']}\n"
+        f"Completate: {s['completed']}\n"
+        f"Errori: {s['failed']}\n"
+        f"Timeout: {s['timeouts']}\n"
+        f"Rifiutate (coda piena): {s['rejected']}\n"
+        f"Latenza media: {s['avg_ms']:.0f} ms\n"
+        f"Latenza max: {s['max_ms']:.0f} ms\n\n"
+        f"Cache: {s['cache_hits']} hit su {s['requests']} richieste "
+        f"(memoria {s['cache']['memory_hits']}, disco {s['cache']['disk_hits']}, "
+        f"miss {s['cache']['misses']}, voci in memoria {s['cache']['memory_items']})"
+    )
+    await update.message.reply_text(msg)
+
+chart_stats_handler = CommandHandler("chart_stats", chart_stats)
@@ -1,7 +1,7 @@
 from telegram import Update
 from telegram.ext import ContextTypes, CommandHandler
 from app.telegram.utils.auth import is_authorized, access_denied
-from app.database.db_connection import get_db_connection
+from app.database.bot_repository import bot_repository
 from datetime import datetime
 
 async def check_daily_insert(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -26,15 +26,8 @@ async def check_daily_insert(update: Update, context: ContextTypes.DEFAULT_TYPE)
         # Nessun argomento: usa oggi
         query_date = "now"
 
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT COUNT(*) FROM historical_nft_data WHERE latest_floor_date = DATE(?)",
-        (query_date,)
-    )
-    result = cur.fetchone()
-    conn.close()
-    x = result[0] if result else 0
+    # Conteggio dal rollup giornaliero (daily_ingest_stats)
+    x = await bot_repository.count_rows_on_date(query_date)
     msg = (
         f"{x} inserted records today" if query_date == "now"
         else f"{x} inserted records in date: {query_date}"
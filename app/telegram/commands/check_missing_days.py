@@ -1,7 +1,8 @@
 from telegram import Update
 from telegram.ext import ContextTypes, CommandHandler
 from app.telegram.utils.auth import is_authorized, access_denied
-from app.database.db_connection import get_db_connection
+from app.database.bot_repository import bot_repository
+from datetime import datetime, timedelta
 
 async def check_days_presence_since(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
@@ -26,22 +27,8 @@ async def check_days_presence_since(update: Update, context: ContextTypes.DEFAUL
         await update.message.reply_text("❌ La data indicata è nel futuro.")
         return
 
-    # Query raggruppata per giorni con almeno 1500 record
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT latest_floor_date, COUNT(*)
-        FROM historical_nft_data
-        WHERE latest_floor_date >= DATE(?)
-        GROUP BY latest_floor_date
-        HAVING COUNT(*) > 1500
-        ORDER BY latest_floor_date ASC
-        """,
-        (arg_date,)
-    )
-    results = cur.fetchall()
-    conn.close()
+    # Giorni con almeno 1500 record, letti dal rollup giornaliero (daily_ingest_stats)
+    results = await bot_repository.daily_counts_since(arg_date, 1500)
 
     if not results:
         await update.message.reply_text("❌ Nessun dato con più di 1500 record trovato.")
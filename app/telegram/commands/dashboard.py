@@ -0,0 +1,83 @@
+"""
+Telegram Command: /dashboard [chain]
+Dashboard giornaliera del mercato: top movers 1d/7d/30d e volume per chain, golden cross
+del giorno, segnali ML più forti e social hype. Legge solo la snapshot precalcolata
+(tabella daily_dashboard, scripts/build_daily_dashboard.py).
+"""
+
+from telegram import Update
+from telegram.ext import ContextTypes, CommandHandler
+from app.telegram.utils.auth import is_authorized, access_denied
+from app.database.bot_repository import bot_repository
+
+# Sezioni nell'ordine di visualizzazione: (sezione, titolo, formato del valore)
+SECTIONS = (
+    ("hype", "🔥 Social hype", lambda v: f"{v:.0f}/100"),
+    ("gainers_1d", "🚀 Top gainers 1D", lambda v: f"{v:+.1f}%"),
+    ("gainers_7d", "📈 Top gainers 7D", lambda v: f"{v:+.1f}%"),
+    ("gainers_30d", "📆 Top gainers 30D", lambda v: f"{v:+.1f}%"),
+    ("volume", "💰 Volume leaders 24h", lambda v: f"{v:,.2f}"),
+    ("crosses", "✨ Golden crosses", lambda v: f"rank {v:.0f}" if v is not None else ""),
+    ("ml_signals", "🤖 ML BUY signals", lambda v: f"{v:.0%}"),
+)
+# Senza chain indicata: righe per chain mostrate in ogni sezione
+COMPACT_ROWS_PER_CHAIN = 3
+
+
+def _format_dashboard(snapshot_date, rows, chain=None):
+    by_section = {}
+    for r in rows:
+        by_section.setdefault(r["section"], []).append(r)
+
+    title = f"📊 NFT Market Dashboard — {snapshot_date}" + (f" ({chain})" if chain else "")
+    lines = [title]
+    for section, label, fmt in SECTIONS:
+        entries = by_section.get(section)
+        if not entries:
+            continue
+        lines.append(f"\n{label}")
+        last_scope = None
+        for r in entries:
+            if not chain and r["scope"] and r["rank"] > COMPACT_ROWS_PER_CHAIN:
+                continue
+            if r["scope"] and r["scope"] != last_scope and not chain:
+                lines.append(f"  {r['scope']}")
+            last_scope = r["scope"]
+            value = fmt(r["value"]) if r["value"] is not None else ""
+            name = r["slug"] or ""
+            if not r["scope"] and r["chain"]:
+                name = f"{name} ({r['chain']})"
+            parts = [p for p in (name, value, r["detail"]) if p]
+            indent = "    " if r["scope"] and not chain else "  "
+            prefix = f"{indent}{r['rank']}. " if name else indent
+            lines.append(prefix + " | ".join(parts))
+    return "\n".join(lines)
+
+
+async def dashboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /dashboard         → dashboard di tutte le chain (top 3 per chain)
+    /dashboard <chain> → dashboard completa di una chain
+    """
+    user_id = update.effective_user.id
+    if not is_authorized(user_id):
+        await access_denied(update)
+        return
+
+    chain = context.args[0].lower() if context.args else None
+    result = await bot_repository.daily_dashboard(chain)
+    if result is None:
+        await update.message.reply_text("Dashboard not available yet, please retry after the daily import.")
+        return
+
+    snapshot_date, generated_at, rows = result
+    if chain and not any(r["scope"] == chain for r in rows):
+        await update.message.reply_text(f"No dashboard data for chain '{chain}' on {snapshot_date}.")
+        return
+
+    message = _format_dashboard(snapshot_date, rows, chain)
+    message += f"\n\nUpdated: {generated_at[:16].replace('T', ' ')} UTC"
+    # Limite Telegram: 4096 caratteri per messaggio
+    await update.message.reply_text(message[:4000])
+
+dashboard_handler = CommandHandler("dashboard", dashboard)
@@ -1,25 +1,11 @@
 from telegram import Update
 from telegram.ext import ContextTypes, CommandHandler
-from app.database.db_connection import get_db_connection
-import sqlite3
+from app.database.bot_repository import bot_repository
 
 async def historical_data_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    # Funzione di utilità per info tabella
-    def get_table_stats(table):
-        cur.execute(f"SELECT COUNT(*), MIN(latest_floor_date), MAX(latest_floor_date) FROM {table}")
-        count, min_date, max_date = cur.fetchone()
-        count = count or 0
-        return {
-            "count": count,
-            "from": min_date or "-",
-            "to": max_date or "-"
-        }
-
-    stats_main = get_table_stats("historical_nft_data")
-    stats_archive = get_table_stats("historical_nft_data_archive")
+    # Conteggi e periodo coperto dal rollup giornaliero (daily_ingest_stats)
+    stats_main = await bot_repository.table_summary("historical_nft_data")
+    stats_archive = await bot_repository.table_summary("historical_nft_data_archive")
 
     total = stats_main["count"] + stats_archive["count"]
     perc_main = round(stats_main["count"] / total * 100, 1) if total else 0.0
@@ -38,7 +24,6 @@ async def historical_data_stats(update: Update, context: ContextTypes.DEFAULT_TY
     )
 
     await update.message.reply_text(msg)
-    conn.close()
 
 # EXPORTA handler
 historical_data_stats_handler = CommandHandler("historical_data_stats", historical_data_stats)
\ No newline at end of file
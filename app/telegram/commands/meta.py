@@ -1,7 +1,7 @@
 from telegram import Update
 from telegram.ext import ContextTypes, CommandHandler
 from app.telegram.utils.auth import is_authorized, access_denied
-from app.database.db_connection import get_db_connection
+from app.database.bot_repository import bot_repository
 
 async def meta(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
@@ -14,24 +14,11 @@ async def meta(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     slug = context.args[0]
 
-    query = """
-        SELECT nc.slug, nc.name, nc.chain, nc.categories, hnd.best_price_url, hnd.latest_floor_date
-        FROM nft_collections nc
-        INNER JOIN historical_nft_data hnd
-        ON nc.collection_identifier = hnd.collection_identifier
-        WHERE nc.slug = ? COLLATE NOCASE
-    """
-
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute(query, (slug,))
-    rows = cur.fetchall()
-    conn.close()
-    if not rows:
+    latest_row = await bot_repository.collection_meta(slug)
+    if not latest_row:
         await update.message.reply_text("No results found.")
         return
 
-    latest_row = max(rows, key=lambda row: row[5] if row[5] is not None else "")
     slug_val, name_val, chain_val, categories_val, best_price_url, latest_floor_date = latest_row
 
     msg = (
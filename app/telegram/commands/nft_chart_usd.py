@@ -5,8 +5,10 @@ from telegram.ext import (
 from datetime import datetime
 import logging
 from app.telegram.utils.auth import is_authorized, access_denied
-from app.telegram.utils.chart import create_nft_chart
-from app.database.db_connection import get_db_connection
+from app.telegram.utils.slug_index import slug_index, slug_not_found_text
+from app.telegram.utils.chart_service import (
+    chart_service, ChartQueueFull, ChartTimeout, STATUS_OK, STATUS_NOT_FOUND, STATUS_NO_DATA
+)
 
 logger = logging.getLogger(__name__)
 
@@ -58,55 +60,54 @@ async def enter_slug_usd(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await access_denied(update)
         return ConversationHandler.END
 
+    # Risoluzione dallo slug index in memoria (case-insensitive, suggerimenti se sbagliato)
+    if slug_index.ready:
+        resolved = slug_index.resolve(slug)
+        if resolved is None:
+            logger.warning(f"[nft_chart_usd] Slug '{slug}' not found in slug index")
+            await update.message.reply_text(slug_not_found_text(slug))
+            return ConversationHandler.END
+        slug = resolved
+
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        logger.debug(f"[nft_chart_usd] Querying nft_collections for collection_identifier: {slug}")
-        
-        cur.execute("SELECT collection_identifier, chain FROM nft_collections WHERE collection_identifier = ?", (slug,))
-        row = cur.fetchone()
-        
-        if not row:
+        # Lettura dati e render nel pool di processi: l'event loop resta libero
+        logger.debug(f"[nft_chart_usd] Requesting chart for {slug} from chart service")
+        try:
+            result = await chart_service.render(slug, "floor_usd", days)
+        except ChartQueueFull:
+            await update.message.reply_text("Too many charts are being generated right now, please retry in a few seconds.")
+            return ConversationHandler.END
+        except ChartTimeout:
+            logger.error(f"[nft_chart_usd] Chart generation timed out for {slug}")
+            await update.message.reply_text("Chart generation timed out, please retry later.")
+            return ConversationHandler.END
+
+        if result["status"] == STATUS_NOT_FOUND:
             logger.warning(f"[nft_chart_usd] Slug '{slug}' not found in nft_collections")
-            await update.message.reply_text("Slug not found.")
-            conn.close()
+            await update.message.reply_text(slug_not_found_text(slug))
             return ConversationHandler.END
-        
-        collection_identifier, chain = row
-        logger.debug(f"[nft_chart_usd] Found collection: {collection_identifier}, chain: {chain}")
 
-        logger.debug(f"[nft_chart_usd] Querying historical_nft_data for {collection_identifier}, last {days} days")
-        cur.execute(
-            "SELECT latest_floor_date, floor_price_usd FROM historical_nft_data "
-            "WHERE collection_identifier = ? AND latest_floor_date >= date('now', ? || ' days') "
-            "ORDER BY latest_floor_date ASC",
-            (collection_identifier, -days)
-        )
-        data = cur.fetchall()
-        conn.close()
-        
-        logger.info(f"[nft_chart_usd] Retrieved {len(data)} data points for {slug} in {days} days")
+        chain = result["chain"]
+        points = result["points"]
+        logger.info(f"[nft_chart_usd] Retrieved {points} data points for {slug} in {days} days")
 
-        if not data:
+        if result["status"] == STATUS_NO_DATA:
             logger.warning(f"[nft_chart_usd] No data available for {slug} in the last {days} days")
             await update.message.reply_text(f"No data available for {slug} in the last {days} days.")
             return ConversationHandler.END
 
-        if len(data) < days:
-            logger.warning(f"[nft_chart_usd] Only {len(data)} days available (requested {days})")
-            await update.message.reply_text(f"Warning: Only {len(data)} days of data available, less than the {days} days requested.")
+        if points < days:
+            logger.warning(f"[nft_chart_usd] Only {points} days available (requested {days})")
+            await update.message.reply_text(f"Warning: Only {points} days of data available, less than the {days} days requested.")
 
-        logger.debug(f"[nft_chart_usd] Generating chart for {slug}")
-        chart = create_nft_chart(slug, data, "floor_price_usd", chain, days)
-        
-        if not chart:
+        if result["status"] != STATUS_OK:
             logger.error(f"[nft_chart_usd] Chart generation failed for {slug}")
             await update.message.reply_text("Error in generating the chart.")
             return ConversationHandler.END
 
         logger.debug(f"[nft_chart_usd] Sending chart to user {user_id}")
         await update.message.reply_photo(
-            photo=chart,
+            photo=result["png"],
             caption=f"Floor Price Chart (USD) - {slug} - Last {days} days",
             reply_markup=ReplyKeyboardRemove()
         )
@@ -0,0 +1,59 @@
+from telegram import Update
+from telegram.ext import ContextTypes, CommandHandler
+from app.telegram.utils.auth import is_admin, access_denied
+from app.telegram.utils.command_metrics import command_metrics, dump_metrics_json
+
+ORDER_KEYS = {
+    "count": "count", "p50": "p50_ms", "p95": "p95_ms", "p99": "p99_ms",
+    "max": "max_ms", "total": "total_ms", "errors": "errors", "rate": "per_min",
+}
+
+async def perf(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /perf [count|p50|p95|p99|max|total|errors|rate] [n]  → latenza e throughput per comando
+    /perf dump                                          → salva le metriche in JSON
+    /perf reset                                         → azzera le metriche
+    """
+    user_id = update.effective_user.id
+    if not is_admin(user_id):
+        await access_denied(update)
+        return
+
+    args = [a.lower() for a in (context.args or [])]
+
+    if args and args[0] == "dump":
+        path = dump_metrics_json()
+        await update.message.reply_text(f"Metriche del bot salvate in {path}")
+        return
+    if args and args[0] == "reset":
+        command_metrics.reset()
+        await update.message.reply_text("Metriche del bot azzerate.")
+        return
+
+    order_by = ORDER_KEYS.get(args[0], "count") if args else "count"
+    n = int(args[-1]) if args and args[-1].isdigit() else 15
+    top = command_metrics.top(n=min(n, 40), order_by=order_by)
+    if not top:
+        await update.message.reply_text("Nessun comando registrato finora.")
+        return
+
+    lines = [f"⏱️ Top {len(top)} comandi per {order_by} (dal {command_metrics.started_at[:19]} UTC)\n"]
+    for e in top:
+        lines.append(
+            f"{e['command']}: {e['count']}x ({e['per_min']:.1f}/min) | "
+            f"p50 {e['p50_ms']:.0f} p95 {e['p95_ms']:.0f} p99 {e['p99_ms']:.0f} max {e['max_ms']:.0f} ms | "
+            f"errori {e['errors']} | in corso {e['in_flight']}"
+        )
+
+    processor = context.application.update_processor
+    if hasattr(processor, "stats"):
+        s = processor.stats()
+        lines.append(
+            f"\nUpdate: {s['processed']} elaborati, {s['failed']} falliti, {s['pending']} in corso "
+            f"(max {s['max_pending']}, limite {s['max_concurrent_updates']})"
+        )
+
+    # Limite Telegram: 4096 caratteri per messaggio
+    await update.message.reply_text("\n".join(lines)[:4000])
+
+perf_handler = CommandHandler("perf", perf)
@@ -1,7 +1,7 @@
 from telegram import Update
 from telegram.ext import ContextTypes, CommandHandler
 from app.telegram.utils.auth import is_authorized, access_denied
-from app.telegram.utils.pagination import get_paginated_results, build_pagination_keyboard, paginated_list_handler
+from app.telegram.utils.pagination import paginated_list_handler
 from app.database.db_connection import get_db_connection
 
 PAGE_SIZE = 10
@@ -17,7 +17,6 @@ async def slug_list_by_prefix(update: Update, context: ContextTypes.DEFAULT_TYPE
         return
 
     prefix = context.args[0]
-    query = "SELECT slug FROM nft_collections WHERE slug LIKE ? COLLATE NOCASE"
-    await paginated_list_handler(update, context, query, f"{prefix}%", "slug_list_by_prefix")
+    await paginated_list_handler(update, context, "slug_list_by_prefix", prefix)
 
 slug_list_by_prefix_handler = CommandHandler("slug_list_by_prefix", slug_list_by_prefix)
\ No newline at end of file
@@ -0,0 +1,61 @@
+from telegram import Update
+from telegram.ext import ContextTypes, CommandHandler
+from app.telegram.utils.auth import is_admin, access_denied
+from app.database import query_tracing
+
+ORDER_KEYS = {"total": "total_ms", "max": "max_ms", "count": "count", "slow": "slow_count"}
+
+async def sql_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /sql_stats [total|max|count|slow] [n]  → istruzioni SQL peggiori del processo del bot
+    /sql_stats dump                        → salva le statistiche in JSON
+    /sql_stats reset                       → azzera le statistiche
+    """
+    user_id = update.effective_user.id
+    if not is_admin(user_id):
+        await access_denied(update)
+        return
+
+    if not query_tracing.SQL_TRACE_ENABLED:
+        await update.message.reply_text(
+            "SQL tracing disattivato. Imposta SQL_TRACE=1 nel .env e riavvia il bot."
+        )
+        return
+
+    args = [a.lower() for a in (context.args or [])]
+
+    if args and args[0] == "dump":
+        path = query_tracing.dump_stats_json()
+        await update.message.reply_text(f"Statistiche SQL salvate in {path}")
+        return
+    if args and args[0] == "reset":
+        query_tracing.query_stats.reset()
+        await update.message.reply_text("Statistiche SQL azzerate.")
+        return
+
+    order_by = ORDER_KEYS.get(args[0], "total_ms") if args else "total_ms"
+    n = int(args[-1]) if args and args[-1].isdigit() else 10
+    top = query_tracing.query_stats.top(n=min(n, 30), order_by=order_by)
+    if not top:
+        await update.message.reply_text("Nessuna query registrata finora.")
+        return
+
+    lines = [f"🐢 Top {len(top)} SQL per {order_by} (slow ≥ {query_tracing.SQL_SLOW_QUERY_MS:.0f} ms)\n"]
+    for i, e in enumerate(top, 1):
+        sql = e["sql"] if len(e["sql"]) <= 160 else e["sql"][:157] + "..."
+        lines.append(
+            f"{i}. {e['count']}x | tot {e['total_ms']:.0f} ms | avg {e['avg_ms']:.1f} ms | "
+            f"max {e['max_ms']:.0f} ms | righe max {e['max_rows']} | lente {e['slow_count']}\n"
+            f"   {sql}"
+        )
+
+    slow = query_tracing.query_stats.slow_queries()
+    if slow:
+        last = slow[-1]
+        plan = "; ".join(last["plan"] or [])
+        lines.append(f"\nUltima query lenta ({last['elapsed_ms']} ms): {plan}")
+
+    # Limite Telegram: 4096 caratteri per messaggio
+    await update.message.reply_text("\n".join(lines)[:4000])
+
+sql_stats_handler = CommandHandler("sql_stats", sql_stats)
@@ -6,7 +6,9 @@ Mostra il social hype e sentiment attuale del mercato NFT.
 from telegram import Update
 from telegram.ext import ContextTypes, CommandHandler
 from app.telegram.utils.auth import is_authorized, access_denied
-from app.database.db_connection import get_db_connection
+from app.database.read_replica import refresh_read_replica
+from app.database.bot_repository import bot_repository
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,19 +26,8 @@ async def vibes(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
         # Recupera il record più recente
-        cursor.execute("""
-            SELECT date, hype_score, sentiment, trend, keywords, summary, created_at
-            FROM nft_social_hype
-            ORDER BY date DESC
-            LIMIT 1
-        """)
-
-        result = cursor.fetchone()
-        conn.close()
+        result = await bot_repository.latest_social_hype()
 
         if result:
             date, hype_score, sentiment, trend, keywords, summary, created_at = result
@@ -103,6 +94,8 @@ async def import_vibes(update: Update, context: ContextTypes.DEFAULT_TYPE):
         sentiment_data = get_nft_market_sentiment()
 
         if sentiment_data and save_social_hype_to_db(sentiment_data):
+            # Rende subito visibili i nuovi dati a /vibes (letto dalla replica)
+            await asyncio.to_thread(refresh_read_replica)
             hype_score = sentiment_data.get("hype_score", 0)
             sentiment = sentiment_data.get("sentiment", "NEUTRAL")
             trend = sentiment_data.get("trend", "STABLE")
@@ -7,7 +7,7 @@ Format: /x_sentiment @handle or /x_sentiment slug-name chain
 from telegram import Update
 from telegram.ext import ContextTypes, CommandHandler
 from app.telegram.utils.auth import is_authorized, access_denied
-from app.database.db_connection import get_db_connection
+from app.database.bot_repository import bot_repository
 import logging
 
 logger = logging.getLogger(__name__)
@@ -41,29 +41,8 @@ async def x_sentiment(update: Update, context: ContextTypes.DEFAULT_TYPE):
         slug = context.args[0].lower()
         chain = context.args[1].lower()
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
         # Get latest sentiment data
-        cursor.execute("""
-        SELECT 
-            sentiment_score,
-            sentiment_category,
-            bullish_indicators,
-            bearish_indicators,
-            key_topics,
-            community_engagement,
-            volume_activity,
-            summary,
-            date
-        FROM nft_x_sentiment
-        WHERE slug = ? AND chain = ?
-        ORDER BY date DESC
-        LIMIT 1
-        """, (slug, chain))
-        
-        result = cursor.fetchone()
-        conn.close()
+        result = await bot_repository.x_sentiment(slug, chain)
         
         if not result:
             await update.message.reply_text(
@@ -127,41 +106,8 @@ async def x_sentiment_top(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get most bullish collections
-        cursor.execute("""
-        SELECT 
-            slug,
-            chain,
-            sentiment_score,
-            sentiment_category,
-            date
-        FROM nft_x_sentiment
-        WHERE date = (SELECT MAX(date) FROM nft_x_sentiment)
-        ORDER BY sentiment_score DESC
-        LIMIT 5
-        """)
-        
-        bullish = cursor.fetchall()
-        
-        # Get most bearish collections
-        cursor.execute("""
-        SELECT 
-            slug,
-            chain,
-            sentiment_score,
-            sentiment_category,
-            date
-        FROM nft_x_sentiment
-        WHERE date = (SELECT MAX(date) FROM nft_x_sentiment)
-        ORDER BY sentiment_score ASC
-        LIMIT 5
-        """)
-        
-        bearish = cursor.fetchall()
-        conn.close()
+        # Most bullish and most bearish collections of the latest analysis
+        bullish, bearish = await bot_repository.x_sentiment_rankings(5)
         
         message = "📊 **X Sentiment Rankings (Latest)**\n\n"
         
@@ -2,6 +2,7 @@
 Entrypoint principale del bot Telegram: importa e registra tutti i command handler.
 """
 
+import asyncio
 import logging
 
 from telegram.ext import (
@@ -20,20 +21,65 @@ from app.telegram.commands.ma_native import ma_native_handler
 from app.telegram.commands.ma_usd import ma_usd_handler
 from app.telegram.commands.historical_data_stats import historical_data_stats_handler
 from app.telegram.commands.vibes import vibes_handler, import_vibes_handler
+from app.telegram.commands.sql_stats import sql_stats_handler
+from app.telegram.commands.chart_stats import chart_stats_handler
+from app.telegram.commands.perf import perf_handler
+from app.telegram.commands.dashboard import dashboard_handler
 from app.telegram.utils.pagination import pagination_callback_handler
 from app.telegram.utils.error_handler import error_handler
+from app.database.read_replica import read_replica_enabled, read_replica_refresh_loop
+from app.telegram.utils.chart_service import chart_service
+from app.database.bot_repository import bot_repository
+from app.telegram.utils.slug_index import slug_index_refresh_loop
+from app.telegram.utils.update_processor import PerUserUpdateProcessor
+from app.telegram.utils.command_metrics import (
+    instrument_application, metrics_dump_loop, dump_metrics_json, BOT_METRICS_DUMP_SECONDS
+)
 
 # Carica il token dal modulo di configurazione
 from app.config.config import load_config
 
 logger = logging.getLogger(__name__)
 
+async def post_init(application: Application):
+    """
+    Avvia il pool di rendering dei grafici e, in background, l'indice degli slug, il dump
+    periodico delle metriche per comando e il refresh della replica di lettura (se configurati).
+    """
+    chart_service.start()
+    application.bot_data["slug_index_task"] = asyncio.create_task(slug_index_refresh_loop())
+    if BOT_METRICS_DUMP_SECONDS > 0:
+        application.bot_data["metrics_dump_task"] = asyncio.create_task(metrics_dump_loop())
+    if read_replica_enabled():
+        application.bot_data["read_replica_task"] = asyncio.create_task(read_replica_refresh_loop())
+        logger.info("Refresh periodico della replica di lettura avviato.")
+
+async def post_shutdown(application: Application):
+    for name in ("read_replica_task", "slug_index_task", "metrics_dump_task"):
+        task = application.bot_data.get(name)
+        if task:
+            task.cancel()
+    try:
+        dump_metrics_json()
+    except OSError as e:
+        logger.error(f"Impossibile salvare le metriche del bot: {e}")
+    chart_service.shutdown()
+    bot_repository.shutdown()
+
 def main():
     config = load_config()
     bot_token = config["TELEGRAM_BOT_TOKEN"]
+    bot_mode = (config.get("TELEGRAM_BOT_MODE") or "polling").lower()
 
-    # Inizializza l'applicazione Telegram
-    application = Application.builder().token(bot_token).build()
+    # Inizializza l'applicazione Telegram: update concorrenti, in ordine per utente
+    application = (
+        Application.builder()
+        .token(bot_token)
+        .concurrent_updates(PerUserUpdateProcessor())
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     # Registrazione di tutti gli handler di comando e callback
     application.add_handler(start_handler)
@@ -49,10 +95,23 @@ def main():
     application.add_handler(ma_usd_handler)
     application.add_handler(historical_data_stats_handler)
     application.add_handler(vibes_handler)
+    application.add_handler(dashboard_handler)
     application.add_handler(import_vibes_handler)
+    application.add_handler(sql_stats_handler)
+    application.add_handler(chart_stats_handler)
+    application.add_handler(perf_handler)
     application.add_handler(pagination_callback_handler)
     application.add_error_handler(error_handler)
 
+    # Latenza, errori e richieste in corso per comando (/perf)
+    instrument_application(application)
+
+    if bot_mode == "webhook":
+        from app.telegram.webhook_server import run_webhook
+        logger.info("Bot Telegram avviato in modalità webhook.")
+        asyncio.run(run_webhook(application))
+        return
+
     logger.info("Bot Telegram avviato. In ascolto di comandi...")
     application.run_polling()
 
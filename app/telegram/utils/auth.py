@@ -25,6 +25,15 @@ def is_authorized(user_id: int) -> bool:
     #print(f"Controllo user_id={user_id}, allowed={ALLOWED_TELEGRAM_IDS}")  # Debug
     return user_id in ALLOWED_TELEGRAM_IDS
 
+# Admin: ADMIN_TELEGRAM_IDS se definito, altrimenti gli stessi utenti abilitati
+ADMIN_TELEGRAM_IDS = _parse_allowed_ids(config.get("ADMIN_TELEGRAM_IDS") or "") or ALLOWED_TELEGRAM_IDS
+
+def is_admin(user_id: int) -> bool:
+    """
+    Restituisce True se user_id può usare i comandi di amministrazione/diagnostica.
+    """
+    return user_id in ADMIN_TELEGRAM_IDS
+
 async def access_denied(update):
     """
     Risposta all'utente non abilitato in ogni handler/callback.
@@ -1,13 +1,62 @@
 # app/telegram/utils/chart.py
 
-import os
 import io
+import threading
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.interpolate import interp1d
-from datetime import datetime
-from app.telegram.utils.telegram_query import get_collection_chart_data
-from app.golden_cross.moving_average import calculate_sma
+import matplotlib
+import matplotlib.style
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from app.golden_cross.moving_average import sma_series
+
+# Tema crypto-friendly: dark_background applicato solo durante il render (rc_context),
+# senza toccare lo stato globale di pyplot
+FIGURE_FACECOLOR = "#1E1E1E"
+AXES_FACECOLOR = "#2B2B2B"
+GRID_COLOR = "#4B5563"
+FLOOR_COLOR = "#3B82F6"
+SMA_COLORS = {"SMA20": "#F97316", "SMA50": "#34D399", "SMA100": "#F87171", "SMA200": "#A855F7"}
+THEME = {
+    **matplotlib.style.library["dark_background"],
+    "figure.facecolor": FIGURE_FACECOLOR,
+    "axes.facecolor": AXES_FACECOLOR,
+    "savefig.facecolor": FIGURE_FACECOLOR,
+}
+FIGSIZE = (12, 6)
+
+# Medie mobili mostrate in base ai giorni visualizzati: (giorni minimi, periodo, soglia mancanti, etichetta)
+SMA_OVERLAYS = (
+    (30, 20, 1, "SMA20"),     # 1 month
+    (90, 50, 3, "SMA50"),     # 3 months
+    (180, 100, 5, "SMA100"),  # 6 months or 1 year
+    (180, 200, 10, "SMA200"),
+)
+
+
+# Una Figure per thread, riusata tra le richieste (svuotata dopo ogni render)
+_local = threading.local()
+
+
+def _get_figure():
+    """Figure + canvas Agg del thread corrente, creati al primo utilizzo."""
+    fig = getattr(_local, "figure", None)
+    if fig is None:
+        with matplotlib.rc_context(THEME):
+            fig = Figure(figsize=FIGSIZE, facecolor=FIGURE_FACECOLOR)
+        FigureCanvasAgg(fig)
+        _local.figure = fig
+    return fig
+
+
+def _to_float(value):
+    """Converte il valore in float, np.nan se None o non numerico."""
+    if value is None:
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
 
 def create_nft_chart(slug: str, data: list, field: str, chain: str, days: int, chain_currency_symbol: str = None):
     """
@@ -27,84 +76,77 @@ def create_nft_chart(slug: str, data: list, field: str, chain: str, days: int, c
     if not data:
         return None
     
-    # Estrai date e valori, convertendo None o non numerici in np.nan
-    dates = [datetime.strptime(row[0], "%Y-%m-%d") for row in data]
-    values = []
-    for row in data:
-        value = row[1]
-        if value is None or not (isinstance(value, (int, float)) or str(value).replace('.', '').replace('-', '').isdigit()):
-            values.append(np.nan)
-        else:
-            values.append(float(value))
+    # Date e valori, None o non numerici diventano np.nan
+    dates = np.array([row[0] for row in data], dtype="datetime64[D]")
+    values = np.array([_to_float(row[1]) for row in data], dtype=np.float64)
     
-    if all(np.isnan(values)):
+    if np.isnan(values).all():
         return None
     
-    # Crea una serie temporale continua
-    date_nums = np.array([d.timestamp() for d in dates])
-    value_nums = np.array(values, dtype=np.float64)
-    date_min = min(dates)
-    date_max = max(dates)
-    date_range = np.linspace(date_min.timestamp(), date_max.timestamp(), max(10, len(dates)))
-    interp_func = interp1d(date_nums, value_nums, kind='linear', fill_value="extrapolate")
-    interp_values = interp_func(date_range)
-    interp_dates = [datetime.fromtimestamp(ts) for ts in date_range]
-    
-    # Definisci le medie mobili in base al numero di giorni
-    date_value_list = [(d.strftime("%Y-%m-%d"), v) for d, v in zip(dates, values)]
-    end_date = date_max.strftime("%Y-%m-%d")
-    periods = []
-    if days >= 7:  # 7 days or more: show floor price
-        pass  # Floor price is always shown
-    if days >= 30:  # 1 month
-        periods.append((20, 1, "SMA20"))
-    if days >= 90:  # 3 months
-        periods.append((50, 3, "SMA50"))
-    if days >= 180:  # 6 months or 1 year
-        periods.extend([(100, 5, "SMA100"), (200, 10, "SMA200")])
-    
-    sma_data = {}
-    for period, threshold, label in periods:
-        sma_values = []
-        for i in range(len(interp_dates)):
-            window_end = interp_dates[i].strftime("%Y-%m-%d")
-            sma = calculate_sma(date_value_list, period, window_end, missing_threshold=threshold)
-            sma_values.append(sma if not np.isnan(sma) else np.nan)
-        sma_nums = np.array(sma_values)
-        sma_interp = interp1d(np.arange(len(sma_nums)), sma_nums, kind='linear', fill_value="extrapolate")
-        sma_data[label] = sma_interp(np.linspace(0, len(sma_nums)-1, len(interp_dates)))
-        print(f"{label} values: {sma_values[:10]}...")  # Debug
-    
-    # Imposta uno stile crypto-friendly con tema dark e floor price in blu
-    plt.style.use('dark_background')  # Tema scuro
-    plt.figure(figsize=(12, 6), facecolor='#1E1E1E')  # Sfondo nero
-    ax = plt.gca()
-    ax.set_facecolor('#2B2B2B')  # Sfondo dell'asse
+    # Serie giornaliera densa dal primo all'ultimo giorno: np.nan nei giorni senza dato
+    first_day = dates.min()
+    offsets = (dates - first_day).astype(np.int64)
+    dense_dates = first_day + np.arange(offsets.max() + 1)
+    dense_values = np.full(len(dense_dates), np.nan)
+    dense_values[offsets] = values
     
-    # Plot del floor price in blu
-    plt.plot(interp_dates, interp_values, label=f"Floor Price ({field})", color="#3B82F6", linewidth=2, marker='o', markersize=4)
+    # Tutte le medie mobili in un solo passaggio vettoriale sulla serie densa
+    sma_data = {
+        label: sma_series(dense_values, period, threshold)
+        for min_days, period, threshold, label in SMA_OVERLAYS
+        if days >= min_days
+    }
     
-    # Plot delle medie mobili come linee continue
-    colors = {"SMA20": "#F97316", "SMA50": "#34D399", "SMA100": "#F87171", "SMA200": "#A855F7"}
-    for label, sma_values in sma_data.items():
-        plt.plot(interp_dates, sma_values, label=label, color=colors[label], linewidth=1.5)
+    # Floor price: solo i giorni con dato (la linea collega i punti attraverso i buchi)
+    known = ~np.isnan(values)
+    floor_dates = dates[known]
+    floor_values = values[known]
     
-    # Personalizza gli assi e la griglia
-    plt.title(f"📈 Floor Price and Moving Averages for {slug} ({chain}) - {days} days", color="white")
-    plt.xlabel("Date", color="white")
-    # Usa chain_currency_symbol per nft_chart_native, altrimenti USD
     y_label = f"Floor Price ({chain_currency_symbol if field == 'floor_native' and chain_currency_symbol else chain.upper() if field == 'floor_native' else 'USD'})"
-    plt.ylabel(y_label, color="white")
-    plt.grid(True, color="#4B5563", linestyle='--', alpha=0.5)  # Griglia leggera
-    plt.xticks(rotation=45, color="white")
-    plt.yticks(color="white")
-    plt.legend(loc='upper left', bbox_to_anchor=(1, 1), frameon=False, facecolor='#2B2B2B', edgecolor='#2B2B2B', labelcolor='white')
-    
-    # Ottimizza il layout
-    plt.tight_layout()
-    
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format="png", bbox_inches="tight", facecolor='#1E1E1E')
+    title = f"📈 Floor Price and Moving Averages for {slug} ({chain}) - {days} days"
+    return _render_png(title, y_label, field, floor_dates, floor_values, dense_dates, sma_data)
+
+
+def _render_png(title, y_label, field, floor_dates, floor_values, sma_dates, sma_data):
+    """Disegna il grafico sulla Figure riusabile e restituisce il PNG in un BytesIO."""
+    fig = _get_figure()
+    try:
+        with matplotlib.rc_context(THEME):
+            ax = fig.add_subplot()
+            ax.set_facecolor(AXES_FACECOLOR)
+
+            # Floor price in blu
+            ax.plot(floor_dates, floor_values, label=f"Floor Price ({field})", color=FLOOR_COLOR, linewidth=2, marker='o', markersize=4)
+
+            # Medie mobili come linee continue
+            for label, sma_values in sma_data.items():
+                ax.plot(sma_dates, sma_values, label=label, color=SMA_COLORS[label], linewidth=1.5)
+
+            # Assi e griglia
+            ax.set_title(title, color="white")
+            ax.set_xlabel("Date", color="white")
+            ax.set_ylabel(y_label, color="white")
+            ax.grid(True, color=GRID_COLOR, linestyle='--', alpha=0.5)
+            ax.tick_params(axis="x", labelrotation=45, colors="white")
+            ax.tick_params(axis="y", colors="white")
+            ax.legend(loc='upper left', bbox_to_anchor=(1, 1), frameon=False, facecolor=AXES_FACECOLOR, edgecolor=AXES_FACECOLOR, labelcolor='white')
+
+            fig.tight_layout()
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format="png", bbox_inches="tight", facecolor=FIGURE_FACECOLOR)
+    finally:
+        # Libera gli artisti ma tiene la Figure (e il canvas) per la richiesta successiva
+        fig.clear()
     buffer.seek(0)
-    plt.close()
-    return buffer
\ No newline at end of file
+    return buffer
+
+
+def warm_up_chart_renderer():
+    """
+    Render di prova con dati sintetici: carica font, cache dei glifi e convertitori di date
+    prima della prima richiesta reale (chiamata all'avvio dei worker dei grafici).
+    """
+    days = np.arange(np.datetime64("2024-01-01"), np.datetime64("2024-08-01"))
+    values = np.linspace(1.0, 2.0, len(days))
+    sma_data = {label: sma_series(values, period, threshold) for _, period, threshold, label in SMA_OVERLAYS}
+    _render_png("📈 warm-up", "Floor Price (ETH)", "floor_native", days, values, days, sma_data)
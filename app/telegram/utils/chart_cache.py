@@ -0,0 +1,196 @@
+"""
+Cache a due livelli dei grafici PNG già generati.
+
+Lo stesso grafico (slug popolare, stesso intervallo) veniva rigenerato a ogni richiesta
+anche se i dati cambiano una sola volta al giorno, dopo l'import. La chiave del grafico è
+(collection_identifier, field, days, latest_floor_date): quando arriva un nuovo giorno di
+dati la chiave cambia da sola.
+
+  - Livello 1: LRU in memoria nel processo del bot (CHART_CACHE_MEMORY_ITEMS voci)
+  - Livello 2: directory su disco (CHART_CACHE_DIR) con tetto di dimensione
+    (CHART_CACHE_DISK_MAX_MB); oltre il tetto vengono rimossi i file usati meno di recente.
+    Il disco è condiviso tra processi: lo script di pre-warm scrive, il bot legge.
+
+Gli import chiamano invalidate_chart_cache(): svuota la directory e aggiorna il file
+'.generation'; il bot se ne accorge alla richiesta successiva e svuota anche la LRU.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from app.config.config import load_config
+
+logger = logging.getLogger(__name__)
+
+config = load_config()
+CHART_CACHE_DIR = config.get("CHART_CACHE_DIR") or "data/chart_cache"
+CHART_CACHE_MEMORY_ITEMS = int(config.get("CHART_CACHE_MEMORY_ITEMS") or 64)
+CHART_CACHE_DISK_MAX_MB = float(config.get("CHART_CACHE_DISK_MAX_MB") or 200)
+
+GENERATION_FILE = ".generation"
+
+# Metadati salvati insieme al PNG (servono all'handler per didascalia e avvisi)
+_META_FIELDS = ("chain", "chain_currency_symbol", "points")
+
+
+def chart_cache_key(collection_identifier, field, days, latest_floor_date):
+    return (collection_identifier, field, int(days), latest_floor_date)
+
+
+def _file_stem(key):
+    return hashlib.sha1("|".join(str(k) for k in key).encode("utf-8")).hexdigest()
+
+
+def _generation_path():
+    return os.path.join(CHART_CACHE_DIR, GENERATION_FILE)
+
+
+def _read_generation():
+    try:
+        return os.stat(_generation_path()).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+class ChartCache:
+    """LRU in memoria + directory su disco con tetto di dimensione."""
+
+    def __init__(self, memory_items=CHART_CACHE_MEMORY_ITEMS, disk_max_mb=CHART_CACHE_DISK_MAX_MB):
+        self.memory_items = memory_items
+        self.disk_max_bytes = int(disk_max_mb * 1024 * 1024)
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = _read_generation()
+        self.metrics = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    # ── invalidazione ──────────────────────────────────────────────
+
+    def _check_generation(self):
+        generation = _read_generation()
+        if generation != self._generation:
+            self._memory.clear()
+            self._generation = generation
+
+    # ── lettura ────────────────────────────────────────────────────
+
+    def get(self, key):
+        """Restituisce il risultato in cache (dict con png e metadati) o None."""
+        with self._lock:
+            self._check_generation()
+            item = self._memory.get(key)
+            if item is not None:
+                self._memory.move_to_end(key)
+                self.metrics["memory_hits"] += 1
+                return item
+
+        item = self._read_disk(key)
+        with self._lock:
+            if item is None:
+                self.metrics["misses"] += 1
+                return None
+            self.metrics["disk_hits"] += 1
+            self._remember(key, item)
+        return item
+
+    def _read_disk(self, key):
+        stem = os.path.join(CHART_CACHE_DIR, _file_stem(key))
+        try:
+            with open(stem + ".png", "rb") as f:
+                png = f.read()
+            with open(stem + ".json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        now = time.time()
+        try:
+            os.utime(stem + ".png", (now, now))  # usato di recente: ultimo a essere rimosso
+        except OSError:
+            pass
+        return {**meta, "png": png}
+
+    # ── scrittura ──────────────────────────────────────────────────
+
+    def put(self, key, result):
+        """Salva un risultato di rendering riuscito in memoria e su disco."""
+        item = {k: result.get(k) for k in _META_FIELDS}
+        item["png"] = result["png"]
+        with self._lock:
+            self._check_generation()
+            self._remember(key, item)
+            self.metrics["stores"] += 1
+        try:
+            self._write_disk(key, item)
+        except OSError as e:
+            logger.warning(f"Chart cache: scrittura su disco fallita: {e}")
+
+    def _remember(self, key, item):
+        self._memory[key] = item
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _write_disk(self, key, item):
+        os.makedirs(CHART_CACHE_DIR, exist_ok=True)
+        stem = os.path.join(CHART_CACHE_DIR, _file_stem(key))
+        # pid e thread: il bot scrive dai thread di asyncio.to_thread, anche sulla stessa chiave
+        tmp = f"{stem}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({k: item[k] for k in _META_FIELDS}, f)
+        os.replace(tmp, stem + ".json")
+        with open(tmp, "wb") as f:
+            f.write(item["png"])
+        os.replace(tmp, stem + ".png")
+        self._enforce_disk_cap()
+
+    def _enforce_disk_cap(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(CHART_CACHE_DIR):
+            if entry.name.endswith(".png"):
+                st = entry.stat()
+                entries.append((st.st_mtime, entry.path, st.st_size))
+                total += st.st_size
+        if total <= self.disk_max_bytes:
+            return
+        entries.sort()
+        for _, path, size in entries:
+            if total <= self.disk_max_bytes:
+                break
+            for p in (path, path[:-4] + ".json"):
+                try:
+                    os.remove(p)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            self.metrics["evictions"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.metrics, "memory_items": len(self._memory)}
+
+
+def invalidate_chart_cache():
+    """
+    Da chiamare dopo ogni import: svuota la cache su disco e aggiorna il marker di
+    generazione, così i processi del bot svuotano la propria LRU alla richiesta successiva.
+    """
+    try:
+        os.makedirs(CHART_CACHE_DIR, exist_ok=True)
+        removed = 0
+        for entry in os.scandir(CHART_CACHE_DIR):
+            if entry.name.endswith((".png", ".json", ".tmp")):
+                os.remove(entry.path)
+                removed += 1
+        with open(_generation_path(), "w", encoding="utf-8") as f:
+            f.write(str(time.time()))
+        logger.info(f"Chart cache invalidata ({removed} file rimossi).")
+    except OSError as e:
+        logger.error(f"Invalidazione chart cache fallita: {e}")
+
+
+chart_cache = ChartCache()
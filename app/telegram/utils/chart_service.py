@@ -0,0 +1,281 @@
+"""
+Servizio di rendering dei grafici fuori dall'event loop del bot.
+
+I comandi /nft_chart_native e /nft_chart_usd chiamavano create_nft_chart direttamente
+nell'handler async: letture SQLite, interpolazione e render matplotlib bloccavano
+run_polling e tutti gli altri utenti attendevano la fine del grafico.
+
+Ora ogni richiesta viene eseguita da un worker di un ProcessPoolExecutor (contesto
+'spawn', stato matplotlib isolato per processo): il worker legge i dati dalla replica
+di lettura, genera il PNG e restituisce i byte. L'handler attende il risultato con:
+  - coda limitata (CHART_QUEUE_MAX richieste in corso/in attesa, oltre → rifiuto)
+  - timeout per richiesta (CHART_TIMEOUT_SECONDS)
+  - metriche: richieste, completate, errori, timeout, rifiuti, profondità coda, latenza
+
+Prima di accodare il render viene consultata la cache dei PNG (chart_cache.py), con
+chiave (collection_identifier, field, days, latest_floor_date); letture e scritture della
+cache (I/O su disco) girano in un thread con asyncio.to_thread. La finestra di 'days'
+giorni del grafico termina a latest_floor_date, così il contenuto dipende solo dalla chiave.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.config.config import load_config
+from app.database.bot_repository import bot_repository
+from app.telegram.utils.chart_cache import chart_cache, chart_cache_key
+
+logger = logging.getLogger(__name__)
+
+config = load_config()
+CHART_WORKERS = int(config.get("CHART_WORKERS") or 2)
+CHART_QUEUE_MAX = int(config.get("CHART_QUEUE_MAX") or 8)
+CHART_TIMEOUT_SECONDS = float(config.get("CHART_TIMEOUT_SECONDS") or 30)
+
+# Esiti del job di rendering
+STATUS_OK = "ok"
+STATUS_NOT_FOUND = "not_found"
+STATUS_NO_DATA = "no_data"
+STATUS_RENDER_FAILED = "render_failed"
+
+
+class ChartQueueFull(Exception):
+    """Troppe richieste di grafico in corso: la richiesta viene rifiutata."""
+
+
+class ChartTimeout(Exception):
+    """Il rendering non è terminato entro CHART_TIMEOUT_SECONDS."""
+
+
+# ─────────────────────────────────────────────
+# Codice eseguito nei processi worker
+# ─────────────────────────────────────────────
+
+def _worker_init():
+    """Inizializzazione del worker: import anticipati e render di prova (font, cache dei glifi)."""
+    from app.telegram.utils.chart import warm_up_chart_renderer
+    try:
+        warm_up_chart_renderer()
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"Warm-up del renderer fallito: {type(e).__name__} - {e}")
+
+
+def _worker_ready() -> int:
+    """Job vuoto usato all'avvio per far partire subito tutti i worker."""
+    import os
+    return os.getpid()
+
+
+def resolve_chart_source(slug: str):
+    """
+    Risolve lo slug nella collezione da graficare e nella sua ultima data disponibile
+    (vedi query_chart_source). Restituisce None se lo slug non esiste.
+    """
+    from app.database.read_replica import get_read_connection
+    from app.database.bot_repository import query_chart_source
+
+    conn = get_read_connection()
+    try:
+        return query_chart_source(conn, slug)
+    finally:
+        conn.close()
+
+
+def render_chart_job(slug: str, field: str, days: int, source: dict = None) -> dict:
+    """
+    Job del worker: legge la serie della collezione e genera il PNG.
+    source è il risultato di resolve_chart_source (se None viene risolto qui).
+    Restituisce un dizionario serializzabile con status, png (bytes) e metadati.
+    """
+    from app.database.read_replica import get_read_connection
+    from app.telegram.utils.chart import create_nft_chart
+
+    t0 = time.perf_counter()
+    if source is None:
+        source = resolve_chart_source(slug)
+        if source is None:
+            return {"status": STATUS_NOT_FOUND}
+    chain = source["chain"]
+    chain_currency_symbol = source["chain_currency_symbol"]
+
+    conn = get_read_connection()
+    try:
+        cur = conn.cursor()
+        # Finestra ancorata all'ultima data disponibile (parte della chiave di cache),
+        # non a date('now'): un PNG in cache resta identico a un nuovo render
+        cur.execute(
+            f"SELECT latest_floor_date, {field} FROM historical_nft_data "
+            "WHERE collection_identifier = ? AND latest_floor_date >= date(?, ? || ' days') "
+            "ORDER BY latest_floor_date ASC",
+            (source["collection_identifier"], source["latest_floor_date"], -days)
+        )
+        data = cur.fetchall()
+    finally:
+        conn.close()
+
+    result = {
+        "chain": chain,
+        "chain_currency_symbol": chain_currency_symbol,
+        "points": len(data),
+    }
+    if not data:
+        return {**result, "status": STATUS_NO_DATA}
+
+    chart = create_nft_chart(slug, data, field, chain, days, chain_currency_symbol=chain_currency_symbol)
+    if not chart:
+        return {**result, "status": STATUS_RENDER_FAILED}
+
+    return {
+        **result,
+        "status": STATUS_OK,
+        "png": chart.getvalue(),
+        "render_ms": (time.perf_counter() - t0) * 1000,
+    }
+
+
+# ─────────────────────────────────────────────
+# Lato bot (event loop)
+# ─────────────────────────────────────────────
+
+class ChartService:
+    """Pool di processi per i grafici con coda limitata, timeout e metriche."""
+
+    def __init__(self, workers=CHART_WORKERS, queue_max=CHART_QUEUE_MAX, timeout=CHART_TIMEOUT_SECONDS):
+        self.workers = workers
+        self.queue_max = queue_max
+        self.timeout = timeout
+        self._executor = None
+        self.in_flight = 0
+        self.metrics = {
+            "requests": 0,
+            "cache_hits": 0,
+            "completed": 0,
+            "failed": 0,
+            "timeouts": 0,
+            "rejected": 0,
+            "max_queue_depth": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+        }
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_worker_init,
+            )
+        return self._executor
+
+    def start(self):
+        """
+        Avvia il pool e fa partire subito tutti i worker (ognuno esegue il warm-up del
+        renderer), così la prima richiesta non paga avvio del processo e cache dei font.
+        """
+        executor = self._get_executor()
+        for _ in range(self.workers):
+            executor.submit(_worker_ready).add_done_callback(self._on_worker_ready)
+        logger.info(
+            f"Chart service avviato: {self.workers} worker, coda max {self.queue_max}, "
+            f"timeout {self.timeout:.0f}s."
+        )
+
+    @staticmethod
+    def _on_worker_ready(future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Chart service: avvio del worker fallito: {type(error).__name__} - {error}")
+        else:
+            logger.debug(f"Chart service: worker {future.result()} pronto.")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def render(self, slug: str, field: str, days: int) -> dict:
+        """
+        Richiede il grafico al pool e ne attende il risultato.
+        Solleva ChartQueueFull se la coda è piena e ChartTimeout allo scadere del timeout.
+        """
+        if field not in ("floor_native", "floor_usd"):
+            raise ValueError(f"Campo non supportato per il grafico: {field}")
+        self.metrics["requests"] += 1
+
+        # Versione dei dati (ultima data) per la chiave di cache: query indicizzata, nel pool del repository
+        source = await bot_repository.chart_source(slug)
+        if source is None:
+            return {"status": STATUS_NOT_FOUND}
+        cache_key = chart_cache_key(source["collection_identifier"], field, days, source["latest_floor_date"])
+        # Cache su disco (lettura file, scansione della directory): fuori dall'event loop
+        cached = await asyncio.to_thread(chart_cache.get, cache_key)
+        if cached is not None:
+            self.metrics["cache_hits"] += 1
+            return {**cached, "status": STATUS_OK}
+
+        if self.in_flight >= self.queue_max:
+            self.metrics["rejected"] += 1
+            logger.warning(f"Chart service: coda piena ({self.in_flight}/{self.queue_max}), richiesta rifiutata.")
+            raise ChartQueueFull()
+
+        self.in_flight += 1
+        self.metrics["max_queue_depth"] = max(self.metrics["max_queue_depth"], self.in_flight)
+        t0 = time.perf_counter()
+        future = None
+        try:
+            try:
+                future = self._get_executor().submit(render_chart_job, slug, field, days, source)
+            except BrokenProcessPool:
+                # Un worker è morto (es. OOM): ricrea il pool e riprova una volta
+                logger.error("Chart service: pool dei worker non valido, lo ricreo.")
+                self._executor = None
+                future = self._get_executor().submit(render_chart_job, slug, field, days, source)
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.metrics["timeouts"] += 1
+            if future is not None:
+                future.cancel()  # rimuove il job se non è ancora partito
+            raise ChartTimeout()
+        except BrokenProcessPool:
+            self.metrics["failed"] += 1
+            self._executor = None
+            raise
+        except Exception:
+            self.metrics["failed"] += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+        if result["status"] == STATUS_OK:
+            await asyncio.to_thread(chart_cache.put, cache_key, result)
+
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        self.metrics["completed"] += 1
+        self.metrics["total_ms"] += elapsed_ms
+        self.metrics["max_ms"] = max(self.metrics["max_ms"], elapsed_ms)
+        logger.debug(
+            f"Chart service: {slug} {field} {days}d in {elapsed_ms:.0f} ms "
+            f"(coda {self.in_flight}/{self.queue_max})"
+        )
+        return result
+
+    def stats(self) -> dict:
+        """Metriche correnti (per comandi admin e log)."""
+        completed = self.metrics["completed"]
+        return {
+            **self.metrics,
+            "queue_depth": self.in_flight,
+            "queue_max": self.queue_max,
+            "workers": self.workers,
+            "avg_ms": self.metrics["total_ms"] / completed if completed else 0.0,
+            "cache": chart_cache.stats(),
+        }
+
+
+chart_service = ChartService()
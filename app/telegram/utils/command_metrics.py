@@ -0,0 +1,217 @@
+"""
+Metriche di latenza e throughput per comando del bot.
+
+instrument_application() avvolge la callback di ogni handler registrato (CommandHandler,
+CallbackQueryHandler e i singoli step delle ConversationHandler) e registra, per comando:
+  - numero di chiamate, errori (eccezioni propagate all'error handler), richieste in corso
+  - latenza: totale/massima e percentili p50/p95/p99 sulle ultime BOT_METRICS_WINDOW chiamate
+  - throughput: chiamate al minuto negli ultimi 5 minuti
+
+Le metriche sono consultabili con il comando admin /perf e vengono scritte in JSON ogni
+BOT_METRICS_DUMP_SECONDS (0 = disattivato) e allo shutdown in BOT_METRICS_DUMP_PATH.
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from telegram.ext import CommandHandler, ConversationHandler
+
+from app.config.config import load_config
+
+logger = logging.getLogger(__name__)
+
+config = load_config()
+BOT_METRICS_WINDOW = int(config.get("BOT_METRICS_WINDOW") or 1000)
+BOT_METRICS_DUMP_SECONDS = int(config.get("BOT_METRICS_DUMP_SECONDS") or 0)
+BOT_METRICS_DUMP_PATH = config.get("BOT_METRICS_DUMP_PATH") or "data/bot_metrics.json"
+
+RATE_WINDOW_SECONDS = 300
+PERCENTILES = (50, 95, 99)
+
+
+def _percentile(sorted_values, p):
+    """Percentile nearest-rank su una lista già ordinata."""
+    if not sorted_values:
+        return 0.0
+    # p * n prima della divisione: math.ceil(0.07 * 100) darebbe 8
+    rank = max(math.ceil(p * len(sorted_values) / 100) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def _new_entry(name, window):
+    return {
+        "command": name,
+        "count": 0,
+        "errors": 0,
+        "in_flight": 0,
+        "max_in_flight": 0,
+        "total_ms": 0.0,
+        "max_ms": 0.0,
+        # (istante monotonic di fine, latenza ms) delle ultime chiamate
+        "samples": deque(maxlen=window),
+    }
+
+
+class CommandMetrics:
+    """Registro thread-safe delle metriche per comando."""
+
+    def __init__(self, window=BOT_METRICS_WINDOW):
+        self._lock = threading.Lock()
+        self._window = window
+        self._stats = {}
+        self.started_at = datetime.utcnow().isoformat()
+        self._started = time.monotonic()
+
+    def _entry(self, name):
+        entry = self._stats.get(name)
+        if entry is None:
+            entry = self._stats[name] = _new_entry(name, self._window)
+        return entry
+
+    def start(self, name):
+        with self._lock:
+            entry = self._entry(name)
+            entry["in_flight"] += 1
+            entry["max_in_flight"] = max(entry["max_in_flight"], entry["in_flight"])
+
+    def finish(self, name, elapsed_ms, failed=False):
+        with self._lock:
+            entry = self._entry(name)
+            entry["in_flight"] -= 1
+            entry["count"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["samples"].append((time.monotonic(), elapsed_ms))
+            if failed:
+                entry["errors"] += 1
+
+    def top(self, n=None, order_by="count"):
+        """Metriche per comando, ordinate per count, errors, p95_ms, p99_ms, max_ms o total_ms."""
+        now = time.monotonic()
+        with self._lock:
+            entries = [(dict(e), list(e["samples"])) for e in self._stats.values()]
+        result = []
+        for entry, samples in entries:
+            entry.pop("samples")
+            latencies = sorted(ms for _, ms in samples)
+            for p in PERCENTILES:
+                entry[f"p{p}_ms"] = _percentile(latencies, p)
+            entry["avg_ms"] = entry["total_ms"] / entry["count"] if entry["count"] else 0.0
+            recent = sum(1 for t, _ in samples if now - t <= RATE_WINDOW_SECONDS)
+            entry["per_min"] = recent * 60 / min(RATE_WINDOW_SECONDS, max(now - self._started, 1))
+            result.append(entry)
+        result.sort(key=lambda e: e.get(order_by, 0), reverse=True)
+        return result[:n] if n else result
+
+    def snapshot(self):
+        """Dizionario serializzabile in JSON con tutte le metriche raccolte."""
+        return {
+            "pid": os.getpid(),
+            "started_at": self.started_at,
+            "dumped_at": datetime.utcnow().isoformat(),
+            "window": self._window,
+            "commands": self.top(),
+        }
+
+    def reset(self):
+        with self._lock:
+            # Le richieste in corso restano contate: finish() arriverà dopo il reset
+            stats = {}
+            for name, entry in self._stats.items():
+                if entry["in_flight"]:
+                    stats[name] = _new_entry(name, self._window)
+                    stats[name]["in_flight"] = stats[name]["max_in_flight"] = entry["in_flight"]
+            self._stats = stats
+            self.started_at = datetime.utcnow().isoformat()
+            self._started = time.monotonic()
+
+
+command_metrics = CommandMetrics()
+
+
+def _instrument(handler, name):
+    callback = handler.callback
+    if getattr(callback, "_metrics_name", None):
+        return
+
+    @functools.wraps(callback)
+    async def timed_callback(update, context):
+        command_metrics.start(name)
+        t0 = time.perf_counter()
+        failed = True
+        try:
+            result = await callback(update, context)
+            failed = False
+            return result
+        finally:
+            command_metrics.finish(name, (time.perf_counter() - t0) * 1000, failed=failed)
+
+    timed_callback._metrics_name = name
+    handler.callback = timed_callback
+
+
+def _handler_name(handler, prefix=None):
+    callback_name = getattr(handler.callback, "__name__", type(handler).__name__)
+    if isinstance(handler, CommandHandler):
+        name = "/" + sorted(handler.commands)[0]
+        # Dentro una conversazione il comando può essere anche un fallback (/cancel)
+        return f"{prefix} {name}" if prefix and prefix != name else name
+    return f"{prefix}:{callback_name}" if prefix else f"callback:{callback_name}"
+
+
+def instrument_handler(handler):
+    """Avvolge la callback dell'handler (o di tutti gli step di una ConversationHandler)."""
+    if isinstance(handler, ConversationHandler):
+        entry_commands = [h for h in handler.entry_points if isinstance(h, CommandHandler)]
+        prefix = "/" + sorted(entry_commands[0].commands)[0] if entry_commands else (handler.name or "conversation")
+        steps = list(handler.entry_points) + list(handler.fallbacks)
+        for state_handlers in handler.states.values():
+            steps.extend(state_handlers)
+        for step in steps:
+            if isinstance(step, CommandHandler) and step in handler.entry_points:
+                _instrument(step, _handler_name(step))
+            else:
+                _instrument(step, _handler_name(step, prefix))
+        return
+    if hasattr(handler, "callback"):
+        _instrument(handler, _handler_name(handler))
+
+
+def instrument_application(application):
+    """Strumenta tutti gli handler già registrati nell'Application (da chiamare dopo add_handler)."""
+    count = 0
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            instrument_handler(handler)
+            count += 1
+    logger.info(f"Metriche per comando attive su {count} handler.")
+
+
+def dump_metrics_json(path=BOT_METRICS_DUMP_PATH):
+    """Scrive le metriche in JSON (scrittura atomica) e restituisce il percorso del file."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(command_metrics.snapshot(), f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+async def metrics_dump_loop(interval_seconds: int = BOT_METRICS_DUMP_SECONDS):
+    """Task asyncio del bot: dump periodico delle metriche su file."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await asyncio.to_thread(dump_metrics_json)
+        except OSError as e:
+            logger.error(f"Impossibile salvare le metriche del bot: {e}")
@@ -1,7 +1,12 @@
 import logging
+from app.database.bot_repository import QueryTimeout
 
 async def error_handler(update, context):
     logging.error(f"Errore: {context.error}")
+    # Query interrotta dal repository del bot: l'utente può riprovare
+    if isinstance(context.error, QueryTimeout) and update and getattr(update, "effective_message", None):
+        await update.effective_message.reply_text("⏳ Database occupato, riprova tra qualche secondo.")
+        return
     # Se vuoi: notifica all’utente
     # if update and update.message:
     #     await update.message.reply_text("Si è verificato un errore inatteso.")
\ No newline at end of file
@@ -1,11 +1,51 @@
-from datetime import datetime
-import numpy as np
+import math
+from datetime import datetime, timedelta
 from telegram import Update
 from telegram.ext import ContextTypes
 from app.telegram.utils.auth import is_authorized, access_denied
-from app.database.db_connection import get_db_connection
+from app.database.bot_repository import bot_repository
+from app.telegram.utils.slug_index import slug_index, slug_not_found_text
 from app.golden_cross.moving_average import calculate_sma, count_days_present
 
+# (periodo, giorni mancanti tollerati, etichetta)
+MA_PERIODS = [
+    (20, 1, "SMA20"),
+    (50, 3, "SMA50"),
+    (100, 5, "SMA100"),
+    (200, 10, "SMA200"),
+]
+# Giorni letti dallo storico: la finestra più lunga più la sua soglia di giorni mancanti
+MA_WINDOW_DAYS = max(period + threshold for period, threshold, _ in MA_PERIODS)
+# Numero massimo di slug per comando
+MA_MAX_SLUGS = 10
+
+
+def _format_ma(slug, data, end_date):
+    date_value_list = data["rows"]
+    sma_results = {}
+    for period, threshold, label in MA_PERIODS:
+        value = calculate_sma(date_value_list, period, end_date, missing_threshold=threshold)
+        sma_results[label] = value
+    
+    present, missing = count_days_present(date_value_list, 200, end_date)
+    
+    # Ternario corretto fuori dalla format
+    sma20_text = f"{sma_results['SMA20']:.4f}" if not math.isnan(sma_results['SMA20']) else "N/A"
+    sma50_text = f"{sma_results['SMA50']:.4f}" if not math.isnan(sma_results['SMA50']) else "N/A"
+    sma100_text = f"{sma_results['SMA100']:.4f}" if not math.isnan(sma_results['SMA100']) else "N/A"
+    sma200_text = f"{sma_results['SMA200']:.4f}" if not math.isnan(sma_results['SMA200']) else "N/A"
+    
+    return (
+        f"{slug} : {data['chain']}, {data['count']} records found\n\n"
+        f"📅 Data available since: {data['first_date']}\n\n"
+        f"SMA20: {sma20_text}\n"
+        f"SMA50: {sma50_text}\n"
+        f"SMA100: {sma100_text}\n"
+        f"SMA200: {sma200_text}\n\n"
+        f"Days check: {present} present, {missing} missing"
+    )
+
+
 async def ma_generic(update: Update, context: ContextTypes.DEFAULT_TYPE, floor_field: str):
     user_id = update.effective_user.id
     if not is_authorized(user_id):
@@ -13,76 +53,44 @@ async def ma_generic(update: Update, context: ContextTypes.DEFAULT_TYPE, floor_f
         return
     
     if not context.args:
-        await update.message.reply_text("Uso: /ma_native <slug> oppure /ma_usd <slug>")
+        await update.message.reply_text("Uso: /ma_native <slug> [<slug> ...] oppure /ma_usd <slug> [<slug> ...]")
         return
-    slug = context.args[0]
-    
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT c.collection_identifier "
-        "FROM nft_collections c "
-        "LEFT JOIN historical_nft_data h ON h.collection_identifier = c.collection_identifier "
-        "WHERE c.slug = ? "
-        "GROUP BY c.collection_identifier "
-        "ORDER BY MAX(h.latest_floor_date) DESC "
-        "LIMIT 1",
-        (slug,)
-    )
-    row = cur.fetchone()
-    if not row:
-        await update.message.reply_text("Slug not found")
-        conn.close()
+    if len(context.args) > MA_MAX_SLUGS:
+        await update.message.reply_text(f"Massimo {MA_MAX_SLUGS} slug per comando.")
         return
-    collection_identifier = row[0]
     
-    cur.execute("SELECT COUNT(*) FROM historical_nft_data WHERE collection_identifier=?", (collection_identifier,))
-    collection_historical_count = cur.fetchone()[0]
-    if collection_historical_count == 0:
-        await update.message.reply_text("No historical data found for this slug")
-        conn.close()
-        return
-    
-    cur.execute(
-        f"SELECT latest_floor_date, {floor_field}, chain FROM historical_nft_data WHERE collection_identifier=? "
-        "ORDER BY latest_floor_date ASC",
-        (collection_identifier,)
-    )
-    db_rows = cur.fetchall()
-    conn.close()
+    # Slug nell'ordine richiesto, senza duplicati; risolti dall'indice in memoria se pronto
+    slugs = []
+    not_found = {}
+    for arg in dict.fromkeys(context.args):
+        slug = arg
+        if slug_index.ready:
+            resolved = slug_index.resolve(arg)
+            if resolved is None:
+                not_found[arg] = slug_not_found_text(arg, base="Slug not found")
+                continue
+            slug = resolved
+        if slug not in slugs:
+            slugs.append(slug)
     
-    first_available_date = db_rows[0][0]
-    slug_chain = db_rows[0][2]
-    date_value_list = [(r[0], r[1]) for r in db_rows]
     today = datetime.utcnow().date()
     end_date = today.strftime("%Y-%m-%d")
+    since_date = (today - timedelta(days=MA_WINDOW_DAYS)).strftime("%Y-%m-%d")
     
-    periods = [
-        (20, 1, "SMA20"),
-        (50, 3, "SMA50"),
-        (100, 5, "SMA100"),
-        (200, 10, "SMA200"),
-    ]
-    sma_results = {}
-    for period, threshold, label in periods:
-        value = calculate_sma(date_value_list, period, end_date, missing_threshold=threshold)
-        sma_results[label] = value
-    
-    present, missing = count_days_present(date_value_list, 200, end_date)
-    
-    # Ternario corretto fuori dalla format
-    sma20_text = f"{sma_results['SMA20']:.4f}" if not np.isnan(sma_results['SMA20']) else "N/A"
-    sma50_text = f"{sma_results['SMA50']:.4f}" if not np.isnan(sma_results['SMA50']) else "N/A"
-    sma100_text = f"{sma_results['SMA100']:.4f}" if not np.isnan(sma_results['SMA100']) else "N/A"
-    sma200_text = f"{sma_results['SMA200']:.4f}" if not np.isnan(sma_results['SMA200']) else "N/A"
+    # Risoluzione e finestre di tutte le collezioni in un'unica lettura batch
+    results = await bot_repository.ma_windows(slugs, floor_field, since_date) if slugs else {}
     
-    msg_out = (
-        f"{slug} : {slug_chain}, {collection_historical_count} records found\n\n"
-        f"📅 Data available since: {first_available_date}\n\n"
-        f"SMA20: {sma20_text}\n"
-        f"SMA50: {sma50_text}\n"
-        f"SMA100: {sma100_text}\n"
-        f"SMA200: {sma200_text}\n\n"
-        f"Days check: {present} present, {missing} missing"
-    )
-    await update.message.reply_text(msg_out)
\ No newline at end of file
+    sections = []
+    for arg in dict.fromkeys(context.args):
+        if arg in not_found:
+            sections.append(f"{arg}: {not_found[arg]}")
+            continue
+        slug = slug_index.resolve(arg) if slug_index.ready else arg
+        data = results.get(slug)
+        if data is None:
+            sections.append(f"{arg}: {slug_not_found_text(arg, base='Slug not found')}")
+        elif data["count"] == 0:
+            sections.append(f"{slug}: No historical data found for this slug")
+        else:
+            sections.append(_format_ma(slug, data, end_date))
+    await update.message.reply_text("\n\n".join(sections))
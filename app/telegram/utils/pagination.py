@@ -1,50 +1,126 @@
+"""
+Paginazione delle liste di slug (/slug_list_by_prefix, /slug_list_by_chain, /slug_list_by_category).
+
+Il comando e il callback dei bottoni leggono la lista dall'indice in memoria degli slug
+(slug_index.py). Finché l'indice non è pronto usano la ricerca equivalente (query_slug_list)
+nel repository del bot (bot_repository.py), con la lista ordinata in cache per (comando, valore) per
+PAGINATION_CACHE_TTL_SECONDS: i cambi pagina leggono solo la fetta richiesta.
+Il callback_data contiene la posizione di partenza della pagina (cursore) invece del numero
+di pagina: "comando|valore|offset". Se la cache è scaduta la query viene rieseguita una volta.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
 from telegram.ext import CallbackQueryHandler, ContextTypes
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update, ReplyKeyboardRemove
 from app.telegram.utils.auth import is_authorized, access_denied
-from app.telegram.utils.telegram_query import (
-    get_slugs_by_prefix, get_slugs_by_chain, get_slugs_by_category
-)
-from app.database.database import get_db_connection
+from app.database.bot_repository import bot_repository
+from app.telegram.utils.slug_index import slug_index
+from app.config.config import load_config
 
 PAGE_SIZE = 10
 
+config = load_config()
+PAGINATION_CACHE_TTL_SECONDS = int(config.get("PAGINATION_CACHE_TTL_SECONDS") or 300)
+PAGINATION_CACHE_MAX_ENTRIES = 256
+
+# Limite Telegram per callback_data (byte)
+CALLBACK_DATA_MAX_BYTES = 64
+
+# Ricerca equivalente sull'indice in memoria
+INDEX_LOOKUPS = {
+    "slug_list_by_prefix": slug_index.by_prefix,
+    "slug_list_by_chain": slug_index.by_chain,
+    "slug_list_by_category": slug_index.by_category,
+}
+
+
+class _ResultCache:
+    """Liste ordinate di slug per (comando, valore) con scadenza."""
+
+    def __init__(self, ttl_seconds=PAGINATION_CACHE_TTL_SECONDS, max_entries=PAGINATION_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, results = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return results
+
+    def put(self, key, results):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_result_cache = _ResultCache()
+
+
+async def get_list_results(command: str, query_value: str):
+    """Lista ordinata degli slug per il comando: indice in memoria, cache o database."""
+    if slug_index.ready:
+        return INDEX_LOOKUPS[command](query_value)
+
+    key = (command, query_value)
+    results = _result_cache.get(key)
+    if results is not None:
+        return results
+
+    results = tuple(await bot_repository.slug_list(command, query_value))
+    _result_cache.put(key, results)
+    return results
+
+
 async def paginated_list_handler(
     update: Update,
     context: ContextTypes.DEFAULT_TYPE,
-    query: str,
-    query_value: str,
     command: str,
-    page: int = 0,
-    field: str = "slug"
+    query_value: str,
+    offset: int = 0
 ):
-
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(query, (query_value,))
-    results = [row[0] for row in cursor.fetchall()]
-    conn.close()
-
-    page_results, total_pages = get_paginated_results(results, page)
+    results = await get_list_results(command, query_value)
+    page_results, page, total_pages = get_paginated_results(results, offset)
     text = "No results found." if not page_results else f"Risultati (pagina {page+1}/{total_pages}):\n" + "\n".join(page_results)
-    reply_markup = build_pagination_keyboard(command, query_value, page, total_pages)
+    reply_markup = build_pagination_keyboard(command, query_value, offset, len(results))
     if update.message:
         await update.message.reply_text(text, reply_markup=reply_markup or ReplyKeyboardRemove())
     elif update.callback_query:
         await update.callback_query.edit_message_text(text, reply_markup=reply_markup)
 
-def get_paginated_results(results, page, page_size=PAGE_SIZE):
-    start = page * page_size
-    end = start + page_size
-    page_results = results[start:end]
+def get_paginated_results(results, offset, page_size=PAGE_SIZE):
+    """Pagina che parte da offset: (risultati, indice pagina, pagine totali)."""
+    page_results = results[offset:offset + page_size]
     total_pages = (len(results) - 1) // page_size + 1 if results else 1
-    return page_results, total_pages
-
-def build_pagination_keyboard(command, query_value, page, total_pages):
-    keyboard = []
-    if page > 0:
-        keyboard.append(InlineKeyboardButton("⬅️", callback_data=f"{command}|{query_value}|{page-1}"))
-    if page < (total_pages - 1):
-        keyboard.append(InlineKeyboardButton("➡️", callback_data=f"{command}|{query_value}|{page+1}"))
+    return list(page_results), offset // page_size, total_pages
+
+def build_pagination_keyboard(command, query_value, offset, total_results, page_size=PAGE_SIZE):
+    buttons = []
+    if offset > 0:
+        buttons.append(("⬅️", f"{command}|{query_value}|{max(offset - page_size, 0)}"))
+    if offset + page_size < total_results:
+        buttons.append(("➡️", f"{command}|{query_value}|{offset + page_size}"))
+    # Valori troppo lunghi non entrano nel callback_data: niente bottoni piuttosto che un errore
+    keyboard = [
+        InlineKeyboardButton(label, callback_data=data)
+        for label, data in buttons
+        if len(data.encode("utf-8")) <= CALLBACK_DATA_MAX_BYTES
+    ]
     return InlineKeyboardMarkup([keyboard]) if keyboard else None
 
 async def pagination_callback(update, context):
@@ -54,35 +130,17 @@ async def pagination_callback(update, context):
         return
 
     try:
-        data = update.callback_query.data.split("|")
-        command, query_value, page = data[0], data[1], int(data[2])
+        command, query_value, offset = update.callback_query.data.rsplit("|", 2)
+        offset = int(offset)
     except Exception:
         await update.callback_query.answer("Errore nei dati di paginazione.", show_alert=True)
         return
 
-    results = []
-    if command == "slug_list_by_prefix":
-        results = get_slugs_by_prefix(query_value)
-    elif command == "slug_list_by_chain":
-        results = get_slugs_by_chain(query_value)
-    elif command == "slug_list_by_category":
-        results = get_slugs_by_category(query_value)
-    else:
+    if command not in INDEX_LOOKUPS:
         await update.callback_query.answer("Comando di paginazione sconosciuto.", show_alert=True)
         return
 
-    if not results:
-        await update.callback_query.edit_message_text("Nessun dato da mostrare.")
-        return
+    await update.callback_query.answer()
+    await paginated_list_handler(update, context, command, query_value, offset)
 
-    page_results, total_pages = get_paginated_results(results, page, PAGE_SIZE)
-    
-    text = (
-    "No results found." if not page_results
-    else f"Risultati (pagina {page + 1}/{total_pages}):\n"
-    + "\n".join(r[0] for r in page_results)
-    )
-    keyboard = build_pagination_keyboard(command, query_value, page, total_pages)
-    await update.callback_query.edit_message_text(text, reply_markup=keyboard)
-
-pagination_callback_handler = CallbackQueryHandler(pagination_callback, pattern=r"^[^|]+\|[^|]+\|\d+$")
\ No newline at end of file
+pagination_callback_handler = CallbackQueryHandler(pagination_callback, pattern=r"^[^|]+\|[^|]+\|\d+$")
@@ -0,0 +1,206 @@
+"""
+Indice in memoria degli slug di nft_collections, residente nel processo del bot.
+
+Le liste per prefisso/chain/categoria e la risoluzione degli slug dei comandi grafico e MA
+usavano query LIKE/LOWER() senza indice (e la categoria era confrontata con l'intera
+stringa 'categories', separata da virgole). L'indice contiene:
+  - lista ordinata degli slug (minuscoli) per la ricerca per prefisso con bisect
+  - liste invertite chain → slug e token di categoria → slug
+  - indice dei trigrammi per suggerire gli slug più simili a uno slug sbagliato
+
+Viene costruito all'avvio del bot e ricostruito da slug_index_refresh_loop quando cambia
+nft_collections (firma COUNT(*) + MAX(rowid)), cioè dopo gli import.
+Finché l'indice non è pronto i chiamanti ricadono sulle query SQL.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+from app.config.config import load_config
+from app.database.read_replica import get_read_connection
+
+logger = logging.getLogger(__name__)
+
+config = load_config()
+SLUG_INDEX_REFRESH_SECONDS = int(config.get("SLUG_INDEX_REFRESH_SECONDS") or 300)
+
+# Similarità minima (coefficiente di Dice sui trigrammi) per suggerire uno slug
+FUZZY_MIN_SCORE = 0.4
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _category_tokens(categories) -> set:
+    if not categories:
+        return set()
+    return {token.strip().lower() for token in str(categories).split(",") if token.strip()}
+
+
+class SlugIndex:
+    """Indice immutabile dopo la costruzione: refresh() ne crea uno nuovo e lo sostituisce."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+        self._signature = None
+        self.built_at = None
+        self.build_ms = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self._data is not None
+
+    # ── costruzione ────────────────────────────────────────────────
+
+    @staticmethod
+    def _build(rows):
+        by_lower = {}
+        by_chain = {}
+        by_category = {}
+        for slug, chain, categories in rows:
+            if not slug:
+                continue
+            lower = slug.lower()
+            by_lower.setdefault(lower, slug)
+            if chain:
+                by_chain.setdefault(chain.lower(), set()).add(lower)
+            for token in _category_tokens(categories):
+                by_category.setdefault(token, set()).add(lower)
+
+        lowers = sorted(by_lower)
+        position = {lower: i for i, lower in enumerate(lowers)}
+        trigrams = {}
+        for i, lower in enumerate(lowers):
+            for gram in _trigrams(lower):
+                trigrams.setdefault(gram, []).append(i)
+
+        def _positions(groups):
+            # Liste invertite come posizioni ordinate nella lista degli slug
+            return {key: sorted(position[lower] for lower in members) for key, members in groups.items()}
+
+        return {
+            "lowers": lowers,
+            "slugs": [by_lower[lower] for lower in lowers],
+            "by_chain": _positions(by_chain),
+            "by_category": _positions(by_category),
+            "trigrams": trigrams,
+        }
+
+    @staticmethod
+    def _read_signature(cur):
+        cur.execute("SELECT COUNT(*), MAX(rowid) FROM nft_collections")
+        return tuple(cur.fetchone())
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Ricostruisce l'indice se nft_collections è cambiata (o se force).
+        Restituisce True se l'indice è stato ricostruito.
+        """
+        t0 = time.perf_counter()
+        conn = get_read_connection()
+        try:
+            cur = conn.cursor()
+            signature = self._read_signature(cur)
+            if not force and self.ready and signature == self._signature:
+                return False
+            cur.execute("SELECT slug, chain, categories FROM nft_collections")
+            data = self._build(cur.fetchall())
+        finally:
+            conn.close()
+
+        with self._lock:
+            self._data = data
+            self._signature = signature
+            self.built_at = time.time()
+            self.build_ms = (time.perf_counter() - t0) * 1000
+        logger.info(f"Indice slug ricostruito: {len(data['slugs'])} slug in {self.build_ms:.0f} ms.")
+        return True
+
+    # ── ricerche ───────────────────────────────────────────────────
+
+    def by_prefix(self, prefix: str) -> list:
+        data = self._data
+        prefix = prefix.lower()
+        lowers = data["lowers"]
+        start = bisect_left(lowers, prefix)
+        end = bisect_left(lowers, prefix + "\U0010ffff", lo=start)
+        return data["slugs"][start:end]
+
+    def by_chain(self, chain: str) -> list:
+        data = self._data
+        return [data["slugs"][i] for i in data["by_chain"].get(chain.lower(), ())]
+
+    def by_category(self, category: str) -> list:
+        data = self._data
+        return [data["slugs"][i] for i in data["by_category"].get(category.strip().lower(), ())]
+
+    def resolve(self, slug: str):
+        """Slug così come salvato in nft_collections (confronto case-insensitive), o None."""
+        data = self._data
+        lower = slug.lower()
+        i = bisect_left(data["lowers"], lower)
+        if i < len(data["lowers"]) and data["lowers"][i] == lower:
+            return data["slugs"][i]
+        return None
+
+    def suggest(self, slug: str, limit: int = 5) -> list:
+        """Gli slug più simili per trigrammi (per gli slug scritti male)."""
+        data = self._data
+        grams = _trigrams(slug.lower())
+        if not grams:
+            return []
+        common = Counter()
+        for gram in grams:
+            common.update(data["trigrams"].get(gram, ()))
+        scored = []
+        for i, shared in common.items():
+            lower = data["lowers"][i]
+            score = 2 * shared / (len(grams) + len(lower) + 1)
+            if score >= FUZZY_MIN_SCORE:
+                scored.append((score, lower, i))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [data["slugs"][i] for _, _, i in scored[:limit]]
+
+    def stats(self) -> dict:
+        data = self._data
+        return {
+            "ready": self.ready,
+            "slugs": len(data["slugs"]) if data else 0,
+            "chains": len(data["by_chain"]) if data else 0,
+            "categories": len(data["by_category"]) if data else 0,
+            "build_ms": self.build_ms,
+            "built_at": self.built_at,
+        }
+
+
+slug_index = SlugIndex()
+
+
+def slug_not_found_text(slug: str, base: str = "Slug not found.") -> str:
+    """Messaggio di slug non trovato con gli eventuali suggerimenti."""
+    if not slug_index.ready:
+        return base
+    suggestions = slug_index.suggest(slug)
+    if not suggestions:
+        return base
+    return f"{base} Did you mean: {', '.join(suggestions)}?"
+
+
+async def slug_index_refresh_loop(interval_seconds: int = SLUG_INDEX_REFRESH_SECONDS):
+    """
+    Task asyncio del bot: costruisce l'indice subito e poi controlla ogni interval_seconds
+    se nft_collections è cambiata. La costruzione gira in un thread.
+    """
+    while True:
+        try:
+            await asyncio.to_thread(slug_index.refresh)
+        except Exception as e:
+            logger.error(f"Refresh dell'indice slug fallito: {type(e).__name__} - {e}")
+        await asyncio.sleep(interval_seconds)
@@ -1,40 +1,398 @@
-import httpx
+"""
+Invio dei messaggi Telegram dagli script e dai job (import, golden cross, ML).
+
+Prima ogni messaggio era un POST diretto con un httpx.AsyncClient globale: gli script lo
+chiamavano con asyncio.run() a ogni messaggio (client legato a un event loop già chiuso),
+alcune chiamate non attendevano la coroutine (messaggio mai inviato) e nessuno rispettava
+i limiti di Telegram. Ora tutti i messaggi passano da TelegramNotifier:
+
+  - un thread dedicato con il proprio event loop e un httpx.AsyncClient persistente,
+    usabile sia da codice async (send_telegram_message) sia sincrono
+    (send_telegram_message_sync, per gli script)
+  - una coda per chat, consegnata in ordine; i messaggi in attesa per la stessa chat
+    vengono uniti in un unico invio finché restano entro 4096 caratteri (se Telegram
+    rifiuta l'invio unito con un 4xx, i messaggi vengono reinviati uno per uno)
+  - token bucket globale (TELEGRAM_GLOBAL_RATE_PER_SEC) e per chat (privata:
+    TELEGRAM_PRIVATE_RATE_PER_SEC, gruppi e canali: TELEGRAM_GROUP_RATE_PER_MIN)
+  - messaggi oltre 4096 caratteri divisi in più parti (preferibilmente a capo); in HTML
+    senza tagliare tag o entità, chiudendo i tag aperti a fine parte e riaprendoli nella
+    successiva
+  - risposta 429: attesa di parameters.retry_after e nuovo tentativo; errori di rete e
+    5xx: backoff esponenziale fino a TELEGRAM_SEND_MAX_RETRIES tentativi
+
+All'uscita del processo i messaggi ancora in coda vengono consegnati (max
+TELEGRAM_SEND_TIMEOUT_SECONDS).
+"""
+
+import asyncio
+import atexit
+import logging
+import re
+import threading
+import time
+from collections import deque
+
 from app.config.config import load_config
 
-# Global client to reuse (best practice)
-_client = None
+logger = logging.getLogger(__name__)
+
+config = load_config()
+TELEGRAM_GLOBAL_RATE_PER_SEC = float(config.get("TELEGRAM_GLOBAL_RATE_PER_SEC") or 25)
+TELEGRAM_PRIVATE_RATE_PER_SEC = float(config.get("TELEGRAM_PRIVATE_RATE_PER_SEC") or 1)
+TELEGRAM_GROUP_RATE_PER_MIN = float(config.get("TELEGRAM_GROUP_RATE_PER_MIN") or 20)
+TELEGRAM_SEND_MAX_RETRIES = int(config.get("TELEGRAM_SEND_MAX_RETRIES") or 5)
+TELEGRAM_SEND_TIMEOUT_SECONDS = float(config.get("TELEGRAM_SEND_TIMEOUT_SECONDS") or 120)
+
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+CHAT_BURST = 3
+BATCH_SEPARATOR = "\n\n"
+
+_HTML_TAG = re.compile(r"<(/?)([a-zA-Z][\w-]*)[^>]*>")
+
+
+class TelegramSendError(Exception):
+    """Telegram ha rifiutato il messaggio (errore non recuperabile o tentativi esauriti)."""
+
+    def __init__(self, message: str, status_code: int = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def rejected(self) -> bool:
+        """True se Telegram ha rifiutato il contenuto (4xx diverso da 429)."""
+        return self.status_code is not None and 400 <= self.status_code < 500 and self.status_code != 429
+
+
+def _cut_position(text: str, limit: int) -> int:
+    """Punto di taglio entro limit: riga vuota, poi a capo, poi spazio, altrimenti limit."""
+    cut = -1
+    for sep in ("\n\n", "\n", " "):
+        cut = text.rfind(sep, 0, limit)
+        if cut > limit // 2:
+            break
+    return cut if cut > 0 else limit
+
+
+def _html_safe_cut(text: str, cut: int) -> int:
+    """Arretra il taglio se cade dentro un tag (<...>) o un'entità (&...;)."""
+    tag_start = text.rfind("<", 0, cut)
+    if tag_start > text.rfind(">", 0, cut):
+        cut = tag_start
+    entity_start = text.rfind("&", 0, cut)
+    if entity_start >= 0 and cut - entity_start <= 10 and ";" not in text[entity_start:cut]:
+        cut = entity_start
+    return cut
+
+
+def _open_html_tags(html: str) -> list:
+    """Tag aperti (nome, tag completo) alla fine di html, dal più esterno."""
+    stack = []
+    for match in _HTML_TAG.finditer(html):
+        closing, name = match.group(1), match.group(2).lower()
+        if not closing:
+            stack.append((name, match.group(0)))
+        elif any(n == name for n, _ in stack):
+            while stack and stack.pop()[0] != name:
+                pass
+    return stack
+
+
+def split_message(text: str, limit: int = TELEGRAM_MAX_MESSAGE_LENGTH, parse_mode: str = None) -> list:
+    """
+    Divide il testo in parti di al massimo limit caratteri, tagliando preferibilmente
+    su una riga vuota, poi su un a capo, poi su uno spazio.
+
+    Con parse_mode HTML ogni parte resta HTML valido: il taglio non cade dentro un tag
+    o un'entità, i tag ancora aperti vengono chiusi a fine parte e riaperti all'inizio
+    della parte successiva.
+    """
+    html = (parse_mode or "").upper() == "HTML"
+    parts = []
+    while len(text) > limit:
+        budget = limit
+        while True:
+            cut = _cut_position(text, budget)
+            closing = ""
+            if html:
+                cut = _html_safe_cut(text, cut) or _cut_position(text, budget)
+                stack = _open_html_tags(text[:cut])
+                closing = "".join(f"</{name}>" for name, _ in reversed(stack))
+            if cut + len(closing) <= limit or budget <= limit // 2:
+                break
+            budget = limit - len(closing)
+        parts.append(text[:cut] + closing)
+        text = text[cut:].lstrip("\n ")
+        if html:
+            text = "".join(tag for _, tag in stack) + text
+    if text or not parts:
+        parts.append(text)
+    return parts
+
+
+class TokenBucket:
+    """Token bucket per l'event loop del notifier (non thread-safe, un solo loop)."""
+
+    def __init__(self, rate_per_sec: float, capacity: float):
+        self.rate = rate_per_sec
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def _is_group_chat(chat_id) -> bool:
+    # Gruppi e canali hanno id negativi (o @username per i canali)
+    return str(chat_id).startswith(("-", "@"))
+
+
+class TelegramNotifier:
+    """Servizio di invio con event loop proprio, code per chat e limiti di frequenza."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._client = None
+        self._token = None
+        self._chats = {}
+        self._chat_buckets = {}
+        self._global_bucket = None
+        self._atexit_registered = False
+        self.metrics = {"queued": 0, "sent": 0, "parts": 0, "batched": 0, "retries_429": 0, "failed": 0}
+
+    # ── ciclo di vita ──────────────────────────────────────────────
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return self._loop
+            ready = threading.Event()
+
+            def run():
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+                self._loop = loop
+                ready.set()
+                try:
+                    loop.run_forever()
+                finally:
+                    if self._client is not None:
+                        loop.run_until_complete(self._client.aclose())
+                        self._client = None
+                    loop.close()
+
+            self._thread = threading.Thread(target=run, name="telegram-notifier", daemon=True)
+            self._thread.start()
+            ready.wait()
+            if not self._atexit_registered:
+                atexit.register(self.close)
+                self._atexit_registered = True
+            return self._loop
+
+    def close(self, timeout: float = TELEGRAM_SEND_TIMEOUT_SECONDS):
+        """Consegna i messaggi in coda (entro timeout) e ferma il thread del notifier."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._thread = None
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._drain(), loop).result(timeout=timeout)
+        except Exception as e:
+            logger.warning(f"Notifier Telegram: messaggi non consegnati alla chiusura ({type(e).__name__}).")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+
+    async def _drain(self):
+        while self._chats:
+            await asyncio.gather(*(state["task"] for state in list(self._chats.values())), return_exceptions=True)
+
+    # ── accodamento ────────────────────────────────────────────────
+
+    def submit(self, message: str, chat_id, parse_mode: str = "HTML"):
+        """
+        Accoda il messaggio e restituisce un concurrent.futures.Future con la risposta
+        di Telegram (dell'ultima parte inviata).
+        """
+        if self._token is None:
+            self._token = config.get("TELEGRAM_BOT_TOKEN")
+        if not self._token or not chat_id:
+            raise ValueError("TELEGRAM_BOT_TOKEN o chat_id mancante nella config")
+        loop = self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(self._enqueue(str(message), str(chat_id), parse_mode), loop)
+
+    async def _enqueue(self, text, chat_id, parse_mode):
+        future = asyncio.get_running_loop().create_future()
+        state = self._chats.get(chat_id)
+        if state is None:
+            state = self._chats[chat_id] = {"items": deque(), "task": None}
+        state["items"].append((text, parse_mode, future))
+        self.metrics["queued"] += 1
+        if state["task"] is None:
+            state["task"] = asyncio.create_task(self._chat_worker(chat_id, state))
+        return await future
+
+    async def _chat_worker(self, chat_id, state):
+        """Consegna in ordine i messaggi di una chat; termina quando la coda è vuota."""
+        items = state["items"]
+        try:
+            while items:
+                text, parse_mode, future = items.popleft()
+                batch = [(text, future)]
+                # Messaggi accodati nel frattempo per la stessa chat: un unico invio
+                while items and items[0][1] == parse_mode and (
+                    len(text) + len(BATCH_SEPARATOR) + len(items[0][0]) <= TELEGRAM_MAX_MESSAGE_LENGTH
+                ):
+                    next_text, _, next_future = items.popleft()
+                    text = f"{text}{BATCH_SEPARATOR}{next_text}"
+                    batch.append((next_text, next_future))
+                    self.metrics["batched"] += 1
+                try:
+                    result = await self._deliver(chat_id, text, parse_mode)
+                except TelegramSendError as e:
+                    if len(batch) > 1 and e.rejected:
+                        # Un solo messaggio non valido (es. HTML malformato) non deve far
+                        # perdere gli altri: reinvio uno per uno
+                        logger.warning(f"Invio unito a {chat_id} rifiutato ({e}): reinvio dei {len(batch)} messaggi singolarmente.")
+                        for item_text, item_future in batch:
+                            await self._deliver_one(chat_id, item_text, parse_mode, [item_future])
+                    else:
+                        self._fail(chat_id, [f for _, f in batch], e)
+                    continue
+                except Exception as e:
+                    self._fail(chat_id, [f for _, f in batch], e)
+                    continue
+                self._succeed([f for _, f in batch], result)
+        finally:
+            self._chats.pop(chat_id, None)
+
+    async def _deliver_one(self, chat_id, text, parse_mode, futures):
+        try:
+            result = await self._deliver(chat_id, text, parse_mode)
+        except Exception as e:
+            self._fail(chat_id, futures, e)
+            return
+        self._succeed(futures, result)
+
+    def _succeed(self, futures, result):
+        self.metrics["sent"] += len(futures)
+        for f in futures:
+            if not f.done():
+                f.set_result(result)
+
+    def _fail(self, chat_id, futures, error):
+        self.metrics["failed"] += 1
+        logger.error(f"Invio Telegram a {chat_id} fallito: {error}")
+        for f in futures:
+            if not f.done():
+                f.set_exception(error)
+
+    # ── invio ──────────────────────────────────────────────────────
+
+    def _get_client(self):
+        if self._client is None:
+            # httpx importato solo al primo invio: gli script lo caricano solo se notificano
+            import httpx
+            self._client = httpx.AsyncClient(timeout=30.0)
+        return self._client
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            rate = TELEGRAM_GROUP_RATE_PER_MIN / 60 if _is_group_chat(chat_id) else TELEGRAM_PRIVATE_RATE_PER_SEC
+            bucket = self._chat_buckets[chat_id] = TokenBucket(rate, CHAT_BURST)
+        return bucket
+
+    async def _deliver(self, chat_id, text, parse_mode):
+        result = None
+        for part in split_message(text, parse_mode=parse_mode):
+            result = await self._send_part(chat_id, part, parse_mode)
+            self.metrics["parts"] += 1
+        return result
+
+    async def _send_part(self, chat_id, text, parse_mode):
+        import httpx
+
+        if self._global_bucket is None:
+            self._global_bucket = TokenBucket(TELEGRAM_GLOBAL_RATE_PER_SEC, TELEGRAM_GLOBAL_RATE_PER_SEC)
+        url = f"https://api.telegram.org/bot{self._token}/sendMessage"
+        payload = {
+            "chat_id": chat_id,
+            "text": text,
+            "disable_web_page_preview": True
+        }
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+
+        for attempt in range(TELEGRAM_SEND_MAX_RETRIES + 1):
+            last_attempt = attempt == TELEGRAM_SEND_MAX_RETRIES
+            await self._chat_bucket(chat_id).acquire()
+            await self._global_bucket.acquire()
+            try:
+                response = await self._get_client().post(url, data=payload)
+            except httpx.TransportError as e:
+                if last_attempt:
+                    raise TelegramSendError(f"Errore di rete verso Telegram: {e}") from e
+                await asyncio.sleep(2 ** attempt)
+                continue
+
+            if response.status_code == 429 and not last_attempt:
+                try:
+                    retry_after = response.json().get("parameters", {}).get("retry_after", 1)
+                except ValueError:
+                    retry_after = 1
+                self.metrics["retries_429"] += 1
+                logger.warning(f"Telegram 429 per la chat {chat_id}: nuovo tentativo tra {retry_after}s.")
+                await asyncio.sleep(float(retry_after))
+                continue
+            if response.status_code >= 500 and not last_attempt:
+                await asyncio.sleep(2 ** attempt)
+                continue
+            if not response.is_success:
+                raise TelegramSendError(
+                    f"Errore Telegram API: {response.status_code} - {response.text}", response.status_code
+                )
+            return response.json()
+
+    def stats(self) -> dict:
+        return {**self.metrics, "chats_pending": len(self._chats)}
+
+
+notifier = TelegramNotifier()
 
-def _get_client():
-    global _client
-    if _client is None:
-        _client = httpx.AsyncClient(timeout=30.0)
-    return _client
 
 async def send_telegram_message(message: str, chat_id: str, parse_mode: str = "HTML"):
     """
-    Invia un messaggio Telegram in modo asincrono.
+    Invia un messaggio Telegram in modo asincrono (tramite la coda del notifier).
     """
-    config = load_config()
-    token = config.get("TELEGRAM_BOT_TOKEN")
-    if not token or not chat_id:
-        raise ValueError("TELEGRAM_BOT_TOKEN o chat_id mancante nella config")
-
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    payload = {
-        "chat_id": chat_id,
-        "text": message,
-        "parse_mode": parse_mode,
-        "disable_web_page_preview": True
-    }
-
-    client = _get_client()
-    response = await client.post(url, data=payload)
-    
-    if not response.is_success:
-        error_detail = response.text
-        raise Exception(f"Errore Telegram API: {response.status_code} - {error_detail}")
-
-    return response.json()  # optional: return the Telegram response
+    return await asyncio.wrap_future(notifier.submit(message, chat_id, parse_mode))
+
+
+def send_telegram_message_sync(message: str, chat_id: str, parse_mode: str = "HTML",
+                               wait: bool = True, timeout: float = TELEGRAM_SEND_TIMEOUT_SECONDS):
+    """
+    Facciata sincrona per gli script. Con wait=True attende la consegna e ne restituisce
+    la risposta (solleva TelegramSendError se fallisce); con wait=False restituisce il
+    Future e il messaggio viene consegnato in background (al più tardi all'uscita): gli
+    errori vengono solo registrati nel log, senza interrompere il job chiamante.
+    """
+    if not wait:
+        try:
+            return notifier.submit(message, chat_id, parse_mode)
+        except ValueError as e:
+            logger.warning(f"Notifica Telegram non inviata: {e}")
+            return None
+    future = notifier.submit(message, chat_id, parse_mode)
+    return future.result(timeout=timeout)
 
 def get_monitoring_chat_id():
     """
@@ -55,4 +413,4 @@ def get_gc_draft_chat_id():
     Restituisce il chat_id per i draft sulle golden cross, pre invio sul canale
     """
     config = load_config()
-    return config.get("TELEGRAM_GC_DRAFT_CHAT_ID", "")
\ No newline at end of file
+    return config.get("TELEGRAM_GC_DRAFT_CHAT_ID", "")
@@ -1,12 +1,11 @@
 # app/utils/telegram_bot_query_utils.py
 
-import os
-import sqlite3
 from datetime import datetime, timedelta
+from app.database.read_replica import get_read_connection
 
 def get_db_connection():
-    db_path = os.getenv("DB_PATH", "nft_data.sqlite3")
-    return sqlite3.connect(db_path)
+    # Query di sola lettura del bot: replica di lettura se configurata
+    return get_read_connection()
 
 def get_slugs_by_prefix(prefix):
     """
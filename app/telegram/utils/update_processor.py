@@ -0,0 +1,102 @@
+"""
+Elaborazione concorrente degli update con ordine garantito per utente.
+
+Con il processore di default run_polling elabora un update alla volta: un grafico o una
+query lenta fanno attendere tutti gli altri utenti. PerUserUpdateProcessor elabora fino a
+BOT_MAX_CONCURRENT_UPDATES update in parallelo, ma quelli dello stesso utente nella stessa
+chat restano in sequenza (nell'ordine di arrivo): le ConversationHandler (/nft_chart_*)
+e la paginazione non vedono mai due update dello stesso utente in parallelo.
+
+Allo shutdown attende gli update ancora in corso per al massimo BOT_SHUTDOWN_GRACE_SECONDS.
+"""
+
+import asyncio
+import logging
+
+from telegram.ext import BaseUpdateProcessor
+
+from app.config.config import load_config
+
+logger = logging.getLogger(__name__)
+
+config = load_config()
+BOT_MAX_CONCURRENT_UPDATES = int(config.get("BOT_MAX_CONCURRENT_UPDATES") or 16)
+BOT_SHUTDOWN_GRACE_SECONDS = float(config.get("BOT_SHUTDOWN_GRACE_SECONDS") or 20)
+
+
+def ordering_key(update):
+    """Chiave di serializzazione: (chat, utente), solo chat, oppure None (nessun vincolo)."""
+    chat = getattr(update, "effective_chat", None)
+    user = getattr(update, "effective_user", None)
+    if user is not None:
+        return (chat.id if chat else None, user.id)
+    if chat is not None:
+        return (chat.id, None)
+    return None
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Update concorrenti tra utenti diversi, sequenziali per lo stesso utente."""
+
+    def __init__(self, max_concurrent_updates=BOT_MAX_CONCURRENT_UPDATES,
+                 shutdown_grace_seconds=BOT_SHUTDOWN_GRACE_SECONDS):
+        super().__init__(max_concurrent_updates)
+        self.shutdown_grace_seconds = shutdown_grace_seconds
+        # chiave → [lock, update in attesa o in corso]
+        self._locks = {}
+        self._pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.metrics = {"processed": 0, "failed": 0, "max_pending": 0}
+
+    async def process_update(self, update, coroutine):
+        # Il lock per utente viene preso prima del semaforo globale: gli update in coda
+        # dietro a un utente lento non occupano posti di elaborazione
+        self._pending += 1
+        self.metrics["max_pending"] = max(self.metrics["max_pending"], self._pending)
+        self._idle.clear()
+        key = ordering_key(update)
+        try:
+            if key is None:
+                await super().process_update(update, coroutine)
+                return
+            entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+            entry[1] += 1
+            try:
+                async with entry[0]:
+                    await super().process_update(update, coroutine)
+            finally:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self._locks.pop(key, None)
+        finally:
+            self._pending -= 1
+            if self._pending == 0:
+                self._idle.set()
+
+    async def do_process_update(self, update, coroutine):
+        try:
+            await coroutine
+            self.metrics["processed"] += 1
+        except Exception:
+            self.metrics["failed"] += 1
+            raise
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        if self._pending:
+            logger.info(f"Attendo {self._pending} update in corso (max {self.shutdown_grace_seconds:.0f}s)...")
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout=self.shutdown_grace_seconds)
+            except asyncio.TimeoutError:
+                logger.warning(f"Shutdown: {self._pending} update non completati entro il tempo limite.")
+
+    def stats(self) -> dict:
+        return {
+            **self.metrics,
+            "pending": self._pending,
+            "active_users": len(self._locks),
+            "max_concurrent_updates": self.max_concurrent_updates,
+        }
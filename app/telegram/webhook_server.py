@@ -0,0 +1,188 @@
+"""
+Modalità webhook del bot Telegram (TELEGRAM_BOT_MODE=webhook).
+
+Un server HTTP asyncio minimale (solo libreria standard) riceve gli update in POST su
+TELEGRAM_WEBHOOK_LISTEN:TELEGRAM_WEBHOOK_PORT/TELEGRAM_WEBHOOK_PATH e li mette nella
+update_queue dell'Application; l'elaborazione è concorrente con ordine per utente
+(vedi update_processor.py). Il server va esposto dietro un reverse proxy HTTPS: Telegram
+accetta solo webhook https.
+
+  - TELEGRAM_WEBHOOK_SECRET: se impostato, le richieste senza l'header
+    X-Telegram-Bot-Api-Secret-Token corrispondente vengono rifiutate (403)
+  - TELEGRAM_WEBHOOK_URL: URL pubblico registrato con setWebhook all'avvio; se vuoto il
+    webhook non viene registrato (test in locale con scripts/replay_telegram_updates.py)
+  - GET /healthz risponde 200 con lo stato dell'elaborazione
+
+Shutdown ordinato su SIGINT/SIGTERM: il server smette di accettare richieste, la coda
+degli update viene svuotata e gli update in corso terminano (BOT_SHUTDOWN_GRACE_SECONDS).
+Il webhook resta registrato: durante il riavvio Telegram ritenta la consegna.
+"""
+
+import asyncio
+import json
+import logging
+import signal
+
+from telegram import Update
+
+from app.config.config import load_config
+
+logger = logging.getLogger(__name__)
+
+config = load_config()
+TELEGRAM_WEBHOOK_LISTEN = config.get("TELEGRAM_WEBHOOK_LISTEN") or "127.0.0.1"
+TELEGRAM_WEBHOOK_PORT = int(config.get("TELEGRAM_WEBHOOK_PORT") or 8443)
+TELEGRAM_WEBHOOK_PATH = "/" + (config.get("TELEGRAM_WEBHOOK_PATH") or "telegram").strip("/")
+TELEGRAM_WEBHOOK_URL = config.get("TELEGRAM_WEBHOOK_URL") or ""
+TELEGRAM_WEBHOOK_SECRET = config.get("TELEGRAM_WEBHOOK_SECRET") or ""
+
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+MAX_BODY_BYTES = 1024 * 1024
+MAX_HEADER_LINES = 100
+READ_TIMEOUT_SECONDS = 10
+
+_REASONS = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found",
+            405: "Method Not Allowed", 413: "Payload Too Large", 503: "Service Unavailable"}
+
+
+class WebhookServer:
+    """Server HTTP/1.1 minimale per gli update di Telegram (una richiesta per connessione)."""
+
+    def __init__(self, application, listen=TELEGRAM_WEBHOOK_LISTEN, port=TELEGRAM_WEBHOOK_PORT,
+                 path=TELEGRAM_WEBHOOK_PATH, secret_token=TELEGRAM_WEBHOOK_SECRET):
+        self.application = application
+        self.listen = listen
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self._server = None
+        self._accepting = False
+        self.metrics = {"received": 0, "rejected": 0, "invalid": 0}
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.listen, self.port)
+        self._accepting = True
+        logger.info(f"Webhook in ascolto su http://{self.listen}:{self.port}{self.path}")
+
+    async def stop(self):
+        self._accepting = False
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _respond(self, writer, status, body=b"", content_type="text/plain"):
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n"
+        )
+        writer.write(head.encode("ascii") + body)
+        await writer.drain()
+
+    async def _read_request(self, reader):
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        parts = request_line.split(" ")
+        if len(parts) != 3:
+            return None
+        method, target, _ = parts
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = (await reader.readline()).decode("latin-1")
+            if line in ("\r\n", "\n", ""):
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return method, target.split("?", 1)[0], headers
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(self._read_request(reader), READ_TIMEOUT_SECONDS)
+            if request is None:
+                await self._respond(writer, 400)
+                return
+            method, path, headers = request
+
+            if path == "/healthz" and method == "GET":
+                status = {"accepting": self._accepting, **self.metrics}
+                processor = self.application.update_processor
+                if hasattr(processor, "stats"):
+                    status["updates"] = processor.stats()
+                await self._respond(writer, 200, json.dumps(status).encode(), "application/json")
+                return
+            if path != self.path:
+                await self._respond(writer, 404)
+                return
+            if method != "POST":
+                await self._respond(writer, 405)
+                return
+            if not self._accepting:
+                await self._respond(writer, 503)
+                return
+            if self.secret_token and headers.get(SECRET_HEADER) != self.secret_token:
+                self.metrics["rejected"] += 1
+                await self._respond(writer, 403)
+                return
+
+            length = int(headers.get("content-length") or 0)
+            if length <= 0 or length > MAX_BODY_BYTES:
+                await self._respond(writer, 413 if length > MAX_BODY_BYTES else 400)
+                return
+            body = await asyncio.wait_for(reader.readexactly(length), READ_TIMEOUT_SECONDS)
+
+            try:
+                update = Update.de_json(json.loads(body), self.application.bot)
+            except (ValueError, TypeError, KeyError) as e:
+                self.metrics["invalid"] += 1
+                logger.warning(f"Webhook: update non valido ({type(e).__name__} - {e})")
+                await self._respond(writer, 400)
+                return
+
+            await self.application.update_queue.put(update)
+            self.metrics["received"] += 1
+            await self._respond(writer, 200)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def run_webhook(application):
+    """
+    Ciclo di vita completo in modalità webhook: initialize, post_init, start, server HTTP,
+    setWebhook (se TELEGRAM_WEBHOOK_URL), attesa del segnale di stop e shutdown ordinato.
+    """
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    server = WebhookServer(application)
+    await application.initialize()
+    # post_init/post_shutdown sono invocati automaticamente solo da run_polling/run_webhook di PTB
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+    try:
+        await server.start()
+        if TELEGRAM_WEBHOOK_URL:
+            await application.bot.set_webhook(
+                url=TELEGRAM_WEBHOOK_URL,
+                secret_token=TELEGRAM_WEBHOOK_SECRET or None,
+                allowed_updates=Update.ALL_TYPES,
+            )
+            logger.info(f"Webhook registrato su {TELEGRAM_WEBHOOK_URL}")
+        else:
+            logger.info("TELEGRAM_WEBHOOK_URL non impostato: webhook non registrato (modalità locale).")
+
+        await stop_event.wait()
+        logger.info("Arresto del bot: chiusura del server webhook...")
+    finally:
+        await server.stop()
+        # stop() elabora gli update ancora in coda, shutdown() attende quelli in corso
+        await application.stop()
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+        logger.info("Bot arrestato.")
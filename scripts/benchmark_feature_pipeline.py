@@ -0,0 +1,104 @@
+"""
+benchmark_feature_pipeline.py
+
+Benchmarks the per-collection feature engineering of build_feature_dataframe:
+the original per-group loop (_compute_features_per_group) against the
+vectorized implementation (_compute_features_vectorized), and checks that
+both produce exactly the same dataframe (values, dtypes, row and column order).
+
+Usage:
+    python scripts/benchmark_feature_pipeline.py [--lookback-days 280] [--min-days 60] [--runs 3]
+    python scripts/benchmark_feature_pipeline.py --synthetic 2000 --days 900
+
+Without --synthetic the price rows are loaded from the configured database,
+exactly as build_feature_dataframe does. Exits with code 1 if the outputs differ.
+"""
+
+import argparse
+import logging
+import statistics
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from app.config.logging_config import setup_logging
+from app.database.db_connection import get_db_connection
+from app.database.compact_schema import latest_history_date
+from app.ml.feature_pipeline import (
+    _load_price_data,
+    _compute_features_per_group,
+    _compute_features_vectorized,
+)
+from tests.synthetic_data import synthetic_price_data
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Benchmark per-group vs vectorized feature engineering")
+    p.add_argument("--lookback-days", type=int, default=None, help="Load only the last N days (predict-only mode)")
+    p.add_argument("--min-days",      type=int, default=60,   help="Min price days required per collection (default: 60)")
+    p.add_argument("--max-fill-gap",  type=int, default=7)
+    p.add_argument("--runs",          type=int, default=3,    help="Timed runs per implementation (median reported)")
+    p.add_argument("--synthetic",     type=int, default=None, help="Use N synthetic collections instead of the DB")
+    p.add_argument("--days",          type=int, default=730,  help="Days per synthetic collection (default: 730)")
+    p.add_argument("--seed",          type=int, default=0)
+    return p.parse_args()
+
+
+def load_price_data(args) -> pd.DataFrame:
+    if args.synthetic:
+        return synthetic_price_data(args.synthetic, args.days, args.seed)
+    conn = get_db_connection()
+    try:
+        since_date = None
+        if args.lookback_days is not None:
+            max_db_date = pd.to_datetime(latest_history_date(conn))
+            since_date = (max_db_date - pd.Timedelta(days=args.lookback_days)).strftime("%Y-%m-%d")
+        price_df = _load_price_data(conn, since_date=since_date)
+    finally:
+        conn.close()
+    # Same min_days filter as build_feature_dataframe
+    counts = price_df.groupby(["collection_identifier", "chain"]).size()
+    valid = counts[counts >= args.min_days].index
+    keys = price_df.set_index(["collection_identifier", "chain"]).index
+    return price_df[keys.isin(valid)].reset_index(drop=True)
+
+
+def time_runs(fn, price_df, args):
+    timings = []
+    result = None
+    for _ in range(max(args.runs, 1)):
+        t0 = time.perf_counter()
+        result = fn(price_df, max_fill_gap=args.max_fill_gap, last_row_only=args.lookback_days is not None)
+        timings.append(time.perf_counter() - t0)
+    return result, statistics.median(timings)
+
+
+def main():
+    setup_logging()
+    args = parse_args()
+
+    price_df = load_price_data(args)
+    n_groups = price_df.groupby(["collection_identifier", "chain"]).ngroups
+    logging.info("Price rows: %d | collections: %d", len(price_df), n_groups)
+
+    (per_group_df, per_group_skipped), per_group_s = time_runs(_compute_features_per_group, price_df, args)
+    logging.info("Per-group loop : %.3f s (median of %d)", per_group_s, args.runs)
+    (vector_df, vector_skipped), vector_s = time_runs(_compute_features_vectorized, price_df, args)
+    logging.info("Vectorized     : %.3f s (median of %d)", vector_s, args.runs)
+    logging.info("Speed-up       : %.1fx", per_group_s / vector_s if vector_s else float("inf"))
+
+    try:
+        pd.testing.assert_frame_equal(per_group_df, vector_df, check_exact=True)
+        assert per_group_skipped == vector_skipped, (per_group_skipped, vector_skipped)
+    except AssertionError as e:
+        logging.error("Outputs differ: %s", e)
+        sys.exit(1)
+    logging.info("Outputs identical: %d rows x %d columns.", *vector_df.shape)
+
+
+if __name__ == "__main__":
+    main()
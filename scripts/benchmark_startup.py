@@ -0,0 +1,131 @@
+"""
+Benchmark del tempo di avvio (import) del bot e degli script di cron, con budget.
+
+Per ogni modulo misurato lancia `python -X importtime -c "import <modulo>"` in un processo
+nuovo (ripetuto --runs volte, si tiene la mediana) e riporta:
+  - il tempo cumulativo di import del modulo
+  - gli import più costosi (tempo proprio)
+  - i moduli pesanti (numpy, matplotlib, scipy, pandas, ...) caricati all'avvio, che
+    devono invece essere importati solo al primo uso
+
+Esce con codice 1 se un modulo supera il budget o carica un modulo pesante vietato:
+da usare come controllo prima di un deploy o dopo aver aggiunto import.
+
+Uso:
+    python scripts/benchmark_startup.py [--runs 5] [--budget-scale 1.0] [--top 10]
+    python scripts/benchmark_startup.py --module app.telegram.telegram_bot
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from app.config.logging_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("numpy", "matplotlib", "scipy", "pandas", "xgboost", "sklearn", "PIL")
+
+# modulo → (budget in ms, moduli che non deve caricare all'avvio)
+STARTUP_BUDGETS = {
+    # telegram e httpx sono necessari al bot; grafici e numpy solo alla prima richiesta
+    "app.telegram.telegram_bot": (900, HEAVY_MODULES),
+    "app.telegram.utils.telegram_notifier": (150, HEAVY_MODULES + ("httpx",)),
+    "app.data_import.import_api": (300, HEAVY_MODULES + ("httpx",)),
+    "app.data_import.import_csv": (300, HEAVY_MODULES + ("httpx",)),
+    "app.database.archive_logic": (200, HEAVY_MODULES + ("httpx",)),
+    "app.golden_cross.golden_cross_calculator": (200, HEAVY_MODULES + ("httpx",)),
+}
+
+
+def measure_import(module, cwd=None):
+    """
+    Importa il modulo in un interprete nuovo con -X importtime.
+    Il processo gira in 'cwd' (di default una directory temporanea), così i file
+    creati all'import, come il log di import_csv, non finiscono nella root del repo.
+    Ritorna (ms cumulativi del modulo, {nome: (self_us, cumulative_us)}).
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    if cwd is None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            return measure_import(module, cwd=tmp_dir)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        errors = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"Import di {module} fallito: {errors[-1] if errors else proc.returncode}")
+
+    imports = {}
+    for line in proc.stderr.splitlines():
+        # "import time:       self [us] |  cumulative | imported package"
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        imports[name.strip()] = (int(self_us), int(cumulative_us))
+    total_us = imports.get(module, (0, 0))[1]
+    return total_us / 1000, imports
+
+
+def check_module(module, budget_ms, forbidden, runs, top):
+    """Misura il modulo, stampa il report e ritorna True se rispetta budget e divieti."""
+    timings = []
+    imports = {}
+    for _ in range(runs):
+        total_ms, imports = measure_import(module)
+        timings.append(total_ms)
+    median_ms = statistics.median(timings)
+
+    loaded_heavy = sorted(
+        name for name in forbidden
+        if name in imports or any(n.startswith(name + ".") for n in imports)
+    )
+    within_budget = median_ms <= budget_ms
+    status = "OK" if within_budget and not loaded_heavy else "FAIL"
+    logger.info(f"[{status}] {module}: {median_ms:.0f} ms (budget {budget_ms:.0f} ms, {runs} run)")
+    if loaded_heavy:
+        logger.info(f"    moduli pesanti caricati all'avvio: {', '.join(loaded_heavy)}")
+
+    slowest = sorted(imports.items(), key=lambda item: item[1][0], reverse=True)[:top]
+    for name, (self_us, cumulative_us) in slowest:
+        logger.info(f"    {self_us / 1000:8.1f} ms self {cumulative_us / 1000:8.1f} ms cum  {name}")
+    return within_budget and not loaded_heavy
+
+
+def main():
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Benchmark del tempo di import con budget")
+    parser.add_argument("--module", action="append", help="Modulo da misurare (ripetibile; default: tutti)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Import più lenti da mostrare")
+    parser.add_argument("--budget-scale", type=float, default=1.0,
+                        help="Moltiplicatore dei budget (es. 2 su macchine lente)")
+    args = parser.parse_args()
+
+    modules = args.module or list(STARTUP_BUDGETS)
+    failed = []
+    for module in modules:
+        budget_ms, forbidden = STARTUP_BUDGETS.get(module, (STARTUP_BUDGETS["app.telegram.telegram_bot"][0], HEAVY_MODULES))
+        try:
+            ok = check_module(module, budget_ms * args.budget_scale, forbidden, max(args.runs, 1), args.top)
+        except RuntimeError as e:
+            logger.error(str(e))
+            ok = False
+        if not ok:
+            failed.append(module)
+
+    if failed:
+        logger.error(f"Budget di avvio non rispettato: {', '.join(failed)}")
+        raise SystemExit(1)
+    logger.info("Tutti i moduli rispettano il budget di avvio.")
+
+
+if __name__ == "__main__":
+    main()
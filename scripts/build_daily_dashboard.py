@@ -0,0 +1,48 @@
+"""
+Ricostruisce la snapshot giornaliera della dashboard di mercato (tabella daily_dashboard).
+
+Da lanciare dopo l'import giornaliero e di nuovo dopo golden cross e segnali ML (la
+ricostruzione di una data sostituisce le sue righe). Il comando /dashboard del bot legge
+solo questa tabella.
+
+Uso:
+    python scripts/build_daily_dashboard.py [--date YYYY-MM-DD] [--top-n 5]
+"""
+
+import argparse
+import logging
+import time
+
+from app.config.logging_config import setup_logging
+from app.database.db_connection import get_db_connection
+from app.database.dashboard import build_daily_dashboard, DASHBOARD_TOP_N
+
+
+def main():
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Snapshot giornaliera della dashboard di mercato")
+    parser.add_argument("--date", default=None, help="Data della snapshot (default: ultimo giorno importato)")
+    parser.add_argument("--top-n", type=int, default=DASHBOARD_TOP_N)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    conn = get_db_connection()
+    try:
+        snapshot_date, sections = build_daily_dashboard(conn, args.date, top_n=args.top_n)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Costruzione della dashboard fallita: {e}")
+        raise
+    finally:
+        conn.close()
+
+    if snapshot_date is None:
+        logging.info("Storico vuoto: nessuna dashboard generata.")
+        return
+    counts = ", ".join(f"{section} {len(rows)}" for section, rows in sections.items())
+    logging.info(f"Dashboard del {snapshot_date} generata in {time.perf_counter() - t0:.2f}s ({counts}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,13 +10,34 @@ What it does:
   3. Sends a Telegram notification with top BUY signals to the monitoring chat
 
 Usage:
-    python scripts/daily_ml_run.py [--skip-train] [--dry-run]
+    python scripts/daily_ml_run.py [--skip-train] [--dry-run] [--rebuild-features] [--external-memory]
+                                   [--incremental] [--feature-store]
 
 Flags:
     --skip-train   Use the existing saved model instead of retraining.
                    Useful if you only want the daily prediction without the
                    cost of a full retrain (e.g. run retrain weekly via cron).
     --dry-run      Run the full pipeline but skip the Telegram notification.
+    --rebuild-features
+                   Recompute the whole feature store from full history.
+    --no-feature-store
+                   Build features from raw prices (build_feature_dataframe)
+                   instead of the incremental feature store.
+    --feature-store
+                   With --skip-train, read the prediction rows from the
+                   feature store (updated first) instead of the 280-day
+                   lookback. Off by default: on an empty or outdated store the
+                   update processes the full price history.
+    --external-memory
+                   Retrain out of core from feature store partitions
+                   (app/ml/external_training.py): only the prediction rows are
+                   loaded in memory, so a full retrain fits on the server.
+    --incremental  Instead of retraining from scratch, update the saved model
+                   on the last ML_UPDATE_WINDOW_DAYS of labeled rows (new trees
+                   or refreshed leaf values, ML_UPDATE_MODE). Falls back to a
+                   full retrain every ML_FULL_RETRAIN_DAYS, on drift (holdout
+                   loss above the last full retrain's by ML_DRIFT_TOLERANCE)
+                   or when the update does worse than the previous model.
 
 Configuration (read from .env):
     ML_HORIZON          Forward return horizon in days  (default: 14)
@@ -26,6 +47,15 @@ Configuration (read from .env):
     ML_LABEL            'binary' or '3class'            (default: binary)
     ML_MIN_DAYS         Min price days per collection   (default: 60)
     ML_MODEL_PATH       Path to save/load .pkl model    (default: data/ml_model.pkl)
+    ML_FEATURE_STORE_PATH  Feature store SQLite file    (default: data/ml_feature_store.sqlite3)
+    ML_MEMORY_BUDGET_MB    Fail when peak RSS exceeds it (default: 0 = no limit)
+    ML_TRAIN_PARTITION_COLLECTIONS  Collections per partition with --external-memory (default: 200)
+    ML_TRAIN_WORK_DIR      Partition files directory with --external-memory (default: data)
+    ML_UPDATE_MODE         'trees' or 'refresh' with --incremental (default: trees)
+    ML_UPDATE_TREES        Max trees added per update          (default: 20)
+    ML_UPDATE_WINDOW_DAYS  Recent labeled days per update      (default: 90)
+    ML_FULL_RETRAIN_DAYS   Full retrain at least every N days  (default: 7)
+    ML_DRIFT_TOLERANCE     Relative holdout loss increase treated as drift (default: 0.10)
 """
 
 import argparse
@@ -43,15 +73,26 @@ from app.config.config import load_config
 from app.config.logging_config import setup_logging
 from app.database.database import create_tables_if_not_exist
 from app.database.db_connection import get_db_connection
+from app.ml.external_training import train_final_model_external
 from app.ml.feature_pipeline import build_feature_dataframe
+from app.ml.feature_store import (
+    get_feature_store_connection,
+    load_feature_dataframe,
+    update_feature_store,
+)
 from app.ml.label_generator import add_labels
+from app.ml.memory import log_memory
 from app.ml.model import (
     DEFAULT_MODEL_PATH,
+    ML_UPDATE_WINDOW_DAYS,
+    full_train_info,
     load_model,
+    load_train_info,
     predict_signals,
     save_model,
     train_final_model,
     walk_forward_cv,
+    warm_start_update,
 )
 from app.telegram.utils.telegram_notifier import send_telegram_message, get_monitoring_chat_id
 
@@ -186,6 +227,51 @@ def _save_signals_to_db(signals, ml_cfg: dict) -> int:
         conn.close()
 
 
+def _warm_start_update(df, args, ml_cfg: dict, label_col: str):
+    """
+    --incremental: update the saved model on recent labeled rows (warm_start_update).
+    Returns (model, feature_names), or None when a full retrain is needed.
+    """
+    try:
+        model, feature_names = load_model(ml_cfg["model_path"])
+    except FileNotFoundError:
+        logging.info("[2/4] No saved model to update — full retrain.")
+        return None
+
+    if args.external_memory:
+        # df holds only the prediction rows: read the update window from the
+        # store, with room for the label horizon and the X sentiment forward-fill
+        conn = get_db_connection()
+        store_conn = get_feature_store_connection()
+        try:
+            recent_df = load_feature_dataframe(
+                conn, store_conn, min_days=ml_cfg["min_days"],
+                recent_days=ML_UPDATE_WINDOW_DAYS + ml_cfg["horizon"] + 45,
+            )
+        finally:
+            store_conn.close()
+            conn.close()
+        recent_df = add_labels(
+            recent_df,
+            horizon_days=ml_cfg["horizon"],
+            buy_threshold=ml_cfg["threshold"],
+            sell_threshold=ml_cfg["threshold"],
+        )
+    else:
+        recent_df = df
+
+    updated, train_info, reason = warm_start_update(
+        model, feature_names, load_train_info(ml_cfg["model_path"]), recent_df, label_col=label_col,
+    )
+    if updated is None:
+        logging.info("[2/4] Full retrain instead of warm-start update: %s", reason)
+        return None
+    log_memory("model updated")
+    save_model(updated, feature_names, path=ml_cfg["model_path"], train_info=train_info)
+    logging.info("[2/4] Model %s, saved to %s", reason, ml_cfg["model_path"])
+    return updated, feature_names
+
+
 async def _notify(message: str, chat_id: str):
     await send_telegram_message(message, chat_id, parse_mode="HTML")
 
@@ -206,7 +292,22 @@ def parse_args():
                    help="Don't send Telegram notification")
     p.add_argument("--with-cv", action="store_true",
                    help="Run walk-forward CV during training (slower but informative)")
-    return p.parse_args()
+    p.add_argument("--rebuild-features", action="store_true",
+                   help="Recompute the whole feature store from full history")
+    p.add_argument("--no-feature-store", action="store_true",
+                   help="Build features from raw prices instead of the feature store")
+    p.add_argument("--feature-store", action="store_true",
+                   help="With --skip-train, use the feature store instead of the 280-day lookback")
+    p.add_argument("--external-memory", action="store_true",
+                   help="Retrain out of core from feature store partitions")
+    p.add_argument("--incremental", action="store_true",
+                   help="Warm-start update of the saved model; full retrain weekly or on drift")
+    args = p.parse_args()
+    if args.external_memory and args.no_feature_store:
+        p.error("--external-memory reads the feature store: drop --no-feature-store")
+    if args.feature_store and args.no_feature_store:
+        p.error("--feature-store and --no-feature-store are mutually exclusive")
+    return args
 
 
 def main():
@@ -223,25 +324,42 @@ def main():
     logging.info("=" * 60)
 
     # ── Step 1: Build feature dataframe ─────────────────────────
-    # In prediction-only mode (--skip-train), load just the last 280 calendar
-    # days per collection. This cuts peak RAM from ~1.8 GB to ~250 MB, making
-    # the script safe on servers with <1 GB RAM.
-    # In training mode, load full history so labels can be computed.
-    lookback = 280 if args.skip_train else None
+    # In training mode the per-collection features come from the incremental
+    # feature store by default: only the newly imported dates are computed (from
+    # a trailing window), collections whose history changed are recomputed in full.
+    # In prediction-only mode (--skip-train) just the last 280 calendar days are
+    # loaded from raw prices. This cuts peak RAM from ~1.8 GB to ~250 MB, making
+    # the script safe on servers with <1 GB RAM. The store is used there only on
+    # request (--feature-store): bringing an empty or outdated store up to date
+    # processes the full history.
+    # In training mode, load full history so labels can be computed, unless
+    # training runs out of core (--external-memory) from the store partitions.
+    lookback = 280 if args.skip_train or args.external_memory else None
     pred_min_days = 20  # in prediction mode allow recently-listed collections
+    min_days = pred_min_days if lookback else ml_cfg["min_days"]
+    use_store = not args.no_feature_store and (
+        not args.skip_train or args.feature_store or args.external_memory
+    )
 
     try:
         logging.info(
-            "[1/4] Building feature dataframe (mode=%s) ...",
+            "[1/4] Building feature dataframe (mode=%s, source=%s) ...",
             "predict-only (280d lookback)" if lookback else "full-history (training)",
+            "feature store" if use_store else "raw prices",
         )
         conn = get_db_connection()
-        df = build_feature_dataframe(
-            conn,
-            min_days=pred_min_days if lookback else ml_cfg["min_days"],
-            lookback_days=lookback,
-        )
-        conn.close()
+        try:
+            if not use_store:
+                df = build_feature_dataframe(conn, min_days=min_days, lookback_days=lookback)
+            else:
+                store_conn = get_feature_store_connection()
+                try:
+                    update_feature_store(conn, store_conn, rebuild=args.rebuild_features)
+                    df = load_feature_dataframe(conn, store_conn, min_days=min_days, lookback_days=lookback)
+                finally:
+                    store_conn.close()
+        finally:
+            conn.close()
 
         if df.empty:
             raise RuntimeError("Feature dataframe is empty.")
@@ -269,26 +387,56 @@ def main():
 
     if not args.skip_train:
         try:
-            df_labeled = add_labels(
-                df,
-                horizon_days=ml_cfg["horizon"],
-                buy_threshold=ml_cfg["threshold"],
-                sell_threshold=ml_cfg["threshold"],
-            )
-
-            if args.with_cv:
-                logging.info("[2/4] Running walk-forward CV ...")
-                cv = walk_forward_cv(df_labeled, label_col=label_col, n_splits=4)
-                if cv:
-                    logging.info(
-                        "[2/4] CV: Precision=%.3f Recall=%.3f AUC=%.3f",
-                        cv["mean_precision"], cv["mean_recall"], cv["mean_auc"],
+            if not args.external_memory:
+                # Labels are added to the same frame (no second copy kept for prediction)
+                df = add_labels(
+                    df,
+                    horizon_days=ml_cfg["horizon"],
+                    buy_threshold=ml_cfg["threshold"],
+                    sell_threshold=ml_cfg["threshold"],
+                )
+                log_memory("labels added", df)
+
+            trained = _warm_start_update(df, args, ml_cfg, label_col) if args.incremental else None
+            if trained:
+                model, feature_names = trained
+            elif args.external_memory:
+                if args.with_cv:
+                    logging.warning("[2/4] Walk-forward CV is not available with --external-memory, skipped.")
+                logging.info("[2/4] Training final model out of core ...")
+                conn = get_db_connection()
+                store_conn = get_feature_store_connection()
+                try:
+                    model, feature_names = train_final_model_external(
+                        conn, store_conn,
+                        label_col=label_col,
+                        horizon_days=ml_cfg["horizon"],
+                        buy_threshold=ml_cfg["threshold"],
+                        sell_threshold=ml_cfg["threshold"],
+                        min_days=ml_cfg["min_days"],
                     )
-
-            logging.info("[2/4] Training final model ...")
-            model, feature_names = train_final_model(df_labeled, label_col=label_col)
-            save_model(model, feature_names, path=ml_cfg["model_path"])
-            logging.info("[2/4] Model saved to %s", ml_cfg["model_path"])
+                finally:
+                    store_conn.close()
+                    conn.close()
+            else:
+                if args.with_cv:
+                    logging.info("[2/4] Running walk-forward CV ...")
+                    cv = walk_forward_cv(df, label_col=label_col, n_splits=4)
+                    if cv:
+                        logging.info(
+                            "[2/4] CV: Precision=%.3f Recall=%.3f AUC=%.3f",
+                            cv["mean_precision"], cv["mean_recall"], cv["mean_auc"],
+                        )
+
+                logging.info("[2/4] Training final model ...")
+                model, feature_names = train_final_model(df, label_col=label_col)
+
+            if not trained:
+                log_memory("model trained")
+                # Out of core, df holds no labels: the first update records the baseline
+                train_info = full_train_info(model, None if args.external_memory else df, label_col=label_col)
+                save_model(model, feature_names, path=ml_cfg["model_path"], train_info=train_info)
+                logging.info("[2/4] Model saved to %s", ml_cfg["model_path"])
 
         except Exception as e:
             msg = f"[ML daily run] FAILED at training:\n{traceback.format_exc()}"
@@ -12,6 +12,7 @@ from datetime import datetime, timedelta
 from app.config.config import load_config
 from app.config.logging_config import setup_logging
 from app.database.db_connection import get_db_connection
+from app.database.canonical_collections import canonical_collections_available
 from app.telegram.utils.telegram_notifier import send_telegram_message
 import httpx
 import json
@@ -87,6 +88,8 @@ def fetch_collections_needing_update(top_n: int = 100) -> list:
     Fetch top N collections that need X sentiment update (not updated in last 30 days).
     Deduplicates by slug+chain so collections with multiple contract identifiers are
     counted as one, using the best (lowest) ranking entry as the canonical identifier.
+    When canonical_collections is available it lists each identifier's latest date,
+    so the latest rows are indexed lookups instead of a scan of historical_nft_data.
 
     Args:
         top_n: Top N rankings to consider (default 100)
@@ -97,48 +100,82 @@ def fetch_collections_needing_update(top_n: int = 100) -> list:
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    # One row per slug+chain: pick the collection_identifier with the best (lowest) ranking.
-    # Deduplicates both historical_nft_data (multiple contracts per slug) and
-    # nft_collections (duplicate rows per slug+chain).
-    cursor.execute("""
-    WITH latest_dates AS (
-        SELECT collection_identifier, chain, MAX(latest_floor_date) AS max_date
-        FROM historical_nft_data
-        GROUP BY collection_identifier, chain
-    ),
-    latest_data AS (
-        SELECT h.collection_identifier, h.slug, h.chain, h.ranking
-        FROM historical_nft_data h
-        JOIN latest_dates ld
-            ON h.collection_identifier = ld.collection_identifier
-            AND h.chain = ld.chain
-            AND h.latest_floor_date = ld.max_date
-        WHERE h.ranking <= ? AND h.ranking IS NOT NULL
-    ),
-    best_per_slug AS (
-        SELECT slug, chain, MIN(ranking) AS best_ranking
-        FROM latest_data
-        GROUP BY slug, chain
-    ),
-    canonical AS (
-        SELECT ld.collection_identifier, ld.slug, ld.chain, ld.ranking
-        FROM latest_data ld
-        JOIN best_per_slug bp
-            ON ld.slug = bp.slug AND ld.chain = bp.chain AND ld.ranking = bp.best_ranking
-        GROUP BY ld.slug, ld.chain
-    ),
-    unique_nc AS (
-        SELECT slug, chain, MAX(x_page) AS x_page
-        FROM nft_collections
-        WHERE x_page IS NOT NULL AND x_page != ''
-        GROUP BY slug, chain
-    )
-    SELECT c.collection_identifier, c.slug, c.chain, nc.x_page, c.ranking
-    FROM canonical c
-    JOIN unique_nc nc ON c.slug = nc.slug AND c.chain = nc.chain
-    ORDER BY c.ranking ASC
-    LIMIT ?
-    """, (top_n, top_n))
+    if canonical_collections_available(conn):
+        # One row per slug+chain: the collection_identifier with the best (lowest)
+        # ranking on its latest row, as below. canonical_collections lists every
+        # identifier of the slug with its last_floor_date, so each latest row is an
+        # indexed lookup on the historical_nft_data primary key.
+        cursor.execute("""
+        WITH latest_data AS (
+            SELECT cc.collection_identifier, cc.slug, cc.chain, h.ranking
+            FROM canonical_collections cc
+            JOIN historical_nft_data h
+                ON h.collection_identifier = cc.collection_identifier
+                AND h.chain = cc.chain
+                AND h.latest_floor_date = cc.last_floor_date
+            WHERE h.ranking <= ? AND h.ranking IS NOT NULL
+        ),
+        canonical AS (
+            -- SQLite: bare columns come from the row holding MIN(ranking)
+            SELECT collection_identifier, slug, chain, MIN(ranking) AS ranking
+            FROM latest_data
+            GROUP BY slug, chain
+        ),
+        unique_nc AS (
+            SELECT slug, chain, MAX(x_page) AS x_page
+            FROM nft_collections
+            WHERE x_page IS NOT NULL AND x_page != ''
+            GROUP BY slug, chain
+        )
+        SELECT c.collection_identifier, c.slug, c.chain, nc.x_page, c.ranking
+        FROM canonical c
+        JOIN unique_nc nc ON c.slug = nc.slug AND c.chain = nc.chain
+        ORDER BY c.ranking ASC
+        LIMIT ?
+        """, (top_n, top_n))
+    else:
+        # One row per slug+chain: pick the collection_identifier with the best (lowest) ranking.
+        # Deduplicates both historical_nft_data (multiple contracts per slug) and
+        # nft_collections (duplicate rows per slug+chain).
+        cursor.execute("""
+        WITH latest_dates AS (
+            SELECT collection_identifier, chain, MAX(latest_floor_date) AS max_date
+            FROM historical_nft_data
+            GROUP BY collection_identifier, chain
+        ),
+        latest_data AS (
+            SELECT h.collection_identifier, h.slug, h.chain, h.ranking
+            FROM historical_nft_data h
+            JOIN latest_dates ld
+                ON h.collection_identifier = ld.collection_identifier
+                AND h.chain = ld.chain
+                AND h.latest_floor_date = ld.max_date
+            WHERE h.ranking <= ? AND h.ranking IS NOT NULL
+        ),
+        best_per_slug AS (
+            SELECT slug, chain, MIN(ranking) AS best_ranking
+            FROM latest_data
+            GROUP BY slug, chain
+        ),
+        canonical AS (
+            SELECT ld.collection_identifier, ld.slug, ld.chain, ld.ranking
+            FROM latest_data ld
+            JOIN best_per_slug bp
+                ON ld.slug = bp.slug AND ld.chain = bp.chain AND ld.ranking = bp.best_ranking
+            GROUP BY ld.slug, ld.chain
+        ),
+        unique_nc AS (
+            SELECT slug, chain, MAX(x_page) AS x_page
+            FROM nft_collections
+            WHERE x_page IS NOT NULL AND x_page != ''
+            GROUP BY slug, chain
+        )
+        SELECT c.collection_identifier, c.slug, c.chain, nc.x_page, c.ranking
+        FROM canonical c
+        JOIN unique_nc nc ON c.slug = nc.slug AND c.chain = nc.chain
+        ORDER BY c.ranking ASC
+        LIMIT ?
+        """, (top_n, top_n))
 
     top_collections = cursor.fetchall()
     conn.close()
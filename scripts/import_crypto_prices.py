@@ -1,4 +1,3 @@
-import asyncio
 import os
 import json
 import requests
@@ -8,7 +7,7 @@ import time
 from datetime import datetime
 from app.database.database import get_db_connection
 from app.utils.helpers import extract_or_none
-from app.telegram.utils.telegram_notifier import send_telegram_message, get_monitoring_chat_id
+from app.telegram.utils.telegram_notifier import send_telegram_message_sync, get_monitoring_chat_id
 from app.telegram.utils import telegram_msg_templates # Import del modulo per i template
 
 # Configura logging per console e file
@@ -106,19 +105,19 @@ def import_crypto_data_via_api():
                 msg = f"Errore parsing JSON nel file mock {fixed_mock_file_path}: {e}"
                 print(msg)
                 logging.error(msg)
-                asyncio.run(send_telegram_message(msg, telegram_chat_id))
+                send_telegram_message_sync(msg, telegram_chat_id)
                 return
             except Exception as e:
                 msg = f"Errore generico caricamento file mock {fixed_mock_file_path}: {e}"
                 print(msg)
                 logging.error(msg)
-                asyncio.run(send_telegram_message(msg, telegram_chat_id))
+                send_telegram_message_sync(msg, telegram_chat_id)
                 return
         else:
             msg = f"Mock file non trovato: {fixed_mock_file_path}. Disabling mock mode and exiting."
             print(msg)
             logging.warning(msg)
-            asyncio.run(send_telegram_message(msg, telegram_chat_id))
+            send_telegram_message_sync(msg, telegram_chat_id)
             return
     else:
         print("Making real API calls")
@@ -136,7 +135,7 @@ def import_crypto_data_via_api():
                 msg = f"Unexpected CoinGecko response format: {json.dumps(cg_data, indent=2)}"
                 print(msg)
                 logging.error(msg)
-                asyncio.run(send_telegram_message(msg, telegram_chat_id))
+                send_telegram_message_sync(msg, telegram_chat_id)
                 return
             expected_coins = {"bitcoin", "ethereum", "solana", "binancecoin", "apecoin", "arbitrum", "optimism", "matic-network", "blast"}
             received_coins = {coin["id"] for coin in cg_data}
@@ -145,7 +144,7 @@ def import_crypto_data_via_api():
                 msg = f"Missing coins in CoinGecko response: {missing_coins}"
                 print(msg)
                 logging.warning(msg)
-                asyncio.run(send_telegram_message(msg, telegram_chat_id))
+                send_telegram_message_sync(msg, telegram_chat_id)
 
             for coin in cg_data:
                 roi = coin.get("roi", {})
@@ -201,13 +200,13 @@ def import_crypto_data_via_api():
             msg = f"Errore chiamata API: {e}"
             print(msg)
             logging.error(msg)
-            asyncio.run(send_telegram_message(msg, telegram_chat_id))
+            send_telegram_message_sync(msg, telegram_chat_id)
             return
         except Exception as e:
             msg = f"Eccezione imprevista durante chiamata API: {e}"
             print(msg)
             logging.error(msg)
-            asyncio.run(send_telegram_message(msg, telegram_chat_id))
+            send_telegram_message_sync(msg, telegram_chat_id)
             return
 
     # --- 2. Validazione e preparazione dati ---
@@ -220,7 +219,7 @@ def import_crypto_data_via_api():
         msg = f"Errore connessione al database: {e}"
         print(msg)
         logging.error(msg)
-        asyncio.run(send_telegram_message(msg, telegram_chat_id))
+        send_telegram_message_sync(msg, telegram_chat_id)
         return
 
     # Query di inserimento
@@ -306,7 +305,7 @@ def import_crypto_data_via_api():
         )
         print(f"Summary: {summary_msg}")
         if telegram_chat_id:
-            asyncio.run(send_telegram_message(summary_msg, telegram_chat_id))
+            send_telegram_message_sync(summary_msg, telegram_chat_id)
         else:
             print("No Telegram chat ID configured")
             logging.warning("No Telegram chat ID configured")
@@ -314,7 +313,7 @@ def import_crypto_data_via_api():
         msg = f"Error generating summary message: {e}"
         print(msg)
         logging.error(msg)
-        asyncio.run(send_telegram_message(msg, telegram_chat_id))
+        send_telegram_message_sync(msg, telegram_chat_id)
         summary_msg = f"Processed: {total_elements}, Inserted: {inserted_count}, Skipped: {skipped_date_mismatch}, Errors: {failed_count}, Status: {file_save_status}"
 
     print("Crypto data import completed")
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the canonical_collections table.
+
+Builds the slug -> (collection_identifier, chain) canonical mapping once from the
+full historical_nft_data table. After this run the API import keeps it up to date
+incrementally, so the ML feature pipeline and the X sentiment fetcher no longer
+need to re-run the GROUP BY / ROW_NUMBER() deduplication over the whole history.
+
+Safe to re-run: the table is rebuilt from scratch every time.
+"""
+
+import logging
+from app.config.logging_config import setup_logging
+from app.database.db_connection import get_db_connection
+from app.database.canonical_collections import rebuild_canonical_collections
+
+
+def migrate_add_canonical_collections_table():
+    """Create and populate canonical_collections."""
+
+    setup_logging()
+    logger = logging.getLogger(__name__)
+
+    conn = get_db_connection()
+    try:
+        logger.info("Building canonical_collections from historical_nft_data...")
+        total, canonical = rebuild_canonical_collections(conn, logger=logger)
+        logger.info(f"Migration completed: {total} identifiers, {canonical} canonical slugs.")
+    except Exception as e:
+        logger.error(f"Migration failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    migrate_add_canonical_collections_table()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the daily_ingest_stats rollup table.
+
+Creates the table and backfills it with one full scan of historical_nft_data and
+historical_nft_data_archive. From then on the API/CSV imports and the archive job
+keep it up to date in the same transaction as their writes, and the Telegram
+check commands read it instead of scanning the history.
+
+Usage:
+    python -m scripts.migrate_add_daily_ingest_stats_table            # create + backfill if missing
+    python -m scripts.migrate_add_daily_ingest_stats_table --rebuild  # recompute all counters
+"""
+
+import argparse
+import logging
+from app.config.logging_config import setup_logging
+from app.database.db_connection import get_db_connection
+from app.database.ingest_stats import ensure_daily_ingest_stats, rebuild_daily_ingest_stats
+
+
+def migrate_add_daily_ingest_stats_table(rebuild: bool = False):
+    """Create (and backfill) daily_ingest_stats."""
+
+    setup_logging()
+    logger = logging.getLogger(__name__)
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        if ensure_daily_ingest_stats(cursor):
+            logger.info("daily_ingest_stats created and backfilled from history.")
+        elif rebuild:
+            logger.info("Rebuilding daily_ingest_stats from history...")
+            rebuild_daily_ingest_stats(cursor)
+        else:
+            logger.info("daily_ingest_stats already exists. Use --rebuild to recompute it.")
+        conn.commit()
+
+        cursor.execute("SELECT COUNT(*), SUM(row_count) FROM daily_ingest_stats")
+        n_stats, n_rows = cursor.fetchone()
+        logger.info(f"Migration completed: {n_stats} rollup rows covering {n_rows or 0} records.")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add the daily_ingest_stats rollup table")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute all counters from history")
+    args = parser.parse_args()
+    migrate_add_daily_ingest_stats_table(rebuild=args.rebuild)
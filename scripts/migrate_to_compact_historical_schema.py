@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Migration script: move historical_nft_data to the compact integer-keyed schema.
+
+Steps (single transaction, nothing changes if any check fails):
+  1. Create dim_chain, dim_collection and nft_daily_facts (see app/database/compact_schema.py).
+  2. Populate the dimensions from the distinct (collection_identifier, chain) pairs.
+     slug / contract_address are taken from the most recent row that has them.
+     dim_collection holds one slug / contract_address per collection, so the
+     migration aborts if a collection has more than one distinct value, unless
+     --allow-metadata-conflicts is given (every row then shows the latest value).
+  3. Copy every row into nft_daily_facts with integer collection_id and day number.
+  4. Verify that the fact table holds exactly as many rows as the legacy table.
+  5. Rename the legacy table to historical_nft_data_legacy and create the
+     historical_nft_data compatibility view + INSTEAD OF triggers.
+
+Existing queries keep working through the view. The legacy table is kept for a
+manual rollback unless --drop-legacy is given (which also VACUUMs the file).
+
+Manual rollback (only before new imports have run):
+  DROP VIEW historical_nft_data;
+  ALTER TABLE historical_nft_data_legacy RENAME TO historical_nft_data;
+
+Usage:
+    python -m scripts.migrate_to_compact_historical_schema
+    python -m scripts.migrate_to_compact_historical_schema --drop-legacy
+    python -m scripts.migrate_to_compact_historical_schema --allow-metadata-conflicts
+"""
+
+import argparse
+import logging
+from app.config.logging_config import setup_logging
+from app.database.db_connection import get_db_connection
+from app.database.compact_schema import (
+    create_compact_tables,
+    create_compat_view,
+    is_compact_schema,
+    FACT_VALUE_COLUMNS,
+)
+
+LEGACY_TABLE = "historical_nft_data_legacy"
+
+COMPLETE_ROW_FILTER = """
+    collection_identifier IS NOT NULL
+    AND chain IS NOT NULL
+    AND julianday(latest_floor_date) IS NOT NULL
+"""
+
+METADATA_CONFLICTS_SQL = """
+    SELECT collection_identifier, chain,
+           COUNT(DISTINCT slug), COUNT(DISTINCT contract_address)
+    FROM historical_nft_data
+    GROUP BY collection_identifier, chain
+    HAVING COUNT(DISTINCT slug) > 1 OR COUNT(DISTINCT contract_address) > 1
+    ORDER BY collection_identifier, chain
+"""
+
+
+def migrate_to_compact_historical_schema(drop_legacy: bool = False, allow_metadata_conflicts: bool = False):
+    """Convert historical_nft_data into dimension + compact fact tables."""
+
+    setup_logging()
+    logger = logging.getLogger(__name__)
+
+    conn = get_db_connection()
+    conn.isolation_level = None  # transazione gestita esplicitamente
+    cursor = conn.cursor()
+
+    try:
+        if is_compact_schema(conn):
+            logger.info("historical_nft_data is already the compact compatibility view. Nothing to do.")
+            return
+
+        cursor.execute("SELECT COUNT(*) FROM historical_nft_data")
+        total_rows = cursor.fetchone()[0]
+        cursor.execute(f"SELECT COUNT(*) FROM historical_nft_data WHERE NOT ({COMPLETE_ROW_FILTER})")
+        incomplete_rows = cursor.fetchone()[0]
+        if incomplete_rows:
+            raise RuntimeError(
+                f"{incomplete_rows} rows have NULL collection_identifier/chain or an invalid "
+                f"latest_floor_date and cannot be keyed. Fix or archive them before migrating."
+            )
+
+        # COUNT(DISTINCT ...) ignores NULLs: only real slug/contract changes count
+        cursor.execute(METADATA_CONFLICTS_SQL)
+        conflicts = cursor.fetchall()
+        if conflicts:
+            for identifier, chain, n_slugs, n_contracts in conflicts[:10]:
+                logger.warning(
+                    f"{identifier} ({chain}): {n_slugs} distinct slugs, {n_contracts} distinct contract addresses"
+                )
+            message = (
+                f"{len(conflicts)} collections have more than one distinct slug or contract_address; "
+                f"the compact schema keeps only the latest value for all of their rows."
+            )
+            if not allow_metadata_conflicts:
+                raise RuntimeError(message + " Re-run with --allow-metadata-conflicts to accept this.")
+            logger.warning(message)
+
+        logger.info(f"Migrating {total_rows} rows from historical_nft_data...")
+
+        cursor.execute("BEGIN IMMEDIATE")
+        create_compact_tables(cursor)
+
+        logger.info("Populating dim_chain...")
+        cursor.execute("""
+            INSERT OR IGNORE INTO dim_chain (chain, chain_currency_symbol)
+            SELECT chain, MAX(chain_currency_symbol)
+            FROM historical_nft_data
+            GROUP BY chain
+        """)
+
+        logger.info("Populating dim_collection...")
+        cursor.execute("""
+            INSERT OR IGNORE INTO dim_collection (collection_identifier, chain_id, slug, contract_address)
+            SELECT
+                p.collection_identifier,
+                ch.chain_id,
+                (SELECT h.slug FROM historical_nft_data h
+                 WHERE h.collection_identifier = p.collection_identifier
+                   AND h.chain = p.chain AND h.slug IS NOT NULL
+                 ORDER BY h.latest_floor_date DESC LIMIT 1),
+                (SELECT h.contract_address FROM historical_nft_data h
+                 WHERE h.collection_identifier = p.collection_identifier
+                   AND h.chain = p.chain AND h.contract_address IS NOT NULL
+                 ORDER BY h.latest_floor_date DESC LIMIT 1)
+            FROM (
+                SELECT DISTINCT collection_identifier, chain FROM historical_nft_data
+            ) p
+            JOIN dim_chain ch ON ch.chain = p.chain
+        """)
+
+        logger.info("Populating nft_daily_facts...")
+        value_columns = ", ".join(FACT_VALUE_COLUMNS)
+        cursor.execute(f"""
+            INSERT INTO nft_daily_facts (collection_id, day, has_metadata, {value_columns})
+            SELECT
+                dc.collection_id,
+                CAST(julianday(h.latest_floor_date) - 2440587.5 AS INTEGER),
+                h.slug IS NOT NULL,
+                {", ".join("h." + col for col in FACT_VALUE_COLUMNS)}
+            FROM historical_nft_data h
+            JOIN dim_chain ch ON ch.chain = h.chain
+            JOIN dim_collection dc
+                ON dc.collection_identifier = h.collection_identifier
+               AND dc.chain_id = ch.chain_id
+        """)
+
+        cursor.execute("SELECT COUNT(*) FROM nft_daily_facts")
+        fact_rows = cursor.fetchone()[0]
+        if fact_rows != total_rows:
+            raise RuntimeError(
+                f"Row count mismatch after copy: legacy={total_rows}, facts={fact_rows}."
+            )
+
+        logger.info(f"Renaming legacy table to {LEGACY_TABLE} and creating compatibility view...")
+        cursor.execute(f"ALTER TABLE historical_nft_data RENAME TO {LEGACY_TABLE}")
+        create_compat_view(cursor)
+        cursor.execute("COMMIT")
+
+        cursor.execute("SELECT COUNT(*) FROM dim_collection")
+        n_collections = cursor.fetchone()[0]
+        logger.info(
+            f"Migration completed: {fact_rows} fact rows, {n_collections} collections."
+        )
+
+        if drop_legacy:
+            logger.info(f"Dropping {LEGACY_TABLE} and compacting the database file (VACUUM)...")
+            cursor.execute(f"DROP TABLE {LEGACY_TABLE}")
+            cursor.execute("VACUUM")
+            logger.info("Legacy table dropped.")
+
+    except Exception as e:
+        if conn.in_transaction:
+            cursor.execute("ROLLBACK")
+        logger.error(f"Migration failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate historical_nft_data to the compact schema")
+    parser.add_argument(
+        "--drop-legacy",
+        action="store_true",
+        help="Drop the renamed legacy table and VACUUM after a successful migration",
+    )
+    parser.add_argument(
+        "--allow-metadata-conflicts",
+        action="store_true",
+        help="Migrate even if a collection has several slugs/contracts, keeping the latest one",
+    )
+    args = parser.parse_args()
+    migrate_to_compact_historical_schema(
+        drop_legacy=args.drop_legacy, allow_metadata_conflicts=args.allow_metadata_conflicts
+    )
@@ -6,7 +6,7 @@ Generate buy/sell/hold signals for all tracked NFT collections using the trained
 Usage:
     python scripts/predict_ml_signals.py [--date YYYY-MM-DD] [--top-n 20]
                                           [--label binary|3class] [--model-path PATH]
-                                          [--min-confidence 0.60] [--telegram]
+                                          [--min-confidence 0.60] [--telegram] [--feature-store]
 
 Output:
     - Prints a ranked signal table to stdout
@@ -14,7 +14,6 @@ Output:
 """
 
 import argparse
-import asyncio
 import logging
 import os
 import sys
@@ -24,12 +23,17 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from app.config.logging_config import setup_logging
 from app.database.db_connection import get_db_connection
 from app.ml.feature_pipeline import build_feature_dataframe
+from app.ml.feature_store import (
+    get_feature_store_connection,
+    load_feature_dataframe,
+    update_feature_store,
+)
 from app.ml.model import (
     DEFAULT_MODEL_PATH,
     load_model,
     predict_signals,
 )
-from app.telegram.utils.telegram_notifier import send_telegram_message, get_monitoring_chat_id
+from app.telegram.utils.telegram_notifier import send_telegram_message_sync, get_monitoring_chat_id
 
 
 def parse_args():
@@ -41,6 +45,7 @@ def parse_args():
     p.add_argument("--min-confidence", type=float, default=0.55,        help="Minimum confidence to include in output (default: 0.55)")
     p.add_argument("--min-days",       type=int,   default=60,          help="Min price days required per collection (default: 60)")
     p.add_argument("--telegram",       action="store_true",             help="Send top signals to Telegram monitoring chat")
+    p.add_argument("--feature-store",  action="store_true",             help="Read features from the incremental feature store (updated first)")
     return p.parse_args()
 
 
@@ -148,7 +153,15 @@ def main():
     logging.info("Building feature dataframe ...")
     conn = get_db_connection()
     try:
-        df = build_feature_dataframe(conn, min_days=args.min_days)
+        if args.feature_store:
+            store_conn = get_feature_store_connection()
+            try:
+                update_feature_store(conn, store_conn)
+                df = load_feature_dataframe(conn, store_conn, min_days=args.min_days)
+            finally:
+                store_conn.close()
+        else:
+            df = build_feature_dataframe(conn, min_days=args.min_days)
     finally:
         conn.close()
 
@@ -179,7 +192,7 @@ def main():
         msg = _format_telegram_message(signals, top_n=args.top_n, min_confidence=args.min_confidence)
         chat_id = get_monitoring_chat_id()
         logging.info("Sending signals to Telegram chat %s ...", chat_id)
-        asyncio.run(send_telegram_message(msg, chat_id, parse_mode="HTML"))
+        send_telegram_message_sync(msg, chat_id, parse_mode="HTML")
         logging.info("Telegram message sent.")
 
     logging.info("Prediction complete.")
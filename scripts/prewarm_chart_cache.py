@@ -0,0 +1,88 @@
+"""
+Pre-warm della cache dei grafici per le collezioni con ranking migliore.
+
+Da lanciare dopo l'import giornaliero (e dopo il refresh della replica di lettura):
+genera i grafici native per le prime CHART_CACHE_PREWARM_TOP_N collezioni e per gli
+intervalli CHART_CACHE_PREWARM_DAYS, scrivendoli nella cache su disco condivisa con il bot.
+
+Uso:
+    python scripts/prewarm_chart_cache.py [--top-n 20] [--days 30,90,365]
+"""
+
+import argparse
+import logging
+import time
+
+from app.config.config import load_config
+from app.config.logging_config import setup_logging
+from app.database.read_replica import get_read_connection
+from app.database.compact_schema import latest_history_date
+from app.telegram.utils.chart_cache import chart_cache, chart_cache_key
+from app.telegram.utils.chart_service import (
+    resolve_chart_source, render_chart_job, STATUS_OK
+)
+
+FIELD = "floor_native"
+
+
+def top_ranked_slugs(top_n):
+    """Slug delle top_n collezioni per ranking nell'ultimo giorno importato."""
+    conn = get_read_connection()
+    try:
+        latest = latest_history_date(conn)
+        if latest is None:
+            return []
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT slug, MIN(ranking) AS best_rank
+            FROM historical_nft_data
+            WHERE latest_floor_date = ? AND slug IS NOT NULL AND ranking IS NOT NULL
+            GROUP BY slug
+            ORDER BY best_rank ASC
+            LIMIT ?
+            """,
+            (latest, top_n),
+        )
+        return [row[0] for row in cur.fetchall()]
+    finally:
+        conn.close()
+
+
+def prewarm_chart_cache(top_n, days_list):
+    slugs = top_ranked_slugs(top_n)
+    logging.info(f"Pre-warm chart cache: {len(slugs)} collezioni x {len(days_list)} intervalli.")
+    rendered = cached = failed = 0
+    t0 = time.perf_counter()
+    for slug in slugs:
+        source = resolve_chart_source(slug)
+        if source is None:
+            continue
+        for days in days_list:
+            key = chart_cache_key(source["collection_identifier"], FIELD, days, source["latest_floor_date"])
+            if chart_cache.get(key) is not None:
+                cached += 1
+                continue
+            try:
+                result = render_chart_job(slug, FIELD, days, source)
+            except Exception as e:
+                failed += 1
+                logging.error(f"Pre-warm fallito per {slug} ({days}d): {type(e).__name__} - {e}")
+                continue
+            if result["status"] == STATUS_OK:
+                chart_cache.put(key, result)
+                rendered += 1
+    logging.info(
+        f"Pre-warm completato in {time.perf_counter() - t0:.1f}s: "
+        f"{rendered} generati, {cached} già in cache, {failed} errori."
+    )
+
+
+if __name__ == "__main__":
+    setup_logging()
+    config = load_config()
+    parser = argparse.ArgumentParser(description="Pre-warm della cache dei grafici")
+    parser.add_argument("--top-n", type=int, default=int(config.get("CHART_CACHE_PREWARM_TOP_N") or 20))
+    parser.add_argument("--days", type=str, default=config.get("CHART_CACHE_PREWARM_DAYS") or "30,90,365")
+    args = parser.parse_args()
+    prewarm_chart_cache(args.top_n, [int(d) for d in args.days.split(",") if d.strip()])
@@ -0,0 +1,19 @@
+from app.config.logging_config import setup_logging
+from app.database.read_replica import refresh_read_replica, read_replica_enabled, DB_READ_REPLICA_PATH
+import logging
+
+def main():
+    """
+    Aggiorna la replica di lettura del bot (DB_READ_REPLICA_PATH) con la backup API.
+    Da lanciare dopo i job batch che scrivono sul database (cron).
+    """
+    setup_logging()
+    if not read_replica_enabled():
+        logging.info("DB_READ_REPLICA_PATH non impostato: replica di lettura disattivata.")
+        return
+    logging.info(f"Aggiornamento replica di lettura {DB_READ_REPLICA_PATH}...")
+    if not refresh_read_replica():
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Invia update Telegram registrati al bot in modalità webhook, per i test in locale.
+
+Il file può contenere un singolo update JSON, una lista di update oppure un update per
+riga (JSONL), ad esempio copiati dall'output di getUpdates. Gli update vengono inviati con
+l'header del secret token configurato; con --concurrency > 1 vengono inviati in parallelo
+(l'ordine per utente è comunque garantito dal bot solo per gli update già ricevuti).
+
+Uso:
+    TELEGRAM_BOT_MODE=webhook python scripts/run_telegram_bot.py
+    python scripts/replay_telegram_updates.py updates.json [--concurrency 8] [--repeat 1]
+"""
+
+import argparse
+import json
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from app.config.logging_config import setup_logging
+from app.telegram.webhook_server import (
+    TELEGRAM_WEBHOOK_LISTEN, TELEGRAM_WEBHOOK_PORT, TELEGRAM_WEBHOOK_PATH, TELEGRAM_WEBHOOK_SECRET
+)
+
+logger = logging.getLogger(__name__)
+
+
+def load_updates(path):
+    """Update dal file: oggetto singolo, lista JSON o JSONL."""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read().strip()
+    if not text:
+        return []
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(data, dict) and "result" in data:
+        data = data["result"]  # risposta completa di getUpdates
+    return data if isinstance(data, list) else [data]
+
+
+def post_update(url, update, secret):
+    headers = {"Content-Type": "application/json"}
+    if secret:
+        headers["X-Telegram-Bot-Api-Secret-Token"] = secret
+    t0 = time.perf_counter()
+    try:
+        response = requests.post(url, data=json.dumps(update), headers=headers, timeout=30)
+        status = response.status_code
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Invio update {update.get('update_id')} fallito: {e}")
+        status = "error"
+    return status, (time.perf_counter() - t0) * 1000
+
+
+def main():
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Replay di update Telegram verso il webhook locale")
+    parser.add_argument("file", help="File JSON/JSONL con gli update")
+    parser.add_argument(
+        "--url",
+        default=f"http://{TELEGRAM_WEBHOOK_LISTEN}:{TELEGRAM_WEBHOOK_PORT}{TELEGRAM_WEBHOOK_PATH}",
+    )
+    parser.add_argument("--secret", default=TELEGRAM_WEBHOOK_SECRET)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1, help="Ripete l'intero file N volte")
+    args = parser.parse_args()
+
+    updates = load_updates(args.file) * max(args.repeat, 1)
+    if not updates:
+        logger.info("Nessun update da inviare.")
+        return
+
+    logger.info(f"Invio {len(updates)} update a {args.url} (concorrenza {args.concurrency})...")
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(args.concurrency, 1)) as executor:
+        results = list(executor.map(lambda u: post_update(args.url, u, args.secret), updates))
+    elapsed = time.perf_counter() - t0
+
+    statuses = Counter(status for status, _ in results)
+    latencies = sorted(ms for _, ms in results)
+    p95 = latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
+    logger.info(
+        f"Completato in {elapsed:.2f}s: esiti {dict(statuses)}, "
+        f"latenza media {sum(latencies) / len(latencies):.1f} ms, p95 {p95:.1f} ms."
+    )
+    if any(status != 200 for status in statuses):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,9 @@ End-to-end training pipeline for the NFT buy/sell signal model.
 
 Usage:
     python scripts/train_ml_model.py [--horizon 14] [--threshold 0.10] [--min-days 60]
-                                     [--label binary|3class] [--no-cv] [--model-path PATH]
+                                     [--label binary|3class] [--no-cv] [--cv-threads N]
+                                     [--model-path PATH]
+                                     [--feature-store] [--external-memory]
 
 Steps:
     1. Build feature dataframe from DB
@@ -14,23 +16,42 @@ Steps:
     4. Train final model on all data
     5. Print SHAP feature importance
     6. Save model to disk
+
+With --external-memory (implies --feature-store) steps 1, 2 and 4 run out of
+core: labeled partitions of collections are written to disk and streamed into
+XGBoost (app/ml/external_training.py), so the full frame is never in RAM.
+Walk-forward CV needs the full frame and is skipped in this mode.
 """
 
 import argparse
 import logging
 import sys
 import os
+import tempfile
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.config.logging_config import setup_logging
 from app.database.db_connection import get_db_connection
 from app.ml.feature_pipeline import build_feature_dataframe
+from app.ml.external_training import (
+    ML_TRAIN_WORK_DIR,
+    sample_partitions,
+    train_from_partitions,
+    write_training_partitions,
+)
+from app.ml.feature_store import (
+    get_feature_store_connection,
+    load_feature_dataframe,
+    update_feature_store,
+)
 from app.ml.label_generator import add_labels
+from app.ml.memory import log_memory
 from app.ml.model import (
     walk_forward_cv,
     train_final_model,
     compute_shap_importance,
+    full_train_info,
     prepare_dataset,
     save_model,
     DEFAULT_MODEL_PATH,
@@ -46,10 +67,55 @@ def parse_args():
                    help="Label type: binary (BUY/not-BUY) or 3class (BUY/HOLD/SELL)")
     p.add_argument("--no-cv",       action="store_true",     help="Skip walk-forward CV (faster)")
     p.add_argument("--cv-splits",   type=int,   default=5,   help="Number of walk-forward CV folds (default: 5)")
+    p.add_argument("--cv-threads",  type=int,   default=None,
+                   help="Total threads for the parallel CV folds (default: ML_CV_THREADS or all cores)")
     p.add_argument("--model-path",  type=str,   default=DEFAULT_MODEL_PATH, help="Where to save the trained model")
+    p.add_argument("--feature-store", action="store_true",  help="Read features from the incremental feature store (updated first)")
+    p.add_argument("--external-memory", action="store_true",
+                   help="Train out of core from feature store partitions (no CV)")
     return p.parse_args()
 
 
+def train_external(args, label_col: str):
+    """Steps 1-6 with partitioned, out-of-core training (--external-memory)."""
+    if not args.no_cv:
+        logging.warning("Walk-forward CV needs the full frame: skipped with --external-memory.")
+    os.makedirs(ML_TRAIN_WORK_DIR, exist_ok=True)
+    conn = get_db_connection()
+    store_conn = get_feature_store_connection()
+    try:
+        update_feature_store(conn, store_conn)
+        with tempfile.TemporaryDirectory(prefix="ml_train_", dir=ML_TRAIN_WORK_DIR) as work_dir:
+            manifest = write_training_partitions(
+                conn, store_conn, work_dir,
+                label_col=label_col,
+                horizon_days=args.horizon,
+                buy_threshold=args.threshold,
+                sell_threshold=args.threshold,
+                min_days=args.min_days,
+            )
+            if manifest["n_rows"] < 200:
+                logging.error("Too few labeled rows (%d). Need at least 200. Aborting.", manifest["n_rows"])
+                sys.exit(1)
+
+            model = train_from_partitions(manifest, label_col=label_col)
+            feature_names = manifest["feature_names"]
+            log_memory("model trained")
+
+            X_sample = sample_partitions(manifest, 2000)
+    finally:
+        store_conn.close()
+        conn.close()
+
+    logging.info("Computing SHAP feature importance (sample=%d) ...", len(X_sample))
+    importance = compute_shap_importance(model, X_sample, top_n=len(feature_names))
+    logging.info("\nTop 15 Features by SHAP Importance:")
+    logging.info("\n%s", importance.head(15).to_string(index=False))
+
+    save_model(model, feature_names, path=args.model_path, train_info=full_train_info(model))
+    logging.info("Training complete. Model saved to: %s", args.model_path)
+
+
 def main():
     setup_logging()
     args = parse_args()
@@ -61,10 +127,22 @@ def main():
                  args.horizon, args.threshold * 100, label_col, args.min_days)
     logging.info("=" * 60)
 
+    if args.external_memory:
+        train_external(args, label_col)
+        return
+
     # ── 1. Feature pipeline ──────────────────────────────────────
     conn = get_db_connection()
     try:
-        df = build_feature_dataframe(conn, min_days=args.min_days)
+        if args.feature_store:
+            store_conn = get_feature_store_connection()
+            try:
+                update_feature_store(conn, store_conn)
+                df = load_feature_dataframe(conn, store_conn, min_days=args.min_days)
+            finally:
+                store_conn.close()
+        else:
+            df = build_feature_dataframe(conn, min_days=args.min_days)
     finally:
         conn.close()
 
@@ -83,6 +161,7 @@ def main():
         buy_threshold=args.threshold,
         sell_threshold=args.threshold,
     )
+    log_memory("labels added", df)
 
     labeled = df[df[label_col].notna()]
     logging.info("Labeled rows: %d (dropped %d end-of-series NaN rows)",
@@ -95,7 +174,9 @@ def main():
     # ── 3. Walk-forward CV ───────────────────────────────────────
     if not args.no_cv:
         logging.info("Running walk-forward cross-validation ...")
-        cv_results = walk_forward_cv(df, label_col=label_col, n_splits=args.cv_splits)
+        cv_results = walk_forward_cv(
+            df, label_col=label_col, n_splits=args.cv_splits, n_jobs=args.cv_threads
+        )
         if cv_results:
             logging.info("CV Results:")
             logging.info(cv_results["fold_results"].to_string(index=False))
@@ -110,6 +191,7 @@ def main():
     # ── 4. Train final model ─────────────────────────────────────
     logging.info("Training final model on all available data ...")
     model, feature_names = train_final_model(df, label_col=label_col)
+    log_memory("model trained")
 
     # ── 5. SHAP feature importance ───────────────────────────────
     X_all, _ = prepare_dataset(df, label_col=label_col)
@@ -123,7 +205,7 @@ def main():
     logging.info("\n%s", importance.head(15).to_string(index=False))
 
     # ── 6. Save model ────────────────────────────────────────────
-    save_model(model, feature_names, path=args.model_path)
+    save_model(model, feature_names, path=args.model_path, train_info=full_train_info(model, df, label_col=label_col))
     logging.info("Training complete. Model saved to: %s", args.model_path)
 
 
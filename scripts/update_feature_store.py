@@ -0,0 +1,55 @@
+"""
+update_feature_store.py
+
+Brings the incremental ML feature store (app/ml/feature_store.py) up to date
+with the price history. scripts/daily_ml_run.py does this on every run; use this
+script after large imports/backfills or to rebuild the store from scratch.
+
+Usage:
+    python scripts/update_feature_store.py [--rebuild] [--trailing-days 400]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.logging_config import setup_logging
+from app.database.db_connection import get_db_connection
+from app.ml.feature_store import (
+    FEATURE_STORE_PATH,
+    FEATURE_STORE_TRAILING_DAYS,
+    get_feature_store_connection,
+    update_feature_store,
+)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Update the incremental ML feature store")
+    p.add_argument("--rebuild",       action="store_true", help="Recompute every collection from full history")
+    p.add_argument("--trailing-days", type=int, default=FEATURE_STORE_TRAILING_DAYS,
+                   help=f"Price window used for incremental rows (default: {FEATURE_STORE_TRAILING_DAYS})")
+    p.add_argument("--path",          type=str, default=FEATURE_STORE_PATH, help="Feature store SQLite file")
+    return p.parse_args()
+
+
+def main():
+    setup_logging()
+    args = parse_args()
+
+    t0 = time.perf_counter()
+    conn = get_db_connection()
+    store_conn = get_feature_store_connection(args.path)
+    try:
+        stats = update_feature_store(conn, store_conn, trailing_days=args.trailing_days, rebuild=args.rebuild)
+    finally:
+        store_conn.close()
+        conn.close()
+    logging.info("Feature store %s updated in %.1f s: %s", args.path, time.perf_counter() - t0, stats)
+
+
+if __name__ == "__main__":
+    main()
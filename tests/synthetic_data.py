@@ -0,0 +1,109 @@
+"""
+Synthetic price histories for the ML tests (and scripts/benchmark_feature_pipeline.py).
+"""
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = [
+    "collection_identifier", "slug", "chain", "date",
+    "floor_native", "floor_usd", "sale_count_24h", "sale_volume_native_24h",
+    "highest_sale_native_24h", "lowest_sale_native_24h",
+    "listed_count", "unique_owners", "total_supply", "ranking",
+]
+
+
+def synthetic_price_data(n_collections: int, days: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Random-walk price rows shaped like _load_price_data output, with missing days,
+    NULL floors, sparse sales and a few duplicated (collection, chain, date) rows.
+    """
+    rng = np.random.default_rng(seed)
+    chains = np.array(["ethereum", "solana", "bitcoin", "base", "polygon"])
+    lengths = rng.integers(days // 4, days + 1, size=n_collections)
+    cid = np.repeat(np.arange(n_collections), lengths)
+    day = np.concatenate([np.arange(n) for n in lengths]) + np.repeat(rng.integers(0, days // 2, n_collections), lengths)
+    n = len(cid)
+
+    log_ret = rng.normal(0, 0.05, n)
+    log_ret[np.r_[0, np.cumsum(lengths)[:-1]]] = np.log(rng.uniform(0.01, 50, n_collections))
+    floor = np.exp(pd.Series(log_ret).groupby(cid).cumsum().to_numpy())
+    floor[rng.random(n) < 0.03] = np.nan
+
+    df = pd.DataFrame({
+        "collection_identifier": np.char.add("col", cid.astype(str)),
+        "slug": np.where(rng.random(n) < 0.05, None, np.char.add("slug", cid.astype(str))),
+        "chain": chains[cid % len(chains)],
+        "date": pd.Timestamp("2022-01-01") + pd.to_timedelta(day, unit="D"),
+        "floor_native": floor,
+        "floor_usd": floor * 2500,
+        "sale_count_24h": np.where(rng.random(n) < 0.5, np.nan, rng.integers(0, 20, n)),
+        "sale_volume_native_24h": np.where(rng.random(n) < 0.5, np.nan, rng.random(n) * 10),
+        "highest_sale_native_24h": rng.random(n) * 5,
+        "lowest_sale_native_24h": rng.random(n),
+        "listed_count": np.where(rng.random(n) < 0.2, np.nan, rng.integers(0, 500, n)),
+        "unique_owners": rng.integers(1, 5000, n).astype(float),
+        "total_supply": rng.integers(0, 10000, n).astype(float),
+        "ranking": np.where(rng.random(n) < 0.2, np.nan, rng.integers(1, 2000, n)),
+    })
+    # Missing days and duplicated rows
+    df = df[rng.random(n) > 0.08]
+    dup = df.sample(frac=0.01, random_state=seed).assign(floor_native=lambda d: d["floor_native"] * 0.9)
+    df = pd.concat([df, dup]).sort_values(["collection_identifier", "chain", "date"], kind="stable")
+    return df.reset_index(drop=True)
+
+
+def aligned_price_data(n_collections: int, days: int, seed: int = 0) -> pd.DataFrame:
+    """synthetic_price_data with every collection's history ending on the same (latest) date."""
+    df = synthetic_price_data(n_collections, days, seed)
+    shift = df["date"].max() - df.groupby("collection_identifier")["date"].transform("max")
+    df["date"] = df["date"] + shift
+    return df.sort_values(["collection_identifier", "chain", "date"], kind="stable").reset_index(drop=True)
+
+
+def make_price_db(price_df: pd.DataFrame = None) -> sqlite3.Connection:
+    """
+    In-memory database with the legacy historical_nft_data table, every collection
+    canonical, and empty hype / X sentiment tables.
+    """
+    conn = sqlite3.connect(":memory:")
+    conn.execute(
+        "CREATE TABLE historical_nft_data ("
+        "collection_identifier TEXT, slug TEXT, chain TEXT, latest_floor_date TEXT, "
+        "floor_native REAL, floor_usd REAL, sale_count_24h INTEGER, sale_volume_native_24h REAL, "
+        "highest_sale_native_24h REAL, lowest_sale_native_24h REAL, listed_count INTEGER, "
+        "unique_owners INTEGER, total_supply INTEGER, ranking INTEGER)"
+    )
+    conn.execute(
+        "CREATE TABLE canonical_collections (slug TEXT, collection_identifier TEXT, chain TEXT, is_canonical INTEGER)"
+    )
+    conn.execute("CREATE TABLE nft_social_hype (date TEXT, hype_score REAL, sentiment TEXT, trend TEXT)")
+    conn.execute(
+        "CREATE TABLE nft_x_sentiment (collection_identifier TEXT, chain TEXT, date TEXT, "
+        "sentiment_score REAL, community_engagement REAL, volume_activity REAL)"
+    )
+    if price_df is not None:
+        insert_prices(conn, price_df)
+    return conn
+
+
+def insert_prices(conn: sqlite3.Connection, price_df: pd.DataFrame):
+    """Insert price rows (synthetic_price_data layout) and mark their collections canonical."""
+    rows = price_df[PRICE_COLUMNS].assign(date=price_df["date"].dt.strftime("%Y-%m-%d"))
+    rows = rows.astype(object).where(rows.notna(), None)
+    conn.executemany(
+        "INSERT INTO historical_nft_data (collection_identifier, slug, chain, latest_floor_date, "
+        "floor_native, floor_usd, sale_count_24h, sale_volume_native_24h, highest_sale_native_24h, "
+        "lowest_sale_native_24h, listed_count, unique_owners, total_supply, ranking) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        rows.itertuples(index=False, name=None),
+    )
+    keys = price_df[["collection_identifier", "chain"]].drop_duplicates()
+    existing = set(conn.execute("SELECT collection_identifier, chain FROM canonical_collections").fetchall())
+    conn.executemany(
+        "INSERT INTO canonical_collections (slug, collection_identifier, chain, is_canonical) VALUES (?, ?, ?, 1)",
+        [("s" + cid, cid, chain) for cid, chain in keys.itertuples(index=False) if (cid, chain) not in existing],
+    )
+    conn.commit()
@@ -0,0 +1,84 @@
+import sqlite3
+
+import pytest
+
+from app.database.compact_schema import (
+    HISTORICAL_COLUMNS,
+    CompactHistoryWriter,
+    create_compact_tables,
+    create_compat_view,
+)
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    cur = conn.cursor()
+    create_compact_tables(cur)
+    create_compat_view(cur)
+    yield conn
+    conn.close()
+
+
+def _row(day, slug, contract="0xabc"):
+    row = dict.fromkeys(HISTORICAL_COLUMNS)
+    row.update(
+        collection_identifier="col", chain="ethereum", chain_currency_symbol="ETH",
+        latest_floor_date=day, slug=slug, contract_address=contract, floor_native=1.0,
+    )
+    return tuple(row[c] for c in HISTORICAL_COLUMNS)
+
+
+def _insert_with_writer(conn, values):
+    return CompactHistoryWriter(conn).insert(conn.cursor(), values)
+
+
+def _insert_with_trigger(conn, values):
+    cur = conn.cursor()
+    cur.execute(
+        f"INSERT OR IGNORE INTO historical_nft_data ({', '.join(HISTORICAL_COLUMNS)}) "
+        f"VALUES ({', '.join('?' for _ in HISTORICAL_COLUMNS)})",
+        values,
+    )
+    cur.execute("SELECT COUNT(*) FROM nft_daily_facts")
+    return cur.fetchone()[0]
+
+
+def _metadata(conn):
+    return conn.execute(
+        "SELECT latest_floor_date, slug, contract_address FROM historical_nft_data ORDER BY latest_floor_date"
+    ).fetchall()
+
+
+@pytest.mark.parametrize("insert", [_insert_with_writer, _insert_with_trigger])
+def test_reimporting_an_old_day_keeps_the_latest_metadata(conn, insert):
+    insert(conn, _row("2024-01-01", "old-slug", "0xold"))
+    insert(conn, _row("2024-01-02", "new-slug", "0xnew"))
+    # Duplicate of day 1 and a first import of an older day: neither rolls back the metadata
+    insert(conn, _row("2024-01-01", "old-slug", "0xold"))
+    insert(conn, _row("2023-12-31", "older-slug", "0xolder"))
+    assert _metadata(conn) == [
+        ("2023-12-31", "new-slug", "0xnew"),
+        ("2024-01-01", "new-slug", "0xnew"),
+        ("2024-01-02", "new-slug", "0xnew"),
+    ]
+
+
+@pytest.mark.parametrize("insert", [_insert_with_writer, _insert_with_trigger])
+def test_newest_row_without_metadata_keeps_the_stored_values(conn, insert):
+    insert(conn, _row("2024-01-01", "slug", "0xabc"))
+    insert(conn, _row("2024-01-02", None, None))
+    assert _metadata(conn) == [("2024-01-01", "slug", "0xabc"), ("2024-01-02", None, "0xabc")]
+
+
+def test_writer_reports_duplicates(conn):
+    assert _insert_with_writer(conn, _row("2024-01-01", "old-slug")) is True
+    assert _insert_with_writer(conn, _row("2024-01-02", "new-slug")) is True
+    assert _insert_with_writer(conn, _row("2024-01-01", "old-slug")) is False
+
+
+def test_unchanged_metadata_is_not_rewritten(conn):
+    _insert_with_writer(conn, _row("2024-01-01", "slug"))
+    cur = conn.cursor()
+    CompactHistoryWriter(conn).insert(cur, _row("2024-01-02", "slug"))
+    assert conn.total_changes == 4  # dim_chain, dim_collection, two fact rows
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.ml import external_training as ext
+from app.ml.feature_store import get_feature_store_connection, load_feature_dataframe, update_feature_store
+from app.ml.label_generator import add_labels
+from app.ml.model import _class_weights, prepare_dataset
+from tests.synthetic_data import aligned_price_data, make_price_db
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    conn = make_price_db(aligned_price_data(14, 500, seed=2))
+    store_conn = get_feature_store_connection(str(tmp_path_factory.mktemp("store") / "store.sqlite3"))
+    update_feature_store(conn, store_conn, trailing_days=300)
+    yield conn, store_conn
+    store_conn.close()
+    conn.close()
+
+
+def _in_memory(conn, store_conn, label_col):
+    """add_labels + prepare_dataset on the whole store, as train_final_model sees it."""
+    df = add_labels(load_feature_dataframe(conn, store_conn, min_days=60))
+    df = df.sort_values("date", kind="stable").reset_index(drop=True)
+    X, y = prepare_dataset(df, label_col=label_col)
+    if label_col == "label_3class":
+        y = y + 1
+    return X, y, df.loc[X.index, "date"]
+
+
+@pytest.mark.parametrize("label_col", ["label_binary", "label_3class"])
+def test_partitions_match_in_memory_dataset(store, tmp_path, label_col):
+    conn, store_conn = store
+    manifest = ext.write_training_partitions(
+        conn, store_conn, str(tmp_path), label_col=label_col, partition_collections=4,
+    )
+    X, y, dates = _in_memory(conn, store_conn, label_col)
+
+    assert len(manifest["parts"]) > 1
+    assert manifest["feature_names"] == X.columns.tolist()
+    assert manifest["n_rows"] == len(X)
+
+    # Validation starts on the date of the row at the 90% position, whole dates held out
+    val_start = ext._validation_cutoff_day(manifest)
+    val_date = pd.Timestamp(val_start, unit="D")
+    assert val_date == dates.iloc[int(len(dates) * 0.90)]
+    is_train = (dates < val_date).to_numpy()
+    days = np.concatenate([np.load(p + "_day.npy") for p in manifest["parts"]])
+    assert (days < val_start).sum() == is_train.sum()
+    assert (days >= val_start).sum() == (~is_train).sum()
+
+    # Class weights of the training rows, as train_model computes them
+    weights = ext._class_weights(manifest, val_start)
+    y_train = y[is_train]
+    expected = _class_weights(y_train).groupby(y_train).first()
+    for cls, w in expected.items():
+        assert weights[int(cls)] == pytest.approx(w)
+
+
+def test_partition_rows_match_in_memory_rows(store, tmp_path):
+    conn, store_conn = store
+    manifest = ext.write_training_partitions(conn, store_conn, str(tmp_path), partition_collections=4)
+    X, y, dates = _in_memory(conn, store_conn, "label_binary")
+
+    parts = pd.DataFrame(
+        np.concatenate([np.load(p + "_X.npy") for p in manifest["parts"]]), columns=manifest["feature_names"]
+    )
+    parts["y"] = np.concatenate([np.load(p + "_y.npy") for p in manifest["parts"]])
+    expected = X.astype(np.float32).assign(y=y.astype(np.float32).to_numpy())
+    key = manifest["feature_names"] + ["y"]
+    pd.testing.assert_frame_equal(
+        parts.sort_values(key).reset_index(drop=True),
+        expected.sort_values(key).reset_index(drop=True),
+        check_exact=True,
+    )
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.ml.feature_pipeline import _compute_features_per_group, _compute_features_vectorized
+from tests.synthetic_data import synthetic_price_data
+
+MAX_FILL_GAP = 7
+
+
+def _edge_case_prices(seed):
+    """
+    Synthetic prices plus the cases the vectorized path must reproduce: duplicated
+    dates (including floor ties), gaps longer than MAX_FILL_GAP, all-NaN floor groups
+    and single-row groups.
+    """
+    df = synthetic_price_data(40, 400, seed=seed)
+    ids = sorted(df["collection_identifier"].unique())
+    rng = np.random.default_rng(seed)
+
+    # Same date repeated with identical and different floors
+    dup = df[df["collection_identifier"] == ids[0]].iloc[50:60]
+    dups = [dup, dup.assign(floor_native=dup["floor_native"] * 1.1, listed_count=1.0)]
+
+    # Gaps of 20 and 60 days, longer than the forward-fill limit
+    gapped = df["collection_identifier"].isin(ids[1:4])
+    day_pos = df[gapped].groupby("collection_identifier").cumcount()
+    drop = day_pos.between(100, 120) | day_pos.between(200, 260)
+    df = df.drop(index=day_pos[drop].index)
+
+    # Collections without a single floor price, on their own and on a shared chain
+    all_nan = df["collection_identifier"].isin(ids[4:6])
+    df.loc[all_nan, ["floor_native", "floor_usd"]] = np.nan
+
+    single = df[df["collection_identifier"] == ids[6]].iloc[[0]].assign(collection_identifier="single")
+    df = pd.concat([df, *dups, single])
+    df = df.sample(frac=1.0, random_state=int(rng.integers(1 << 31)))
+    return df.sort_values(["collection_identifier", "chain", "date"], kind="stable").reset_index(drop=True)
+
+
+@pytest.mark.parametrize("last_row_only", [False, True])
+@pytest.mark.parametrize("seed", [0, 1])
+def test_vectorized_features_match_per_group(seed, last_row_only):
+    price_df = _edge_case_prices(seed)
+    expected, expected_skipped = _compute_features_per_group(
+        price_df, max_fill_gap=MAX_FILL_GAP, last_row_only=last_row_only
+    )
+    actual, actual_skipped = _compute_features_vectorized(
+        price_df, max_fill_gap=MAX_FILL_GAP, last_row_only=last_row_only
+    )
+    assert expected_skipped == actual_skipped >= 2
+    pd.testing.assert_frame_equal(expected, actual, check_exact=True)
+
+
+def test_vectorized_features_empty_input():
+    price_df = synthetic_price_data(2, 40).iloc[:0]
+    assert _compute_features_vectorized(price_df)[0].empty
+    assert _compute_features_per_group(price_df)[0].empty
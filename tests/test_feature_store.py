@@ -0,0 +1,209 @@
+import json
+
+import pandas as pd
+import pytest
+
+from app.ml import feature_store as fs
+from app.ml.feature_pipeline import build_feature_dataframe
+from tests.synthetic_data import aligned_price_data, insert_prices, make_price_db
+
+TRAILING_DAYS = 300
+N_NEW_DAYS = 3
+
+
+def _assert_store_matches(conn, store_conn):
+    expected = build_feature_dataframe(conn, min_days=60)
+    actual = fs.load_feature_dataframe(conn, store_conn, min_days=60)
+    pd.testing.assert_frame_equal(expected, actual, check_exact=False, rtol=1e-6, atol=1e-9)
+
+
+@pytest.fixture
+def prices():
+    return aligned_price_data(12, 700, seed=1)
+
+
+@pytest.fixture
+def db(prices, tmp_path):
+    """Main DB holding all but the last N_NEW_DAYS dates, and a store built from it."""
+    cut = prices["date"].max() - pd.Timedelta(days=N_NEW_DAYS)
+    conn = make_price_db(prices[prices["date"] <= cut])
+    store_conn = fs.get_feature_store_connection(str(tmp_path / "store.sqlite3"))
+    stats = fs.update_feature_store(conn, store_conn, trailing_days=TRAILING_DAYS)
+    yield conn, store_conn, stats
+    store_conn.close()
+    conn.close()
+
+
+def _new_days(prices):
+    cut = prices["date"].max() - pd.Timedelta(days=N_NEW_DAYS)
+    return [g for _, g in prices[prices["date"] > cut].groupby("date")]
+
+
+def test_initial_build_matches_full_computation(db):
+    conn, store_conn, stats = db
+    n_collections = conn.execute("SELECT COUNT(*) FROM canonical_collections").fetchone()[0]
+    assert stats["rebuilt"] + stats["window"] == n_collections
+    assert stats["unchanged"] == stats["appended"] == stats["removed"] == 0
+    _assert_store_matches(conn, store_conn)
+
+
+def test_unchanged_history_writes_nothing(db):
+    conn, store_conn, _ = db
+    stats = fs.update_feature_store(conn, store_conn, trailing_days=TRAILING_DAYS)
+    assert stats["rows_written"] == 0
+    assert stats["appended"] == stats["window"] == stats["rebuilt"] == 0
+    assert stats["unchanged"] == len(fs.store_collections(store_conn, min_days=0))
+
+
+def test_daily_appends_match_full_computation(db, prices):
+    conn, store_conn, _ = db
+    for day in _new_days(prices):
+        insert_prices(conn, day)
+        stats = fs.update_feature_store(conn, store_conn, trailing_days=TRAILING_DAYS)
+        assert stats["appended"] > 0
+        assert stats["rebuilt"] == 0
+        _assert_store_matches(conn, store_conn)
+
+
+def test_corrected_old_row_is_recomputed(db, prices):
+    conn, store_conn, _ = db
+    key = prices.groupby(["collection_identifier", "chain"])["date"].min().idxmin()
+    conn.execute(
+        """
+        UPDATE historical_nft_data SET floor_native = floor_native * 1.5
+        WHERE rowid = (SELECT MIN(rowid) FROM historical_nft_data
+                       WHERE collection_identifier = ? AND chain = ? AND floor_native IS NOT NULL)
+        """,
+        key,
+    )
+    conn.commit()
+    insert_prices(conn, _new_days(prices)[0])
+
+    stats = fs.update_feature_store(conn, store_conn, trailing_days=TRAILING_DAYS)
+    # The corrected row is older than the trailing window: full-history recompute
+    assert stats["rebuilt"] == 1
+    _assert_store_matches(conn, store_conn)
+
+
+def test_collection_no_longer_canonical_is_removed(db):
+    conn, store_conn, _ = db
+    key = fs.store_collections(store_conn, min_days=0)[0]
+    conn.execute(
+        "UPDATE canonical_collections SET is_canonical = 0 WHERE collection_identifier = ? AND chain = ?", key
+    )
+    conn.commit()
+
+    stats = fs.update_feature_store(conn, store_conn, trailing_days=TRAILING_DAYS)
+    assert stats["removed"] == 1
+    assert key not in fs.store_collections(store_conn, min_days=0)
+    assert store_conn.execute(
+        "SELECT COUNT(*) FROM collection_features WHERE collection_identifier = ? AND chain = ?", key
+    ).fetchone()[0] == 0
+    _assert_store_matches(conn, store_conn)
+
+
+def test_version_change_rebuilds_everything(db):
+    conn, store_conn, _ = db
+    store_conn.execute("UPDATE feature_store_meta SET value = '0' WHERE key = 'version'")
+    store_conn.commit()
+    stats = fs.update_feature_store(conn, store_conn, trailing_days=TRAILING_DAYS)
+    assert stats["unchanged"] == stats["appended"] == 0
+    assert stats["rebuilt"] + stats["window"] == len(fs.store_collections(store_conn, min_days=0))
+    _assert_store_matches(conn, store_conn)
+
+
+# ─────────────────────────────────────────────
+# Fingerprints
+# ─────────────────────────────────────────────
+
+def test_fingerprint_tracks_rows_up_to_previous_run(db, prices):
+    conn, store_conn, _ = db
+    as_of = int(store_conn.execute("SELECT value FROM feature_store_meta WHERE key = 'as_of_day'").fetchone()[0])
+    insert_prices(conn, _new_days(prices)[0])
+
+    fingerprints = fs._history_fingerprints(conn, as_of)
+    state = dict(store_conn.execute(
+        "SELECT collection_identifier || '/' || chain, fingerprint FROM collection_features_state"
+    ).fetchall())
+    for (cid, chain), row in fingerprints.iterrows():
+        stored = json.loads(state[f"{cid}/{chain}"])
+        # History up to the previous run is unchanged, the full history grew
+        assert fs._same_fingerprint(stored, fs._fingerprint(row, "_as_of"))
+        assert not fs._same_fingerprint(stored, fs._fingerprint(row))
+
+
+def test_same_fingerprint_tolerance():
+    a = [10, 3.0, 1.5, 0.1]
+    assert fs._same_fingerprint(a, [10, 3.0, 1.5 * (1 + 1e-12), 0.1])
+    assert not fs._same_fingerprint(a, [10, 3.0, 1.5 * (1 + 1e-6), 0.1])
+    assert not fs._same_fingerprint(a, a[:-1])
+
+
+# ─────────────────────────────────────────────
+# _append_rows
+# ─────────────────────────────────────────────
+
+def _window_features(n_days, first_day=1000):
+    days = range(first_day, first_day + n_days)
+    return pd.DataFrame({
+        "collection_identifier": "c",
+        "chain": "ethereum",
+        "date": pd.to_datetime(list(days), unit="D"),
+        "slug": None,
+    })
+
+
+def _state(last_day, slug="stored-slug"):
+    return pd.DataFrame(
+        {"last_day": [last_day], "slug": [slug]},
+        index=pd.MultiIndex.from_tuples([("c", "ethereum")], names=fs.KEYS),
+    )
+
+
+def _first_day(day):
+    return pd.Series([day], index=pd.MultiIndex.from_tuples([("c", "ethereum")], names=fs.KEYS))
+
+
+def test_append_rows_returns_only_new_rows():
+    window_start, gap = 1000, 7
+    feat = _window_features(fs._WARMUP_ROWS + gap + 5, first_day=window_start)
+    last_day = window_start + fs._WARMUP_ROWS + gap + 2
+    rows, short_keys = fs._append_rows(feat, _state(last_day), _first_day(0), window_start, gap)
+    assert short_keys == set()
+    assert (fs._feature_days(rows) > last_day).all()
+    assert len(rows) == 2
+    # NULL slugs inherit the stored one
+    assert (rows["slug"] == "stored-slug").all()
+
+
+def test_append_rows_flags_window_too_short():
+    window_start, gap = 1000, 7
+    # First new row has only _WARMUP_ROWS predecessors, gap rows of which are forward-fill edge
+    feat = _window_features(fs._WARMUP_ROWS + 1, first_day=window_start)
+    last_day = window_start + fs._WARMUP_ROWS - 1
+    rows, short_keys = fs._append_rows(feat, _state(last_day), _first_day(0), window_start, gap)
+    assert short_keys == {("c", "ethereum")}
+    assert rows.empty
+
+
+def test_append_rows_edge_boundary():
+    window_start, gap = 1000, 7
+    # Exactly _WARMUP_ROWS rows after the edge precede the first new row: exact
+    feat = _window_features(gap + fs._WARMUP_ROWS + 1, first_day=window_start)
+    last_day = window_start + gap + fs._WARMUP_ROWS - 1
+    rows, short_keys = fs._append_rows(feat, _state(last_day), _first_day(0), window_start, gap)
+    assert short_keys == set()
+    assert len(rows) == 1
+
+    # One missing date between the edge and the new row makes it too short
+    rows, short_keys = fs._append_rows(feat.drop(index=gap + 5), _state(last_day), _first_day(0), window_start, gap)
+    assert short_keys == {("c", "ethereum")}
+
+
+def test_append_rows_history_inside_window_is_exact():
+    window_start, gap = 1000, 7
+    feat = _window_features(10, first_day=window_start + 3)
+    last_day = window_start + 10
+    rows, short_keys = fs._append_rows(feat, _state(last_day), _first_day(window_start + 3), window_start, gap)
+    assert short_keys == set()
+    assert len(rows) == 2
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.ml.label_generator import add_labels
+
+
+def _reference_labels(df, horizon_days, buy_threshold, sell_threshold):
+    """The original per-row implementation of add_labels, used as the oracle."""
+    df = df.sort_values(["collection_identifier", "chain", "date"]).copy()
+    fwd = pd.Series(np.nan, index=df.index)
+    for _, grp in df.groupby(["collection_identifier", "chain"], sort=False):
+        floor = grp.set_index("date")["floor_native"]
+        for idx, dt in zip(grp.index, floor.index):
+            target_dt = dt + pd.Timedelta(days=horizon_days)
+            for offset in [0, 1, -1, 2, -2]:
+                candidate = target_dt + pd.Timedelta(days=offset)
+                if candidate in floor.index and pd.notna(floor[candidate]) and floor[dt] > 0:
+                    fwd[idx] = (floor[candidate] - floor[dt]) / floor[dt]
+                    break
+
+    def _classify(r):
+        if pd.isna(r):
+            return np.nan
+        if r >= buy_threshold:
+            return 1
+        if r <= -sell_threshold:
+            return -1
+        return 0
+
+    df["forward_ret"] = fwd
+    df["label_3class"] = df["forward_ret"].map(_classify).astype(float)
+    df["label_binary"] = (df["forward_ret"] >= buy_threshold).astype(float)
+    df.loc[df["forward_ret"].isna(), "label_binary"] = np.nan
+    return df
+
+
+def _gappy_features(seed=0, n_collections=8, days=120):
+    """One row per (collection, chain, date) with missing dates, NaN and zero floors."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i in range(n_collections):
+        dates = pd.date_range("2024-01-01", periods=days, freq="D") + pd.Timedelta(days=int(rng.integers(0, 30)))
+        keep = rng.random(days) > 0.3
+        floor = np.exp(np.cumsum(rng.normal(0, 0.08, days))) * rng.uniform(0.1, 10)
+        floor[rng.random(days) < 0.1] = np.nan
+        floor[rng.random(days) < 0.05] = 0.0
+        frames.append(pd.DataFrame({
+            "collection_identifier": f"col{i % 5}",
+            "chain": ["ethereum", "solana"][i // 5],
+            "date": dates[keep],
+            "floor_native": floor[keep],
+        }))
+    df = pd.concat(frames, ignore_index=True)
+    # Shuffled input: add_labels sorts it
+    return df.sample(frac=1.0, random_state=seed).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("horizon", [1, 2, 14])
+@pytest.mark.parametrize("seed", [0, 1])
+def test_labels_match_per_row_reference(seed, horizon):
+    df = _gappy_features(seed)
+    expected = _reference_labels(df, horizon, 0.10, 0.05)
+    actual = add_labels(df, horizon_days=horizon, buy_threshold=0.10, sell_threshold=0.05)
+    pd.testing.assert_frame_equal(expected, actual, check_exact=True)
+
+
+def test_extra_horizons_match_single_horizon_calls():
+    df = _gappy_features(2)
+    combined = add_labels(df, horizon_days=14, extra_horizons=(1, 2, 14))
+    assert "forward_ret_14d" not in combined.columns
+    for h in (1, 2):
+        single = add_labels(df, horizon_days=h)
+        for col in ("forward_ret", "label_3class", "label_binary"):
+            pd.testing.assert_series_equal(
+                combined[f"{col}_{h}d"], single[col], check_names=False, check_exact=True
+            )
+    pd.testing.assert_frame_equal(
+        combined[["forward_ret", "label_3class", "label_binary"]],
+        add_labels(df, horizon_days=14)[["forward_ret", "label_3class", "label_binary"]],
+        check_exact=True,
+    )
+
+
+def test_empty_frame():
+    df = _gappy_features().iloc[:0]
+    out = add_labels(df, horizon_days=14, extra_horizons=(7,))
+    assert out.empty
+    assert {"forward_ret", "label_binary", "label_3class_7d"} <= set(out.columns)
@@ -0,0 +1,148 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.ml.model import (
+    _holdout_loss,
+    _recent_splits,
+    full_train_info,
+    train_final_model,
+    warm_start_update,
+)
+
+FEATURES = ["ret_7d", "vol_14d", "floor_vs_ma20", "listing_ratio"]
+
+
+def _labeled_frame(seed=0, n_collections=20, days=300, drift=0.0):
+    """
+    Feature rows whose label_binary depends on ret_7d and floor_vs_ma20; with
+    drift the floor_vs_ma20 coefficient moves linearly from 0.5 + drift/2 to 0.5 - drift/2.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2024-01-01", periods=days, freq="D")
+    n = n_collections * days
+    df = pd.DataFrame({
+        "collection_identifier": np.repeat([f"col{i}" for i in range(n_collections)], days),
+        "chain": "ethereum",
+        "date": np.tile(dates, n_collections),
+        **{c: rng.normal(size=n) for c in FEATURES},
+    })
+    t = (df["date"] - dates[0]).dt.days / days
+    coef = 0.5 + drift * (0.5 - t)
+    signal = df["ret_7d"] + coef * df["floor_vs_ma20"] + rng.normal(0, 0.5, n)
+    df["label_binary"] = (signal > 0.3).astype(float)
+    return df
+
+
+@pytest.fixture(scope="module")
+def trained():
+    df = _labeled_frame()
+    model, feature_names = train_final_model(df)
+    return df, model, feature_names
+
+
+@pytest.fixture(scope="module")
+def drifting():
+    """Model fully trained on the first 300 of 400 days of a slowly drifting relation."""
+    df = _labeled_frame(days=400, drift=1.6)
+    old = df[df["date"] < df["date"].min() + pd.Timedelta(days=300)]
+    model, feature_names = train_final_model(old)
+    return df, model, feature_names, full_train_info(model, old)
+
+
+def _info(model, df, **overrides):
+    return dict(full_train_info(model, df), **overrides)
+
+
+def test_recent_splits_are_disjoint_and_date_ordered():
+    df = _labeled_frame(days=120)
+    X_tr, _, X_es, _, X_acc, y_acc = _recent_splits(df, "label_binary", window_days=90)
+    recent = df[df["date"] > df["date"].max() - pd.Timedelta(days=90)]
+    assert len(X_tr) + len(X_es) + len(X_acc) == len(recent)
+    assert len(X_acc) == len(recent) - int(len(recent) * 0.90)
+    dates = recent.sort_values("date", kind="stable")["date"].reset_index(drop=True)
+    assert dates[X_tr.index].max() <= dates[X_es.index].min()
+    assert dates[X_es.index].max() <= dates[X_acc.index].min()
+
+
+def test_baseline_is_measured_on_acceptance_slice(trained):
+    df, model, _ = trained
+    *_, X_acc, y_acc = _recent_splits(df, "label_binary", 90)
+    assert full_train_info(model, df)["baseline_loss"] == pytest.approx(_holdout_loss(model, X_acc, y_acc))
+    assert full_train_info(model)["baseline_loss"] is None
+
+
+@pytest.mark.parametrize("mode", ["trees", "refresh"])
+def test_update_accepted(drifting, mode):
+    df, model, feature_names, info = drifting
+    updated, new_info, reason = warm_start_update(
+        model, feature_names, info, df, mode=mode, drift_tolerance=5.0,
+    )
+    assert updated is not None, reason
+    assert reason.startswith(f"updated ({mode})")
+    *_, X_acc, y_acc = _recent_splits(df, "label_binary", 90)
+    assert new_info["last_update_loss"] == pytest.approx(_holdout_loss(updated, X_acc, y_acc))
+    assert new_info["last_update_loss"] < _holdout_loss(model, X_acc, y_acc)
+    assert new_info["updates"] == 1
+    assert new_info["baseline_loss"] == info["baseline_loss"]
+
+
+def test_missing_baseline_is_recorded(drifting):
+    df, model, feature_names, info = drifting
+    updated, new_info, reason = warm_start_update(
+        model, feature_names, dict(info, baseline_loss=None), df,
+    )
+    # No baseline, no drift check: the previous model's acceptance loss becomes the baseline
+    assert updated is not None, reason
+    *_, X_acc, y_acc = _recent_splits(df, "label_binary", 90)
+    assert new_info["baseline_loss"] == pytest.approx(_holdout_loss(model, X_acc, y_acc))
+
+
+def test_fallback_without_full_retrain_record(trained):
+    df, model, feature_names = trained
+    updated, info, reason = warm_start_update(model, feature_names, {}, df)
+    assert updated is None and info == {}
+    assert reason == "no full-retrain record"
+
+
+def test_fallback_when_full_retrain_is_due(trained):
+    df, model, feature_names = trained
+    old = (datetime.utcnow() - timedelta(days=8)).isoformat()
+    updated, _, reason = warm_start_update(
+        model, feature_names, _info(model, df, full_trained_at=old), df, full_retrain_days=7,
+    )
+    assert updated is None
+    assert reason.startswith("last full retrain 8.0 days ago")
+
+
+def test_fallback_when_feature_set_changed(trained):
+    df, model, feature_names = trained
+    updated, _, reason = warm_start_update(model, feature_names, _info(model, df), df.drop(columns="vol_14d"))
+    assert updated is None
+    assert reason == "feature set changed"
+
+
+def test_fallback_with_too_few_recent_rows(trained):
+    df, model, feature_names = trained
+    updated, _, reason = warm_start_update(model, feature_names, _info(model, df), df, window_days=1)
+    assert updated is None
+    assert reason.startswith("too few recent labeled rows")
+
+
+def test_fallback_on_drift(drifting):
+    df, model, feature_names, info = drifting
+    updated, _, reason = warm_start_update(model, feature_names, info, df, drift_tolerance=0.10)
+    assert updated is None
+    assert reason.startswith("drift: ")
+
+
+def test_fallback_when_update_is_worse(trained, monkeypatch):
+    df, model, feature_names = trained
+    # An "update" that predicts the opposite class is always worse on the acceptance slice
+    flipped = train_final_model(df.assign(label_binary=1 - df["label_binary"]))[0]
+    monkeypatch.setattr("app.ml.model.update_model", lambda *args, **kwargs: flipped)
+    updated, info, reason = warm_start_update(model, feature_names, _info(model, df), df)
+    assert updated is None and info["updates"] == 0
+    assert reason.startswith("update worse than previous model")
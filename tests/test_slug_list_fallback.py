@@ -0,0 +1,43 @@
+import sqlite3
+
+import pytest
+
+from app.database.bot_repository import query_slug_list
+from app.telegram.utils.slug_index import SlugIndex
+
+COLLECTIONS = [
+    ("pixel-punks", "ethereum", "Pixel Art, PFP"),
+    ("pixelart-club", "ethereum", "pixelart"),
+    ("art-blocks", "ethereum", " Art ,Generative"),
+    ("percent", "solana", "100%_off"),
+    ("gamers", "polygon", "Gaming"),
+    ("no-category", "polygon", None),
+]
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE nft_collections (slug TEXT, chain TEXT, categories TEXT)")
+    conn.executemany("INSERT INTO nft_collections VALUES (?, ?, ?)", COLLECTIONS)
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize(
+    "category, expected",
+    [
+        ("art", ["art-blocks"]),
+        (" ART ", ["art-blocks"]),
+        ("pixel art", ["pixel-punks"]),
+        ("pixelart", ["pixelart-club"]),
+        ("100%_off", ["percent"]),
+        ("%", []),
+        ("gam_ng", []),
+    ],
+)
+def test_category_fallback_matches_index(conn, category, expected):
+    index = SlugIndex()
+    index._data = index._build(COLLECTIONS)
+    assert index.by_category(category) == expected
+    assert query_slug_list(conn, "slug_list_by_category", category) == expected
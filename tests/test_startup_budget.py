@@ -0,0 +1,40 @@
+import re
+
+import pytest
+
+from scripts.benchmark_startup import STARTUP_BUDGETS, measure_import
+
+# Generous margin over the benchmark budgets: CI machines are slower and noisier
+BUDGET_SCALE = 3.0
+
+CRON_MODULES = [m for m in STARTUP_BUDGETS if m != "app.telegram.telegram_bot"]
+
+
+def _measure(module, tmp_path):
+    try:
+        return measure_import(module, cwd=str(tmp_path))
+    except RuntimeError as e:
+        missing = re.search(r"No module named '([^']+)'", str(e))
+        if missing and not missing.group(1).startswith("app"):
+            pytest.skip(f"dependency not installed: {missing.group(1)}")
+        raise
+
+
+@pytest.mark.parametrize("module", CRON_MODULES)
+def test_cron_module_does_not_load_heavy_modules(module, tmp_path):
+    _, imports = _measure(module, tmp_path)
+    forbidden = STARTUP_BUDGETS[module][1]
+    loaded = sorted(
+        name for name in forbidden
+        if name in imports or any(n.startswith(name + ".") for n in imports)
+    )
+    assert not loaded, f"{module} loads {', '.join(loaded)} at import time"
+
+
+@pytest.mark.parametrize("module", CRON_MODULES)
+def test_cron_module_import_within_budget(module, tmp_path):
+    budget_ms = STARTUP_BUDGETS[module][0] * BUDGET_SCALE
+    # Best of three runs: the first one also pays for cold .pyc / disk caches
+    total_ms = min(_measure(module, tmp_path)[0] for _ in range(3))
+    assert total_ms <= budget_ms, f"{module}: {total_ms:.0f} ms > {budget_ms:.0f} ms"
+
@@ -0,0 +1,85 @@
+import asyncio
+import re
+
+import pytest
+
+from app.telegram.utils import telegram_notifier as tn
+
+
+def _balanced(html):
+    stack = []
+    for closing, name in re.findall(r"<(/?)([a-zA-Z][\w-]*)[^>]*>", html):
+        if closing:
+            assert stack and stack.pop() == name, html
+        else:
+            stack.append(name)
+    return not stack
+
+
+def test_split_plain_text_prefers_line_breaks():
+    text = "\n".join(f"line {i}" for i in range(100))
+    parts = tn.split_message(text, limit=100)
+    assert all(len(p) <= 100 for p in parts)
+    assert "\n".join(parts) == text
+
+
+def test_split_html_keeps_every_part_well_formed():
+    block = '<b>Collection &amp; co</b>\n<a href="https://example.com/x">link</a> <i>note <code>x&lt;y</code></i>\n'
+    text = "<blockquote>" + block * 40 + "</blockquote>"
+    parts = tn.split_message(text, limit=200, parse_mode="HTML")
+    assert len(parts) > 1
+    for part in parts:
+        assert len(part) <= 200
+        assert _balanced(part), part
+        # No cut inside an entity
+        assert not re.search(r"&[a-z]*$", part.split("<")[-1])
+    assert all(p.startswith("<blockquote>") for p in parts)
+
+
+def test_split_html_never_cuts_inside_a_tag():
+    text = "x" * 95 + '<a href="https://example.com">y</a>' + "z" * 50
+    parts = tn.split_message(text, limit=100, parse_mode="HTML")
+    assert parts[0] == "x" * 95
+    assert all(_balanced(p) for p in parts)
+
+
+@pytest.fixture
+def notifier(monkeypatch):
+    n = tn.TelegramNotifier()
+    sent = []
+
+    async def fake_send_part(chat_id, text, parse_mode):
+        if "<bad" in text:
+            raise tn.TelegramSendError("Errore Telegram API: 400 - can't parse entities", 400)
+        sent.append(text)
+        return {"ok": True}
+
+    monkeypatch.setattr(n, "_send_part", fake_send_part)
+    return n, sent
+
+
+def _run_batch(n, messages):
+    async def run():
+        state = n._chats["1"] = {"items": tn.deque(), "task": None}
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in messages]
+        state["items"].extend((m, "HTML", f) for m, f in zip(messages, futures))
+        await n._chat_worker("1", state)
+        return [f.exception() or f.result() for f in futures]
+    return asyncio.run(run())
+
+
+def test_rejected_batch_is_resent_item_by_item(notifier):
+    n, sent = notifier
+    results = _run_batch(n, ["<b>one</b>", "<bad>two", "three"])
+    assert sent == ["<b>one</b>", "three"]
+    assert results[0] == results[2] == {"ok": True}
+    assert isinstance(results[1], tn.TelegramSendError)
+    assert n.metrics["sent"] == 2 and n.metrics["failed"] == 1
+
+
+def test_valid_batch_is_sent_once(notifier):
+    n, sent = notifier
+    results = _run_batch(n, ["one", "two"])
+    assert sent == ["one" + tn.BATCH_SEPARATOR + "two"]
+    assert results == [{"ok": True}, {"ok": True}]